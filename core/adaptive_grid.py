@@ -0,0 +1,185 @@
+# Archivo: core/adaptive_grid.py
+"""Rejilla con espaciado adaptado a la volatilidad (`strategy.grid_mode = 'adaptive'`).
+
+- Spread (%) = ATR% × `atr_multiplier`, acotado a [`min_spread`, `max_spread`].
+- Líneas: las necesarias para cubrir ± `range_sigmas` desviaciones de la volatilidad realizada en
+  `horizon` velas, acotadas a [`min_grids`, `max_grids`].
+
+ATR y volatilidad se calculan en streaming (core.indicators) sobre las velas CERRADAS del almacén
+local (market_data, lo llena el recolector con velas de 15m): cada ciclo sólo procesa las nuevas.
+
+Re-espaciado con diff mínimo: la rejilla objetivo se compara con la actual y los niveles que ya
+están cerca de uno objetivo (a menos de `match_tolerance` × spread) se conservan con su precio, así
+que sus órdenes no se tocan; las de los niveles que desaparecen las sustituye el planificador del
+ciclo (core.planner, cancel-replace) por las de los nuevos. Sólo se re-espacia si el spread cambia más de `respace_threshold`, el número de
+líneas cambia de verdad o el precio sale de la rejilla; si el spread no cambia, la rejilla nueva se
+alinea con la malla anterior y sólo se mueven los extremos. Así puede evaluarse en cada ciclo sin
+castigar el rate limit.
+"""
+import math
+from core.indicators import StreamingATR, StreamingRealizedVolatility
+
+ADAPTIVE_DEFAULTS = {
+    'atr_period': 14,
+    'atr_multiplier': 1.0,
+    'vol_period': 30,
+    'horizon': 96,            # velas que debe cubrir la rejilla (96 × 15m = 1 día)
+    'range_sigmas': 2.0,
+    'min_spread': 0.2,
+    'max_spread': 3.0,
+    'min_grids': 4,
+    'max_grids': 30,
+    'respace_threshold': 0.2,  # cambio relativo del spread que justifica re-espaciar
+    'match_tolerance': 0.25,   # fracción del spread dentro de la cual un nivel se conserva
+}
+
+
+def adaptive_settings(params):
+    return dict(ADAPTIVE_DEFAULTS, **(params.get('adaptive') or {}))
+
+
+def grid_levels(center, spread_percent, quantity):
+    """Niveles a ±i × spread alrededor de `center` (quantity/2 por lado), ordenados."""
+    spread = spread_percent / 100
+    levels = []
+    for i in range(1, int(quantity / 2) + 1):
+        levels.append(center * (1 - (spread * i)))
+        levels.append(center * (1 + (spread * i)))
+    levels.sort()
+    return levels
+
+
+def target_spacing(price, atr, volatility, settings):
+    """(spread %, nº de líneas) para el ATR y la volatilidad realizada (por vela) actuales."""
+    spread = atr / price * 100 * settings['atr_multiplier']
+    spread = min(settings['max_spread'], max(settings['min_spread'], spread))
+    half_range = settings['range_sigmas'] * volatility * math.sqrt(settings['horizon']) * 100
+    per_side = max(1, round(half_range / spread))
+    quantity = min(settings['max_grids'], max(settings['min_grids'], 2 * per_side))
+    return round(spread, 3), int(quantity) // 2 * 2
+
+
+def respace(current, target, spread_percent, tolerance):
+    """Diff mínimo entre dos rejillas ordenadas.
+
+    Cada nivel actual se empareja como mucho con un nivel objetivo a menos de
+    `tolerance` × spread; los emparejados se conservan con su precio actual.
+    Devuelve {'levels', 'keep', 'add', 'remove'}.
+    """
+    keep, add, remove = [], [], []
+    i = j = 0
+    current, target = sorted(current), sorted(target)
+    while i < len(current) and j < len(target):
+        cur, tgt = current[i], target[j]
+        if abs(cur - tgt) <= tgt * spread_percent / 100 * tolerance:
+            keep.append(cur)
+            i += 1
+            j += 1
+        elif cur < tgt:
+            remove.append(cur)
+            i += 1
+        else:
+            add.append(tgt)
+            j += 1
+    remove += current[i:]
+    add += target[j:]
+    return {"levels": sorted(keep + add), "keep": keep, "add": add, "remove": remove}
+
+
+class VolatilityTracker:
+    """ATR y volatilidad realizada de un símbolo, alimentados sólo con velas cerradas nuevas."""
+
+    def __init__(self, atr_period, vol_period):
+        self.atr = StreamingATR(atr_period)
+        self.volatility = StreamingRealizedVolatility(vol_period)
+        self.last_ts = None
+
+    def feed(self, candles):
+        # La última vela del almacén puede seguir abierta: se procesa cuando llegue la siguiente
+        for c in candles[:-1]:
+            if self.last_ts is not None and c[0] <= self.last_ts:
+                continue
+            self.atr.update(c[2], c[3], c[4])
+            self.volatility.update(c[4])
+            self.last_ts = c[0]
+
+    @property
+    def ready(self):
+        return self.atr.value is not None and self.volatility.value is not None
+
+
+class AdaptiveGrid:
+    """Estado del modo adaptativo por símbolo. `candle_source(symbol, since_ms)` -> velas."""
+
+    def __init__(self, candle_source):
+        self._source = candle_source
+        self._trackers = {}
+        self._state = {}
+
+    def spread(self, symbol):
+        state = self._state.get(symbol)
+        return state['spread'] if state else None
+
+    def state(self, symbol):
+        return dict(self._state.get(symbol) or {})
+
+    def reset(self, symbol=None):
+        if symbol is None:
+            self._trackers.clear()
+            self._state.clear()
+        else:
+            self._trackers.pop(symbol, None)
+            self._state.pop(symbol, None)
+
+    def _tracker(self, symbol, settings):
+        tracker = self._trackers.get(symbol)
+        if tracker is None or tracker.atr.period != settings['atr_period'] \
+                or tracker.volatility.period != settings['vol_period']:
+            tracker = VolatilityTracker(settings['atr_period'], settings['vol_period'])
+            self._trackers[symbol] = tracker
+        tracker.feed(self._source(symbol, tracker.last_ts or 0) or [])
+        return tracker
+
+    def _needs_respace(self, state, spread_changed, quantity, price, current, settings):
+        if not current or not state or spread_changed:
+            return True
+        if abs(quantity - state['quantity']) > max(2, state['quantity'] * settings['respace_threshold']):
+            return True
+        return not (current[0] < price < current[-1])
+
+    def plan(self, symbol, price, current, params, round_levels=None):
+        """Plan de re-espaciado para `symbol` o None si la rejilla actual sirve (o aún no hay
+        velas suficientes). `round_levels` ajusta los niveles objetivo a la precisión del mercado."""
+        settings = adaptive_settings(params)
+        tracker = self._tracker(symbol, settings)
+        if not tracker.ready:
+            return None
+        spread, quantity = target_spacing(price, tracker.atr.value, tracker.volatility.value, settings)
+        current = sorted(current or [])
+        state = self._state.get(symbol)
+        spread_changed = state is None or \
+            abs(spread - state['spread']) / state['spread'] > settings['respace_threshold']
+        if not self._needs_respace(state, spread_changed, quantity, price, current, settings):
+            return None
+        if spread_changed:
+            anchor = price
+            target = grid_levels(price, spread, quantity)
+        else:
+            # Mismo spread: la rejilla se recentra sobre la malla anterior, así los niveles que
+            # siguen dentro del rango coinciden exactamente y sólo cambian los extremos
+            spread, anchor = state['spread'], state['anchor']
+            step = anchor * spread / 100
+            center = anchor + round((price - anchor) / step) * step
+            target = sorted(center + i * step for i in range(-(quantity // 2), quantity // 2 + 1) if i)
+        if round_levels:
+            target = round_levels(target)
+        plan = respace(current, target, spread, settings['match_tolerance'])
+        self._state[symbol] = {
+            "spread": spread,
+            "quantity": quantity,
+            "anchor": anchor,
+            "atr_pct": round(tracker.atr.value / price * 100, 4),
+            "volatility_pct": round(tracker.volatility.value * 100, 4),
+        }
+        plan.update(self._state[symbol])
+        return plan
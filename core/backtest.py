@@ -0,0 +1,263 @@
+# Archivo: core/backtest.py
+"""Backtest de la estrategia de grid sobre velas OHLCV o trades históricos.
+
+Se ejecuta el MISMO código del motor (`GridBot._run_grid_cycle`: niveles fijos, arranque
+`buy_1`/`buy_2`, trailing up, guardia de venta mínima sobre `get_last_buy_price`) contra un
+`SimulatedExchange` que casa las órdenes con el camino de precios. Nada toca la red, la base de
+datos del bot, Telegram, la consola ni las trazas del proceso.
+
+Dirigido por eventos: el ciclo del grid sólo se evalúa donde su decisión puede cambiar. Tras cada
+ciclo, `GridBot._decision_bounds` da el intervalo de precios en el que el resultado sería el mismo
+y se busca (con NumPy, por bloques) el siguiente punto del camino que lo abandona. Los niveles (donde
+están las órdenes) son límites de ese intervalo, así que entre eventos no se ejecuta ninguna orden:
+el resultado es idéntico a evaluar cada punto y un año de velas de 1m se procesa en segundos.
+
+Las velas se recorren como o -> l -> h -> c (alcistas) u o -> h -> l -> c (bajistas), igual que
+`SimulatedExchange.feed_candle`.
+"""
+import math
+import time
+import numpy as np
+from core.simulator import SimulatedExchange
+from core.exchange import BinanceConnector
+from core.bot import GridBot
+from core.planner import PlanExecutor
+from utils.logger import log
+from utils.tracing import tracer
+
+DEFAULT_STRATEGY = {
+    'grids_quantity': 10,
+    'grid_spread': 1.0,
+    'amount_per_grid': 20,
+    'start_mode': 'wait',
+    'trailing_enabled': False,
+}
+# Instante dentro del minuto de cada punto del camino de una vela (o, l/h, h/l, c)
+CANDLE_OFFSETS_MS = np.array([0, 20000, 40000, 59999], dtype=np.int64)
+
+
+def price_path(candles):
+    """Velas [ts, o, h, l, c, ...] -> (timestamps ms, precios), 4 puntos por vela."""
+    data = np.asarray(candles, dtype=np.float64)
+    if data.ndim != 2 or data.shape[1] < 5:
+        raise ValueError("Se esperan velas [ts, open, high, low, close, volumen]")
+    ts, o, h, l, c = (data[:, i] for i in range(5))
+    up = c >= o
+    prices = np.column_stack((o, np.where(up, l, h), np.where(up, h, l), c)).ravel()
+    stamps = (ts.astype(np.int64)[:, None] + CANDLE_OFFSETS_MS).ravel()
+    return stamps, prices
+
+
+def load_candles(path):
+    """Lee un CSV de velas (ts, open, high, low, close, volumen), con o sin cabecera."""
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.readline()
+    skip = 0 if first.split(',')[0].strip().replace('.', '', 1).isdigit() else 1
+    return np.loadtxt(path, delimiter=',', skiprows=skip, usecols=range(6), ndmin=2)
+
+
+def _default_price_precision(price):
+    # ~5 cifras significativas, como los pares de Binance
+    return int(min(8, max(0, 5 - math.floor(math.log10(price)))))
+
+
+def _next_event(prices, start, low, high, block=256):
+    """Índice del primer precio desde `start` que sale de (low, high), o len(prices)."""
+    n = len(prices)
+    i = start
+    while i < n:
+        segment = prices[i:i + block]
+        hits = np.flatnonzero((segment <= low) | (segment >= high))
+        if hits.size:
+            return i + int(hits[0])
+        i += block
+        block = min(block * 2, 65536)
+    return n
+
+
+class BacktestLedger:
+    """Sustituye a BotDatabase en el backtest con lo que consulta el ciclo del grid."""
+
+    def __init__(self):
+        self._setup_done = set()
+        self._last_buy = {}
+
+    def get_symbol_setup_done(self, symbol):
+        return symbol in self._setup_done
+
+    def set_symbol_setup_done(self, symbol, status=True):
+        if status:
+            self._setup_done.add(symbol)
+        else:
+            self._setup_done.discard(symbol)
+
+    def get_last_buy_price(self, symbol):
+        return self._last_buy.get(symbol, 0.0)
+
+    def get_candles_since(self, symbol, since_ms=0):
+        # Sin almacén de velas: el modo adaptativo se queda con el grid_spread fijo
+        return [], 0.0
+
+    def record_trades(self, trades):
+        for t in trades:
+            if t['side'] == 'buy':
+                self._last_buy[t['symbol']] = float(t['price'])
+
+
+class Backtester:
+    def __init__(self, symbol, strategy=None, initial_quote=1000.0, initial_base=0.0,
+                 maker_fee=0.001, taker_fee=0.001, price_precision=None, amount_precision=5,
+                 min_amount=0.00001, min_cost=5.0):
+        self.symbol = symbol
+        self.base, self.quote = symbol.split('/')
+        self.strategy = dict(DEFAULT_STRATEGY, **(strategy or {}))
+        self.initial_quote = float(initial_quote)
+        self.initial_base = float(initial_base)
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.price_precision = price_precision
+        self.amount_precision = amount_precision
+        self.min_amount = min_amount
+        self.min_cost = min_cost
+
+    def _build(self, first_price):
+        exchange = SimulatedExchange(
+            balances={self.quote: self.initial_quote, self.base: self.initial_base},
+            maker_fee=self.maker_fee, taker_fee=self.taker_fee, clock=lambda: 0)
+        precision = self.price_precision
+        if precision is None:
+            precision = _default_price_precision(first_price)
+        exchange.add_market(self.symbol, price_precision=precision, amount_precision=self.amount_precision,
+                            min_amount=self.min_amount, min_cost=self.min_cost)
+        config = {
+            'system': {'cycle_delay': 0},
+            'default_strategy': self.strategy,
+            'pairs': [{'symbol': self.symbol, 'enabled': True, 'strategy': self.strategy}],
+        }
+        ledger = BacktestLedger()
+        bot = GridBot(connector=BinanceConnector(exchange=exchange, config=config), db=ledger,
+                      config=config, notifier=lambda text: None)
+        bot.settle_delay = 0
+        bot.executor = PlanExecutor(bot.connector, max_workers=1, rate=None)
+        return exchange, ledger, bot
+
+    def run(self, candles):
+        """Backtest sobre velas [ts, o, h, l, c, v] (cualquier temporalidad)."""
+        stamps, prices = price_path(candles)
+        return self.run_path(stamps, prices, candles=len(stamps) // 4)
+
+    def run_trades(self, trades):
+        """Backtest sobre trades [ts, precio, ...] en orden temporal."""
+        data = np.asarray(trades, dtype=np.float64)
+        return self.run_path(data[:, 0].astype(np.int64), np.ascontiguousarray(data[:, 1]))
+
+    def run_path(self, stamps, prices, candles=None):
+        """Backtest sobre un camino de precios ya construido (p.ej. compartido entre procesos)."""
+        if len(prices) == 0:
+            raise ValueError("No hay datos de precio")
+        started = time.perf_counter()
+        symbol = self.symbol
+        exchange, ledger, bot = self._build(float(prices[0]))
+        seen_trades = 0
+        event_idx, quote_bal, base_bal = [], [], []
+        cycles = 0
+        n = len(prices)
+        i = 0
+        with log.muted(), tracer.muted():
+            while i < n:
+                price = float(prices[i])
+                exchange.set_price(symbol, price, timestamp=int(stamps[i]))
+                fills = exchange.trades_since(symbol, seen_trades)
+                if fills:
+                    ledger.record_trades(fills)
+                    seen_trades += len(fills)
+                version = (exchange.state_version, tuple(bot.levels.get(symbol, ())),
+                           ledger.get_symbol_setup_done(symbol))
+                bot._run_grid_cycle(symbol, price, None, time.perf_counter_ns())
+                cycles += 1
+                fills = exchange.trades_since(symbol, seen_trades)
+                if fills:
+                    ledger.record_trades(fills)
+                    seen_trades += len(fills)
+                balance = exchange.fetch_balance()
+                event_idx.append(i)
+                quote_bal.append(balance.get(self.quote, {}).get('total', 0.0))
+                base_bal.append(balance.get(self.base, {}).get('total', 0.0))
+                changed = version != (exchange.state_version, tuple(bot.levels.get(symbol, ())),
+                                      ledger.get_symbol_setup_done(symbol))
+                if changed:
+                    # El ciclo actuó (p.ej. arranque, trailing): se vuelve a evaluar en el siguiente punto
+                    i += 1
+                    continue
+                low, high = bot._decision_bounds(symbol, price)
+                i = _next_event(prices, i + 1, low, high)
+        return self._report(stamps, prices, exchange, event_idx, quote_bal, base_bal, cycles,
+                            candles, time.perf_counter() - started)
+
+    def _report(self, stamps, prices, exchange, event_idx, quote_bal, base_bal, cycles, candles, elapsed):
+        # Balances constantes entre eventos: se expanden a todo el camino de precios
+        pos = np.searchsorted(np.asarray(event_idx), np.arange(len(prices)), side='right') - 1
+        pos = np.maximum(pos, 0)
+        quote_path = np.asarray(quote_bal)[pos]
+        inventory_value = np.asarray(base_bal)[pos] * prices
+        equity = quote_path + inventory_value
+        peak = np.maximum.accumulate(equity)
+        drawdown = (peak - equity) / np.where(peak > 0, peak, 1.0)
+        dd_end = int(np.argmax(drawdown))
+        exposure = inventory_value / np.where(equity > 0, equity, 1.0)
+        # Sharpe anualizado de los rendimientos diarios (equity al final de cada día)
+        days = (stamps - stamps[0]) // 86400000
+        day_close = equity[np.r_[np.flatnonzero(np.diff(days)), len(equity) - 1]]
+        daily = np.diff(np.r_[equity[0], day_close]) / np.r_[equity[0], day_close[:-1]]
+        sharpe = float(daily.mean() / daily.std() * math.sqrt(365)) if len(daily) > 1 and daily.std() > 0 else 0.0
+
+        trades = exchange.all_trades()
+        fees = 0.0
+        turnover = 0.0
+        buys = sells = 0
+        for t in trades:
+            turnover += t['cost']
+            fee = t['fee']
+            fees += fee['cost'] if fee['currency'] == self.quote else fee['cost'] * t['price']
+            if t['side'] == 'buy':
+                buys += 1
+            else:
+                sells += 1
+
+        initial_equity = self.initial_quote + self.initial_base * float(prices[0])
+        final_equity = float(equity[-1])
+        pnl = final_equity - initial_equity
+        hold_pnl = initial_equity * (float(prices[-1]) / float(prices[0]) - 1)
+        return {
+            "symbol": self.symbol,
+            "strategy": dict(self.strategy),
+            "start": int(stamps[0]),
+            "end": int(stamps[-1]),
+            "candles": candles,
+            "price_points": len(prices),
+            "cycles": cycles,
+            "initial_equity": round(initial_equity, 4),
+            "final_equity": round(final_equity, 4),
+            "pnl": round(pnl, 4),
+            "pnl_pct": round(pnl / initial_equity * 100, 4) if initial_equity else 0.0,
+            "buy_and_hold_pnl": round(hold_pnl, 4),
+            "fees": round(fees, 4),
+            "turnover": round(turnover, 4),
+            "trades": len(trades),
+            "buys": buys,
+            "sells": sells,
+            "sharpe": round(sharpe, 4),
+            "max_drawdown_pct": round(float(drawdown[dd_end]) * 100, 4),
+            "max_drawdown_at": int(stamps[dd_end]),
+            "exposure_avg_pct": round(float(exposure.mean()) * 100, 2),
+            "exposure_max_pct": round(float(exposure.max()) * 100, 2),
+            "final_inventory": round(float(base_bal[-1]), 8),
+            "final_inventory_value": round(float(inventory_value[-1]), 4),
+            "open_orders": len(exchange.fetch_open_orders(self.symbol)),
+            "elapsed_s": round(elapsed, 3),
+        }
+
+
+def run_backtest(symbol, candles, strategy=None, **kwargs):
+    """Atajo: `Backtester(symbol, strategy, **kwargs).run(candles)`."""
+    return Backtester(symbol, strategy, **kwargs).run(candles)
@@ -3,19 +3,59 @@ Orquesta la lógica de trading en grid con gestión de base de datos e integraci
 """
 from core.exchange import BinanceConnector
 from core.database import BotDatabase
+from core.order_view import OpenOrderView
+from core.adaptive_grid import AdaptiveGrid, grid_levels
+from core.planner import PlanExecutor, plan_orders, plan_size
+from core.paper import PaperTrading, paper_symbols
 from utils.logger import log
+from utils.metrics import REGISTRY
+from utils.tracing import tracer
 from utils.telegram import send_msg 
+from utils.config_service import config_service
+from utils.scheduler import scheduler
 import time
 import math
 import threading
-from datetime import datetime
 from colorama import Fore, Style
 
+GRID_CONSISTENCY_SECONDS = REGISTRY.histogram(
+    'gridbot_grid_consistency_seconds', 'Duración de _ensure_grid_consistency por símbolo', ('symbol',))
+COLLECTOR_SWEEP_SECONDS = REGISTRY.histogram(
+    'gridbot_collector_sweep_seconds', 'Duración de una pasada del recolector (incluye la pausa entre pares)',
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+COLLECTOR_SYMBOL_SECONDS = REGISTRY.histogram(
+    'gridbot_collector_symbol_seconds', 'Trabajo del recolector por símbolo (sin pausas)', ('symbol',))
+
+# Umbrales del ciclo del grid (fracciones de grid_spread salvo MIN_INVENTORY_VALUE, en USDC)
+LEVEL_MARGIN = 0.1          # banda alrededor del precio en la que un nivel no lleva orden
+TRAILING_TRIGGER = 0.2      # cuánto debe superar el precio al nivel más alto para mover la rejilla
+MIN_SELL_MARGIN = 0.5       # una venta debe quedar al menos esto por encima de la última compra
+MIN_INVENTORY_VALUE = 5.0   # por debajo de este inventario se hace la compra inicial
+ORDER_SETTLE_SECONDS = 2    # pausa tras una compra a mercado
+
 class GridBot:
-    def __init__(self):
-        self.connector = BinanceConnector()
-        self.db = BotDatabase()
-        self.config = self.connector.config
+    def __init__(self, connector=None, db=None, config=None, notifier=None, account=None):
+        """Por defecto usa Binance, la base de datos del bot, el servicio de configuración y Telegram.
+        Se pueden inyectar (p.ej. un BinanceConnector sobre core.simulator y una BD temporal);
+        con `config` fija no se siguen las recargas del fichero. `account`: cuenta de un runtime
+        secundario de core.engine (sólo lleva los pares con esa cuenta en su `"accounts"`)."""
+        self.connector = connector or BinanceConnector()
+        # Runtime principal (el exchange que se conecta desde la web) o de una cuenta de core.engine
+        self.primary = account is None
+        if account is not None:
+            self.active_exchange_name = account
+        # core.engine.AccountEngine que gestiona las demás cuentas (sólo en el principal)
+        self.accounts = None
+        self.db = db or BotDatabase()
+        self._static_config = config is not None
+        self.notify = notifier or send_msg
+        # Pausa tras una compra a mercado para que el exchange refleje el balance
+        self.settle_delay = ORDER_SETTLE_SECONDS
+        self.config = config if config is not None else self.connector.config
+        # Cuenta virtual de los pares en papel (core.paper); se crea con el primero
+        self.paper = None
+        self.paper_db_path = None
+        self.paper_symbols = set()
         self.pairs_map = {}
         self._refresh_pairs_map()
         self.levels = {} 
@@ -28,31 +68,77 @@ class GridBot:
         self.processed_trade_ids = set()
         self.session_trades_count = {} 
         
-        self.last_prune_time = 0
-        self.last_daily_report_date = None
-        self.last_backup_time = 0  # Temporizador para copia de seguridad de PnL
+        self._jobs = []  # tareas periódicas registradas en el scheduler mientras el motor corre
+        # Vista en memoria de órdenes abiertas + precios (la lee /api/orders sin llamar al exchange)
+        self.order_view = OpenOrderView(spread_lookup=self.effective_spread)
+        # Modo adaptativo: ATR/volatilidad en streaming sobre el almacén local de velas
+        self.adaptive = AdaptiveGrid(lambda symbol, since_ms: self.db_for(symbol).get_candles_since(symbol, since_ms)[0])
+        # Envío concurrente de los planes de órdenes (cancel-replace, presupuesto de órdenes/s)
+        self.executor = PlanExecutor(self.connector)
+        # Configuración recargada pendiente de aplicar entre ciclos (la deja el servicio de configuración)
+        self._pending_config = None
+        if not self._static_config:
+            config_service.subscribe(self._on_config_change)
+
+    def _on_config_change(self, snapshot, previous):
+        if self.is_running:
+            # Se aplica en el hilo del motor, nunca a mitad de un ciclo del grid
+            self._pending_config = snapshot
+        else:
+            self.config = snapshot
+            self._refresh_pairs_map()
+
+    def reload_config(self):
+        """Fuerza releer config.json5 (p.ej. tras guardarlo desde otro proceso)."""
+        return config_service.reload()
+
+    def account_name(self):
+        return getattr(self, 'active_exchange_name', None) or getattr(self.connector, 'account', None)
+
+    def owns_pair(self, pair):
+        """Un par sin `"accounts"` va al runtime principal; con lista, al runtime de cada cuenta
+        (el principal lo lleva si su cuenta conectada está en la lista)."""
+        accounts = pair.get('accounts') or ()
+        if not accounts:
+            return self.primary
+        return self.account_name() in accounts
 
     def _refresh_pairs_map(self):
-        self.pairs_map = {p['symbol']: p for p in self.config['pairs'] if p['enabled']}
+        self.pairs_map = {p['symbol']: p for p in self.config['pairs'] if p['enabled'] and self.owns_pair(p)}
         self.active_pairs = list(self.pairs_map.keys())
-
-    def _calculate_rsi(self, candles, period=14):
-        if not candles or len(candles) < period + 1:
-            return 50.0 
-        closes = [float(c[4]) for c in candles]
-        deltas = [closes[i] - closes[i-1] for i in range(1, len(closes))]
-        gains = [d if d > 0 else 0 for d in deltas]
-        losses = [-d if d < 0 else 0 for d in deltas]
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-        for i in range(period, len(deltas)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        if avg_loss == 0:
-            return 100.0
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return round(rsi, 2)
+        self.paper_symbols = paper_symbols(self.config)
+
+    # --- PAPER TRADING ---
+    # Los pares con "mode": "paper" operan contra core.paper (libro y cartera virtuales, BD propia);
+    # todo lo que es de un par pasa por _connector_for / db_for / _executor_for.
+    def is_paper(self, symbol):
+        return symbol in self.paper_symbols
+
+    def _paper(self):
+        if self.paper is None:
+            self.paper = PaperTrading(self.connector, self.config,
+                                      lambda: [s for s in self.active_pairs if self.is_paper(s)],
+                                      db=BotDatabase(self.paper_db_path) if self.paper_db_path else None)
+            log.info("📝 Paper trading activo: cartera virtual y estadísticas en BD aparte.")
+        return self.paper
+
+    def _connector_for(self, symbol, paper=None):
+        paper = self.is_paper(symbol) if paper is None else paper
+        return self._paper().connector if paper else self.connector
+
+    def db_for(self, symbol):
+        return self._paper().db if self.is_paper(symbol) else self.db
+
+    def _executor_for(self, symbol):
+        return self._paper().executor if self.is_paper(symbol) else self.executor
+
+    def _symbols_by_db(self):
+        """[(bd, pares activos)]: la del bot con los pares reales y, si los hay, la de papel."""
+        groups = [(self.db, [s for s in self.active_pairs if not self.is_paper(s)])]
+        paper = [s for s in self.active_pairs if self.is_paper(s)]
+        if paper:
+            groups.append((self._paper().db, paper))
+        return groups
 
     def _data_collector_loop(self):
         while self.is_running:
@@ -60,185 +146,150 @@ class GridBot:
             if self.is_paused:
                 time.sleep(1)
                 continue
-            
-            # --- MANTENIMIENTO DE BASE DE DATOS (Cada 24h) ---
-            if time.time() - self.last_prune_time > 86400:
-                try:
-                    log.info("🧹 Ejecutando mantenimiento de Base de Datos...")
-                    d_trades, d_bal = self.db.prune_old_data(days_keep=30)
-                    if d_trades > 0 or d_bal > 0:
-                        log.success(f"DB optimizada: Borrados {d_trades} trades y {d_bal} registros antiguos.")
-                    self.last_prune_time = time.time()
-                except Exception as e:
-                    log.error(f"Error en mantenimiento DB: {e}")
-            
-            # --- COPIA DE SEGURIDAD DE PnL (Cada ~30s) ---
-            # Guardamos el PnL de la sesión actual en la tabla de seguridad
-            if time.time() - self.last_backup_time > 30:
-                try:
-                    self._backup_current_session_pnl()
-                    self.last_backup_time = time.time()
-                except Exception:
-                    pass
-
-            now = datetime.now()
-            current_date_str = now.strftime("%Y-%m-%d")
-            
-            if now.hour == 8 and self.last_daily_report_date != current_date_str:
-                try:
-                    log.info("📊 Generando informe diario...")
-                    stats_24h = self.db.get_stats(from_timestamp=time.time() - 86400)
-                    total_profit = sum(stats_24h['per_coin_stats']['cash_flow'].values())
-                    total_trades = stats_24h['trades']
-                    best_coin = stats_24h['best_coin']
-                    
-                    icon = "🟢" if total_profit >= 0 else "🔴"
-                    msg = (f"📅 <b>INFORME DIARIO (24h)</b>\n"
-                           f"--------------------------------\n"
-                           f"{icon} <b>Beneficio: {total_profit:+.2f} USDC</b>\n"
-                           f"🔢 Operaciones: {total_trades}\n"
-                           f"🏆 Top Moneda: {best_coin}\n"
-                           f"--------------------------------\n"
-                           f"<i>Sistema funcionando correctamente.</i>")
-                    
-                    send_msg(msg)
-                    self.last_daily_report_date = current_date_str
-                    log.success("Informe diario enviado a Telegram.")
-                except Exception as e:
-                    log.error(f"Error enviando informe diario: {e}")
 
             current_pairs = list(self.active_pairs)
+            sweep_start = time.perf_counter()
             for symbol in current_pairs:
-                try:
-                    price = self.connector.fetch_current_price(symbol)
-                    candles = self.connector.fetch_candles(symbol, limit=500) 
-                    self.db.update_market_snapshot(symbol, price, candles)
-
-                    open_orders = self.connector.fetch_open_orders(symbol) or []
-                    grid_levels = self.levels.get(symbol, [])
-                    self.db.update_grid_status(symbol, open_orders, grid_levels)
-
-                    trades = self.connector.fetch_my_trades(symbol, limit=10)
-                    self.db.save_trades(trades)
-                    
-                    self._check_and_alert_trades(symbol, trades)
-                except Exception:
-                    pass
+                self._collect_symbol(symbol)
                 time.sleep(1) 
+            COLLECTOR_SWEEP_SECONDS.observe(time.perf_counter() - sweep_start)
+
+    def _collect_symbol(self, symbol):
+        """Una pasada del recolector para `symbol`: precio, velas, órdenes y trades a la BD."""
+        symbol_start = time.perf_counter()
+        try:
+            connector = self._connector_for(symbol)
+            db = self.db_for(symbol)
+            price = connector.fetch_current_price(symbol)
+            candles = connector.fetch_candles(symbol, limit=500) 
+            db.update_market_snapshot(symbol, price, candles)
+            self.order_view.update_price(symbol, price)
+
+            open_orders = connector.fetch_open_orders(symbol) or []
+            levels = self.levels.get(symbol, [])
+            db.update_grid_status(symbol, open_orders, levels)
+            self.order_view.update_orders(symbol, open_orders)
+
+            trades = connector.fetch_my_trades(symbol, limit=10)
+            db.save_trades(trades)
             
-            # Snapshots programados:
-            # - Exchange conectado: cada 60s
-            # - Exchanges desconectados: cada 180s (3 minutos) para reducir uso de rate limits
-            now_ts = int(time.time())
-            # 1) Exchange activo: cada 60s
-            if now_ts % 60 == 0:
-                try:
-                    total_equity = self.calculate_total_equity()
-                    if total_equity > 0:
-                        ex_id = 'unknown'
-                        try:
-                            if hasattr(self, 'active_exchange_name') and self.active_exchange_name:
-                                ex_id = self.active_exchange_name
-                                if getattr(self, 'active_exchange_use_testnet', False):
-                                    ex_id = f"{ex_id}-testnet"
-                            else:
-                                # Fallback: usar id interno de ccxt si está disponible
-                                if self.connector and self.connector.exchange and hasattr(self.connector.exchange, 'id'):
-                                    ex_id = self.connector.exchange.id
-                        except Exception:
-                            pass
-                        # Snapshot del exchange activo
-                        self.db.log_balance_snapshot(total_equity, exchange=ex_id)
-                except Exception:
-                    pass
+            self._check_and_alert_trades(symbol, trades)
+            if self.is_paper(symbol):
+                self.paper.save_ledger()
+        except Exception:
+            pass
+        COLLECTOR_SYMBOL_SECONDS.labels(symbol).observe(time.perf_counter() - symbol_start)
+
+    # --- TAREAS PROGRAMADAS (utils.scheduler) ---
+    # Los snapshots de exchanges inactivos los programa web.server (start_snapshot_scheduler)
+    def _schedule_jobs(self):
+        # Cada runtime de core.engine tiene sus propias tareas (los nombres son únicos en el scheduler)
+        prefix = 'engine' if self.primary else f"engine-{self.account_name()}"
+        self._jobs = [
+            # Mantenimiento de base de datos (al arrancar y cada 24h)
+            scheduler.every(f'{prefix}-db-prune', 86400, self._prune_database, mode='delay', initial_delay=0),
+            # Copia de seguridad del PnL de la sesión
+            scheduler.every(f'{prefix}-pnl-backup', 30, self._backup_current_session_pnl, mode='delay'),
+            # Snapshot del exchange activo en el segundo 0 de cada minuto
+            scheduler.every(f'{prefix}-balance-snapshot', 60, self._snapshot_active_exchange, align=True),
+            scheduler.daily(f'{prefix}-daily-report', 8, 0, self._send_daily_report),
+        ]
+
+    def _cancel_jobs(self):
+        for job in getattr(self, '_jobs', []):
+            scheduler.cancel(job.name)
+        self._jobs = []
+
+    def _prune_database(self):
+        if self.is_paused:
+            return
+        log.info("🧹 Ejecutando mantenimiento de Base de Datos...")
+        d_trades, d_bal = self.db.prune_old_data(days_keep=30)
+        if self.paper is not None:
+            self.paper.db.prune_old_data(days_keep=30)
+        if d_trades > 0 or d_bal > 0:
+            log.success(f"DB optimizada: Borrados {d_trades} trades y {d_bal} registros antiguos.")
+
+    def _send_daily_report(self):
+        log.info("📊 Generando informe diario...")
+        stats_24h = self.db.get_stats(from_timestamp=time.time() - 86400)
+        total_profit = sum(stats_24h['per_coin_stats']['cash_flow'].values())
+        total_trades = stats_24h['trades']
+        best_coin = stats_24h['best_coin']
+        
+        icon = "🟢" if total_profit >= 0 else "🔴"
+        msg = (f"📅 <b>INFORME DIARIO (24h)</b>\n"
+               f"--------------------------------\n"
+               f"{icon} <b>Beneficio: {total_profit:+.2f} USDC</b>\n"
+               f"🔢 Operaciones: {total_trades}\n"
+               f"🏆 Top Moneda: {best_coin}\n"
+               f"--------------------------------\n"
+               f"<i>Sistema funcionando correctamente.</i>")
+        
+        self.notify(msg)
+        log.success("Informe diario enviado a Telegram.")
 
-            # 2) Exchanges desconectados: cada 180s
-            if now_ts % 180 == 0:
-                try:
-                    exchanges = self.db.get_exchanges()
-                    for e in exchanges:
-                        name = e.get('name')
-                        use_testnet = e.get('use_testnet', False)
-                        ex_key = f"{name}-testnet" if use_testnet else name
-
-                        # Saltar si es el exchange activo (ya fue procesado cada 60s)
-                        try:
-                            active_id = 'unknown'
-                            if hasattr(self, 'active_exchange_name') and self.active_exchange_name:
-                                active_id = self.active_exchange_name
-                                if getattr(self, 'active_exchange_use_testnet', False):
-                                    active_id = f"{active_id}-testnet"
-                            elif self.connector and self.connector.exchange and hasattr(self.connector.exchange, 'id'):
-                                active_id = self.connector.exchange.id
-                        except Exception:
-                            active_id = 'unknown'
-
-                        if ex_key == active_id:
-                            continue
-
-                        taken = False
-                        # Intentar obtener credenciales y hacer fetch real
-                        try:
-                            creds = self.db.get_exchange_credentials(name)
-                            if creds.get('success') and creds.get('api_key') and creds.get('secret_key'):
-                                fetched = BinanceConnector.fetch_balance_snapshot_static(creds.get('api_key'), creds.get('secret_key'), creds.get('passphrase'), use_testnet, exchange_type=e.get('type', 'binance'))
-                                if fetched and fetched > 0:
-                                    self.db.log_balance_snapshot(fetched, exchange=ex_key)
-                                    log.debug(f"Snapshot real para {ex_key}: {fetched:.2f} USDC")
-                                    taken = True
-                                    # pequeña espera para no pisar rate limits
-                                    time.sleep(0.5)
-                        except Exception as inner_e:
-                            log.debug(f"No se pudo obtener snapshot real para {ex_key}: {inner_e}")
-
-                        if taken:
-                            continue
-
-                        # Fallback: carry-forward si existe última snapshot
-                        try:
-                            last = self.db.get_last_balance_snapshot(ex_key)
-                            if last:
-                                last_equity = float(last[1])
-                                self.db.log_balance_snapshot(last_equity, exchange=ex_key)
-                                log.debug(f"Carry-forward snapshot para {ex_key}: {last_equity:.2f} USDC")
-                        except Exception:
-                            pass
-                except Exception:
-                    pass
+    def _active_exchange_id(self):
+        ex_id = 'unknown'
+        try:
+            if hasattr(self, 'active_exchange_name') and self.active_exchange_name:
+                ex_id = self.active_exchange_name
+                if getattr(self, 'active_exchange_use_testnet', False):
+                    ex_id = f"{ex_id}-testnet"
+            else:
+                # Fallback: usar id interno de ccxt si está disponible
+                if self.connector and self.connector.exchange and hasattr(self.connector.exchange, 'id'):
+                    ex_id = self.connector.exchange.id
+        except Exception:
+            pass
+        return ex_id
+
+    def _snapshot_active_exchange(self):
+        if self.is_paused:
+            return
+        total_equity = self.calculate_total_equity()
+        if total_equity > 0:
+            # Snapshot del exchange activo
+            self.db.log_balance_snapshot(total_equity, exchange=self._active_exchange_id())
+        if self.paper is not None and any(self.is_paper(s) for s in self.active_pairs):
+            self.paper.db.log_balance_snapshot(self.paper.equity(), exchange='paper')
     
     def _backup_current_session_pnl(self):
         """Calcula el PnL actual de la sesión y lo guarda en copia de seguridad"""
         if not self.global_start_time:
             return
         
-        # Obtenemos estadísticas desde el inicio de la sesión
-        stats = self.db.get_stats(from_timestamp=self.global_start_time)
-        cash_flows = stats['per_coin_stats']['cash_flow']
-        qty_deltas = stats['per_coin_stats']['qty_delta']
-        
-        # Obtenemos precios actuales para calcular valor latente
-        prices = self.db.get_all_prices()
-        
-        for symbol in self.active_pairs:
-            try:
-                cf = cash_flows.get(symbol, 0.0)
-                qty_delta = qty_deltas.get(symbol, 0.0)
-                price = prices.get(symbol, 0.0)
-                if price == 0:
-                     price = self.connector.fetch_current_price(symbol)
-                
-                # PnL Sesión = CashFlow + (QtyDelta * Price)
-                session_pnl = cf + (qty_delta * price)
-                
-                self.db.update_pnl_backup(symbol, session_pnl)
-            except Exception:
-                pass
+        for db, symbols in self._symbols_by_db():
+            # Obtenemos estadísticas desde el inicio de la sesión
+            stats = db.get_stats(from_timestamp=self.global_start_time)
+            cash_flows = stats['per_coin_stats']['cash_flow']
+            qty_deltas = stats['per_coin_stats']['qty_delta']
+
+            # Obtenemos precios actuales para calcular valor latente
+            prices = db.get_all_prices()
+
+            for symbol in symbols:
+                try:
+                    cf = cash_flows.get(symbol, 0.0)
+                    qty_delta = qty_deltas.get(symbol, 0.0)
+                    price = prices.get(symbol, 0.0)
+                    if price == 0:
+                         price = self._connector_for(symbol).fetch_current_price(symbol)
+
+                    # PnL Sesión = CashFlow + (QtyDelta * Price)
+                    session_pnl = cf + (qty_delta * price)
+
+                    db.update_pnl_backup(symbol, session_pnl)
+                except Exception:
+                    pass
 
     def _check_and_alert_trades(self, symbol, trades):
         if not trades:
             return
         strat = self.pairs_map.get(symbol, {}).get('strategy', self.config['default_strategy'])
-        spread_pct = strat.get('grid_spread', 1.0)
+        spread_pct = self._grid_spread(symbol, strat)
+        db = self.db_for(symbol)
+        paper_tag = "📝 <b>[PAPER]</b> " if self.is_paper(symbol) else ""
 
         if symbol not in self.session_trades_count:
             self.session_trades_count[symbol] = 0
@@ -249,7 +300,7 @@ class GridBot:
             
             buy_id_assigned = None
             if side == 'BUY':
-                 buy_id_assigned = self.db.assign_id_to_trade_if_missing(tid)
+                 buy_id_assigned = db.assign_id_to_trade_if_missing(tid)
 
             if tid in self.processed_trade_ids:
                 continue
@@ -292,9 +343,9 @@ class GridBot:
                 msg = (f"{header}\nPar: <b>{symbol}</b>\nPrecio: {price:.4f}\nCantidad: {amount}\nCoste Total: {cost:.2f} USDC")
             
             else:  # SELL
-                linked_id = self.db.find_linked_buy_id(symbol, price, spread_pct)
+                linked_id = db.find_linked_buy_id(symbol, price, spread_pct)
                 if linked_id:
-                    self.db.set_trade_buy_id(tid, linked_id)
+                    db.set_trade_buy_id(tid, linked_id)
 
                 id_text = f"#{linked_id}" if linked_id else "?"
                 buy_price_ref = price / (1 + (spread_pct / 100))
@@ -313,56 +364,88 @@ class GridBot:
                        f"💰 <b>Beneficio Neto Est.: +{net_profit:.3f} USDC</b>\n"
                        f"📈 <i>Rentabilidad Op.: {percent_profit:.2f}%</i>")
 
-            send_msg(msg)
+            self.notify(paper_tag + msg)
 
     def _get_params(self, symbol):
         pair_config = self.pairs_map.get(symbol, {})
         return pair_config.get('strategy', self.config['default_strategy'])
 
+    def _grid_spread(self, symbol, params):
+        """grid_spread (%) efectivo: en modo adaptativo, el último calculado (si ya lo hay)."""
+        if params.get('grid_mode') == 'adaptive':
+            spread = self.adaptive.spread(symbol)
+            if spread:
+                return spread
+        return params.get('grid_spread', 1.0)
+
+    def effective_spread(self, symbol):
+        return self._grid_spread(symbol, self._get_params(symbol))
+
     def _generate_fixed_levels(self, symbol, current_price):
         params = self._get_params(symbol)
-        quantity = params['grids_quantity']
-        spread_percent = params['grid_spread'] / 100 
-        log.info(f"Calculando rejilla {symbol} ({current_price})...")
-        levels = []
-        for i in range(1, int(quantity / 2) + 1):
-            levels.append(current_price * (1 - (spread_percent * i))) 
-            levels.append(current_price * (1 + (spread_percent * i))) 
-        levels.sort()
+        log.info("Calculando rejilla %s (%s)...", symbol, current_price)
+        return self._round_levels(symbol, grid_levels(current_price, params['grid_spread'], params['grids_quantity']))
+
+    def _round_levels(self, symbol, levels):
         clean_levels = []
         for p in levels:
             try:
-                p_str = self.connector.exchange.price_to_precision(symbol, p)
+                p_str = self._connector_for(symbol).exchange.price_to_precision(symbol, p)
                 clean_levels.append(float(p_str))
             except Exception:
                 clean_levels.append(p)
         return clean_levels
 
+    def _apply_adaptive_spacing(self, symbol, current_price, params):
+        """Re-espacia la rejilla si el plan adaptativo lo pide. Las órdenes de los niveles retirados
+        quedan huérfanas y el planificador las sustituye (cancel-replace) por las de los nuevos."""
+        plan = self.adaptive.plan(symbol, current_price, self.levels.get(symbol), params,
+                                  round_levels=lambda levels: self._round_levels(symbol, levels))
+        if plan is None:
+            return
+        self.levels[symbol] = plan['levels']
+        log.info("📐 Rejilla adaptativa %s: spread %s%% (ATR %s%%), %s líneas · conserva %d, nuevas %d, retiradas %d",
+                 symbol, plan['spread'], plan['atr_pct'], plan['quantity'],
+                 len(plan['keep']), len(plan['add']), len(plan['remove']))
+
     def _get_amount_for_level(self, symbol, price):
         params = self._get_params(symbol)
         amount_usdc = params['amount_per_grid']
         base_amount = amount_usdc / price 
-        market = self.connector.exchange.market(symbol)
+        exchange = self._connector_for(symbol).exchange
+        market = exchange.market(symbol)
         min_amount = market['limits']['amount']['min']
         if base_amount < min_amount:
             return 0.0
         try:
-            amt_str = self.connector.exchange.amount_to_precision(symbol, base_amount)
+            amt_str = exchange.amount_to_precision(symbol, base_amount)
             return float(amt_str)
         except Exception:
             return 0.0
 
     def _ensure_grid_consistency(self, symbol):
-        current_price = self.connector.fetch_current_price(symbol)
+        with tracer.span('price_fetch', symbol):
+            current_price = self._connector_for(symbol).fetch_current_price(symbol)
         if current_price == 0:
             return
+        # Inicio de la traza tick -> orden: precio observado
+        trace_id, tick_ns = tracer.begin_trace(symbol)
+        try:
+            self._run_grid_cycle(symbol, current_price, trace_id, tick_ns)
+        finally:
+            tracer.end_trace()
 
+    def _run_grid_cycle(self, symbol, current_price, trace_id, tick_ns):
+        self.order_view.update_price(symbol, current_price)
+
+        connector = self._connector_for(symbol)
+        db = self.db_for(symbol)
         params = self._get_params(symbol)
         base_asset = symbol.split('/')[0]
-        balance_base = self.connector.get_total_balance(base_asset)
+        balance_base = connector.get_total_balance(base_asset)
         amount_buy_usdc = params['amount_per_grid']
         
-        if not self.db.get_symbol_setup_done(symbol):
+        if not db.get_symbol_setup_done(symbol):
             mode = params.get('start_mode', 'wait')
             
             if mode == 'buy_1' or mode == 'buy_2':
@@ -370,34 +453,37 @@ class GridBot:
                 total_invest = amount_buy_usdc * multiplier
                 log.warning(f"🚀 ARRANQUE {mode.upper()}: Comprando {total_invest} USDC de {symbol}...")
                 
-                buy_order = self.connector.place_market_buy(symbol, total_invest)
+                buy_order = connector.place_market_buy(symbol, total_invest)
                 
                 if buy_order:
                     log.success(f"✅ Compra inicial ({mode}) ejecutada.")
-                    send_msg(f"🚀 <b>ARRANQUE RÁPIDO ({mode.upper()})</b>\nCompra a mercado ejecutada en {symbol}.")
-                    time.sleep(2)
+                    self.notify(f"🚀 <b>ARRANQUE RÁPIDO ({mode.upper()})</b>\nCompra a mercado ejecutada en {symbol}.")
+                    time.sleep(self.settle_delay)
                 else:
                     log.error(f"❌ Falló la compra inicial de {symbol}.")
             
-            self.db.set_symbol_setup_done(symbol, True)
+            db.set_symbol_setup_done(symbol, True)
             return 
         
         value_held = balance_base * current_price
         
-        if value_held < 5.0:
-            log.warning(f"⚠️ {symbol}: Sin inventario ({value_held:.2f} $). Ejecutando COMPRA INICIAL...")
-            usdc_balance = self.connector.get_asset_balance('USDC')
+        if value_held < MIN_INVENTORY_VALUE:
+            log.warning("⚠️ %s: Sin inventario (%.2f $). Ejecutando COMPRA INICIAL...", symbol, value_held)
+            usdc_balance = connector.get_asset_balance('USDC')
             if usdc_balance > amount_buy_usdc:
-                buy_order = self.connector.place_market_buy(symbol, amount_buy_usdc)
+                buy_order = connector.place_market_buy(symbol, amount_buy_usdc)
                 if buy_order:
                     log.success(f"✅ Compra inicial ejecutada para {symbol}.")
-                    time.sleep(2) 
+                    time.sleep(self.settle_delay)
                     return 
             else:
                 log.error(f"Falta USDC para compra inicial de {symbol}.")
 
-        open_orders = self.connector.fetch_open_orders(symbol)
-        
+        open_orders = connector.fetch_open_orders(symbol)
+
+        if params.get('grid_mode') == 'adaptive':
+            self._apply_adaptive_spacing(symbol, current_price, params)
+
         if symbol not in self.levels:
             self.levels[symbol] = self._generate_fixed_levels(symbol, current_price)
 
@@ -406,105 +492,122 @@ class GridBot:
         if params.get('trailing_enabled', False) and my_levels:
              my_levels.sort()
              max_level = my_levels[-1]
-             spread_val = params['grid_spread'] / 100
-             trigger_price = max_level * (1 + (spread_val * 0.2))
+             spread_val = self._grid_spread(symbol, params) / 100
+             trigger_price = max_level * (1 + (spread_val * TRAILING_TRIGGER))
              
              if current_price > trigger_price:
-                 log.warning(f"🚀 TRAILING UP: {symbol} ha roto techo ({max_level}). Moviendo rejilla...")
+                 log.warning("🚀 TRAILING UP: %s ha roto techo (%s). Moviendo rejilla...", symbol, max_level)
                  lowest_level = my_levels.pop(0)
                  for o in open_orders:
                      if math.isclose(o['price'], lowest_level, rel_tol=1e-5):
-                         log.info(f"🗑️ Cancelando orden inferior {o['id']} ({lowest_level}) para liberar grid.")
-                         self.connector.cancel_order(o['id'], symbol)
+                         log.info("🗑️ Cancelando orden inferior %s (%s) para liberar grid.", o['id'], lowest_level)
+                         connector.cancel_order(o['id'], symbol)
                          break
                  new_top = max_level * (1 + spread_val)
                  try:
-                    p_str = self.connector.exchange.price_to_precision(symbol, new_top)
+                    p_str = connector.exchange.price_to_precision(symbol, new_top)
                     new_top = float(p_str)
                  except Exception:
                     pass
                  my_levels.append(new_top)
                  self.levels[symbol] = sorted(my_levels)
-                 send_msg(f"🧗 <b>TRAILING UP {symbol}</b>\nEl precio ha subido. Grid desplazado hacia arriba.\nNuevo techo: {new_top}")
+                 self.notify(f"🧗 <b>TRAILING UP {symbol}</b>\nEl precio ha subido. Grid desplazado hacia arriba.\nNuevo techo: {new_top}")
                  return 
 
         base_asset, quote_asset = symbol.split('/')
-        spread_val = params['grid_spread'] / 100
-        margin = current_price * (spread_val * 0.1) 
-
-        for level_price in my_levels:
-            target_side = None
+        spread_val = self._grid_spread(symbol, params) / 100
+        margin = current_price * (spread_val * LEVEL_MARGIN)
+
+        # 1) Plan (sin red salvo los dos saldos): qué orden quiere cada nivel frente a las abiertas
+        targets = self._level_targets(symbol, my_levels, current_price, margin, spread_val)
+        quote_free = connector.get_asset_balance(quote_asset)
+        base_free = connector.get_asset_balance(base_asset) - self.reserved_inventory.get(base_asset, 0.0)
+        plan = plan_orders(targets, open_orders, quote_free, base_free,
+                           round_amount=lambda amount: self._round_amount(symbol, amount))
+        if not plan_size(plan):
+            return
+        tracer.record('decision', symbol, tick_ns, time.perf_counter_ns(), trace_id)
+        for a in plan['create']:
+            log.warning("[%s] Creando orden %s @ %s", symbol, a['side'], a['price'])
+        for a in plan['amend']:
+            log.warning("[%s] Sustituyendo orden %s (%s @ %s) por %s @ %s", symbol, a['order_id'],
+                        a['old_side'], a['old_price'], a['side'], a['price'])
+        for a in plan['cancel']:
+            if a.get('orphan'):
+                log.info("🧹 Limpiando orden huérfana %s (%s) - Fuera de rango.", a['order_id'], a['price'])
+
+        # 2) Ejecución concurrente del diff
+        self._executor_for(symbol).execute(symbol, plan, trace_id, tick_ns)
+
+    def _level_targets(self, symbol, levels, current_price, margin, spread_val):
+        """Lado y cantidad que quiere cada nivel (side None: el nivel no lleva orden nueva)."""
+        targets = []
+        last_buy_price = None
+        for level_price in levels:
             if level_price > current_price + margin:
-                target_side = 'sell'
+                side = 'sell'
             elif level_price < current_price - margin:
-                target_side = 'buy'
+                side = 'buy'
             else:
-                continue 
-
-            if target_side == 'sell':
-                last_buy_price = self.db.get_last_buy_price(symbol)
-                min_sell_price = last_buy_price * (1 + (spread_val * 0.5))
-                if level_price < min_sell_price:
-                    continue
-
-            exists = False
-            for o in open_orders:
-                if math.isclose(o['price'], level_price, rel_tol=1e-5):
-                    if o['side'] == target_side:
-                        exists = True
-                    else:
-                        self.connector.exchange.cancel_order(o['id'], symbol)
-                        exists = False
-                    break
-            if exists:
-                continue 
-
-            amount = self._get_amount_for_level(symbol, level_price)
-            if amount == 0:
+                targets.append({'price': level_price, 'side': None})
                 continue
-
-            if target_side == 'buy':
-                balance = self.connector.get_asset_balance(quote_asset)
-                if balance < amount * level_price:
-                    continue
-            else: 
-                balance = self.connector.get_asset_balance(base_asset)
-                reserved = self.reserved_inventory.get(base_asset, 0.0)
-                if (balance - reserved) < amount * 0.99:
+            if side == 'sell':
+                if last_buy_price is None:
+                    last_buy_price = self.db_for(symbol).get_last_buy_price(symbol)
+                if level_price < last_buy_price * (1 + (spread_val * MIN_SELL_MARGIN)):
+                    targets.append({'price': level_price, 'side': None})
                     continue
-                if balance < amount and balance > amount * 0.9:
-                    try:
-                        amount = float(self.connector.exchange.amount_to_precision(symbol, balance))
-                    except Exception:
-                        pass
-
-            log.warning(f"[{symbol}] Creando orden {target_side} @ {level_price}")
-            self.connector.place_order(symbol, target_side, amount, level_price)
-
-        for o in open_orders:
-            match_found = False
-            for lvl in my_levels:
-                if math.isclose(o['price'], lvl, rel_tol=1e-5):
-                    match_found = True
-                    break
-            if not match_found:
-                log.info(f"🧹 Limpiando orden huérfana {o['id']} ({o['price']}) - Fuera de rango.")
-                self.connector.cancel_order(o['id'], symbol)
-
-    def _handle_smart_reload(self):
-        print() 
+            targets.append({'price': level_price, 'side': side,
+                            'amount': self._get_amount_for_level(symbol, level_price)})
+        return targets
+
+    def _round_amount(self, symbol, amount):
+        try:
+            return float(self._connector_for(symbol).exchange.amount_to_precision(symbol, amount))
+        except Exception:
+            return amount
+
+    def _decision_bounds(self, symbol, current_price):
+        """Intervalo abierto (bajo, alto) alrededor de `current_price` en el que `_run_grid_cycle`
+        decidiría lo mismo mientras no cambien órdenes, balances ni niveles. Fuera de él se cruza un
+        nivel (y su posible orden), un nivel cambia de lado, salta el trailing o el inventario cruza
+        MIN_INVENTORY_VALUE."""
+        levels = self.levels.get(symbol)
+        if not levels:
+            return current_price, current_price
+        params = self._get_params(symbol)
+        spread_val = self._grid_spread(symbol, params) / 100
+        margin = spread_val * LEVEL_MARGIN
+        # Un nivel es de venta si precio < nivel/(1+margin) y de compra si precio > nivel/(1-margin)
+        bounds = list(levels)
+        bounds += [lvl / (1 + margin) for lvl in levels] + [lvl / (1 - margin) for lvl in levels]
+        if params.get('trailing_enabled', False):
+            bounds.append(max(levels) * (1 + (spread_val * TRAILING_TRIGGER)))
+        balance_base = self._connector_for(symbol).get_total_balance(symbol.split('/')[0])
+        if balance_base > 0:
+            bounds.append(MIN_INVENTORY_VALUE / balance_base)
+        low = max((b for b in bounds if b < current_price), default=0.0)
+        high = min((b for b in bounds if b > current_price), default=math.inf)
+        return low, high
+
+    def _handle_smart_reload(self, new_config):
+        log.blank()
         log.warning("🔄 CONFIGURACIÓN ACTUALIZADA: Analizando cambios...")
         old_testnet = self.config.get('system', {}).get('use_testnet', True)
-        new_config = self.connector.config 
-        new_testnet = new_config.get('system', {}).get('use_testnet', True)
+        new_testnet = new_config.use_testnet
+        old_paper = set(self.paper_symbols)
         self.config = new_config
         self._refresh_pairs_map()
         
-        if old_testnet != new_testnet:
+        # La red de una cuenta secundaria es la de su fila en exchanges, no la de config.json5
+        if self.primary and old_testnet != new_testnet:
             network_name = "TESTNET" if new_testnet else "REAL"
             log.warning(f"🚨 CAMBIO DE RED DETECTADO A: {network_name}. Reiniciando sistema...")
-            send_msg(f"🔄 <b>CAMBIO DE RED</b>\nEl bot ha pasado a modo: <b>{network_name}</b>")
+            self.notify(f"🔄 <b>CAMBIO DE RED</b>\nEl bot ha pasado a modo: <b>{network_name}</b>")
+            # La reconexión del conector se hace aquí, en el hilo del motor, entre ciclos del grid
+            self.connector.apply_network_change()
             self.levels = {}
+            self.adaptive.reset()
             self.reserved_inventory = {}
             self.db.reset_all_statistics()
             self.processed_trade_ids.clear()
@@ -521,48 +624,92 @@ class GridBot:
         new_symbols = set(self.pairs_map.keys())
         active_running_symbols = set(self.levels.keys())
         
-        removed = active_running_symbols - new_symbols
+        # Un par que pasa de real a papel (o al revés) se detiene en su modo anterior y arranca de cero
+        switched = {s for s in new_symbols & active_running_symbols if (s in old_paper) != self.is_paper(s)}
+        removed = (active_running_symbols - new_symbols) | switched
         for symbol in removed:
             log.info(f"⛔ Deteniendo {symbol}. Cancelando órdenes...")
-            self.connector.cancel_all_orders(symbol)
+            self._connector_for(symbol, paper=symbol in old_paper).cancel_all_orders(symbol)
             if symbol in self.levels:
                 del self.levels[symbol]
+            self.adaptive.reset(symbol)
+            self.order_view.remove_symbol(symbol)
             if symbol in self.reserved_inventory:
                 del self.reserved_inventory[symbol.split('/')[0]]
             
-        added = new_symbols - active_running_symbols
+        added = (new_symbols - active_running_symbols) | switched
         for symbol in added:
-            log.success(f"✨ Activando {symbol}.")
+            log.success(f"✨ Activando {symbol}{' (paper trading)' if self.is_paper(symbol) else ''}.")
         
         log.info("✅ Recarga completada.")
-        send_msg("⚙️ <b>CONFIGURACIÓN ACTUALIZADA</b>\nNuevos parámetros aplicados.")
+        self.notify("⚙️ <b>CONFIGURACIÓN ACTUALIZADA</b>\nNuevos parámetros aplicados.")
 
     def manual_close_order(self, symbol, order_id, side, amount):
-        print()
+        log.blank()
         log.warning(f"MANUAL: Cerrando orden {order_id} ({side}) en {symbol}...")
-        self.connector.cancel_order(order_id, symbol)
+        connector = self._connector_for(symbol)
+        connector.cancel_order(order_id, symbol)
         if side == 'buy':
             log.success(f"Orden {order_id} cancelada. USDC recuperados.")
-            send_msg(f"🗑️ <b>ORDEN CANCELADA (Manual)</b>\n{symbol} - {side}")
+            self.notify(f"🗑️ <b>ORDEN CANCELADA (Manual)</b>\n{symbol} - {side}")
             return True
         elif side == 'sell':
             time.sleep(0.5)
-            market_order = self.connector.place_market_sell(symbol, amount)
+            market_order = connector.place_market_sell(symbol, amount)
             if market_order:
                 log.success("Activo vendido a mercado (Market Sell) correctamente.")
-                send_msg(f"🔥 <b>VENTA A MERCADO (Manual)</b>\n{symbol} - {amount}")
+                self.notify(f"🔥 <b>VENTA A MERCADO (Manual)</b>\n{symbol} - {amount}")
                 return True
             else:
                 log.error("No se ha podido ejecutar el Market Sell.")
                 return False
 
+    # --- Optimizador (corre en el proceso del motor: un único trabajo para todos los workers web) ---
+    def start_optimization(self, symbol, timeframe='5m', days=30, metric='sharpe', capital=1000.0,
+                           space=None, method='grid', samples=200, refine_rounds=0):
+        from core.optimizer import GridOptimizer, optimization_jobs, check_search, DEFAULT_SPACE, MAX_DAYS
+        if not self.connector.exchange:
+            return {"status": "error", "reason": "offline",
+                    "message": "Sin conexión con el exchange para descargar velas"}
+        try:
+            check_search(space, metric, method)
+        except ValueError as e:
+            return {"status": "error", "reason": "invalid", "message": str(e)}
+        days = min(max(int(days), 1), MAX_DAYS)
+
+        def build():
+            # Descarga en el hilo del trabajo: la petición web vuelve enseguida con el id
+            until = int(time.time() * 1000)
+            candles = self.connector.fetch_candles_range(symbol, timeframe, since=until - days * 86400000, until=until)
+            if not candles:
+                raise ValueError(f"No hay velas de {symbol} ({timeframe})")
+            return GridOptimizer(symbol, candles, space=space or DEFAULT_SPACE, metric=metric,
+                                 initial_quote=capital)
+        try:
+            job_id = optimization_jobs.start(symbol, build, method=method, samples=samples,
+                                             refine_rounds=refine_rounds)
+        except RuntimeError as e:
+            return {"status": "error", "reason": "busy", "message": str(e)}
+        return {"status": "started", "job": job_id}
+
+    def optimization_status(self):
+        from core.optimizer import optimization_jobs
+        return optimization_jobs.status()
+
+    def cancel_optimization(self):
+        from core.optimizer import optimization_jobs
+        return optimization_jobs.cancel()
+
     def calculate_total_equity(self):
+        """Patrimonio de la cuenta real (los pares en papel tienen su cartera virtual)."""
         total_usdc = 0.0
         try:
             total_usdc += self.connector.get_total_balance('USDC')
         except Exception:
             pass
         for symbol in self.active_pairs:
+            if self.is_paper(symbol):
+                continue
             base = symbol.split('/')[0]
             try:
                 qty = self.connector.get_total_balance(base)
@@ -577,70 +724,105 @@ class GridBot:
         for symbol in self.active_pairs:
             base = symbol.split('/')[0]
             try:
-                qty = self.connector.get_total_balance(base)
-                price = self.connector.fetch_current_price(symbol)
+                connector = self._connector_for(symbol)
+                qty = connector.get_total_balance(base)
+                price = connector.fetch_current_price(symbol)
                 initial_value = qty * price
-                self.db.set_coin_initial_balance(symbol, initial_value)
+                self.db_for(symbol).set_coin_initial_balance(symbol, initial_value)
             except Exception as e:
                 log.error(f"Error snapshot {symbol}: {e}")
 
     def panic_stop(self):
-        print()
+        log.blank()
         log.warning("⛔ ACCIÓN DE USUARIO: PAUSANDO BOT...")
         self.is_paused = True
-        send_msg("⏸️ <b>BOT PAUSADO</b>\nSe han detenido todas las operaciones.")
+        self.notify("⏸️ <b>BOT PAUSADO</b>\nSe han detenido todas las operaciones.")
+        if self.accounts is not None:
+            self.accounts.pause()
         return True
 
     def resume_bot(self):
-        print()
+        log.blank()
         log.success("▶️ ACCIÓN DE USUARIO: REANUDANDO BOT...")
         self.is_paused = False
-        send_msg("▶️ <b>BOT REANUDADO</b>\nContinuando operaciones.")
+        self.notify("▶️ <b>BOT REANUDADO</b>\nContinuando operaciones.")
+        if self.accounts is not None:
+            self.accounts.resume()
         return True
 
     def panic_cancel_all(self):
-        print()
+        log.blank()
         log.warning("⛔ ACCIÓN DE PÁNICO: Cancelando todas las órdenes...")
-        send_msg("🗑️ <b>PÁNICO: CANCELAR TODO</b>\nBorrando todas las órdenes del exchange...")
+        self.notify(f"🗑️ <b>PÁNICO: CANCELAR TODO</b>\nBorrando todas las órdenes del exchange{self._accounts_suffix()}...")
+        count = self._cancel_all_pairs()
+        # Las cuentas secundarias (core.engine) también
+        if self.accounts is not None:
+            count += sum(self.accounts.panic_cancel_all().values())
+        return count
+
+    def _accounts_suffix(self):
+        count = len(self.accounts.runtimes) if self.accounts is not None else 0
+        return f" (+{count} cuentas secundarias)" if count else ""
+
+    def _cancel_all_pairs(self):
+        """Cancela las órdenes de los pares de este runtime -> nº de pares."""
         count = 0
         for symbol in self.active_pairs:
-            self.connector.cancel_all_orders(symbol)
+            self._connector_for(symbol).cancel_all_orders(symbol)
             grid_levels = self.levels.get(symbol, [])
-            self.db.update_grid_status(symbol, [], grid_levels)
+            self.db_for(symbol).update_grid_status(symbol, [], grid_levels)
+            self.order_view.update_orders(symbol, [])
             count += 1
         return count
 
     def panic_sell_all(self):
-        print()
+        log.blank()
         log.warning("🔥 ACCIÓN DE PÁNICO: VENDIENDO TODO A USDC...")
-        send_msg("🔥 <b>PÁNICO: VENDER TODO</b>\nLiquidando cartera a USDC...")
-        sold_count = 0
-        self.panic_cancel_all()
+        self.notify(f"🔥 <b>PÁNICO: VENDER TODO</b>\nLiquidando cartera a USDC{self._accounts_suffix()}...")
+        self._cancel_all_pairs()
+        by_account = {}
+        if self.accounts is not None:
+            self.accounts.panic_cancel_all()
         time.sleep(2) 
 
+        sold_count = self._sell_all_pairs()
+        if self.accounts is not None:
+            by_account = self.accounts.panic_sell_all()
+            sold_count += sum(by_account.values())
+
+        extra = f" (incluye {len(by_account)} cuentas secundarias)" if by_account else ""
+        self.notify(f"🔥 <b>PÁNICO FINALIZADO</b>\nSe han liquidado {sold_count} posiciones{extra}.")
+        return sold_count
+
+    def _sell_all_pairs(self):
+        """Vende a mercado el inventario de los pares de este runtime -> nº de posiciones vendidas."""
+        sold_count = 0
         for symbol in self.active_pairs:
             try:
                 base_asset = symbol.split('/')[0]
-                amount = self.connector.get_asset_balance(base_asset)
-                price = self.connector.fetch_current_price(symbol)
+                connector = self._connector_for(symbol)
+                amount = connector.get_asset_balance(base_asset)
+                price = connector.fetch_current_price(symbol)
                 value_usdc = amount * price
                 
                 if value_usdc > 2.0: 
                     log.warning(f"Vendiendo {amount} {base_asset} a mercado...")
-                    self.connector.place_market_sell(symbol, amount)
+                    connector.place_market_sell(symbol, amount)
                     sold_count += 1
                     time.sleep(0.5) 
             except Exception as e:
                 log.error(f"Error Panic Sell {symbol}: {e}")
-        
-        send_msg(f"🔥 <b>PÁNICO FINALIZADO</b>\nSe han liquidado {sold_count} posiciones.")
         return sold_count
 
     def start_logic(self):
         log.info(f"{Fore.CYAN}--- INICIANDO GRIDBOT PROFESSIONAL ---{Style.RESET_ALL}")
         
-        self.connector.check_and_reload_config()
-        self.config = self.connector.config 
+        self._pending_config = None
+        if not self._static_config:
+            self.config = config_service.get()
+        self._refresh_pairs_map()
+        # Cambio de red guardado con el motor parado: se conecta a la red nueva antes de arrancar
+        self.connector.apply_network_change()
         self.connector.validate_connection()
         
         log.info("Calculando patrimonio inicial...")
@@ -655,15 +837,22 @@ class GridBot:
         # Abans de començar una sessió nova, arxivamos la vella si existeix
         if self.db.archive_session_stats():
             log.success("Sessió anterior arxivada correctament a l'històric.")
+        if any(self.is_paper(s) for s in self.active_pairs):
+            paper = self._paper()
+            paper.db.archive_session_stats()
+            paper_equity = paper.equity()
+            paper.db.set_session_start_balance(paper_equity)
+            paper.db.set_global_start_balance_if_not_exists(paper_equity)
+            log.info(f"📝 Cartera virtual: {paper_equity:.2f} USDC")
         
         self.global_start_time = time.time()
         self.processed_trade_ids.clear()
 
-        send_msg(f"🚀 <b>MOTOR INICIADO</b>\nPatrimonio inicial: {initial_equity:.2f} USDC")
+        self.notify(f"🚀 <b>MOTOR INICIADO</b>\nPatrimonio inicial: {initial_equity:.2f} USDC")
 
         log.warning("Limpiando órdenes antiguas iniciales...")
         for symbol in self.active_pairs:
-            self.connector.cancel_all_orders(symbol)
+            self._connector_for(symbol).cancel_all_orders(symbol)
         
         log.info("Arrancando motores...")
         time.sleep(2)
@@ -671,7 +860,9 @@ class GridBot:
         self.is_running = True
         self.is_paused = False 
         
-        data_thread = threading.Thread(target=self._data_collector_loop, daemon=True)
+        self._schedule_jobs()
+        data_thread = threading.Thread(target=self._data_collector_loop, daemon=True,
+                                       name="engine-collector" if self.primary else f"engine-collector-{self.account_name()}")
         data_thread.start()
         
         try:
@@ -684,8 +875,12 @@ class GridBot:
             log.warning("El bot ya está corriendo!")
             return False
         
-        self.bot_thread = threading.Thread(target=self.start_logic, daemon=True)
+        name = "engine-monitor" if self.primary else f"engine-monitor-{self.account_name()}"
+        self.bot_thread = threading.Thread(target=self.start_logic, daemon=True, name=name)
         self.bot_thread.start()
+        # Las demás cuentas arrancan y paran con el runtime principal
+        if self.accounts is not None:
+            self.accounts.launch()
         return True
 
     def stop_logic(self):
@@ -693,14 +888,19 @@ class GridBot:
             return
         log.warning("Deteniendo lógica del bot...")
         self.is_running = False
+        self._cancel_jobs()
+        if self.accounts is not None:
+            self.accounts.stop()
         
         # Forcem un últim backup abans de parar
         try:
             self._backup_current_session_pnl()
+            if self.paper is not None:
+                self.paper.save_ledger(force=True)
         except Exception:
             pass
 
-        send_msg("🛑 <b>MOTOR DETENIDO</b>\nEl bot se ha apagado.")
+        self.notify("🛑 <b>MOTOR DETENIDO</b>\nEl bot se ha apagado.")
         log.success("Bot detenido.")
 
     def _monitoring_loop(self):
@@ -715,31 +915,41 @@ class GridBot:
                 continue
             
             if not self.connector.exchange:
-                if self.connector.check_and_reload_config():
-                    self._handle_smart_reload()
+                self._apply_pending_config()
                 log.status(f"{Fore.RED}SIN CONEXIÓN{Fore.RESET} - Revisa API Keys / Red... {spin_chars[idx]}")
                 idx = (idx + 1) % 4
                 time.sleep(1)
                 continue
 
-            if self.connector.check_and_reload_config():
-                self._handle_smart_reload()
+            self._apply_pending_config()
             
             for symbol in self.active_pairs:
-                self._ensure_grid_consistency(symbol)
+                with GRID_CONSISTENCY_SECONDS.labels(symbol).time():
+                    self._ensure_grid_consistency(symbol)
             
             display_status = f"{Fore.GREEN}EN MARCHA{Fore.RESET} | Monitorizando {len(self.active_pairs)} pares | {spin_chars[idx]}"
             log.status(display_status)
             idx = (idx + 1) % 4
             time.sleep(delay)
 
+    def _apply_pending_config(self):
+        snapshot = self._pending_config
+        if snapshot is not None:
+            self._pending_config = None
+            self._handle_smart_reload(snapshot)
+
     def _shutdown(self):
         self.is_running = False
+        self._cancel_jobs()
+        if self.accounts is not None:
+            self.accounts.stop()
         # Forcem un últim backup en sortir per Ctrl+C
         try:
             self._backup_current_session_pnl()
+            if self.paper is not None:
+                self.paper.save_ledger(force=True)
         except Exception:
             pass
-        print()
+        log.blank()
         log.warning("--- DETENIENDO GRIDBOT ---")
         log.success("Bot detenido.")
\ No newline at end of file
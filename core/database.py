@@ -4,19 +4,25 @@ import json
 import time
 import os
 from utils.logger import log
+from utils.metrics import REGISTRY, instrument_methods
 from cryptography.fernet import Fernet
 import base64
+import bisect
 import hashlib
 
 DB_FOLDER = "data"
 DB_NAME = "bot_data.db"
 DB_PATH = os.path.join(DB_FOLDER, DB_NAME)
+SNAPSHOT_SLOT = 60  # segundos por ranura de balance_history (una fila por exchange y ranura)
+SNAPSHOT_TS_RETRIES = 5  # intentos si el timestamp (clave primaria) ya existe
 
 # Gestión segura de la clave de encriptación:
 # 1) Si existe la variable de entorno GRIDBOT_MASTER_KEY, se usa (se deriva a clave Fernet si no es una clave Fernet válida)
 # 2) Si existe el fichero de clave en data/.encryption_key se lee y se usa
 # 3) Si no existe, se genera una nueva clave Fernet y se persiste en data/.encryption_key con permisos restringidos
 
+KEY_PATH = os.path.join(DB_FOLDER, '.encryption_key')
+
 def _load_or_generate_encryption_key():
     # 1) variable de entorno
     env_key = os.getenv('GRIDBOT_MASTER_KEY')
@@ -32,7 +38,7 @@ def _load_or_generate_encryption_key():
         return base64.urlsafe_b64encode(hash_bytes)
 
     # 2) fichero en data/
-    key_path = os.path.join(DB_FOLDER, '.encryption_key')
+    key_path = KEY_PATH
     try:
         if os.path.exists(key_path):
             with open(key_path, 'rb') as f:
@@ -60,10 +66,53 @@ def _load_or_generate_encryption_key():
 ENCRYPTION_KEY = _load_or_generate_encryption_key()
 cipher_suite = Fernet(ENCRYPTION_KEY)
 
+def rotate_encryption_key(db_path=None):
+    """Genera una clave Fernet nueva, re-encripta con ella las credenciales de exchanges y la guarda
+    en data/.encryption_key. Devuelve el nº de exchanges re-encriptados.
+
+    La clave nueva se escribe primero en `.encryption_key.new` y sólo sustituye a la antigua tras el
+    commit de la BD: si el proceso muere a medias, la clave que corresponde a la BD sigue en disco.
+    """
+    global ENCRYPTION_KEY, cipher_suite
+    if os.getenv('GRIDBOT_MASTER_KEY'):
+        raise RuntimeError("La clave viene de GRIDBOT_MASTER_KEY: cámbiala en el entorno, no en data/")
+    new_key = Fernet.generate_key()
+    new_cipher = Fernet(new_key)
+    pending_path = KEY_PATH + '.new'
+    os.makedirs(DB_FOLDER, exist_ok=True)
+    fd = os.open(pending_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(new_key)
+    with sqlite3.connect(db_path or DB_PATH, timeout=30) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, api_key, secret_key, passphrase FROM exchanges")
+        rows = cursor.fetchall()
+        for row_id, *secrets in rows:
+            # Falla (InvalidToken) antes de tocar nada si alguna credencial no se puede leer con la clave actual
+            plain = [cipher_suite.decrypt(v.encode()) if v else None for v in secrets]
+            cursor.execute("UPDATE exchanges SET api_key = ?, secret_key = ?, passphrase = ? WHERE id = ?",
+                           [new_cipher.encrypt(v).decode() if v else None for v in plain] + [row_id])
+        conn.commit()
+    os.replace(pending_path, KEY_PATH)
+    ENCRYPTION_KEY, cipher_suite = new_key, new_cipher
+    return len(rows)
+
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'gridbot_db_query_seconds', 'Latencia de los métodos de BotDatabase', ('method',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'gridbot_cache_requests_total', 'Consultas a cachés internas por resultado (hit/miss)', ('cache', 'result'))
+_candles_hit = CACHE_REQUESTS.labels('candles', 'hit')
+_candles_miss = CACHE_REQUESTS.labels('candles', 'miss')
+
 class BotDatabase:
-    def __init__(self):
-        if not os.path.exists(DB_FOLDER):
-            os.makedirs(DB_FOLDER)
+    def __init__(self, path=None):
+        """`path`: fichero SQLite (por defecto data/bot_data.db; los pares en papel usan el suyo)."""
+        self.path = path or DB_PATH
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        # symbol -> (updated_at, candles, timestamps) para no re-parsear el JSON de velas en cada petición delta
+        self._candles_cache = {}
         self._init_db()
 
     @staticmethod
@@ -86,7 +135,7 @@ class BotDatabase:
 
     def _get_conn(self):
         """Abre una conexión nueva segura para el hilo actual"""
-        return sqlite3.connect(DB_PATH, timeout=30) 
+        return sqlite3.connect(self.path, timeout=30)
 
     def _init_db(self):
         with self._get_conn() as conn:
@@ -120,6 +169,8 @@ class BotDatabase:
                 )
             ''')
             
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_trade_symbol_ts ON trade_history (symbol, timestamp)")
+
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS balance_history (
                     timestamp REAL PRIMARY KEY,
@@ -132,9 +183,27 @@ class BotDatabase:
             except Exception:
                 # Si ya existe la columna, ignoramos el error
                 pass
+            # Ranura temporal del snapshot: como mucho una fila por exchange y ranura (las filas
+            # antiguas quedan con slot NULL y no participan en el índice)
+            try:
+                cursor.execute("ALTER TABLE balance_history ADD COLUMN slot INTEGER")
+            except Exception:
+                pass
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_balance_exchange_slot ON balance_history (exchange, slot) WHERE slot IS NOT NULL")
             
             cursor.execute('''CREATE TABLE IF NOT EXISTS bot_info (key TEXT PRIMARY KEY, value TEXT)''')
-            
+
+            # Versión de trade_history (ver get_trades_version): contador en bot_info que los
+            # triggers incrementan en cada alta, baja o cambio de trade, venga de donde venga
+            cursor.execute("INSERT OR IGNORE INTO bot_info (key, value) VALUES ('trades_version', '0')")
+            for event in ('INSERT', 'DELETE', 'UPDATE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_trades_version_{event.lower()} AFTER {event} ON trade_history
+                    BEGIN
+                        UPDATE bot_info SET value = CAST(value AS INTEGER) + 1 WHERE key = 'trades_version';
+                    END
+                ''')
+
             # --- SISTEMA PNL PER SESSIONS (Robust) ---
             
             # 1. HISTÒRIC: Resultats consolidats de sessions anteriors
@@ -296,40 +365,46 @@ class BotDatabase:
 
     def log_balance_snapshot(self, equity, exchange='default'):
         """Guarda instantánea del balance con referencia al exchange (p.ej. 'binance').
-        Evita insertar duplicados cercanos en el tiempo o con variación insignificante para reducir ruido y duplicados.
-        Devuelve True si se insertó una fila nueva, False si se omitió por deduplicación.
-        """
+        Devuelve True si se guardó (ver `log_balance_snapshots`)."""
+        return self.log_balance_snapshots([(exchange, equity, time.time())]) > 0
+
+    def log_balance_snapshots(self, rows):
+        """Guarda varias instantáneas `(exchange, equity, timestamp)` en una sola transacción.
+        Cada exchange tiene como mucho una fila por ranura de SNAPSHOT_SLOT segundos: si dos
+        programadores (motor y web) escriben la misma ranura, la última lectura sustituye a la
+        anterior en vez de duplicarla. Devuelve el número de filas escritas."""
+        if not rows:
+            return 0
         try:
+            used_ts = set()
+            params = []
+            for exchange, equity, ts in rows:
+                # timestamp es la clave primaria: dos exchanges en el mismo instante no pueden chocar
+                while ts in used_ts:
+                    ts += 1e-6
+                used_ts.add(ts)
+                params.append((ts, float(equity), exchange, int(ts // SNAPSHOT_SLOT) * SNAPSHOT_SLOT))
+            written = 0
             with self._get_conn() as conn:
-                cursor = conn.cursor()
-                current_ts = time.time()
-
-                # Recuperar última snapshot para este exchange
-                cursor.execute("SELECT timestamp, equity FROM balance_history WHERE exchange = ? ORDER BY timestamp DESC LIMIT 1", (exchange,))
-                last = cursor.fetchone()
-
-                # Parámetros de deduplicación
-                MIN_INTERVAL = 50  # segundos mínimos entre snapshots para considerar insertar
-                MIN_DELTA = 0.01   # diferencia mínima en equity para considerar distinto
-
-                if last:
-                    try:
-                        last_ts = float(last[0])
-                        last_eq = float(last[1])
-                        if (current_ts - last_ts) < MIN_INTERVAL and abs(float(equity) - last_eq) <= MIN_DELTA:
-                            # Omitir inserción si es demasiado cercano en el tiempo y sin cambios relevantes
-                            return False
-                    except Exception:
-                        # Si falla el parsing, seguimos y permitimos la inserción
-                        pass
-
-                # Insertar snapshot
-                cursor.execute("INSERT INTO balance_history (timestamp, equity, exchange) VALUES (?, ?, ?)", (current_ts, equity, exchange))
+                for ts, equity, exchange, slot in params:
+                    # Si el timestamp ya existe en la tabla (otra fila, otro proceso) sólo falla esta
+                    # sentencia: se desplaza un microsegundo y se reintenta sin perder el resto del lote
+                    for _ in range(SNAPSHOT_TS_RETRIES):
+                        try:
+                            conn.execute('''
+                                INSERT INTO balance_history (timestamp, equity, exchange, slot) VALUES (?, ?, ?, ?)
+                                ON CONFLICT(exchange, slot) WHERE slot IS NOT NULL
+                                DO UPDATE SET equity = excluded.equity, timestamp = excluded.timestamp
+                            ''', (ts, equity, exchange, slot))
+                            written += 1
+                            break
+                        except sqlite3.IntegrityError:
+                            ts += 1e-6
                 conn.commit()
-                return True
+                return written
         except Exception as e:
             log.error(f"Error guardando snapshot en DB: {e}")
-            return False
+            return 0
 
     def get_balance_history(self, from_timestamp=0, exchange=None):
         """Si `exchange` es None devuelve datos de todos los exchanges; si se especifica, filtra por `exchange`."""
@@ -645,6 +720,84 @@ class BotDatabase:
                 "trades": trades
             }
 
+    def get_candles_since(self, symbol, since_ms=0):
+        """Devuelve (candles, updated_at) con las velas cuyo timestamp >= `since_ms`.
+        La última vela recibida por el cliente se incluye de nuevo porque puede seguir abierta (cambiar).
+        El JSON de velas se parsea sólo cuando `updated_at` cambia (caché por símbolo).
+        """
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT updated_at FROM market_data WHERE symbol=?", (symbol,))
+            row = cursor.fetchone()
+            if not row:
+                return [], 0.0
+            updated_at = row[0] or 0.0
+            cached = self._candles_cache.get(symbol)
+            if cached and cached[0] == updated_at:
+                _candles_hit.inc()
+            else:
+                _candles_miss.inc()
+                cursor.execute("SELECT candles_json FROM market_data WHERE symbol=?", (symbol,))
+                c_row = cursor.fetchone()
+                candles = json.loads(c_row[0]) if c_row and c_row[0] else []
+                cached = (updated_at, candles, [c[0] for c in candles])
+                self._candles_cache[symbol] = cached
+        _, candles, stamps = cached
+        if not since_ms:
+            return candles, updated_at
+        return candles[bisect.bisect_left(stamps, since_ms):], updated_at
+
+    def get_pair_state(self, symbol):
+        """Precio, órdenes abiertas y niveles del grid de `symbol`, sin velas ni trades (variante delta)."""
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT price FROM market_data WHERE symbol=?", (symbol,))
+            market_row = cursor.fetchone()
+            cursor.execute("SELECT open_orders_json, grid_levels_json FROM grid_status WHERE symbol=?", (symbol,))
+            grid_row = cursor.fetchone() or (None, None)
+            return {
+                "price": market_row[0] if market_row and market_row[0] else 0.0,
+                "open_orders": json.loads(grid_row[0]) if grid_row[0] else [],
+                "grid_levels": json.loads(grid_row[1]) if grid_row[1] else []
+            }
+
+    def get_trades_since(self, symbol, after_rowid=None, limit=50):
+        """Devuelve (trades, more) de `symbol` en orden de inserción (rowid ascendente).
+        Con `after_rowid` avanza desde el cursor: los `limit` trades siguientes y `more` si quedan más.
+        Sin cursor (primera carga) devuelve los `limit` últimos.
+        Se usa el rowid y no el timestamp porque los trades pueden llegar a la BD fuera de orden.
+        """
+        cols_sql = "rowid, id, symbol, side, price, amount, cost, fee_cost, fee_currency, timestamp, buy_id"
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            if after_rowid is None:
+                cursor.execute(f"SELECT {cols_sql} FROM trade_history WHERE symbol=? ORDER BY rowid DESC LIMIT ?",
+                               (symbol, limit))
+                rows = cursor.fetchall()[::-1]
+                more = False
+            else:
+                cursor.execute(f"SELECT {cols_sql} FROM trade_history WHERE symbol=? AND rowid > ? ORDER BY rowid ASC LIMIT ?",
+                               (symbol, int(after_rowid), limit + 1))
+                rows = cursor.fetchall()
+                more = len(rows) > limit
+                rows = rows[:limit]
+            cols = [d[0] for d in cursor.description]
+            return [dict(zip(cols, r)) for r in rows], more
+
+    def get_session_flows(self, symbol, from_timestamp=0):
+        """(cash_flow, qty_delta) de `symbol` desde `from_timestamp` (segundos), agregados en SQL.
+        Mismo cálculo que per_coin_stats de get_stats pero sólo para un par (PnL de sesión en /api/details).
+        """
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT SUM(CASE WHEN side='sell' THEN cost ELSE -cost END - COALESCE(fee_cost, 0)),
+                       SUM(CASE WHEN side='buy' THEN amount ELSE -amount END)
+                FROM trade_history WHERE symbol=? AND timestamp >= ?
+            ''', (symbol, int(from_timestamp * 1000)))
+            cash_flow, qty_delta = cursor.fetchone()
+            return cash_flow or 0.0, qty_delta or 0.0
+
     def get_all_prices(self):
         with self._get_conn() as conn:
             cursor = conn.cursor()
@@ -728,6 +881,57 @@ class BotDatabase:
                 }
             }
 
+    def get_trades_version(self):
+        """Versión de trade_history: contador de bot_info que mantienen los triggers de la tabla.
+        Cambia al insertar, borrar o modificar trades desde cualquier proceso (motor y workers web
+        en modo separado) y se lee en una sola fila, sin recorrer trade_history.
+        """
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM bot_info WHERE key='trades_version'")
+            row = cursor.fetchone()
+            return int(row[0]) if row else 0
+
+    def get_trade_aggregates(self):
+        """Agregados por símbolo calculados en SQL: nº trades, capital comprado, ingresos netos de ventas,
+        cash flow neto y primer timestamp (ms)."""
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT symbol,
+                       COUNT(*),
+                       SUM(CASE WHEN side='buy' THEN cost ELSE 0 END),
+                       SUM(CASE WHEN side='sell' THEN cost - COALESCE(fee_cost, 0) ELSE 0 END),
+                       MIN(timestamp)
+                FROM trade_history GROUP BY symbol
+            ''')
+            result = {}
+            for symbol, trades, bought, sold, first_ts in cursor.fetchall():
+                bought = bought or 0.0
+                sold = sold or 0.0
+                result[symbol] = {
+                    "trades": trades,
+                    "capital_invested": bought,
+                    "sell_proceeds": sold,
+                    "pnl": sold - bought,
+                    "first_trade_time": first_ts or 0.0
+                }
+            return result
+
+    def get_daily_cash_flows(self):
+        """Cash flow neto por símbolo y día (días UTC desde epoch), ordenado por día."""
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT symbol, CAST(timestamp / 86400000 AS INTEGER) AS day,
+                       SUM(CASE WHEN side='sell' THEN cost - COALESCE(fee_cost, 0) ELSE -cost END)
+                FROM trade_history GROUP BY symbol, day ORDER BY symbol, day
+            ''')
+            flows = {}
+            for symbol, day, cash_flow in cursor.fetchall():
+                flows.setdefault(symbol, []).append((day, cash_flow or 0.0))
+            return flows
+
     def get_all_active_orders(self):
         with self._get_conn() as conn:
             cursor = conn.cursor()
@@ -765,7 +969,7 @@ class BotDatabase:
         if deleted_trades > 0 or deleted_balance > 0:
             try:
                 # isolation_level=None activa el mode autocommit
-                vacuum_conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+                vacuum_conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
                 vacuum_conn.execute("VACUUM")
                 vacuum_conn.close()
             except Exception as e:
@@ -835,6 +1039,22 @@ class BotDatabase:
                 return float(row[0])
             return 0.0
 
+    def set_paper_ledger(self, balances):
+        """Cartera virtual de paper trading ({activo: saldo total})."""
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR REPLACE INTO bot_info (key, value) VALUES (?, ?)", ('paper_ledger', json.dumps(balances)))
+            conn.commit()
+
+    def get_paper_ledger(self):
+        with self._get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT value FROM bot_info WHERE key='paper_ledger'")
+            row = cursor.fetchone()
+            if row and row[0]:
+                return json.loads(row[0])
+            return None
+
     def get_all_stored_grids(self):
         with self._get_conn() as conn:
             cursor = conn.cursor()
@@ -963,4 +1183,8 @@ class BotDatabase:
             data[symbol] = current_val + delta_usdc
             
             cursor.execute("INSERT OR REPLACE INTO bot_info (key, value) VALUES (?, ?)", ('coins_initial_equity', json.dumps(data)))
-            conn.commit()
\ No newline at end of file
+            conn.commit()
+
+
+# Latencia de cada método público de la BD
+instrument_methods(BotDatabase, DB_QUERY_SECONDS)
@@ -0,0 +1,383 @@
+# Archivo: core/engine.py
+"""Motor multicuenta: un runtime de grid aislado por cuenta de exchange, en el mismo proceso.
+
+El runtime principal es el GridBot de siempre (el exchange que se conecta desde la web). Cada
+cuenta de la tabla `exchanges` que aparece en el `"accounts"` de algún par activo tiene además su
+propio runtime: un GridBot con su conector y credenciales (y por tanto su ccxt con rate limit y su
+PlanExecutor con presupuesto de órdenes/s), su cartera en el exchange y su base de datos
+(data/accounts/<cuenta>.db, y <cuenta>-paper.db si tiene pares en papel).
+
+    {"symbol": "BTC/USDC", "enabled": true, "accounts": ["binance", "bitget"], ...}
+
+Un par sin `"accounts"` sigue en el runtime principal. Una cuenta nunca tiene dos runtimes: si es
+la conectada en el principal, sus pares los lleva él. Los runtimes arrancan, se pausan y se
+detienen con el principal.
+
+Datos de mercado: los runtimes del mismo venue (id del exchange + endpoint público, así testnet y
+real no se mezclan) comparten `MarketDataHub`: un único fetch_tickers por segundo con los pares de
+todas las cuentas y las velas reutilizadas unos segundos, de modo que N cuentas con pares
+solapados no multiplican las peticiones públicas.
+"""
+import os
+import re
+import threading
+import time
+from core.bot import GridBot
+from core.database import BotDatabase, DB_FOLDER
+from core.exchange import BinanceConnector
+from utils.config_service import config_service
+from utils.logger import log
+from utils.metrics import REGISTRY
+from utils.telegram import send_msg
+
+ACCOUNTS_FOLDER = os.path.join(DB_FOLDER, 'accounts')
+TICKER_TTL = 1.0     # s que se reutiliza el fetch_tickers de un venue
+CANDLES_TTL = 20.0   # s que se reutilizan las velas de un (venue, símbolo, timeframe, límite)
+
+MARKET_DATA_REQUESTS = REGISTRY.counter(
+    'gridbot_market_data_requests_total', 'Peticiones de datos de mercado compartidos por resultado',
+    ('kind', 'result'))
+
+
+def account_db_path(name, suffix=''):
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+    return os.path.join(ACCOUNTS_FOLDER, f"{safe}{suffix}.db")
+
+
+def venue_of(exchange):
+    """Clave del mercado de un exchange: sólo se comparten datos entre cuentas del mismo venue.
+    Sin endpoint público conocido (simuladores) cada exchange es su propio mercado."""
+    urls = getattr(exchange, 'urls', None)
+    api = urls.get('api') if isinstance(urls, dict) else None
+    public = api.get('public') if isinstance(api, dict) else None
+    if not public:
+        return f"{getattr(exchange, 'id', 'unknown')}#{id(exchange):x}"
+    return f"{getattr(exchange, 'id', 'unknown')}@{public}"
+
+
+def accounts_in_config(config):
+    """{cuenta: [símbolos]} de los pares activos que declaran `"accounts"`."""
+    accounts = {}
+    for pair in (config or {}).get('pairs', ()):
+        if not pair.get('enabled'):
+            continue
+        for name in pair.get('accounts') or ():
+            accounts.setdefault(name, []).append(pair['symbol'])
+    return accounts
+
+
+class MarketDataHub:
+    """Tickers y velas públicos compartidos por los runtimes de un mismo venue."""
+
+    def __init__(self, ticker_ttl=TICKER_TTL, candles_ttl=CANDLES_TTL):
+        self.ticker_ttl = ticker_ttl
+        self.candles_ttl = candles_ttl
+        self._venues = {}
+        self._candles = {}    # (venue, símbolo, timeframe, since, limit) -> (monotonic, velas)
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _venue(self, venue):
+        with self._lock:
+            state = self._venues.get(venue)
+            if state is None:
+                state = self._venues[venue] = {
+                    'lock': threading.Lock(), 'symbols': set(), 'tickers': {}, 'at': 0.0,
+                    'accounts': set(), 'requests': 0, 'hits': 0,
+                }
+            return state
+
+    def attach(self, venue, account):
+        self._venue(venue)['accounts'].add(account)
+
+    def detach(self, venue, account):
+        self._venue(venue)['accounts'].discard(account)
+
+    def tickers(self, venue, exchange, symbols):
+        """Tickers de `symbols`. Se piden de una vez los de todos los pares vistos en el venue y
+        se reutilizan TICKER_TTL segundos."""
+        state = self._venue(venue)
+        with state['lock']:
+            state['symbols'].update(symbols)
+            stale = time.monotonic() - state['at'] >= self.ticker_ttl
+            if stale or any(s not in state['tickers'] for s in symbols):
+                try:
+                    state['tickers'].update(exchange.fetch_tickers(sorted(state['symbols'])))
+                except Exception:
+                    # Un par que no existe en el venue no debe romper los de las demás cuentas
+                    state['symbols'].difference_update(symbols)
+                    state['tickers'].update(exchange.fetch_tickers(list(symbols)))
+                state['at'] = time.monotonic()
+                state['requests'] += 1
+                MARKET_DATA_REQUESTS.labels('tickers', 'miss').inc()
+            else:
+                state['hits'] += 1
+                MARKET_DATA_REQUESTS.labels('tickers', 'hit').inc()
+            return {s: state['tickers'][s] for s in symbols if s in state['tickers']}
+
+    def ohlcv(self, venue, exchange, symbol, timeframe, since, limit):
+        key = (venue, symbol, timeframe, since, limit)
+        with self._lock:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:
+            cached = self._candles.get(key)
+            if cached and time.monotonic() - cached[0] < self.candles_ttl:
+                MARKET_DATA_REQUESTS.labels('ohlcv', 'hit').inc()
+                return cached[1]
+            candles = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            self._candles[key] = (time.monotonic(), candles)
+            MARKET_DATA_REQUESTS.labels('ohlcv', 'miss').inc()
+            return candles
+
+    def stats(self):
+        with self._lock:
+            venues = dict(self._venues)
+        return {venue: {"accounts": sorted(state['accounts']), "symbols": len(state['symbols']),
+                        "ticker_requests": state['requests'], "ticker_hits": state['hits']}
+                for venue, state in venues.items()}
+
+
+class SharedMarketExchange:
+    """Proxy de un exchange ccxt que sirve tickers y velas desde MarketDataHub. Órdenes, balances
+    y trades (lo que es de la cuenta) pasan tal cual."""
+
+    def __init__(self, exchange, hub, venue):
+        self._exchange = exchange
+        self.hub = hub
+        self.venue = venue
+
+    def __getattr__(self, name):
+        return getattr(self._exchange, name)
+
+    def fetch_ticker(self, symbol, params=None):
+        ticker = self.hub.tickers(self.venue, self._exchange, [symbol]).get(symbol)
+        return ticker if ticker is not None else self._exchange.fetch_ticker(symbol)
+
+    def fetch_tickers(self, symbols=None, params=None):
+        if not symbols:
+            return self._exchange.fetch_tickers()
+        return self.hub.tickers(self.venue, self._exchange, list(symbols))
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        if params:
+            return self._exchange.fetch_ohlcv(symbol, timeframe, since, limit, params)
+        return self.hub.ohlcv(self.venue, self._exchange, symbol, timeframe, since, limit)
+
+
+class AccountEngine:
+    """Runtimes de las cuentas secundarias de un GridBot principal y su vista agregada."""
+
+    def __init__(self, primary, db=None, hub=None, connector_factory=None, notifier=None):
+        """`connector_factory(nombre)` -> BinanceConnector conectado a esa cuenta (por defecto con
+        sus credenciales de la tabla exchanges de `db`)."""
+        self.primary = primary
+        primary.accounts = self
+        self.db = db or primary.db
+        self.hub = hub or MarketDataHub()
+        self.notify = notifier or send_msg
+        self._connector_factory = connector_factory or self._connect
+        self.runtimes = {}
+        self.is_running = False
+        self._lock = threading.RLock()
+        self._warned = set()
+        if not primary._static_config:
+            config_service.subscribe(self._on_config_change)
+
+    def _connect(self, name):
+        # Configuración fija: la red de la cuenta es la de su fila en exchanges
+        return BinanceConnector(config=config_service.get(), account=name)
+
+    def _on_config_change(self, snapshot, previous):
+        # Con el motor parado no se conecta nada: ya se sincroniza al arrancar
+        if self.is_running:
+            self.sync(snapshot)
+
+    def _share(self, bot, account):
+        """Pone el exchange de `bot` detrás del hub de datos de mercado (idempotente)."""
+        exchange = bot.connector.exchange
+        if exchange is None or isinstance(exchange, SharedMarketExchange):
+            return
+        venue = venue_of(exchange)
+        bot.connector.exchange = SharedMarketExchange(exchange, self.hub, venue)
+        self.hub.attach(venue, account)
+
+    def _desired(self, config):
+        """Cuentas que necesitan runtime: las de algún `"accounts"`, salvo la del principal."""
+        wanted = set(accounts_in_config(config)) - {self.primary.account_name()}
+        stored = {e['name']: e for e in self.db.get_exchanges() if e.get('has_credentials')}
+        for name in wanted - set(stored) - self._warned:
+            log.warning(f"🏦 La cuenta '{name}' de config.json5 no está en Exchanges: se ignoran sus pares.")
+        self._warned |= wanted - set(stored)
+        return {name: stored[name] for name in wanted if name in stored}
+
+    def sync(self, config=None):
+        """Crea o retira runtimes según la configuración y la cuenta conectada en el principal."""
+        with self._lock:
+            desired = self._desired(config if config is not None else self.primary.config)
+            for name in set(self.runtimes) - set(desired):
+                self._remove(name)
+            for name, row in desired.items():
+                if name not in self.runtimes:
+                    self._add(name, row)
+            # La cuenta conectada en el principal decide qué pares con "accounts" lleva él
+            primary = self.primary
+            owned = {p['symbol'] for p in primary.config['pairs'] if p['enabled'] and primary.owns_pair(p)}
+            if owned != set(primary.pairs_map) and not primary._static_config:
+                primary._on_config_change(primary.config, None)
+            # Sin otras cuentas el principal no comparte nada: se queda como estaba
+            if self.runtimes:
+                self._share(self.primary, self.primary.account_name() or 'principal')
+        return sorted(self.runtimes)
+
+    def _add(self, name, row):
+        try:
+            connector = self._connector_factory(name)
+        except Exception as e:
+            log.error(f"🏦 Error conectando la cuenta {name}: {e}")
+            return
+        if connector is None or connector.exchange is None:
+            log.error(f"🏦 No se pudo conectar la cuenta {name}: sus pares quedan parados.")
+            return
+        primary = self.primary
+        bot = GridBot(connector=connector, db=BotDatabase(account_db_path(name)),
+                      config=primary.config if primary._static_config else None,
+                      notifier=lambda text, name=name: self.notify(f"🏦 <b>[{name}]</b> {text}"),
+                      account=name)
+        bot.active_exchange_use_testnet = bool(row.get('use_testnet'))
+        bot.paper_db_path = account_db_path(name, '-paper')
+        bot.settle_delay = primary.settle_delay
+        self._share(bot, name)
+        self.runtimes[name] = bot
+        log.success(f"🏦 Cuenta {name}: runtime listo ({len(bot.active_pairs)} pares).")
+        if self.is_running:
+            bot.launch()
+            bot.is_paused = primary.is_paused
+
+    def _remove(self, name):
+        bot = self.runtimes.pop(name)
+        log.info(f"🏦 Retirando la cuenta {name}. Cancelando órdenes...")
+        bot.stop_logic()
+        for symbol in list(bot.levels):
+            try:
+                bot._connector_for(symbol).cancel_all_orders(symbol)
+            except Exception as e:
+                log.error(f"🏦 [{name}] Error cancelando {symbol}: {e}")
+        if not bot._static_config:
+            config_service.unsubscribe(bot._on_config_change)
+        bot.connector.release_recording()
+        exchange = bot.connector.exchange
+        if isinstance(exchange, SharedMarketExchange):
+            self.hub.detach(exchange.venue, name)
+
+    # --- CICLO DE VIDA (lo sigue el GridBot principal) ---
+    def launch(self):
+        """Arranca los runtimes en segundo plano (conectar cuentas no debe bloquear la web)."""
+        self.is_running = True
+        threading.Thread(target=self._launch, daemon=True, name="engine-accounts").start()
+
+    def _launch(self):
+        self.sync()
+        with self._lock:
+            for bot in self.runtimes.values():
+                if self.is_running and not bot.is_running:
+                    bot.launch()
+
+    def stop(self):
+        self.is_running = False
+        with self._lock:
+            for bot in self.runtimes.values():
+                bot.stop_logic()
+
+    def pause(self):
+        for bot in list(self.runtimes.values()):
+            bot.is_paused = True
+
+    def resume(self):
+        for bot in list(self.runtimes.values()):
+            bot.is_paused = False
+
+    # --- PÁNICO (lo lanza el GridBot principal, que avisa una sola vez) ---
+    def panic_cancel_all(self):
+        """Cancela las órdenes de todas las cuentas secundarias -> {cuenta: nº de pares}."""
+        return self._each_runtime('_cancel_all_pairs')
+
+    def panic_sell_all(self):
+        """Vende a mercado el inventario de todas las cuentas secundarias -> {cuenta: nº de ventas}."""
+        return self._each_runtime('_sell_all_pairs')
+
+    def _each_runtime(self, method):
+        with self._lock:
+            runtimes = dict(self.runtimes)
+        results = {}
+        for name, bot in sorted(runtimes.items()):
+            try:
+                results[name] = getattr(bot, method)()
+            except Exception as e:
+                log.error(f"🏦 [{name}] Error en acción de pánico: {e}")
+                results[name] = 0
+        return results
+
+    def launch_account(self, name):
+        bot = self.runtimes.get(name)
+        if bot is None:
+            return False
+        return bot.launch()
+
+    def stop_account(self, name):
+        bot = self.runtimes.get(name)
+        if bot is None or not bot.is_running:
+            return False
+        bot.stop_logic()
+        return True
+
+    # --- VISTA AGREGADA ---
+    def _runtime_status(self, bot, primary=False):
+        """Estado de un runtime sin llamar al exchange: equity del último snapshot de balance y PnL
+        de la sesión con los precios de su vista de órdenes."""
+        last = bot.db.get_last_balance_snapshot(bot._active_exchange_id())
+        session_pnl = total_pnl = 0.0
+        trades = 0
+        if bot.global_start_time:
+            stats = bot.db.get_stats(from_timestamp=bot.global_start_time)
+            per_coin = stats['per_coin_stats']
+            trades = stats['trades']
+            for symbol in bot.active_pairs:
+                if bot.is_paper(symbol):
+                    continue
+                price = bot.order_view.get_price(symbol) or 0.0
+                pnl = per_coin['qty_delta'].get(symbol, 0.0) * price + per_coin['cash_flow'].get(symbol, 0.0)
+                session_pnl += pnl
+                total_pnl += pnl + bot.db.get_accumulated_pnl(symbol)
+        exchange = bot.connector.exchange
+        return {
+            "account": bot.account_name() or getattr(exchange, 'id', None),
+            "primary": primary,
+            "connected": exchange is not None,
+            "venue": getattr(exchange, 'venue', None),
+            "running": bot.is_running,
+            "paused": bot.is_paused,
+            "pairs": list(bot.active_pairs),
+            "equity": round(last[1], 2) if last else None,
+            "equity_at": last[0] if last else None,
+            "trades": trades,
+            "session_pnl": round(session_pnl, 2),
+            "total_pnl": round(total_pnl, 2),
+        }
+
+    def status(self):
+        with self._lock:
+            rows = [self._runtime_status(self.primary, primary=True)]
+            rows += [self._runtime_status(bot) for _, bot in sorted(self.runtimes.items())]
+        return {
+            "running": self.is_running,
+            "accounts": rows,
+            "totals": {
+                "accounts": len(rows),
+                "pairs": sum(len(r['pairs']) for r in rows),
+                "equity": round(sum(r['equity'] or 0.0 for r in rows), 2),
+                "trades": sum(r['trades'] for r in rows),
+                "session_pnl": round(sum(r['session_pnl'] for r in rows), 2),
+                "total_pnl": round(sum(r['total_pnl'] for r in rows), 2),
+            },
+            "market_data": self.hub.stats(),
+        }
@@ -1,73 +1,135 @@
 # Archivo: gridbot_binance/core/exchange.py
 import ccxt
 import os
-import json5
 import time
 from utils.logger import log
+from utils.metrics import REGISTRY, instrument_methods
+from utils.tracing import tracer
+from utils.config_service import config_service
 from core.database import BotDatabase
 
+EXCHANGE_CALL_SECONDS = REGISTRY.histogram(
+    'gridbot_exchange_call_seconds', 'Latencia de las llamadas de BinanceConnector', ('method', 'symbol'))
+EXCHANGE_ERRORS = REGISTRY.counter(
+    'gridbot_exchange_errors_total', 'Errores de API del exchange por tipo', ('error',))
+
 # Nota: no cargamos variables de exchange desde .env aquí para evitar intentos de conexión automáticos.
 # Las credenciales deben gestionarse exclusivamente desde la base de datos y el Dashboard.
 
+# URLs de la testnet de Binance (spot y futuros)
+TESTNET_URLS = {
+    'public': 'https://testnet.binance.vision/api/v3',
+    'private': 'https://testnet.binance.vision/api/v3',
+    'fapiPublic': 'https://testnet.binancefuture.com/fapi/v1',
+    'fapiPrivate': 'https://testnet.binancefuture.com/fapi/v1',
+}
+
+
+def _apply_testnet_urls(exchange):
+    # ACTUALIZACIÓN SEGURA DE URLS PARA NO BORRAR OTROS ENDPOINTS
+    if 'api' not in exchange.urls:
+        exchange.urls['api'] = {}
+    exchange.urls['api'].update(TESTNET_URLS)
+
+
+def _simulated_exchange(config):
+    """Exchange simulado: remoto si SIM_EXCHANGE_ADDRESS apunta a un simulador servido; si no, uno
+    en proceso con los pares de la configuración (los precios los alimenta quien lo controle, o
+    SIM_MARKET_FEED: 'replay:<registro>' o 'synthetic[:semilla]', a SIM_MARKET_SPEED: 1, 10, max)."""
+    from core.simulator import SimulatedExchange, RemoteSimulatedExchange
+    address = os.getenv('SIM_EXCHANGE_ADDRESS')
+    if address:
+        return RemoteSimulatedExchange(address)
+    exchange = SimulatedExchange(balances={'USDC': float(os.getenv('SIM_EXCHANGE_USDC', 10000))})
+    symbols = [pair['symbol'] for pair in config.get('pairs', ())]
+    for symbol in symbols:
+        exchange.add_market(symbol)
+    feed = os.getenv('SIM_MARKET_FEED')
+    if feed:
+        from core.market_feed import MarketReplayer, SyntheticMarket, parse_speed
+        kind, _, arg = feed.partition(':')
+        if kind == 'synthetic':
+            source = SyntheticMarket(symbols, seed=int(arg) if arg else None).events()
+        elif kind == 'replay':
+            source = arg
+        else:
+            raise ValueError(f"SIM_MARKET_FEED no válido: {feed}")
+        MarketReplayer(source, exchange, speed=parse_speed(os.getenv('SIM_MARKET_SPEED', '1'))).start()
+        log.info(f"📼 Alimentando el simulador con {feed}")
+    return exchange
+
+
+def _maybe_record(exchange):
+    """Con MARKET_RECORD_PATH, graba lo que recibe el conector (core.market_feed)."""
+    path = os.getenv('MARKET_RECORD_PATH')
+    if not path or exchange is None:
+        return exchange
+    from core.market_feed import RecordingExchange
+    log.info(f"⏺️ Grabando datos de mercado en {path}")
+    return RecordingExchange(exchange, path)
+
+
 class BinanceConnector:
-    def __init__(self):
+    def __init__(self, exchange=None, config=None, account=None):
+        """`exchange`: objeto con interfaz ccxt ya creado (p.ej. core.simulator.SimulatedExchange);
+        si se pasa no se leen credenciales. `config`: configuración fija (no sigue al servicio).
+        `account`: cuenta de la tabla exchanges a la que conectar (por defecto, la primera activa)."""
         self.exchange = None
-        self.config_path = 'config/config.json5'
-        self.last_config_mtime = 0 
-        self.config = self._load_config()
-        self._connect()
+        # Cuenta de la tabla exchanges con la que se ha conectado (None si se inyecta el exchange)
+        self.account = None
+        # Cambio de red visto por el servicio de configuración, pendiente de reconectar en el motor
+        self._reconnect_pending = False
+        if config is not None:
+            self.config = config
+        else:
+            # Snapshot inmutable del servicio de configuración (se sustituye al recargar)
+            self.config = config_service.get()
+            config_service.subscribe(self._on_config_change)
+        if exchange is not None:
+            self.exchange = exchange
+            self.exchange.load_markets()
+            self._markets_loaded = True
+            return
+        self._connect(account)
         # Cargamos mercados de forma lazy (cuando se necesiten, no en __init__)
         self._markets_loaded = False
         # Programar carga de mercados en background (no bloquea el startup)
         import threading
         threading.Thread(target=self._load_markets_background, daemon=True).start()
 
-    def _load_config(self):
-        try:
-            mtime = os.path.getmtime(self.config_path)
-            self.last_config_mtime = mtime
-            with open(self.config_path, 'r') as f:
-                return json5.load(f)
-        except Exception as e:
-            log.error(f"Error leyendo config.json5: {e}")
-            if hasattr(self, 'config'):
-                return self.config
-            return {}
-
-    def check_and_reload_config(self):
+    def _on_config_change(self, snapshot, previous):
+        """Suscriptor del servicio de configuración: sólo anota si cambia la red.
+        La reconexión la hace el motor en su hilo (apply_network_change), nunca el hilo del watchdog."""
+        old_testnet = self.config.get('system', {}).get('use_testnet', True)
+        self.config = snapshot
+        if (old_testnet != snapshot.use_testnet) and self.exchange:
+            self._reconnect_pending = True
+
+    def apply_network_change(self):
+        """Reconecta si la configuración cambió de red desde la última conexión. Devuelve True si reconectó."""
+        if not self._reconnect_pending:
+            return False
+        self._reconnect_pending = False
+        log.warning(f"🔄 RECONFIGURACIÓN DE RED: {'TESTNET' if self.config.use_testnet else 'REAL'}. Conectando...")
+        self._connect()
         try:
-            current_mtime = os.path.getmtime(self.config_path)
-            if current_mtime > self.last_config_mtime:
-                log.warning("Detectado cambio en config.json5...")
-                new_config = self._load_config()
-                if new_config:
-                    old_testnet = self.config.get('system', {}).get('use_testnet', True)
-                    new_testnet = new_config.get('system', {}).get('use_testnet', True)
-
-                    self.config = new_config
-                    # Solo reconectar si hay cambios significativos de red y tenemos exchange activo
-                    if (old_testnet != new_testnet) and self.exchange:
-                         log.warning(f"🔄 RECONFIGURACIÓN DE RED: {'TESTNET' if new_testnet else 'REAL'}. Conectando...")
-                         self._connect()
-                         try:
-                             if self.exchange:
-                                 self.exchange.load_markets()
-                         except Exception as e:
-                             log.debug(f"load_markets failed during config reload: {e}")
-
-                    return True
+            if self.exchange:
+                self.exchange.load_markets()
         except Exception as e:
-            log.error(f"Error verificando config: {e}")
-        return False
+            log.debug(f"load_markets failed during config reload: {e}")
+        return True
 
-    def _connect(self):
+    def _connect(self, account=None):
         """Intenta conectar usando credenciales de la base de datos (prioridad)"""
         try:
             db = BotDatabase()
             exchanges = db.get_exchanges()
             
-            # Buscar el primer exchange marcado como activo
-            active_exchange = next((e for e in exchanges if e.get('is_active')), None)
+            # La cuenta pedida o, si no, el primer exchange marcado como activo
+            if account:
+                active_exchange = next((e for e in exchanges if e.get('name') == account), None)
+            else:
+                active_exchange = next((e for e in exchanges if e.get('is_active')), None)
             
             if active_exchange:
                 name = active_exchange['name']
@@ -81,13 +143,15 @@ class BinanceConnector:
                     passphrase = creds.get('passphrase')
                     
                     if api_key and secret_key:
-                        self.connect_with_credentials(
+                        ok, _ = self.connect_with_credentials(
                             api_key=api_key,
                             secret_key=secret_key,
                             passphrase=passphrase,
                             use_testnet=use_testnet,
                             exchange_type=active_exchange.get('type', 'binance')
                         )
+                        if ok:
+                            self.account = name
                         return
                     else:
                         log.error(f"❌ Credenciales vacías para exchange {name}.")
@@ -126,13 +190,29 @@ class BinanceConnector:
             log.debug(f"validate_connection failed: {e}")
             return False
 
+    def release_recording(self):
+        """Suelta la grabación del exchange actual (MARKET_RECORD_PATH), si la hay."""
+        close = getattr(self.exchange, 'close_recording', None) if self.exchange is not None else None
+        if callable(close):
+            close()
+
     def connect_with_credentials(self, api_key: str, secret_key: str, passphrase: str = None, use_testnet: bool = None, exchange_type: str = 'binance'):
         """Conecta el conector usando credenciales proporcionadas (no lee .env).
         Soporta 'binance' y 'bitget' (básico) actualmente."""
         try:
+            # El exchange anterior deja de grabar (el escritor del registro es compartido)
+            self.release_recording()
             if use_testnet is None:
                 use_testnet = self.config.get('system', {}).get('use_testnet', True)
 
+            # El simulador no necesita claves
+            if exchange_type == 'simulated':
+                self.exchange = _maybe_record(_simulated_exchange(self.config))
+                self.exchange.load_markets()
+                self._markets_loaded = True
+                log.success("✅ Conectado al exchange SIMULADO.")
+                return True, "Conectado"
+
             if not api_key or not secret_key:
                 log.error("❌ Faltan claves para conectar con credenciales proporcionadas.")
                 self.exchange = None
@@ -161,22 +241,13 @@ class BinanceConnector:
                 except Exception:
                     pass
                 
-                # ACTUALIZACIÓN SEGURA DE URLS PARA NO BORRAR OTROS ENDPOINTS
                 try:
-                    # Aseguramos que existe el dict 'api'
-                    if 'api' not in self.exchange.urls:
-                         self.exchange.urls['api'] = {}
-                    
-                    # Actualizamos URLs de Spot (API v3)
-                    self.exchange.urls['api']['public'] = 'https://testnet.binance.vision/api/v3'
-                    self.exchange.urls['api']['private'] = 'https://testnet.binance.vision/api/v3'
-                    
-                    # Actualizamos URLs de Futures (FAPI v1) para evitar errores de claves faltantes
-                    self.exchange.urls['api']['fapiPublic'] = 'https://testnet.binancefuture.com/fapi/v1'
-                    self.exchange.urls['api']['fapiPrivate'] = 'https://testnet.binancefuture.com/fapi/v1'
+                    _apply_testnet_urls(self.exchange)
                 except Exception as e:
                     log.warning(f"Error actualizando URLs Testnet: {e}")
 
+            self.exchange = _maybe_record(self.exchange)
+
             # Verificación no bloqueante con timeout
             try:
                 import threading
@@ -215,6 +286,7 @@ class BinanceConnector:
 
     # --- GESTOR DE ERRORES CENTRALIZADO ---
     def _handle_api_error(self, e, context=""):
+        EXCHANGE_ERRORS.labels(type(e).__name__).inc()
         err_str = str(e).lower()
         if "418" in err_str or "too much request weight" in err_str or "-1003" in err_str:
             log.error("🚨 IP BANEADA TEMPORALMENTE POR BINANCE (418).")
@@ -259,7 +331,7 @@ class BinanceConnector:
                         info['maker'] = maker * 100
                         info['taker'] = taker * 100
                 except Exception as e:
-                    log.debug(f"fetch_trading_fee failed for {pair}: {e}")
+                    log.debug("fetch_trading_fee failed for %s: %s", pair, e)
                     continue
             
             # 2. Obtenim nivell VIP
@@ -334,16 +406,16 @@ class BinanceConnector:
             self._handle_api_error(e, f"price {symbol}")
             return 0.0
     @staticmethod
-    def fetch_balance_snapshot_static(api_key, secret_key, passphrase=None, use_testnet=False, exchange_type='binance'):
+    def fetch_balance_snapshot_static(api_key, secret_key, passphrase=None, use_testnet=False, exchange_type='binance', timeout_ms=30000):
         """Crea una instancia temporal de ccxt con las credenciales proporcionadas y devuelve el equity total aproximado en USDC.
         Devuelve None si no se puede obtener el balance o ocurre un error.
         """
         try:
             # Construir instancia mínima de exchange
             if exchange_type == 'bitget':
-                exch = ccxt.bitget({'apiKey': api_key, 'secret': secret_key, 'password': passphrase or '', 'enableRateLimit': True, 'timeout': 30000})
+                exch = ccxt.bitget({'apiKey': api_key, 'secret': secret_key, 'password': passphrase or '', 'enableRateLimit': True, 'timeout': timeout_ms})
             else:
-                exch = ccxt.binance({'apiKey': api_key, 'secret': secret_key, 'enableRateLimit': True, 'timeout': 30000, 'options': {'defaultType': 'spot', 'adjustForTimeDifference': True}})
+                exch = ccxt.binance({'apiKey': api_key, 'secret': secret_key, 'enableRateLimit': True, 'timeout': timeout_ms, 'options': {'defaultType': 'spot', 'adjustForTimeDifference': True}})
 
             if use_testnet and exchange_type == 'binance':
                 try:
@@ -351,12 +423,7 @@ class BinanceConnector:
                 except Exception:
                     pass
                 try:
-                    if 'api' not in exch.urls:
-                        exch.urls['api'] = {}
-                    exch.urls['api']['public'] = 'https://testnet.binance.vision/api/v3'
-                    exch.urls['api']['private'] = 'https://testnet.binance.vision/api/v3'
-                    exch.urls['api']['fapiPublic'] = 'https://testnet.binancefuture.com/fapi/v1'
-                    exch.urls['api']['fapiPrivate'] = 'https://testnet.binancefuture.com/fapi/v1'
+                    _apply_testnet_urls(exch)
                 except Exception:
                     pass
 
@@ -364,7 +431,7 @@ class BinanceConnector:
             try:
                 balance = exch.fetch_balance()
             except Exception as e:
-                log.debug(f"fetch_balance failed (static): {e}")
+                log.debug("fetch_balance failed (static): %s", e)
                 return None
 
             total_usdc = 0.0
@@ -423,14 +490,15 @@ class BinanceConnector:
 
             return total_usdc
         except Exception as e:
-            log.debug(f"fetch_balance_snapshot_static error: {e}")
+            log.debug("fetch_balance_snapshot_static error: %s", e)
             return None
     def place_order(self, symbol, side, amount, price):
         if not self.exchange:
             return None
         params = {}
         try:
-            order = self.exchange.create_order(symbol, 'limit', side, amount, price, params)
+            with tracer.span('order_send', symbol, side=side, price=price):
+                order = self.exchange.create_order(symbol, 'limit', side, amount, price, params)
             log.trade(symbol, side, price, amount)
             return order
         except ccxt.InsufficientFunds as e:
@@ -479,6 +547,27 @@ class BinanceConnector:
             self._handle_api_error(e, f"cancel {order_id}")
             return None
 
+    def edit_order(self, order_id, symbol, side, amount, price):
+        """Sustituye una orden límite por otra en una sola petición (cancel-replace de Binance).
+        Si el exchange no tiene editOrder, cancela y crea."""
+        if not self.exchange:
+            return None
+        if not getattr(self.exchange, 'has', {}).get('editOrder'):
+            if self.cancel_order(order_id, symbol) is None:
+                return None
+            return self.place_order(symbol, side, amount, price)
+        try:
+            with tracer.span('order_send', symbol, side=side, price=price):
+                order = self.exchange.edit_order(order_id, symbol, 'limit', side, amount, price)
+            log.trade(symbol, side, price, amount)
+            return order
+        except ccxt.InsufficientFunds as e:
+            log.error(f"FONDOS INSUFICIENTES: {e}")
+            return None
+        except Exception as e:
+            self._handle_api_error(e, f"cancel-replace {order_id}")
+            return None
+
     def cancel_all_orders(self, symbol):
         if not self.exchange:
             return None
@@ -512,6 +601,26 @@ class BinanceConnector:
             self._handle_api_error(e, f"candles {symbol}")
             return []
 
+    def fetch_candles_range(self, symbol, timeframe='1m', since=None, until=None, page=1000):
+        """Velas de [since, until) en ms, paginando (para backtests y el optimizador)."""
+        if not self.exchange:
+            return []
+        step = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        until = until or self.exchange.milliseconds()
+        cursor = since if since is not None else until - step * page
+        candles = []
+        try:
+            while cursor < until:
+                batch = self.exchange.fetch_ohlcv(symbol, timeframe, since=cursor, limit=page)
+                batch = [c for c in batch if c[0] >= cursor and c[0] < until]
+                if not batch:
+                    break
+                candles.extend(batch)
+                cursor = batch[-1][0] + step
+        except Exception as e:
+            self._handle_api_error(e, f"candles {symbol}")
+        return candles
+
     def fetch_my_trades(self, symbol, limit=20):
         if not self.exchange:
             return []
@@ -519,4 +628,8 @@ class BinanceConnector:
             return self.exchange.fetch_my_trades(symbol, limit=limit)
         except Exception as e:
             self._handle_api_error(e, f"trades {symbol}")
-            return []
\ No newline at end of file
+            return []
+
+
+# Latencia por método y símbolo de todas las llamadas públicas del conector
+instrument_methods(BinanceConnector, EXCHANGE_CALL_SECONDS, symbol_arg='symbol')
@@ -0,0 +1,461 @@
+# Archivo: core/indicators.py
+"""Indicadores técnicos sobre arrays de NumPy: RSI, ATR, Bollinger, EMA/SMA, volatilidad realizada y ADX.
+
+Todas las funciones aceptan una serie (1-D, eje = velas) o un lote de series del mismo largo (2-D,
+una fila por símbolo/timeframe) y devuelven arrays alineados con la entrada, con NaN mientras el
+indicador no tiene velas suficientes. `snapshot` agrupa velas de muchos pares y timeframes y calcula
+todo por lotes.
+
+- Ventanas (SMA, Bollinger, volatilidad): sumas acumuladas, sin bucles.
+- Recursivos (EMA, medias de Wilder de RSI/ATR/ADX): avanzan vela a vela pero sobre todas las filas
+  del lote a la vez.
+
+Las clases `Streaming*` actualizan en O(1) por vela con exactamente las mismas operaciones (mismo
+orden, misma semilla), así que dan los mismos valores que la versión por lotes sobre la misma serie.
+"""
+import math
+from collections import deque
+import numpy as np
+
+# Velas por año de cada timeframe (para anualizar la volatilidad)
+PERIODS_PER_YEAR = {
+    '1m': 525600, '3m': 175200, '5m': 105120, '15m': 35040, '30m': 17520,
+    '1h': 8760, '2h': 4380, '4h': 2190, '6h': 1460, '8h': 1095, '12h': 730,
+    '1d': 365, '3d': 365 / 3, '1w': 52,
+}
+
+
+# ----------------------------------------------------------------------
+# Utilidades
+# ----------------------------------------------------------------------
+def _batch(values):
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr.reshape(1, -1), True
+    if arr.ndim != 2:
+        raise ValueError("Se espera una serie (1-D) o un lote de series (2-D)")
+    return arr, False
+
+
+def _unbatch(arr, single):
+    return arr[0] if single else arr
+
+
+def ohlcv(candles):
+    """Velas [ts, o, h, l, c, v] (lista de ccxt o array) -> (open, high, low, close, volume)."""
+    data = np.asarray(candles, dtype=np.float64)
+    if data.ndim != 2 or data.shape[1] < 5:
+        raise ValueError("Se esperan velas [ts, open, high, low, close, volumen]")
+    volume = data[:, 5] if data.shape[1] > 5 else np.zeros(len(data))
+    return data[:, 1], data[:, 2], data[:, 3], data[:, 4], volume
+
+
+def _wilder_step(period):
+    def step(avg, value):
+        return (avg * (period - 1) + value) / period
+    return step
+
+
+def _ema_step(period):
+    alpha = 2.0 / (period + 1)
+    beta = 1.0 - alpha
+
+    def step(avg, value):
+        return alpha * value + beta * avg
+    return step
+
+
+def _recursive(x, period, kind):
+    """Media recursiva por filas (`kind`: 'wilder' o 'ema'), sembrada con la media simple de los
+    `period` primeros valores. Mismas operaciones que `_wilder_step`/`_ema_step` (streaming).
+    """
+    rows, n = x.shape
+    out = np.full((rows, n), np.nan)
+    if n < period:
+        return out
+    wilder = kind == 'wilder'
+    keep = period - 1
+    alpha = 2.0 / (period + 1)
+    beta = 1.0 - alpha
+    if rows == 1:
+        # Una sola serie: floats de Python en línea (más rápido que NumPy vela a vela)
+        values = x[0].tolist()
+        acc = 0.0
+        for v in values[:period]:
+            acc += v
+        avg = acc / period
+        result = [avg]
+        append = result.append
+        if wilder:
+            for v in values[period:]:
+                avg = (avg * keep + v) / period
+                append(avg)
+        else:
+            for v in values[period:]:
+                avg = alpha * v + beta * avg
+                append(avg)
+        out[0, keep:] = result
+        return out
+    step = _wilder_step(period) if wilder else _ema_step(period)
+    cols = np.ascontiguousarray(x.T)
+    acc = np.zeros(rows)
+    for i in range(period):
+        acc = acc + cols[i]
+    avg = acc / period
+    result = np.empty((n - keep, rows))
+    result[0] = avg
+    for j in range(1, n - keep):
+        avg = step(avg, cols[keep + j])
+        result[j] = avg
+    out[:, keep:] = result.T
+    return out
+
+
+def _rolling_sum(x, period):
+    """Suma de las `period` últimas columnas (diferencia de sumas acumuladas)."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] < period:
+        return out
+    csum = np.cumsum(x, axis=1)
+    out[:, period - 1] = csum[:, period - 1]
+    out[:, period:] = csum[:, period:] - csum[:, :-period]
+    return out
+
+
+def _rolling_mean_std(x, period, ref):
+    """Media y desviación (poblacional) móviles; se centra en `ref` para no perder precisión."""
+    d = x - ref
+    mean = _rolling_sum(d, period) / period
+    var = _rolling_sum(d * d, period) / period - mean * mean
+    return mean + ref, np.sqrt(np.maximum(var, 0.0))
+
+
+def _true_range(high, low, close):
+    prev = close[:, :-1]
+    h, l = high[:, 1:], low[:, 1:]
+    tr = np.maximum(h - l, np.maximum(np.abs(h - prev), np.abs(l - prev)))
+    return np.concatenate((high[:, :1] - low[:, :1], tr), axis=1)
+
+
+# ----------------------------------------------------------------------
+# Indicadores (por lotes)
+# ----------------------------------------------------------------------
+def sma(values, period=20):
+    x, single = _batch(values)
+    return _unbatch(_rolling_sum(x, period) / period, single)
+
+
+def ema(values, period=20):
+    """EMA (alpha = 2/(period+1)) sembrada con la SMA de las `period` primeras velas."""
+    x, single = _batch(values)
+    return _unbatch(_recursive(x, period, 'ema'), single)
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - (100 / (1 + avg_gain / avg_loss))
+    return np.where(avg_loss == 0, 100.0, values)
+
+
+def rsi(close, period=14):
+    """RSI de Wilder (medias sembradas con la media simple de las `period` primeras variaciones)."""
+    c, single = _batch(close)
+    out = np.full(c.shape, np.nan)
+    if c.shape[1] > period:
+        delta = np.diff(c, axis=1)
+        gains = np.where(delta > 0, delta, 0.0)
+        losses = np.where(delta < 0, -delta, 0.0)
+        avg_gain = _recursive(gains, period, 'wilder')
+        avg_loss = _recursive(losses, period, 'wilder')
+        out[:, 1:] = _rsi_from_averages(avg_gain, avg_loss)
+    return _unbatch(out, single)
+
+
+def atr(high, low, close, period=14):
+    """Average True Range de Wilder (la primera vela usa high - low)."""
+    h, single = _batch(high)
+    l, _ = _batch(low)
+    c, _ = _batch(close)
+    return _unbatch(_recursive(_true_range(h, l, c), period, 'wilder'), single)
+
+
+def bollinger(close, period=20, width=2.0):
+    """Bandas de Bollinger -> (media, superior, inferior)."""
+    c, single = _batch(close)
+    mid, std = _rolling_mean_std(c, period, c[:, :1])
+    return tuple(_unbatch(a, single) for a in (mid, mid + width * std, mid - width * std))
+
+
+def realized_volatility(close, period=30, periods_per_year=None):
+    """Desviación de los retornos logarítmicos de las `period` últimas velas.
+    Con `periods_per_year` (ver PERIODS_PER_YEAR) se anualiza.
+    """
+    c, single = _batch(close)
+    out = np.full(c.shape, np.nan)
+    if c.shape[1] > period:
+        returns = np.diff(np.log(c), axis=1)
+        _, std = _rolling_mean_std(returns, period, 0.0)
+        out[:, 1:] = std
+        if periods_per_year:
+            out *= math.sqrt(periods_per_year)
+    return _unbatch(out, single)
+
+
+def _directional_index(plus, minus, tr):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * plus / tr
+        minus_di = 100 * minus / tr
+        total = plus_di + minus_di
+        dx = np.where(total == 0, 0.0, 100 * np.abs(plus_di - minus_di) / total)
+    plus_di = np.where(tr == 0, 0.0, plus_di)
+    minus_di = np.where(tr == 0, 0.0, minus_di)
+    dx = np.where(tr == 0, 0.0, dx)
+    return plus_di, minus_di, dx
+
+
+def adx(high, low, close, period=14):
+    """ADX de Wilder -> (adx, +DI, -DI)."""
+    h, single = _batch(high)
+    l, _ = _batch(low)
+    c, _ = _batch(close)
+    shape = c.shape
+    adx_out, plus_out, minus_out = (np.full(shape, np.nan) for _ in range(3))
+    if shape[1] > period:
+        up = np.diff(h, axis=1)
+        down = -np.diff(l, axis=1)
+        plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+        tr = _true_range(h, l, c)[:, 1:]
+        s_plus, s_minus, s_tr = (_recursive(a, period, 'wilder') for a in (plus_dm, minus_dm, tr))
+        plus_di, minus_di, dx = _directional_index(s_plus[:, period - 1:], s_minus[:, period - 1:],
+                                                   s_tr[:, period - 1:])
+        plus_out[:, period:] = plus_di
+        minus_out[:, period:] = minus_di
+        adx_out[:, period:] = _recursive(dx, period, 'wilder')
+    return tuple(_unbatch(a, single) for a in (adx_out, plus_out, minus_out))
+
+
+def last_rsi(candles, period=14):
+    """RSI de la última vela de una lista de velas; 50.0 (neutro) si no hay velas suficientes."""
+    if candles is None or len(candles) < period + 1:
+        return 50.0
+    close = np.fromiter((c[4] for c in candles), dtype=np.float64, count=len(candles))
+    return round(float(rsi(close, period)[-1]), 2)
+
+
+def _last(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def snapshot(candles_by_key, period=14, bb_period=20, vol_period=30):
+    """Último valor de cada indicador para muchas series de velas a la vez.
+
+    `candles_by_key`: {clave: velas}, p. ej. {('BTC/USDC', '1h'): [...], ('ETH/USDC', '4h'): [...]}.
+    Las series del mismo largo se apilan en un lote 2-D y se calculan juntas.
+    """
+    groups = {}
+    for key, candles in candles_by_key.items():
+        if candles is not None and len(candles):
+            groups.setdefault(len(candles), []).append(key)
+    result = {}
+    for keys in groups.values():
+        _, h, l, c, _ = (np.stack(a) for a in zip(*(ohlcv(candles_by_key[k]) for k in keys)))
+        close = c[:, -1]
+        values = {
+            'close': close,
+            'rsi': rsi(c, period)[:, -1],
+            'atr': atr(h, l, c, period)[:, -1],
+            'ema': ema(c, bb_period)[:, -1],
+            'volatility': realized_volatility(c, vol_period)[:, -1],
+            'adx': adx(h, l, c, period)[0][:, -1],
+        }
+        mid, upper, lower = (band[:, -1] for band in bollinger(c, bb_period))
+        values.update(sma=mid, bb_upper=upper, bb_lower=lower)
+        values['atr_pct'] = values['atr'] / close * 100
+        for i, key in enumerate(keys):
+            result[key] = {name: _last(arr[i]) for name, arr in values.items()}
+    return result
+
+
+# ----------------------------------------------------------------------
+# Versiones en streaming (O(1) por vela, mismos valores que por lotes)
+# ----------------------------------------------------------------------
+class _RecursiveAverage:
+    def __init__(self, period, step):
+        self.period = period
+        self._step = step
+        self._acc = 0.0
+        self._count = 0
+        self.value = None
+
+    def update(self, x):
+        if self._count < self.period:
+            self._acc += x
+            self._count += 1
+            if self._count == self.period:
+                self.value = self._acc / self.period
+        else:
+            self.value = self._step(self.value, x)
+        return self.value
+
+
+class _RollingSum:
+    """Suma de ventana como diferencia de sumas acumuladas (igual que `_rolling_sum`)."""
+
+    def __init__(self, period):
+        self.period = period
+        self._total = 0.0
+        self._history = deque(maxlen=period + 1)
+
+    def update(self, x):
+        self._total += x
+        self._history.append(self._total)
+        if len(self._history) < self.period:
+            return None
+        if len(self._history) == self.period:
+            return self._total
+        return self._total - self._history[0]
+
+
+class _RollingMeanStd:
+    def __init__(self, period, ref=None):
+        self.period = period
+        self.ref = ref
+        self._sum = _RollingSum(period)
+        self._sq = _RollingSum(period)
+
+    def update(self, x):
+        if self.ref is None:
+            self.ref = x
+        d = x - self.ref
+        s, sq = self._sum.update(d), self._sq.update(d * d)
+        if s is None:
+            return None, None
+        mean = s / self.period
+        var = sq / self.period - mean * mean
+        return mean + self.ref, math.sqrt(max(var, 0.0))
+
+
+class StreamingSMA:
+    def __init__(self, period=20):
+        self.period = period
+        self._sum = _RollingSum(period)
+        self.value = None
+
+    def update(self, x):
+        s = self._sum.update(float(x))
+        self.value = None if s is None else s / self.period
+        return self.value
+
+
+class StreamingEMA(_RecursiveAverage):
+    def __init__(self, period=20):
+        super().__init__(period, _ema_step(period))
+
+    def update(self, x):
+        return super().update(float(x))
+
+
+class StreamingRSI:
+    def __init__(self, period=14):
+        self.period = period
+        self._gain = _RecursiveAverage(period, _wilder_step(period))
+        self._loss = _RecursiveAverage(period, _wilder_step(period))
+        self._prev = None
+        self.value = None
+
+    def update(self, close):
+        close = float(close)
+        if self._prev is not None:
+            delta = close - self._prev
+            avg_gain = self._gain.update(delta if delta > 0 else 0.0)
+            avg_loss = self._loss.update(-delta if delta < 0 else 0.0)
+            if avg_loss is not None:
+                self.value = 100.0 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss))
+        self._prev = close
+        return self.value
+
+
+class StreamingATR:
+    def __init__(self, period=14):
+        self.period = period
+        self._avg = _RecursiveAverage(period, _wilder_step(period))
+        self._prev_close = None
+        self.value = None
+
+    def update(self, high, low, close):
+        high, low = float(high), float(low)
+        if self._prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, max(abs(high - self._prev_close), abs(low - self._prev_close)))
+        self._prev_close = float(close)
+        self.value = self._avg.update(tr)
+        return self.value
+
+
+class StreamingBollinger:
+    def __init__(self, period=20, width=2.0):
+        self.period = period
+        self.width = width
+        self._stats = _RollingMeanStd(period)
+        self.value = None
+
+    def update(self, close):
+        mid, std = self._stats.update(float(close))
+        self.value = None if mid is None else (mid, mid + self.width * std, mid - self.width * std)
+        return self.value
+
+
+class StreamingRealizedVolatility:
+    def __init__(self, period=30, periods_per_year=None):
+        self.period = period
+        self._scale = math.sqrt(periods_per_year) if periods_per_year else None
+        self._stats = _RollingMeanStd(period, ref=0.0)
+        self._prev_log = None
+        self.value = None
+
+    def update(self, close):
+        current = float(np.log(float(close)))
+        if self._prev_log is not None:
+            _, std = self._stats.update(current - self._prev_log)
+            if std is not None:
+                self.value = std * self._scale if self._scale else std
+        self._prev_log = current
+        return self.value
+
+
+class StreamingADX:
+    def __init__(self, period=14):
+        self.period = period
+        step = _wilder_step(period)
+        self._plus = _RecursiveAverage(period, step)
+        self._minus = _RecursiveAverage(period, step)
+        self._tr = _RecursiveAverage(period, step)
+        self._adx = _RecursiveAverage(period, step)
+        self._prev = None
+        self.plus_di = None
+        self.minus_di = None
+        self.value = None
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        if self._prev is not None:
+            prev_high, prev_low, prev_close = self._prev
+            up, down = high - prev_high, prev_low - low
+            tr = max(high - low, max(abs(high - prev_close), abs(low - prev_close)))
+            s_plus = self._plus.update(up if up > down and up > 0 else 0.0)
+            s_minus = self._minus.update(down if down > up and down > 0 else 0.0)
+            s_tr = self._tr.update(tr)
+            if s_tr is not None:
+                if s_tr == 0:
+                    self.plus_di = self.minus_di = dx = 0.0
+                else:
+                    self.plus_di = 100 * s_plus / s_tr
+                    self.minus_di = 100 * s_minus / s_tr
+                    total = self.plus_di + self.minus_di
+                    dx = 0.0 if total == 0 else 100 * abs(self.plus_di - self.minus_di) / total
+                self.value = self._adx.update(dx)
+        self._prev = (high, low, close)
+        return self.value
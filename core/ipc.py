@@ -0,0 +1,367 @@
+# Archivo: gridbot_binance/core/ipc.py
+"""Primitivas de comunicación entre el proceso del motor y los procesos web.
+
+- `SnapshotWriter` / `SnapshotReader`: región mmap (fichero compartido) protegida con un seqlock.
+  El motor publica el estado como JSON; los lectores copian la región sin bloquear nunca al
+  escritor y reintentan si la secuencia ha cambiado mientras leían.
+- `CommandServer` / `CommandClient`: canal de órdenes sobre socket Unix. Por TCP (`tcp://host:puerto`,
+  obligatorio en plataformas sin AF_UNIX) hace falta un secreto compartido (ENGINE_SECRET): cada
+  conexión se autentica respondiendo con un HMAC al reto que envía el servidor.
+  Protocolo de una línea JSON por petición/respuesta.
+"""
+import hashlib
+import hmac
+import json
+import mmap
+import os
+import select
+import socket
+import socketserver
+import struct
+import threading
+import time
+from utils.logger import log
+
+# Cabecera: secuencia (u64), longitud del payload (u32), instante de publicación (f64)
+_HEADER = struct.Struct('<QId')
+_LENGTH_STAMP = struct.Struct('<Id')  # campos de la cabecera tras la secuencia (offset 8)
+_HEADER_SIZE = 32
+DEFAULT_SNAPSHOT_SIZE = 4 * 1024 * 1024
+
+
+class EngineUnavailable(ConnectionError):
+    """No se puede contactar con el proceso del motor."""
+
+
+class EngineError(Exception):
+    """El motor ha recibido la orden pero ha fallado al ejecutarla."""
+
+
+# --- SNAPSHOT COMPARTIDO (SEQLOCK) ---
+
+class SnapshotWriter:
+    def __init__(self, path, size=DEFAULT_SNAPSHOT_SIZE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = max(size, _HEADER_SIZE + 1024)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._mm = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+        seq, _, _ = _HEADER.unpack_from(self._mm, 0)
+        # Si el proceso anterior murió a mitad de escritura la secuencia queda impar
+        self._seq = seq + (seq & 1)
+        self._lock = threading.Lock()
+
+    def _grow(self, needed):
+        new_size = len(self._mm)
+        while new_size < needed:
+            new_size *= 2
+        os.ftruncate(self._fd, new_size)
+        self._mm.resize(new_size)
+        log.debug(f"[ipc] Snapshot ampliado a {new_size} bytes")
+
+    def publish(self, payload):
+        """Publica `payload` (bytes). Los lectores nunca ven una escritura a medias."""
+        with self._lock:
+            if _HEADER_SIZE + len(payload) > len(self._mm):
+                self._grow(_HEADER_SIZE + len(payload))
+            self._seq += 1  # impar: escritura en curso
+            struct.pack_into('<Q', self._mm, 0, self._seq)
+            self._mm[_HEADER_SIZE:_HEADER_SIZE + len(payload)] = payload
+            # Longitud e instante se escriben aún con la secuencia impar; la par va sola y la última
+            _LENGTH_STAMP.pack_into(self._mm, 8, len(payload), time.time())
+            self._seq += 1  # par: snapshot consistente
+            struct.pack_into('<Q', self._mm, 0, self._seq)
+
+    def close(self):
+        try:
+            self._mm.close()
+        finally:
+            os.close(self._fd)
+
+
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self._mm = None
+        self._fd = None
+        self._lock = threading.Lock()
+        self._cached_seq = None
+        self._cached = None
+        self._published_at = 0.0
+
+    def _open(self):
+        self._close()
+        if not os.path.exists(self.path):
+            return False
+        self._fd = os.open(self.path, os.O_RDONLY)
+        size = os.fstat(self._fd).st_size
+        if size < _HEADER_SIZE:
+            self._close()
+            return False
+        self._mm = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        return True
+
+    def _close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def read_raw(self, retries=100):
+        """Devuelve (seq, payload, published_at) consistentes o None si no hay snapshot."""
+        if self._mm is None and not self._open():
+            return None
+        for _ in range(retries):
+            seq1, length, published_at = _HEADER.unpack_from(self._mm, 0)
+            if seq1 == 0:
+                return None
+            if seq1 & 1:
+                time.sleep(0)
+                continue
+            if _HEADER_SIZE + length > len(self._mm):
+                # El escritor ha ampliado el fichero: volver a mapearlo
+                if not self._open():
+                    return None
+                continue
+            payload = self._mm[_HEADER_SIZE:_HEADER_SIZE + length]
+            seq2 = struct.unpack_from('<Q', self._mm, 0)[0]
+            if seq1 == seq2:
+                return seq1, payload, published_at
+        return None
+
+    def read(self):
+        """Último snapshot decodificado (se cachea mientras la secuencia no cambie) o None."""
+        with self._lock:
+            raw = self.read_raw()
+            if raw is None:
+                return self._cached
+            seq, payload, published_at = raw
+            if seq != self._cached_seq:
+                try:
+                    self._cached = json.loads(payload)
+                except ValueError as e:
+                    # Payload corrupto o cortado: se sigue sirviendo el último snapshot bueno
+                    log.debug("[ipc] Snapshot %s ilegible: %s", seq, e)
+                    return self._cached
+                self._cached_seq = seq
+            self._published_at = published_at
+            return self._cached
+
+    @property
+    def published_at(self):
+        return self._published_at
+
+    def age(self):
+        """Segundos desde la última publicación del motor (inf si nunca ha publicado)."""
+        if not self._published_at:
+            return float('inf')
+        return time.time() - self._published_at
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+# --- CANAL DE ÓRDENES ---
+
+def _parse_address(address):
+    """'tcp://host:port' -> (AF_INET, (host, port)); cualquier otra cosa es la ruta del socket Unix."""
+    if address.startswith('tcp://'):
+        host, port = address[len('tcp://'):].rsplit(':', 1)
+        return socket.AF_INET, (host, int(port))
+    if not hasattr(socket, 'AF_UNIX'):
+        raise ValueError(f"Sin soporte de sockets Unix para '{address}': "
+                         "configura una dirección tcp://host:puerto y ENGINE_SECRET")
+    return socket.AF_UNIX, address
+
+
+def _resolve_secret(family, secret, address):
+    """Secreto del canal (por defecto ENGINE_SECRET). Por TCP es obligatorio: sin él cualquier
+    proceso que llegue al puerto podría dar órdenes al motor."""
+    secret = secret if secret is not None else os.getenv('ENGINE_SECRET')
+    if family != socket.AF_UNIX and not secret:
+        raise ValueError(f"El canal TCP {address} necesita un secreto compartido (ENGINE_SECRET)")
+    return secret.encode() if secret else None
+
+
+def _sign(secret, nonce):
+    return hmac.new(secret, nonce.encode(), hashlib.sha256).hexdigest()
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def _authenticate(self):
+        """Reto-respuesta: se envía un nonce y el cliente debe devolver su HMAC con el secreto."""
+        nonce = os.urandom(16).hex()
+        self.wfile.write(json.dumps({"nonce": nonce}).encode() + b'\n')
+        self.wfile.flush()
+        try:
+            answer = json.loads(self.rfile.readline() or b'{}').get('auth', '')
+        except (ValueError, AttributeError):
+            answer = ''
+        ok = isinstance(answer, str) and hmac.compare_digest(answer, _sign(self.server.secret, nonce))
+        self.wfile.write(json.dumps({"ok": ok}).encode() + b'\n')
+        self.wfile.flush()
+        if not ok:
+            log.warning(f"🔒 Conexión rechazada en el canal de órdenes ({self.client_address}): autenticación fallida")
+        return ok
+
+    def handle(self):
+        if self.server.secret and not self._authenticate():
+            return
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = self.server.dispatch(request)
+                reply = {"ok": True, "result": result}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            try:
+                data = json.dumps(reply, default=str)
+            except (TypeError, ValueError) as e:
+                data = json.dumps({"ok": False, "error": f"Respuesta no serializable: {e}"})
+            self.wfile.write(data.encode() + b'\n')
+            self.wfile.flush()
+
+
+class CommandServer:
+    def __init__(self, address, dispatch, secret=None):
+        self.address = address
+        self.family, self.bind_address = _parse_address(address)
+        self.secret = _resolve_secret(self.family, secret, address)
+        self._dispatch = dispatch
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(self.bind_address):
+                os.unlink(self.bind_address)
+            os.makedirs(os.path.dirname(self.bind_address) or '.', exist_ok=True)
+            server_cls = socketserver.ThreadingUnixStreamServer
+        else:
+            server_cls = socketserver.ThreadingTCPServer
+        server_cls.daemon_threads = True
+        server_cls.allow_reuse_address = True
+        self._server = server_cls(self.bind_address, _CommandHandler)
+        self._server.dispatch = self._dispatch
+        self._server.secret = self.secret
+        if self.family == socket.AF_UNIX:
+            os.chmod(self.bind_address, 0o600)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="engine-ipc")
+        self._thread.start()
+        log.info(f"🔌 Canal de órdenes del motor escuchando en {self.address}")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            if self.family == socket.AF_UNIX and os.path.exists(self.bind_address):
+                os.unlink(self.bind_address)
+
+
+class CommandClient:
+    """Cliente del canal de órdenes: una conexión persistente por hilo."""
+
+    def __init__(self, address, timeout=30, secret=None):
+        self.address = address
+        self.family, self.connect_address = _parse_address(address)
+        self.secret = _resolve_secret(self.family, secret, address)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.connect_address)
+            except OSError as e:
+                sock.close()
+                raise EngineUnavailable(f"Motor no disponible en {self.address}: {e}")
+            conn = (sock, sock.makefile('rb'))
+            if self.secret:
+                self._handshake(*conn)
+            self._local.conn = conn
+        return conn
+
+    def _handshake(self, sock, reader):
+        try:
+            nonce = json.loads(reader.readline() or b'{}').get('nonce')
+            if not nonce:
+                raise ConnectionError("el motor no ha enviado el reto de autenticación")
+            sock.sendall(json.dumps({"auth": _sign(self.secret, nonce)}).encode() + b'\n')
+            accepted = json.loads(reader.readline() or b'{}').get('ok')
+        except (OSError, ValueError) as e:
+            reader.close()
+            sock.close()
+            raise EngineUnavailable(f"Motor no disponible en {self.address}: {e}")
+        if not accepted:
+            reader.close()
+            sock.close()
+            raise EngineUnavailable(f"Autenticación rechazada por el motor en {self.address} (ENGINE_SECRET)")
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _closed_by_peer(sock):
+        """True si el motor ha cerrado la conexión persistente (p.ej. se ha reiniciado).
+        Se comprueba antes de escribir, cuando aún es seguro reconectar y enviar."""
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            return bool(readable) and not sock.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def request(self, op, path, *args, **kwargs):
+        message = json.dumps({"op": op, "path": path, "args": args, "kwargs": kwargs}, default=str).encode() + b'\n'
+        # Sólo se reintenta si falla el envío: una orden ya escrita puede estar ejecutándose en el
+        # motor y reenviarla podría duplicarla (p.ej. una venta a mercado)
+        for attempt in range(2):
+            sock, reader = self._connection()
+            if self._closed_by_peer(sock):
+                self._drop()
+                sock, reader = self._connection()
+            try:
+                sock.sendall(message)
+                break
+            except OSError as e:
+                self._drop()
+                if attempt == 1:
+                    raise EngineUnavailable(f"Motor no disponible en {self.address}: {e}")
+        try:
+            line = reader.readline()
+        except socket.timeout as e:
+            self._drop()
+            raise EngineUnavailable(f"Timeout esperando al motor ({self.timeout}s): {e}")
+        except OSError as e:
+            self._drop()
+            raise EngineUnavailable(f"Conexión con el motor perdida tras enviar '{path}': {e}")
+        if not line:
+            self._drop()
+            raise EngineUnavailable(f"El motor cerró la conexión sin responder a '{path}' (no se reenvía)")
+        reply = json.loads(line)
+        if not reply.get('ok'):
+            raise EngineError(reply.get('error', 'Error desconocido en el motor'))
+        return reply.get('result')
+
+    def call(self, path, *args, **kwargs):
+        return self.request('call', path, *args, **kwargs)
+
+    def get(self, path):
+        return self.request('get', path)
+
+    def set(self, path, value):
+        return self.request('set', path, value)
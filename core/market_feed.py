@@ -0,0 +1,651 @@
+# Archivo: core/market_feed.py
+"""Datos de mercado para pruebas de carga: grabación, reproducción y generación sintética.
+
+- `RecordingExchange` envuelve un exchange ccxt (el que usa BinanceConnector) y graba lo que
+  recibe: tickers, velas, órdenes y ejecuciones, con el instante de recepción. El resultado de
+  cada llamada se devuelve intacto.
+- `MarketReplayer` reproduce un registro sobre un `SimulatedExchange` a 1×, 10× o sin pausas
+  (`speed=None`): los tickers mueven el precio del simulador y éste casa las órdenes del bot.
+  Las órdenes y ejecuciones grabadas no se reinyectan (las del bot las genera el simulador);
+  se entregan a `on_event` para comparar.
+- `SyntheticMarket` genera precios por símbolo con un GBM con saltos (Merton), vectorizado con
+  NumPy para decenas de pares, y produce los mismos eventos que un registro.
+
+Formato del registro (binario, sólo se añade al final; little-endian):
+    cabecera 'GBML' + versión (1 byte)
+    registro: tipo (u8), id de símbolo (u16), instante ms (i64) + carga según el tipo
+      SYMBOL  longitud (u16) + nombre utf-8        (declara el id antes de su primer uso)
+      TICKER  last, bid, ask, volumen (f64; NaN = sin dato)
+      CANDLE  timeframe (u8), ts, o, h, l, c, v
+      ORDER   lado, tipo, estado (u8), precio, cantidad, ejecutado (f64), id (u8 + bytes)
+      FILL    lado (u8), ts del exchange (i64), precio, cantidad, comisión (f64), id orden, id trade
+Un registro truncado al final (corte a mitad de escritura) se ignora al leer.
+"""
+import atexit
+import math
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from core.simulator import TIMEFRAME_SECONDS
+from utils.logger import log
+
+MAGIC = b'GBML'
+VERSION = 1
+
+SYMBOL, TICKER, CANDLE, ORDER, FILL = range(5)
+KINDS = ('symbol', 'ticker', 'candle', 'order', 'fill')
+
+TIMEFRAMES = tuple(TIMEFRAME_SECONDS)
+SIDES = ('buy', 'sell')
+ORDER_TYPES = ('limit', 'market')
+ORDER_STATUSES = ('open', 'closed', 'canceled', 'expired', 'rejected')
+
+_HEADER = struct.Struct('<BHq')
+_LENGTH = struct.Struct('<H')
+_TICKER = struct.Struct('<dddd')
+_CANDLE = struct.Struct('<Bqddddd')
+_ORDER = struct.Struct('<BBBddd')
+_FILL = struct.Struct('<Bqddd')
+
+NAN = float('nan')
+
+# kind: 'ticker' | 'candle' | 'order' | 'fill'; data: dict con los campos del tipo
+MarketEvent = namedtuple('MarketEvent', 'ts kind symbol data')
+
+
+def _num(value):
+    return NAN if value is None else float(value)
+
+
+def _opt(value):
+    return None if math.isnan(value) else value
+
+
+def _index(values, value):
+    # 255 = valor desconocido (se lee como None)
+    return values.index(value) if value in values else 255
+
+
+def _text(value):
+    raw = str(value if value is not None else '').encode('utf-8')[:255]
+    return bytes((len(raw),)) + raw
+
+
+class MarketLogWriter:
+    """Escritor del registro binario. Si el fichero ya existe se continúa (los ids de símbolo se
+    recuperan de él). Seguro entre hilos."""
+
+    def __init__(self, path, flush_every=256):
+        self.path = path
+        self.flush_every = flush_every
+        self._symbols = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Se continúa tras el último registro completo (descarta una escritura cortada)
+            self._symbols, end = _scan(path)
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC + bytes((VERSION,)))
+
+    def _symbol_id(self, symbol):
+        symbol_id = self._symbols.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self._symbols)
+            self._symbols[symbol] = symbol_id
+            raw = symbol.encode('utf-8')
+            self._file.write(_HEADER.pack(SYMBOL, symbol_id, 0) + _LENGTH.pack(len(raw)) + raw)
+        return symbol_id
+
+    def _write(self, kind, ts, symbol, payload):
+        with self._lock:
+            self._file.write(_HEADER.pack(kind, self._symbol_id(symbol), int(ts)) + payload)
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self._file.flush()
+                self._pending = 0
+
+    def ticker(self, ts, symbol, last, bid=None, ask=None, volume=None):
+        self._write(TICKER, ts, symbol, _TICKER.pack(_num(last), _num(bid), _num(ask), _num(volume)))
+
+    def candle(self, ts, symbol, timeframe, candle):
+        o, h, l, c = (float(x) for x in candle[1:5])
+        volume = candle[5] if len(candle) > 5 else None
+        self._write(CANDLE, ts, symbol, _CANDLE.pack(_index(TIMEFRAMES, timeframe), int(candle[0]),
+                                                     o, h, l, c, _num(volume)))
+
+    def order(self, ts, order):
+        payload = _ORDER.pack(_index(SIDES, order.get('side')), _index(ORDER_TYPES, order.get('type')),
+                              _index(ORDER_STATUSES, order.get('status')), _num(order.get('price')),
+                              _num(order.get('amount')), _num(order.get('filled')))
+        self._write(ORDER, ts, order['symbol'], payload + _text(order.get('id')))
+
+    def fill(self, ts, trade):
+        fee = (trade.get('fee') or {}).get('cost')
+        payload = _FILL.pack(_index(SIDES, trade.get('side')), int(trade.get('timestamp') or ts),
+                             _num(trade.get('price')), _num(trade.get('amount')), _num(fee))
+        self._write(FILL, ts, trade['symbol'], payload + _text(trade.get('order')) + _text(trade.get('id')))
+
+    def write(self, event):
+        """Escribe un MarketEvent (de `read_log` o `SyntheticMarket`)."""
+        data = event.data
+        if event.kind == 'ticker':
+            self.ticker(event.ts, event.symbol, data['last'], data.get('bid'), data.get('ask'), data.get('volume'))
+        elif event.kind == 'candle':
+            self.candle(event.ts, event.symbol, data['timeframe'], data['candle'])
+        elif event.kind == 'order':
+            self.order(event.ts, dict(data, symbol=event.symbol))
+        elif event.kind == 'fill':
+            self.fill(event.ts, {'symbol': event.symbol, 'side': data['side'], 'timestamp': data['timestamp'],
+                                 'price': data['price'], 'amount': data['amount'], 'fee': {'cost': data['fee']},
+                                 'order': data['order'], 'id': data['id']})
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Un único escritor por fichero en el proceso: varios escritores sobre la misma ruta (reconexiones,
+# runtimes de varias cuentas) tendrían cada uno su offset y su tabla de símbolos y se pisarían.
+_writers = {}   # ruta absoluta -> [MarketLogWriter, referencias]
+_writers_lock = threading.Lock()
+
+
+def shared_writer(path):
+    """Escritor compartido de `path` (se cierra al liberar la última referencia, `release_writer`)."""
+    key = os.path.abspath(path)
+    with _writers_lock:
+        entry = _writers.get(key)
+        if entry is None or entry[0].closed:
+            entry = _writers[key] = [MarketLogWriter(path), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_writer(writer):
+    with _writers_lock:
+        key = os.path.abspath(writer.path)
+        entry = _writers.get(key)
+        if entry is not None and entry[0] is writer:
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del _writers[key]
+    writer.close()
+
+
+@atexit.register
+def _close_writers():
+    with _writers_lock:
+        writers = [entry[0] for entry in _writers.values()]
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) < size:
+        raise EOFError
+    return data
+
+
+def _read_text(f):
+    size = _read_exact(f, 1)[0]
+    return _read_exact(f, size).decode('utf-8')
+
+
+def _records(path):
+    """(tipo, símbolo, ts, campos, fin) de cada registro completo, en orden (`fin`: offset tras él)."""
+    symbols = {}
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC) + 1)
+        if head[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} no es un registro de mercado")
+        if head[len(MAGIC)] != VERSION:
+            raise ValueError(f"Versión de registro no soportada: {head[len(MAGIC)]}")
+        while True:
+            try:
+                kind, symbol_id, ts = _HEADER.unpack(_read_exact(f, _HEADER.size))
+                if kind == SYMBOL:
+                    size, = _LENGTH.unpack(_read_exact(f, _LENGTH.size))
+                    symbols[symbol_id] = _read_exact(f, size).decode('utf-8')
+                    fields = (symbol_id,)
+                elif kind == TICKER:
+                    fields = _TICKER.unpack(_read_exact(f, _TICKER.size))
+                elif kind == CANDLE:
+                    fields = _CANDLE.unpack(_read_exact(f, _CANDLE.size))
+                elif kind == ORDER:
+                    fields = _ORDER.unpack(_read_exact(f, _ORDER.size)) + (_read_text(f),)
+                elif kind == FILL:
+                    fields = _FILL.unpack(_read_exact(f, _FILL.size)) + (_read_text(f), _read_text(f))
+                else:
+                    raise ValueError(f"Tipo de registro desconocido: {kind}")
+            except EOFError:
+                return
+            yield kind, symbols[symbol_id], ts, fields, f.tell()
+
+
+def _scan(path):
+    """Símbolos declarados ({nombre: id}) y longitud de la parte válida de un registro."""
+    symbols = {}
+    end = len(MAGIC) + 1
+    for kind, symbol, _, fields, end in _records(path):
+        if kind == SYMBOL:
+            symbols[symbol] = fields[0]
+    return symbols, end
+
+
+def _pick(values, index):
+    return values[index] if index < len(values) else None
+
+
+def read_log(path, kinds=None):
+    """Eventos (MarketEvent) de un registro, en el orden en que se grabaron."""
+    wanted = set(kinds) if kinds else None
+    for kind, symbol, ts, fields, _ in _records(path):
+        name = KINDS[kind]
+        if kind == SYMBOL or (wanted and name not in wanted):
+            continue
+        if kind == TICKER:
+            last, bid, ask, volume = fields
+            data = {'last': last, 'bid': _opt(bid), 'ask': _opt(ask), 'volume': _opt(volume)}
+        elif kind == CANDLE:
+            timeframe, candle_ts, o, h, l, c, v = fields
+            data = {'timeframe': _pick(TIMEFRAMES, timeframe), 'candle': [candle_ts, o, h, l, c, _opt(v) or 0.0]}
+        elif kind == ORDER:
+            side, type_, status, price, amount, filled, order_id = fields
+            data = {'id': order_id, 'side': _pick(SIDES, side), 'type': _pick(ORDER_TYPES, type_),
+                    'status': _pick(ORDER_STATUSES, status), 'price': _opt(price), 'amount': _opt(amount),
+                    'filled': _opt(filled)}
+        else:
+            side, exchange_ts, price, amount, fee, order_id, trade_id = fields
+            data = {'id': trade_id, 'order': order_id, 'side': _pick(SIDES, side), 'timestamp': exchange_ts,
+                    'price': price, 'amount': amount, 'fee': _opt(fee)}
+        yield MarketEvent(ts, name, symbol, data)
+
+
+def log_summary(path):
+    """Resumen de un registro: eventos por tipo, símbolos, rango temporal y tamaño."""
+    counts = dict.fromkeys(KINDS[1:], 0)
+    symbols = set()
+    first = last = None
+    for event in read_log(path):
+        counts[event.kind] += 1
+        symbols.add(event.symbol)
+        first = event.ts if first is None else min(first, event.ts)
+        last = event.ts if last is None else max(last, event.ts)
+    return {
+        "events": counts,
+        "symbols": sorted(symbols),
+        "start_ms": first,
+        "end_ms": last,
+        "duration_s": round((last - first) / 1000, 3) if first is not None else 0.0,
+        "bytes": os.path.getsize(path),
+    }
+
+
+# ----------------------------------------------------------------------
+# Grabación
+# ----------------------------------------------------------------------
+class RecordingExchange:
+    """Proxy de un exchange ccxt que graba en `writer` (MarketLogWriter o ruta) lo que recibe.
+
+    Para que el registro sea compacto sólo se graban las velas nuevas o que cambian, los cambios de
+    estado de las órdenes y cada ejecución una vez. El resto de atributos y métodos pasan tal cual.
+    """
+
+    _MAX_TRACKED = 10000
+
+    def __init__(self, exchange, writer, clock=None):
+        self._exchange = exchange
+        # Con una ruta se usa el escritor compartido del proceso para ese fichero
+        self._shared = isinstance(writer, str)
+        self.writer = shared_writer(writer) if self._shared else writer
+        self._released = False
+        self._clock = clock or (lambda: int(time.time() * 1000))
+        self._candles = {}  # (símbolo, timeframe) -> última vela grabada
+        self._orders = {}   # id -> (estado, ejecutado, precio, cantidad) grabado
+        self._fills = set()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self._exchange, name)
+
+    def _safe(self, record, *args):
+        # Grabar nunca debe romper la llamada al exchange
+        try:
+            record(*args)
+        except Exception as e:
+            log.debug("[market_feed] No se pudo grabar: %s", e)
+
+    def _record_ticker(self, symbol, ticker):
+        self.writer.ticker(self._clock(), symbol, ticker.get('last'), ticker.get('bid'), ticker.get('ask'),
+                           ticker.get('baseVolume'))
+
+    def _record_candles(self, symbol, timeframe, candles):
+        now = self._clock()
+        with self._lock:
+            last = self._candles.get((symbol, timeframe))
+            for candle in candles:
+                if last is not None and (candle[0] < last[0] or list(candle) == last):
+                    continue
+                self.writer.candle(now, symbol, timeframe, candle)
+                last = list(candle)
+            if last is not None:
+                self._candles[(symbol, timeframe)] = last
+
+    def _record_orders(self, orders):
+        now = self._clock()
+        with self._lock:
+            if len(self._orders) > self._MAX_TRACKED:
+                self._orders.clear()
+            for order in orders:
+                if not order or not order.get('id'):
+                    continue
+                state = (order.get('status'), order.get('filled'), order.get('price'), order.get('amount'))
+                if self._orders.get(order['id']) == state:
+                    continue
+                self._orders[order['id']] = state
+                self.writer.order(now, order)
+
+    def _record_fills(self, trades):
+        now = self._clock()
+        with self._lock:
+            if len(self._fills) > self._MAX_TRACKED:
+                self._fills.clear()
+            for trade in trades:
+                key = (trade.get('symbol'), trade.get('id'))
+                if key in self._fills:
+                    continue
+                self._fills.add(key)
+                self.writer.fill(now, trade)
+
+    # --- API ccxt grabada ---
+    def fetch_ticker(self, symbol, params=None):
+        ticker = self._exchange.fetch_ticker(symbol, params or {})
+        self._safe(self._record_ticker, symbol, ticker)
+        return ticker
+
+    def fetch_tickers(self, symbols=None, params=None):
+        tickers = self._exchange.fetch_tickers(symbols, params or {})
+        for symbol, ticker in (tickers or {}).items():
+            self._safe(self._record_ticker, symbol, ticker)
+        return tickers
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        candles = self._exchange.fetch_ohlcv(symbol, timeframe, since, limit, params or {})
+        self._safe(self._record_candles, symbol, timeframe, candles or [])
+        return candles
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        order = self._exchange.create_order(symbol, type, side, amount, price, params or {})
+        self._safe(self._record_orders, [dict(order, symbol=order.get('symbol') or symbol)])
+        return order
+
+    def edit_order(self, id, symbol, type, side, amount=None, price=None, params=None):
+        order = self._exchange.edit_order(id, symbol, type, side, amount, price, params or {})
+        self._safe(self._record_orders, [dict(order, symbol=order.get('symbol') or symbol)])
+        return order
+
+    def cancel_order(self, id, symbol=None, params=None):
+        order = self._exchange.cancel_order(id, symbol, params or {})
+        if isinstance(order, dict):
+            self._safe(self._record_orders, [dict(order, symbol=order.get('symbol') or symbol,
+                                                  status=order.get('status') or 'canceled')])
+        return order
+
+    def cancel_all_orders(self, symbol=None, params=None):
+        orders = self._exchange.cancel_all_orders(symbol, params or {})
+        if isinstance(orders, list):
+            self._safe(self._record_orders, [dict(o, symbol=o.get('symbol') or symbol,
+                                                  status=o.get('status') or 'canceled')
+                                             for o in orders if isinstance(o, dict)])
+        return orders
+
+    def fetch_order(self, id, symbol=None, params=None):
+        order = self._exchange.fetch_order(id, symbol, params or {})
+        self._safe(self._record_orders, [order])
+        return order
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        orders = self._exchange.fetch_open_orders(symbol, since, limit, params or {})
+        self._safe(self._record_orders, orders or [])
+        return orders
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        trades = self._exchange.fetch_my_trades(symbol, since, limit, params or {})
+        self._safe(self._record_fills, trades or [])
+        return trades
+
+    def close_recording(self):
+        """Suelta el registro (idempotente); el escritor compartido se cierra con el último."""
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        if self._shared:
+            release_writer(self.writer)
+        else:
+            self.writer.close()
+
+
+# ----------------------------------------------------------------------
+# Generación sintética
+# ----------------------------------------------------------------------
+SYNTHETIC_DEFAULTS = {
+    'price': 100.0,
+    'drift': 0.0,            # anual
+    'volatility': 0.8,       # anual (difusión)
+    'jump_intensity': 2.0,   # saltos por día
+    'jump_mean': 0.0,        # media del log-salto
+    'jump_std': 0.02,        # desviación del log-salto
+    'spread_bps': 2.0,       # bid/ask alrededor del precio
+}
+YEAR_MS = 365 * 86400 * 1000
+
+
+class SyntheticMarket:
+    """Precios sintéticos por símbolo (GBM con saltos de Merton) muestreados cada `step_ms`.
+
+    `symbols`: lista de símbolos o {símbolo: parámetros} (ver SYNTHETIC_DEFAULTS; los que falten se
+    toman de `defaults`). Reproducible con `seed`. Los saltos se compensan en la deriva para que el
+    precio esperado sólo dependa de `drift`.
+    """
+
+    def __init__(self, symbols, step_ms=1000, seed=None, start_ms=None, block=1024, **defaults):
+        specs = symbols if isinstance(symbols, dict) else {s: {} for s in symbols}
+        unknown = set(defaults) - set(SYNTHETIC_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Parámetros desconocidos: {', '.join(sorted(unknown))}")
+        base = dict(SYNTHETIC_DEFAULTS, **defaults)
+        params = [dict(base, **(spec or {})) for spec in specs.values()]
+        self.symbols = list(specs)
+        self.step_ms = int(step_ms)
+        self.block = block
+        self.ts = int(start_ms if start_ms is not None else time.time() * 1000)
+        self._rng = np.random.default_rng(seed)
+
+        def column(key):
+            return np.array([p[key] for p in params], dtype=np.float64)
+
+        dt = self.step_ms / YEAR_MS
+        sigma = column('volatility')
+        lam = column('jump_intensity') * 365 * dt  # saltos esperados por paso
+        mu_j, sd_j = column('jump_mean'), column('jump_std')
+        compensation = lam * (np.exp(mu_j + 0.5 * sd_j ** 2) - 1)
+        self._drift = (column('drift') - 0.5 * sigma ** 2) * dt - compensation
+        self._diffusion = sigma * math.sqrt(dt)
+        self._lam, self._mu_j, self._sd_j = lam, mu_j, sd_j
+        self._half_spread = column('spread_bps') / 20000
+        self._log_price = np.log(column('price'))
+
+    @property
+    def prices(self):
+        return dict(zip(self.symbols, np.exp(self._log_price).tolist()))
+
+    def paths(self, steps):
+        """Matriz (steps, símbolos) de precios para los próximos `steps` pasos."""
+        shape = (steps, len(self.symbols))
+        jumps = self._rng.poisson(self._lam, shape)
+        returns = self._drift + self._diffusion * self._rng.standard_normal(shape)
+        returns += jumps * self._mu_j + np.sqrt(jumps) * self._sd_j * self._rng.standard_normal(shape)
+        log_prices = self._log_price + np.cumsum(returns, axis=0)
+        self._log_price = log_prices[-1]
+        return np.exp(log_prices)
+
+    def events(self, steps=None, duration_ms=None):
+        """Tickers (MarketEvent) de todos los símbolos en cada paso. Sin límites, indefinido."""
+        if duration_ms is not None:
+            steps = int(duration_ms // self.step_ms)
+        remaining = steps
+        while remaining is None or remaining > 0:
+            count = self.block if remaining is None else min(self.block, remaining)
+            prices = self.paths(count)
+            bids = prices * (1 - self._half_spread)
+            asks = prices * (1 + self._half_spread)
+            for row, bid_row, ask_row in zip(prices.tolist(), bids.tolist(), asks.tolist()):
+                self.ts += self.step_ms
+                for symbol, last, bid, ask in zip(self.symbols, row, bid_row, ask_row):
+                    yield MarketEvent(self.ts, 'ticker', symbol, {'last': last, 'bid': bid, 'ask': ask, 'volume': None})
+            if remaining is not None:
+                remaining -= count
+
+    def write(self, path, steps=None, duration_ms=None):
+        """Graba los eventos generados en un registro (para repetir la misma prueba)."""
+        with MarketLogWriter(path, flush_every=4096) as writer:
+            count = 0
+            for event in self.events(steps, duration_ms):
+                writer.write(event)
+                count += 1
+        return count
+
+
+# ----------------------------------------------------------------------
+# Reproducción
+# ----------------------------------------------------------------------
+def parse_speed(value):
+    """'1', '10', '10x' o 'max' -> factor (None = sin pausas)."""
+    text = str(value).strip().lower()
+    if text in ('max', 'inf', '0', ''):
+        return None
+    text = text.rstrip('x×')
+    speed = float(text)
+    if speed <= 0:
+        raise ValueError(f"Velocidad no válida: {value}")
+    return speed
+
+
+class MarketReplayer:
+    """Aplica eventos (de un registro o de SyntheticMarket) a un SimulatedExchange.
+
+    `source`: ruta de un registro o iterable de MarketEvent. `speed`: 1.0 = tiempo real, 10.0 = diez
+    veces más rápido, None = tan rápido como se pueda. `prices='tickers'` mueve el precio con los
+    tickers; `prices='candles'` recorre las velas de `timeframe` ya cerradas (para registros sin
+    tickers). Los mercados que no existan en el simulador se crean con el primer precio.
+    """
+
+    def __init__(self, source, exchange, speed=1.0, prices='tickers', timeframe='1m', on_event=None):
+        if prices not in ('tickers', 'candles'):
+            raise ValueError("prices debe ser 'tickers' o 'candles'")
+        self.source = source
+        self.exchange = exchange
+        self.speed = speed
+        self.prices = prices
+        self.timeframe = timeframe
+        self.on_event = on_event
+        self.stats = {"events": 0, "prices": 0, "first_ms": None, "last_ms": None, "max_lag_ms": 0.0}
+        self._pending = {}  # símbolo -> vela en curso (modo 'candles')
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _events(self):
+        return read_log(self.source) if isinstance(self.source, (str, os.PathLike)) else iter(self.source)
+
+    def _ensure_market(self, symbol):
+        if symbol not in self.exchange.markets and hasattr(self.exchange, 'add_market'):
+            self.exchange.add_market(symbol)
+
+    def _apply(self, event):
+        if event.kind == 'ticker' and self.prices == 'tickers':
+            self._ensure_market(event.symbol)
+            self.exchange.set_price(event.symbol, event.data['last'], timestamp=event.ts)
+            self.stats['prices'] += 1
+        elif event.kind == 'candle' and self.prices == 'candles' and event.data['timeframe'] == self.timeframe:
+            candle = event.data['candle']
+            pending = self._pending.get(event.symbol)
+            # Una vela se da por cerrada cuando llega la siguiente
+            if pending is not None and candle[0] > pending[0]:
+                self._ensure_market(event.symbol)
+                self.exchange.feed_candle(event.symbol, pending)
+                self.stats['prices'] += 1
+            if pending is None or candle[0] >= pending[0]:
+                self._pending[event.symbol] = candle
+
+    def run(self):
+        """Reproduce hasta agotar la fuente o `stop()`. Devuelve las estadísticas."""
+        wall_start = time.monotonic()
+        first = None
+        for event in self._events():
+            if self._stop.is_set():
+                break
+            if first is None:
+                first = event.ts
+                self.stats['first_ms'] = first
+            if self.speed is not None:
+                delay = (event.ts - first) / 1000 / self.speed - (time.monotonic() - wall_start)
+                if delay > 0.001:
+                    if self._stop.wait(delay):
+                        break
+                else:
+                    self.stats['max_lag_ms'] = max(self.stats['max_lag_ms'], round(-delay * 1000, 3))
+            self._apply(event)
+            if self.on_event is not None:
+                self.on_event(event)
+            self.stats['events'] += 1
+            self.stats['last_ms'] = event.ts
+        self.stats['wall_s'] = round(time.monotonic() - wall_start, 3)
+        return self.stats
+
+    def start(self):
+        """Reproduce en un hilo en segundo plano."""
+        self._thread = threading.Thread(target=self.run, name='market-replay', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.stats
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
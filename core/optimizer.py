@@ -0,0 +1,350 @@
+# Archivo: core/optimizer.py
+"""Búsqueda de parámetros del grid con backtests en paralelo.
+
+Cada combinación de `grids_quantity`, `grid_spread`, `amount_per_grid`, `start_mode` y
+`trailing_enabled` se evalúa con `core.backtest` en un pool de procesos (todos los núcleos, baja
+prioridad, contexto 'spawn' como utils.kdf). El camino de precios se copia UNA vez a memoria
+compartida y cada proceso lo mapea como arrays de NumPy sin copiarlo; a los workers sólo viaja el
+dict de parámetros y vuelve el informe.
+
+Métodos: `grid` (todas las combinaciones del espacio) y `random` (muestras del espacio, con rondas
+opcionales de refinamiento alrededor de los mejores). Se ordena por una métrica ajustada por
+riesgo (`sharpe`, `calmar` = rendimiento / drawdown máximo, o `pnl`).
+
+`apply_strategy` escribe la combinación elegida en config.json5 a través del servicio de
+configuración (valida, escritura atómica y aviso a motor/web).
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+from core.backtest import Backtester, price_path
+from utils.config_service import config_service
+from utils.logger import log
+
+DEFAULT_SPACE = {
+    'grids_quantity': [6, 8, 10, 12, 16, 20],
+    'grid_spread': [0.3, 0.5, 0.8, 1.0, 1.5, 2.0],
+    'amount_per_grid': [10, 20, 50],
+    'start_mode': ['wait', 'buy_1', 'buy_2'],
+    'trailing_enabled': [False, True],
+}
+STRATEGY_KEYS = tuple(DEFAULT_SPACE)
+MAX_EVALUATIONS = 5000
+MAX_DAYS = 365
+METHODS = ('grid', 'random')
+
+
+def _score_sharpe(result):
+    return result['sharpe']
+
+def _score_calmar(result):
+    return result['pnl_pct'] / max(result['max_drawdown_pct'], 1.0)
+
+def _score_pnl(result):
+    return result['pnl']
+
+# Métrica -> puntuación (mayor es mejor), como RANKERS en core/ranking.py
+SCORERS = {
+    'sharpe': _score_sharpe,
+    'calmar': _score_calmar,
+    'pnl': _score_pnl,
+}
+
+
+def check_search(space=None, metric='sharpe', method='grid'):
+    """Valida métrica, método y espacio antes de descargar velas o lanzar backtests."""
+    if metric not in SCORERS:
+        raise ValueError(f"Métrica desconocida: {metric} (opciones: {', '.join(SCORERS)})")
+    if method not in METHODS:
+        raise ValueError(f"Método desconocido: {method} (grid o random)")
+    unknown = set(space or DEFAULT_SPACE) - set(STRATEGY_KEYS)
+    if unknown:
+        raise ValueError(f"Parámetros no optimizables: {', '.join(sorted(unknown))}")
+
+
+# ----------------------------------------------------------------------
+# Lado worker (se importa en cada proceso hijo)
+# ----------------------------------------------------------------------
+_worker = {}
+
+
+def _lower_priority():
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def _attach(shm_name, length, symbol, market):
+    _lower_priority()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker['shm'] = shm  # mantener el mapeo vivo mientras viva el proceso
+    _worker['stamps'] = np.ndarray((length,), dtype=np.int64, buffer=shm.buf)
+    _worker['prices'] = np.ndarray((length,), dtype=np.float64, buffer=shm.buf, offset=length * 8)
+    _worker['symbol'] = symbol
+    _worker['market'] = market
+
+
+def _evaluate(params):
+    result = Backtester(_worker['symbol'], params, **_worker['market']).run_path(
+        _worker['stamps'], _worker['prices'])
+    return params, result
+
+
+# ----------------------------------------------------------------------
+# Espacio de búsqueda
+# ----------------------------------------------------------------------
+def _sample(values, rng):
+    """Lista -> elección; tupla (min, max) -> uniforme (entera si ambos extremos lo son)."""
+    if isinstance(values, tuple) and len(values) == 2:
+        low, high = values
+        if isinstance(low, int) and isinstance(high, int):
+            return rng.randint(low, high)
+        return round(rng.uniform(low, high), 2)
+    return rng.choice(list(values))
+
+
+def _neighbour(params, space, rng):
+    """Variación de una combinación: cambia un parámetro a un valor vecino."""
+    key = rng.choice([k for k in space if len(space[k]) > 1 or isinstance(space[k], tuple)])
+    values = space[key]
+    candidate = dict(params)
+    if isinstance(values, tuple):
+        low, high = values
+        step = (high - low) * 0.1
+        value = min(high, max(low, params[key] + rng.uniform(-step, step)))
+        candidate[key] = int(round(value)) if isinstance(low, int) and isinstance(high, int) else round(value, 2)
+    else:
+        values = list(values)
+        idx = values.index(params[key]) if params[key] in values else 0
+        candidate[key] = values[min(len(values) - 1, max(0, idx + rng.choice((-1, 1))))]
+    return candidate
+
+
+def grid_candidates(space):
+    keys = list(space)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(space[k] for k in keys))]
+
+
+def random_candidates(space, samples, rng):
+    seen = set()
+    candidates = []
+    for _ in range(samples * 10):
+        if len(candidates) >= samples:
+            break
+        params = {k: _sample(v, rng) for k, v in space.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+class GridOptimizer:
+    def __init__(self, symbol, candles, space=None, metric='sharpe', initial_quote=1000.0,
+                 workers=None, **market):
+        check_search(space, metric)
+        self.symbol = symbol
+        self.stamps, self.prices = price_path(candles)
+        self.space = dict(space or DEFAULT_SPACE)
+        self.metric = metric
+        self.market = dict(market, initial_quote=initial_quote)
+        self.workers = workers or os.cpu_count() or 1
+        self.evaluated = 0
+        self.total = 0
+        self.cancelled = False
+
+    # --- Ejecución ---
+    def _pool(self, shm):
+        if self.workers <= 1:
+            return None
+        try:
+            # 'spawn': cada worker importa main.py (ligero, sin web ni BD) y este módulo. No se usa
+            # 'forkserver' con precarga: importar core.optimizer arranca el hilo del logger y el
+            # servidor haría fork de un proceso con hilos
+            ctx = multiprocessing.get_context('spawn')
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_attach,
+                                       initargs=(shm.name, len(self.prices), self.symbol, self.market))
+        except (OSError, NotImplementedError, ValueError):
+            return None
+
+    def _evaluate_all(self, pool, candidates):
+        results = []
+        if pool is None:
+            # Sin multiprocessing: en el propio proceso sobre los mismos arrays
+            _worker.update(stamps=self.stamps, prices=self.prices, symbol=self.symbol, market=self.market)
+            for params in candidates:
+                if self.cancelled:
+                    break
+                results.append(_evaluate(params))
+                self.evaluated += 1
+            return results
+        futures = [pool.submit(_evaluate, params) for params in candidates]
+        for future in as_completed(futures):
+            if self.cancelled:
+                for f in futures:
+                    f.cancel()
+                break
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                log.debug("[optimizer] Backtest fallido: %s", e)
+            self.evaluated += 1
+        return results
+
+    def _rank(self, results):
+        score = SCORERS[self.metric]
+        ranked = [dict(result, score=round(score(result), 4), params=params) for params, result in results]
+        ranked.sort(key=lambda r: r['score'], reverse=True)
+        return ranked
+
+    def run(self, method='grid', samples=200, refine_rounds=0, refine_top=5, top=10, seed=None):
+        rng = random.Random(seed)
+        if method == 'grid':
+            candidates = grid_candidates(self.space)
+        elif method == 'random':
+            candidates = random_candidates(self.space, samples, rng)
+        else:
+            raise ValueError(f"Método desconocido: {method} (grid o random)")
+        if len(candidates) > MAX_EVALUATIONS:
+            raise ValueError(f"Demasiadas combinaciones ({len(candidates)} > {MAX_EVALUATIONS})")
+        self.total = len(candidates) * (1 + refine_rounds) if refine_rounds else len(candidates)
+        started = time.perf_counter()
+
+        buffer = np.concatenate((self.stamps.view(np.uint8), self.prices.view(np.uint8)))
+        shm = shared_memory.SharedMemory(create=True, size=max(buffer.nbytes, 1))
+        try:
+            shm.buf[:buffer.nbytes] = buffer.tobytes()
+            del buffer
+            pool = self._pool(shm)
+            try:
+                results = self._evaluate_all(pool, candidates)
+                seen = {tuple(sorted(p.items())) for p in candidates}
+                for _ in range(refine_rounds):
+                    if self.cancelled:
+                        break
+                    best = [r['params'] for r in self._rank(results)[:refine_top]]
+                    neighbours = []
+                    for params in best:
+                        for _ in range(max(1, len(candidates) // (refine_top * (refine_rounds + 1)))):
+                            candidate = _neighbour(params, self.space, rng)
+                            key = tuple(sorted(candidate.items()))
+                            if key not in seen:
+                                seen.add(key)
+                                neighbours.append(candidate)
+                    results += self._evaluate_all(pool, neighbours)
+            finally:
+                if pool is not None:
+                    pool.shutdown(wait=True, cancel_futures=True)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        ranked = self._rank(results)
+        return {
+            "symbol": self.symbol,
+            "method": method,
+            "metric": self.metric,
+            "evaluated": len(results),
+            "workers": self.workers,
+            "price_points": len(self.prices),
+            "elapsed_s": round(time.perf_counter() - started, 2),
+            "best": ranked[0] if ranked else None,
+            "top": ranked[:top],
+        }
+
+
+def apply_strategy(symbol, params):
+    """Escribe `params` en la estrategia del par `symbol` de config.json5 y la publica."""
+    params = {k: v for k, v in params.items() if k in STRATEGY_KEYS}
+    if not params:
+        raise ValueError("No hay parámetros de estrategia que aplicar")
+    data = json.loads(json.dumps(config_service.get()))
+    pair = next((p for p in data.get('pairs', []) if p.get('symbol') == symbol), None)
+    if pair is None:
+        raise ValueError(f"El par {symbol} no está en la configuración")
+    strategy = pair.setdefault('strategy', dict(data.get('default_strategy', {})))
+    strategy.update(params)
+    strategy['strategy_profile'] = 'manual'
+    return config_service.save(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+class OptimizationJobs:
+    """Una optimización a la vez en un hilo de fondo (consume todos los núcleos).
+
+    El estado vive en el proceso que ejecuta el trabajo: en modo separado es el motor (la web
+    llega por IPC con GridBot.start_optimization/optimization_status), así todos los workers
+    ven el mismo trabajo. `build()` descarga las velas y crea el GridOptimizer dentro del hilo,
+    de modo que `start` vuelve enseguida con el id.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = None
+        self._ids = itertools.count(1)
+
+    def start(self, symbol, build, **run_kwargs):
+        with self._lock:
+            if self._current is not None and self._current['status'] == 'running':
+                raise RuntimeError("Ya hay una optimización en curso")
+            job = {"id": next(self._ids), "status": "running", "phase": "download", "symbol": symbol,
+                   "started_at": time.time(), "result": None, "error": None,
+                   "_optimizer": None, "_cancelled": False}
+            self._current = job
+        threading.Thread(target=self._run, args=(job, build, run_kwargs), daemon=True,
+                         name=f"optimizer-{job['id']}").start()
+        return job['id']
+
+    def _run(self, job, build, run_kwargs):
+        try:
+            optimizer = build()
+            if job['_cancelled']:
+                job['status'] = 'cancelled'
+                return
+            optimizer.cancelled = job['_cancelled']
+            job['_optimizer'] = optimizer
+            job['phase'] = 'backtest'
+            job['result'] = optimizer.run(**run_kwargs)
+            job['status'] = 'cancelled' if optimizer.cancelled else 'done'
+            best = job['result']['best']
+            if best:
+                log.success(f"🧪 Optimización {job['symbol']}: {job['result']['evaluated']} backtests, "
+                            f"mejor {best['params']} ({job['result']['metric']} {best['score']})")
+        except Exception as e:
+            job['status'] = 'error'
+            job['error'] = str(e)
+            log.error(f"Error en la optimización de {job['symbol']}: {e}")
+        finally:
+            job['finished_at'] = time.time()
+
+    def cancel(self):
+        job = self._current
+        if job is None or job['status'] != 'running':
+            return False
+        job['_cancelled'] = True
+        if job['_optimizer'] is not None:
+            job['_optimizer'].cancelled = True
+        return True
+
+    def status(self):
+        job = self._current
+        if job is None:
+            return {"status": "idle"}
+        optimizer = job['_optimizer']
+        view = {k: v for k, v in job.items() if not k.startswith('_')}
+        view['progress'] = {"evaluated": optimizer.evaluated if optimizer else 0,
+                            "total": optimizer.total if optimizer else 0}
+        return view
+
+
+optimization_jobs = OptimizationJobs()
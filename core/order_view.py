@@ -0,0 +1,96 @@
+# Archivo: gridbot_binance/core/order_view.py
+"""Vista en memoria de las órdenes abiertas unida a la tabla de precios en vivo.
+
+El motor la alimenta desde el recolector (órdenes y precios por símbolo) y la web la lee
+sin tocar ni la BD ni el exchange. La vista enriquecida (precio actual, valor total y precio
+de entrada de las ventas) se recalcula de forma perezosa como mucho una vez por cambio de
+precio u órdenes, y se sirve agrupada por símbolo.
+"""
+import threading
+
+
+class OpenOrderView:
+    def __init__(self, spread_lookup=None):
+        # spread_lookup(symbol) -> grid_spread (%) usado para estimar el precio de entrada de las ventas
+        self.spread_lookup = spread_lookup
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._prices = {}
+        self._version = 0
+        self._built_version = -1
+        self._grouped = {}
+
+    def update_orders(self, symbol, orders):
+        with self._lock:
+            self._orders[symbol] = list(orders or [])
+            self._version += 1
+
+    def update_price(self, symbol, price):
+        if not price:
+            return
+        with self._lock:
+            if self._prices.get(symbol) != price:
+                self._prices[symbol] = price
+                self._version += 1
+
+    def remove_symbol(self, symbol):
+        with self._lock:
+            self._orders.pop(symbol, None)
+            self._prices.pop(symbol, None)
+            self._version += 1
+
+    def clear(self):
+        with self._lock:
+            self._orders = {}
+            self._version += 1
+
+    def has_data(self):
+        return bool(self._orders)
+
+    def get_price(self, symbol):
+        return self._prices.get(symbol, 0.0)
+
+    def get_prices(self):
+        with self._lock:
+            return dict(self._prices)
+
+    def _rebuild(self):
+        grouped = {}
+        for symbol, orders in self._orders.items():
+            current_price = self._prices.get(symbol, 0.0)
+            spread = None
+            if self.spread_lookup:
+                try:
+                    spread = self.spread_lookup(symbol)
+                except Exception:
+                    spread = None
+            rows = []
+            for o in orders:
+                row = dict(o)
+                row['symbol'] = symbol
+                row['current_price'] = current_price
+                row['total_value'] = (o.get('amount') or 0.0) * (o.get('price') or 0.0)
+                row['entry_price'] = 0.0
+                if o.get('side') == 'sell' and spread:
+                    row['entry_price'] = o['price'] / (1 + (spread / 100.0))
+                rows.append(row)
+            grouped[symbol] = rows
+        self._grouped = grouped
+        self._built_version = self._version
+
+    def get_grouped(self, symbols=None):
+        """Órdenes enriquecidas agrupadas por símbolo (opcionalmente sólo `symbols`)."""
+        with self._lock:
+            if self._built_version != self._version:
+                self._rebuild()
+            grouped = self._grouped
+        if symbols is None:
+            return dict(grouped)
+        return {s: grouped[s] for s in symbols if s in grouped}
+
+    def get_orders(self, symbols=None):
+        """Lista plana de órdenes enriquecidas (formato de /api/orders)."""
+        result = []
+        for rows in self.get_grouped(symbols).values():
+            result.extend(rows)
+        return result
@@ -0,0 +1,202 @@
+# Archivo: core/paper.py
+"""Paper trading por par (`"mode": "paper"` en el par de config.json5).
+
+Las órdenes de los pares en papel van a un libro virtual local (`PaperExchange`, un
+SimulatedExchange) que se ejecuta contra los precios en vivo del exchange real; la cartera
+virtual, los trades y las estadísticas van a una base de datos aparte (data/paper_trading.db),
+así que nada de lo que hacen se mezcla con los pares reales.
+
+Coste de API: las órdenes, balances y trades virtuales no llaman al exchange. Los precios se
+piden para todos los pares en papel a la vez (un `fetch_tickers` por segundo como mucho) y las
+velas se cachean, de modo que decenas de estrategias en sombra comparten el mismo feed.
+
+Configuración (sección `system`):
+    "paper_trading": {"balances": {"USDC": 10000}, "maker_fee": 0.001, "taker_fee": 0.001}
+"""
+import math
+import os
+import threading
+import time
+from core.database import BotDatabase, DB_FOLDER
+from core.exchange import BinanceConnector
+from core.planner import PlanExecutor
+from core.simulator import SimulatedExchange
+from utils.logger import log
+
+PAPER_DB_PATH = os.path.join(DB_FOLDER, 'paper_trading.db')
+PAPER_EXCHANGE_ID = 'paper'
+DEFAULT_BALANCES = {'USDC': 10000.0}
+TICKER_TTL = 1.0     # s entre dos fetch_tickers del feed compartido
+CANDLES_TTL = 60.0   # s que se reutilizan las velas de un (símbolo, timeframe)
+
+
+def is_paper_pair(pair):
+    return bool(pair) and pair.get('mode') == 'paper'
+
+
+def paper_symbols(config):
+    return {p['symbol'] for p in (config or {}).get('pairs', ()) if is_paper_pair(p)}
+
+
+def paper_settings(config):
+    settings = dict((config or {}).get('system', {}).get('paper_trading') or {})
+    settings.setdefault('balances', dict(DEFAULT_BALANCES))
+    settings.setdefault('maker_fee', 0.001)
+    settings.setdefault('taker_fee', 0.001)
+    return settings
+
+
+def _decimals(precision):
+    """Precisión de ccxt (decimales o tamaño de tick, según el exchange) -> decimales."""
+    if precision is None:
+        return None
+    precision = float(precision)
+    if precision >= 1 and precision.is_integer():
+        return int(precision)
+    return max(0, round(-math.log10(precision)))
+
+
+class LiveFeed:
+    """Precios y velas en vivo del conector real, compartidos por todos los pares en papel."""
+
+    def __init__(self, connector, symbols_fn):
+        self.connector = connector
+        self._symbols_fn = symbols_fn
+        self._prices = {}
+        self._prices_at = 0.0
+        self._candles = {}
+        self._lock = threading.Lock()
+
+    @property
+    def exchange(self):
+        return self.connector.exchange if self.connector else None
+
+    def prices(self):
+        """{símbolo: último precio} de los pares en papel (una petición por TICKER_TTL)."""
+        with self._lock:
+            if time.monotonic() - self._prices_at >= TICKER_TTL:
+                symbols = sorted(self._symbols_fn())
+                if symbols and self.exchange is not None:
+                    fresh = self.connector.fetch_batch_prices(symbols)
+                    if fresh:
+                        self._prices.update({s: p for s, p in fresh.items() if p})
+                self._prices_at = time.monotonic()
+            return dict(self._prices)
+
+    def candles(self, symbol, timeframe, limit):
+        key = (symbol, timeframe, limit)
+        with self._lock:
+            cached = self._candles.get(key)
+            if cached and time.monotonic() - cached[0] < CANDLES_TTL:
+                return cached[1]
+        candles = self.connector.fetch_candles(symbol, timeframe=timeframe, limit=limit) if self.exchange else []
+        if candles:
+            with self._lock:
+                self._candles[key] = (time.monotonic(), candles)
+        return candles
+
+    def market(self, symbol):
+        return self.exchange.market(symbol) if self.exchange is not None else None
+
+
+class PaperExchange(SimulatedExchange):
+    """Libro de órdenes virtual con los mercados (precisión, mínimos) y precios del exchange real.
+    Cada vez que se pide un precio se aplican los últimos del feed y se ejecutan las órdenes que
+    cruzan (como maker, a su precio límite)."""
+    id = PAPER_EXCHANGE_ID
+
+    def __init__(self, feed, balances=None, maker_fee=0.001, taker_fee=0.001):
+        super().__init__(balances=balances, maker_fee=maker_fee, taker_fee=taker_fee)
+        self.feed = feed
+
+    def ensure_market(self, symbol):
+        if symbol in self.markets:
+            return True
+        try:
+            live = self.feed.market(symbol)
+        except Exception as e:
+            log.debug("[paper] Mercado %s no disponible: %s", symbol, e)
+            return False
+        if not live:
+            return False
+        limits = live.get('limits') or {}
+        precision = live.get('precision') or {}
+        self.add_market(symbol,
+                        price_precision=_decimals(precision.get('price')),
+                        amount_precision=_decimals(precision.get('amount')),
+                        min_amount=(limits.get('amount') or {}).get('min'),
+                        min_cost=(limits.get('cost') or {}).get('min'))
+        return True
+
+    def sync_prices(self):
+        for symbol, price in self.feed.prices().items():
+            if self.ensure_market(symbol) and price != self._last.get(symbol):
+                self.set_price(symbol, price)
+
+    def load_markets(self, reload=False):
+        return self.markets
+
+    def market(self, symbol):
+        self.ensure_market(symbol)
+        return super().market(symbol)
+
+    def fetch_ticker(self, symbol, params=None):
+        self.sync_prices()
+        return super().fetch_ticker(symbol, params)
+
+    def fetch_tickers(self, symbols=None, params=None):
+        self.sync_prices()
+        return super().fetch_tickers(symbols, params)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        # Velas reales (las del simulador sólo tendrían los precios muestreados)
+        return self.feed.candles(symbol, timeframe, limit)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        self.sync_prices()
+        return super().fetch_open_orders(symbol, since, limit, params)
+
+    def ledger(self):
+        """Saldo total (libre + reservado) por activo."""
+        with self._lock:
+            assets = set(self._free) | set(self._used)
+            return {a: self._free.get(a, 0.0) + self._used.get(a, 0.0) for a in sorted(assets)
+                    if abs(self._free.get(a, 0.0) + self._used.get(a, 0.0)) > 1e-12}
+
+
+class PaperTrading:
+    """Cuenta virtual de los pares en papel: exchange, conector, ejecutor y BD propios."""
+
+    def __init__(self, live_connector, config, symbols_fn, db=None):
+        settings = paper_settings(config)
+        self.db = db or BotDatabase(PAPER_DB_PATH)
+        self.feed = LiveFeed(live_connector, symbols_fn)
+        self.exchange = PaperExchange(self.feed, balances=self._load_ledger() or settings['balances'],
+                                      maker_fee=settings['maker_fee'], taker_fee=settings['taker_fee'])
+        self.connector = BinanceConnector(exchange=self.exchange, config=config)
+        # En proceso y sin red: nada que paralelizar ni presupuesto de órdenes que respetar
+        self.executor = PlanExecutor(self.connector, max_workers=1, rate=None)
+        self._saved_version = self.exchange.state_version
+
+    def _load_ledger(self):
+        try:
+            return self.db.get_paper_ledger()
+        except Exception as e:
+            log.error(f"Error leyendo la cartera virtual: {e}")
+            return None
+
+    def save_ledger(self, force=False):
+        """Guarda la cartera virtual si ha cambiado (las órdenes abiertas no se guardan: al
+        reiniciar sus fondos vuelven a estar libres y el motor vuelve a crearlas)."""
+        version = self.exchange.state_version
+        if not force and version == self._saved_version:
+            return
+        self.db.set_paper_ledger(self.exchange.ledger())
+        self._saved_version = version
+
+    def equity(self, quote='USDC'):
+        self.exchange.sync_prices()
+        return self.exchange.equity(quote)
+
+    def summary(self):
+        return {"balances": self.exchange.ledger(), "equity": round(self.equity(), 2)}
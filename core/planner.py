@@ -0,0 +1,235 @@
+# Archivo: core/planner.py
+"""Reconciliación de las órdenes del grid en dos fases: plan puro y ejecución concurrente.
+
+`plan_orders` compara lo que quiere cada nivel (lado y cantidad, o nada) con las órdenes abiertas
+y devuelve el diff sin tocar la red, en microsegundos:
+
+- keep:   órdenes que ya están donde deben.
+- create: niveles sin orden que la necesitan y para los que hay saldo.
+- amend:  órdenes que cambian de lado o de precio; se envían como cancel-replace (una petición).
+          Las huérfanas (su precio ya no es un nivel) se reutilizan, por orden de precio, para
+          los niveles nuevos del mismo lado antes que cancelarlas y crear aparte.
+- cancel: órdenes sobrantes.
+
+El saldo se reparte nivel a nivel en el orden de la rejilla, como hacía el ciclo secuencial; los
+fondos de las órdenes que se van a cancelar o sustituir cuentan como disponibles.
+
+`PlanExecutor` envía el diff en paralelo (primero las cancelaciones, luego altas y sustituciones)
+dentro de un presupuesto de órdenes por segundo, así que el tiempo de pared pasa de una ida y vuelta
+por orden a una o dos. Devuelve el resultado de cada acción.
+"""
+import bisect
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import log
+from utils.metrics import REGISTRY
+from utils.tracing import tracer
+
+ORDER_ACTIONS = REGISTRY.counter(
+    'gridbot_order_actions_total', 'Acciones del planificador de órdenes enviadas', ('action', 'result'))
+PLAN_EXECUTION_SECONDS = REGISTRY.histogram(
+    'gridbot_plan_execution_seconds', 'Tiempo de pared de la ejecución de un plan de órdenes', ('symbol',))
+
+# Límite de Binance spot: 100 órdenes / 10 s por cuenta (las cancelaciones no cuentan)
+ORDER_RATE_PER_SECOND = 10.0
+ORDER_BURST = 20
+MAX_PARALLEL_ORDERS = 8
+
+
+def _nearest(prices, price, rel_tol):
+    """Índice en `prices` (ordenados) del precio que coincide con `price`, o None."""
+    i = bisect.bisect_left(prices, price)
+    for j in (i, i - 1):
+        if 0 <= j < len(prices) and math.isclose(prices[j], price, rel_tol=rel_tol):
+            return j
+    return None
+
+
+def _remaining(order):
+    remaining = order.get('remaining')
+    return float(order['amount'] if remaining is None else remaining)
+
+
+def plan_orders(targets, open_orders, quote_free, base_free, round_amount=None, rel_tol=1e-5):
+    """Diff entre las órdenes deseadas y las abiertas.
+
+    `targets`: un dict por nivel, en orden, con 'price' y 'side' ('buy', 'sell' o None si el nivel
+    no debe llevar orden nueva; la que ya tenga se conserva) y 'amount' (0 = no operable).
+    `quote_free` / `base_free`: saldo libre para compras / ventas.
+    `round_amount(amount)`: precisión del mercado para recortar una venta al saldo que queda.
+    Devuelve {'keep', 'create', 'amend', 'cancel'}.
+    """
+    plan = {"keep": [], "create": [], "amend": [], "cancel": []}
+    level_prices = sorted(t['price'] for t in targets)
+    orphans = [o for o in open_orders if _nearest(level_prices, o['price'], rel_tol) is None]
+    # Órdenes en niveles, por precio (las de un mismo nivel se toman en el orden en que llegaron)
+    by_price = sorted((o for o in open_orders if _nearest(level_prices, o['price'], rel_tol) is not None),
+                      key=lambda o: o['price'])
+    order_prices = [o['price'] for o in by_price]
+    # Lo que reservan las huérfanas vuelve al saldo (se cancelan o se sustituyen antes de crear)
+    for o in orphans:
+        if o['side'] == 'buy':
+            quote_free += _remaining(o) * o['price']
+        else:
+            base_free += _remaining(o)
+
+    matched = set()
+    for target in targets:
+        price, side = target['price'], target.get('side')
+        order = None
+        i = _nearest(order_prices, price, rel_tol)
+        if i is not None:
+            # Puede haber varias en el mismo nivel: la primera aún sin emparejar
+            while i > 0 and math.isclose(order_prices[i - 1], price, rel_tol=rel_tol):
+                i -= 1
+            while i < len(by_price) and math.isclose(order_prices[i], price, rel_tol=rel_tol):
+                if by_price[i]['id'] not in matched:
+                    order = by_price[i]
+                    break
+                i += 1
+        if order is not None:
+            matched.add(order['id'])
+            if side is None or order['side'] == side:
+                plan['keep'].append(order)
+                continue
+            # Lado contrario: lo que reservaba queda libre al sustituirla o cancelarla
+            if order['side'] == 'buy':
+                quote_free += _remaining(order) * order['price']
+            else:
+                base_free += _remaining(order)
+        elif side is None:
+            continue
+
+        amount = target.get('amount') or 0.0
+        feasible = False
+        if amount > 0 and side == 'buy':
+            feasible = quote_free >= amount * price
+            if feasible:
+                quote_free -= amount * price
+        elif amount > 0 and side == 'sell':
+            feasible = base_free >= amount * 0.99
+            if feasible:
+                if base_free < amount:
+                    amount = round_amount(base_free) if round_amount else base_free
+                base_free -= amount
+
+        action = {"side": side, "price": price, "amount": amount}
+        if order is None:
+            if feasible:
+                plan['create'].append(action)
+        elif feasible:
+            plan['amend'].append(dict(action, order_id=order['id'], old_side=order['side'],
+                                      old_price=order['price']))
+        else:
+            plan['cancel'].append({"order_id": order['id'], "side": order['side'], "price": order['price']})
+
+    # Huérfanas: se reaprovechan (por orden de precio) para las altas del mismo lado; el resto se cancela
+    for side in ('buy', 'sell'):
+        creates = sorted((a for a in plan['create'] if a['side'] == side), key=lambda a: a['price'])
+        spare = sorted((o for o in orphans if o['side'] == side), key=lambda o: o['price'])
+        for action, order in zip(creates, spare):
+            plan['create'].remove(action)
+            orphans.remove(order)
+            plan['amend'].append(dict(action, order_id=order['id'], old_side=order['side'],
+                                      old_price=order['price']))
+    plan['cancel'] += [{"order_id": o['id'], "side": o['side'], "price": o['price'], "orphan": True}
+                       for o in orphans]
+    return plan
+
+
+def plan_size(plan):
+    return len(plan['create']) + len(plan['amend']) + len(plan['cancel'])
+
+
+class _OrderBudget:
+    """Cubo de fichas: `rate` órdenes por segundo con ráfagas de hasta `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PlanExecutor:
+    """Ejecuta planes de `plan_orders` contra un BinanceConnector.
+    Con `max_workers=1` todo se envía en el hilo que llama y con `rate=None` no hay presupuesto de
+    órdenes (backtests contra el simulador)."""
+
+    def __init__(self, connector, max_workers=MAX_PARALLEL_ORDERS, rate=ORDER_RATE_PER_SECOND,
+                 burst=ORDER_BURST):
+        self.connector = connector
+        self.max_workers = max_workers
+        self._budget = _OrderBudget(rate, burst) if rate else None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='orders') \
+            if max_workers > 1 else None
+
+    def _send(self, symbol, kind, action, trace_id, tick_ns):
+        if kind != 'cancel' and self._budget is not None:
+            self._budget.acquire()
+        start = time.perf_counter()
+        result = None
+        error = None
+        try:
+            with tracer.join_trace(trace_id, symbol):
+                if kind == 'cancel':
+                    result = self.connector.cancel_order(action['order_id'], symbol)
+                elif kind == 'create':
+                    result = self.connector.place_order(symbol, action['side'], action['amount'], action['price'])
+                else:
+                    result = self.connector.edit_order(action['order_id'], symbol, action['side'],
+                                                       action['amount'], action['price'])
+        except Exception as e:
+            error = str(e)
+            log.debug("[planner] %s %s @ %s falló: %s", kind, symbol, action['price'], e)
+        ok = result is not None
+        if ok and kind != 'cancel' and tick_ns is not None:
+            tracer.record('tick_to_order', symbol, tick_ns, time.perf_counter_ns(), trace_id,
+                          {'side': action['side'], 'price': action['price']})
+        ORDER_ACTIONS.labels(kind, 'ok' if ok else 'error').inc()
+        report = dict(action, action=kind, ok=ok, elapsed_ms=round((time.perf_counter() - start) * 1000, 2))
+        if ok and kind != 'cancel':
+            report['order_id'] = result.get('id')
+        if error:
+            report['error'] = error
+        return report
+
+    def _run_wave(self, symbol, wave, trace_id, tick_ns):
+        if self._pool is None or len(wave) == 1:
+            return [self._send(symbol, kind, action, trace_id, tick_ns) for kind, action in wave]
+        futures = [self._pool.submit(self._send, symbol, kind, action, trace_id, tick_ns)
+                   for kind, action in wave]
+        return [f.result() for f in futures]
+
+    def execute(self, symbol, plan, trace_id=None, tick_ns=None):
+        """Envía el plan y devuelve un informe por acción (action, side, price, ok, elapsed_ms...).
+        Las cancelaciones van primero porque liberan el saldo que usan las altas."""
+        start = time.perf_counter()
+        results = []
+        waves = ([('cancel', a) for a in plan['cancel']],
+                 [('amend', a) for a in plan['amend']] + [('create', a) for a in plan['create']])
+        for wave in waves:
+            if wave:
+                results += self._run_wave(symbol, wave, trace_id, tick_ns)
+        if results:
+            PLAN_EXECUTION_SECONDS.labels(symbol).observe(time.perf_counter() - start)
+        return results
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,113 @@
+# Archivo: gridbot_binance/core/ranking.py
+"""Ranking de estrategias/pares a partir de agregados SQL de trade_history.
+
+Los agregados y los rankings de todas las métricas se recalculan sólo cuando cambia
+la versión de trade_history en la BD (`get_trades_version`: llegan o se borran trades, también
+desde otro proceso) o caduca `max_age`; entre medias,
+pedir el top-N de cualquier métrica es un slice de una lista ya ordenada.
+"""
+import math
+import threading
+import time
+
+
+def _rank_roi(row):
+    return row['roi_annualized']
+
+def _rank_pnl(row):
+    return row['pnl']
+
+def _rank_sharpe(row):
+    return row['sharpe']
+
+def _rank_drawdown(row):
+    # Menor drawdown es mejor: se ordena por el valor negado
+    return -row['max_drawdown']
+
+# Métrica -> función clave (mayor es mejor). Para añadir un criterio basta con registrarlo aquí.
+RANKERS = {
+    'roi': _rank_roi,
+    'pnl': _rank_pnl,
+    'sharpe': _rank_sharpe,
+    'drawdown': _rank_drawdown,
+}
+
+
+def _sharpe_and_drawdown(daily_flows):
+    """Sharpe anualizado de los cash flows diarios (rellenando días sin actividad con 0)
+    y máximo drawdown (USDC) de su curva acumulada."""
+    if not daily_flows:
+        return 0.0, 0.0
+    first_day = daily_flows[0][0]
+    last_day = daily_flows[-1][0]
+    n_days = last_day - first_day + 1
+    total = sum(cf for _, cf in daily_flows)
+    mean = total / n_days
+    sq = sum((cf - mean) ** 2 for _, cf in daily_flows) + (n_days - len(daily_flows)) * mean ** 2
+    std = math.sqrt(sq / n_days) if n_days > 1 else 0.0
+    sharpe = (mean / std) * math.sqrt(365) if std > 0 else 0.0
+
+    equity = 0.0
+    peak = 0.0
+    max_dd = 0.0
+    for _, cf in daily_flows:
+        equity += cf
+        peak = max(peak, equity)
+        max_dd = max(max_dd, peak - equity)
+    return sharpe, max_dd
+
+
+class StrategyRanker:
+    def __init__(self, db, max_age=60):
+        self.db = db
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = None
+        self._built_at = 0.0
+        self._rankings = {}
+
+    def _rebuild(self):
+        aggregates = self.db.get_trade_aggregates()
+        flows = self.db.get_daily_cash_flows()
+        current_time = time.time()
+        rows = []
+        for symbol, agg in aggregates.items():
+            capital = agg['capital_invested']
+            pnl = agg['pnl']
+            # trade_history guarda timestamps en ms
+            days_active = max((current_time - agg['first_trade_time'] / 1000) / 86400, 1)  # Al menos 1 día
+            if capital > 0:
+                roi_percent = (pnl / capital) * 100
+                roi_annualized = roi_percent * (365 / days_active)
+            else:
+                roi_percent = 0
+                roi_annualized = 0
+            sharpe, max_dd = _sharpe_and_drawdown(flows.get(symbol, []))
+            rows.append({
+                'symbol': symbol,
+                'pnl': round(pnl, 2),
+                'roi_percent': round(roi_percent, 2),
+                'roi_annualized': round(roi_annualized, 2),
+                'capital_invested': round(capital, 2),
+                'trades': agg['trades'],
+                'days_active': round(days_active, 1),
+                'sharpe': round(sharpe, 2),
+                'max_drawdown': round(max_dd, 2)
+            })
+        self._rankings = {name: sorted(rows, key=key, reverse=True) for name, key in RANKERS.items()}
+        self._built_at = current_time
+
+    def top(self, metric='roi', limit=5):
+        """Top-N por `metric` (roi, pnl, sharpe, drawdown). Métricas desconocidas usan 'roi'."""
+        if metric not in RANKERS:
+            metric = 'roi'
+        version = self.db.get_trades_version()
+        with self._lock:
+            if version != self._version or time.time() - self._built_at > self.max_age:
+                self._rebuild()
+                self._version = version
+            return self._rankings[metric][:limit]
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
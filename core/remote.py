@@ -0,0 +1,345 @@
+# Archivo: gridbot_binance/core/remote.py
+"""Despliegue en dos procesos: el motor (GridBot) y la web se comunican por IPC local.
+
+- `EngineHost` vive en el proceso del motor: publica periódicamente (y tras cada orden) el
+  estado del bot en un snapshot mmap y atiende órdenes por el socket local.
+- `EngineProxy` vive en cada worker web y se comporta como un `GridBot` para web/server.py:
+  los atributos de estado se leen del snapshot (sin bloquear nunca al motor) y los métodos
+  se reenvían como órdenes al motor.
+"""
+import json
+import os
+import threading
+import time
+from core.ipc import SnapshotWriter, SnapshotReader, CommandServer, CommandClient
+from utils.logger import log
+from utils.metrics import REGISTRY
+from utils.tracing import tracer
+from utils.profiler import profiler
+from utils.scheduler import scheduler
+
+DEFAULT_STATE_FILE = 'data/engine_state.mmap'
+DEFAULT_SOCKET = 'data/engine.sock'
+
+# Estado publicado en el snapshot y su valor por defecto cuando el motor no ha publicado nada
+SNAPSHOT_DEFAULTS = {
+    'is_running': False,
+    'is_paused': False,
+    'global_start_time': 0,
+    'active_pairs': [],
+    'pairs_map': {},
+    'config': {},
+    'levels': {},
+    'session_trades_count': {},
+    'active_exchange_name': None,
+    'active_exchange_use_testnet': False,
+}
+
+# Atributos que la web puede leer o reasignar en el motor
+GETTABLE = {'config', 'connector.config', 'levels'}
+SETTABLE = {'global_start_time', 'levels', 'config', 'active_exchange_name',
+            'active_exchange_use_testnet', 'connector.exchange'}
+# Métodos que la web puede invocar en el motor (op 'call'): sólo los que usa web/server.py.
+# Lista explícita: nada de métodos arbitrarios de GridBot ni de ccxt (withdraw, private*...)
+ALLOWED_CALLS = {
+    # GridBot
+    'calculate_total_equity', 'capture_initial_snapshots', 'effective_spread',
+    'launch', 'stop_logic', 'reload_config', 'resume_bot',
+    'panic_stop', 'panic_cancel_all', 'panic_sell_all', 'manual_close_order',
+    'start_optimization', 'optimization_status', 'cancel_optimization',
+    # ExchangeConnector
+    'connector.connect_with_credentials', 'connector.get_account_status',
+    'connector.get_total_balance', 'connector.fetch_current_price', 'connector.fetch_candles',
+    'connector.fetch_open_orders', 'connector.cancel_all_orders', 'connector.place_market_sell',
+    'connector.release_recording',
+    # ccxt (sólo lecturas)
+    'connector.exchange.fetch_balance', 'connector.exchange.fetch_tickers',
+    'connector.exchange.publicGetPing',
+    # OpenOrderView y AccountEngine
+    'order_view.clear',
+    'accounts.sync', 'accounts.status', 'accounts.launch_account', 'accounts.stop_account',
+}
+# Vistas de diagnóstico del proceso del motor (métricas, trazas...) accesibles con op 'debug'
+DEBUG_VIEWS = {
+    'metrics': REGISTRY.render,
+    'scheduler_stats': scheduler.stats,
+    'trace_stats': tracer.stats,
+    'trace_chrome': tracer.chrome_trace,
+    'trace_clear': tracer.clear,
+    'profile_start': profiler.start,
+    'profile_status': profiler.status,
+    'profile_collapsed': profiler.collapsed,
+    'profile_top': profiler.top,
+}
+
+
+def ipc_settings():
+    """Rutas del snapshot y del socket (configurables por entorno: ENGINE_STATE_FILE / ENGINE_SOCKET)."""
+    return (os.getenv('ENGINE_STATE_FILE', DEFAULT_STATE_FILE),
+            os.getenv('ENGINE_SOCKET', DEFAULT_SOCKET))
+
+
+class EngineHost:
+    def __init__(self, bot, state_file=None, address=None, interval=0.5, heartbeat=5):
+        default_state, default_address = ipc_settings()
+        self.bot = bot
+        self.state_file = state_file or default_state
+        self.address = address or default_address
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self._writer = None
+        self._server = None
+        self._wake = threading.Event()
+        self._running = False
+        self._dirty = False
+        self._last_payload = None
+        self._last_publish = 0.0
+
+    # --- Snapshot ---
+    def build_snapshot(self):
+        bot = self.bot
+        exchange = bot.connector.exchange if bot.connector else None
+        state = {name: getattr(bot, name, default) for name, default in SNAPSHOT_DEFAULTS.items()}
+        state['exchange'] = {
+            'connected': bool(exchange),
+            'id': getattr(exchange, 'id', None) if exchange else None
+        }
+        state['orders'] = bot.order_view.get_grouped()
+        state['prices'] = bot.order_view.get_prices()
+        return state
+
+    def publish(self, force=False):
+        payload = json.dumps(self.build_snapshot(), default=str, separators=(',', ':')).encode()
+        now = time.time()
+        # Sólo se reescribe si cambia el estado (o como latido para que la web sepa que seguimos vivos)
+        if force or payload != self._last_payload or now - self._last_publish >= self.heartbeat:
+            self._writer.publish(payload)
+            self._last_payload = payload
+            self._last_publish = now
+
+    def _publisher_loop(self):
+        while self._running:
+            force, self._dirty = self._dirty, False
+            try:
+                self.publish(force=force)
+            except Exception as e:
+                log.error(f"Error publicando estado del motor: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # --- Órdenes ---
+    def _resolve_parent(self, path):
+        parts = path.split('.')
+        target = self.bot
+        for part in parts[:-1]:
+            target = getattr(target, part)
+            if target is None:
+                raise RuntimeError(f"'{part}' no disponible en el motor")
+        return target, parts[-1]
+
+    def dispatch(self, request):
+        op = request.get('op')
+        path = request.get('path', '')
+        args = request.get('args') or []
+        kwargs = request.get('kwargs') or {}
+        try:
+            if op == 'debug':
+                if path not in DEBUG_VIEWS:
+                    raise PermissionError(f"Vista de diagnóstico desconocida: {path}")
+                return DEBUG_VIEWS[path](*args, **kwargs)
+            if op == 'get':
+                if path not in GETTABLE:
+                    raise PermissionError(f"Lectura no permitida: {path}")
+                parent, name = self._resolve_parent(path)
+                return getattr(parent, name)
+            if op == 'set':
+                if path not in SETTABLE:
+                    raise PermissionError(f"Escritura no permitida: {path}")
+                if path == 'connector.exchange' and args[0] is not None:
+                    raise PermissionError("Sólo se puede desconectar el exchange (None)")
+                parent, name = self._resolve_parent(path)
+                setattr(parent, name, args[0])
+                return True
+            if op == 'call':
+                if path not in ALLOWED_CALLS:
+                    raise PermissionError(f"Orden no permitida: {path}")
+                parent, name = self._resolve_parent(path)
+                return getattr(parent, name)(*args, **kwargs)
+            raise ValueError(f"Operación desconocida: {op}")
+        finally:
+            # Tras cualquier orden se publica enseguida para que la web vea el efecto
+            if op in ('call', 'set'):
+                self._dirty = True
+                self._wake.set()
+
+    def start(self):
+        self._writer = SnapshotWriter(self.state_file)
+        self._running = True
+        self.publish(force=True)
+        threading.Thread(target=self._publisher_loop, daemon=True, name="engine-publisher").start()
+        self._server = CommandServer(self.address, self.dispatch)
+        self._server.start()
+        log.success(f"Motor publicando estado en {self.state_file}")
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._server:
+            self._server.stop()
+        if self._writer:
+            self._writer.close()
+
+
+# --- LADO WEB ---
+
+class _RemoteMethod:
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+
+    def __call__(self, *args, **kwargs):
+        return self._client.call(self._path, *args, **kwargs)
+
+
+class _RemoteExchange:
+    def __init__(self, client, exchange_id):
+        self._client = client
+        self.id = exchange_id
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _RemoteMethod(self._client, f"connector.exchange.{name}")
+
+
+class _RemoteConnector:
+    def __init__(self, proxy):
+        object.__setattr__(self, '_proxy', proxy)
+
+    @property
+    def exchange(self):
+        info = self._proxy._snapshot().get('exchange') or {}
+        if not info.get('connected'):
+            return None
+        return _RemoteExchange(self._proxy._client, info.get('id'))
+
+    @property
+    def config(self):
+        # Se pide al motor (no al snapshot) para ver la configuración recién recargada
+        return self._proxy._client.get('connector.config')
+
+    def __setattr__(self, name, value):
+        if name == 'exchange':
+            sent_at = time.time()
+            self._proxy._client.set('connector.exchange', value)
+            self._proxy._wait_for_publish(sent_at)
+            return
+        raise AttributeError(f"No se puede asignar connector.{name} en remoto")
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _RemoteMethod(self._proxy._client, f"connector.{name}")
+
+
+class _RemoteAccounts:
+    """`bot.accounts` (core.engine.AccountEngine) del motor."""
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _RemoteMethod(self._client, f"accounts.{name}")
+
+
+class _SnapshotOrderView:
+    """Misma interfaz de lectura que OpenOrderView, servida desde el snapshot del motor."""
+
+    def __init__(self, proxy):
+        self._proxy = proxy
+
+    def has_data(self):
+        return bool(self._proxy._snapshot().get('orders'))
+
+    def get_price(self, symbol):
+        return self._proxy._snapshot().get('prices', {}).get(symbol, 0.0)
+
+    def get_prices(self):
+        return dict(self._proxy._snapshot().get('prices', {}))
+
+    def get_grouped(self, symbols=None):
+        grouped = self._proxy._snapshot().get('orders', {})
+        if symbols is None:
+            return dict(grouped)
+        return {s: grouped[s] for s in symbols if s in grouped}
+
+    def get_orders(self, symbols=None):
+        result = []
+        for rows in self.get_grouped(symbols).values():
+            result.extend(rows)
+        return result
+
+    def clear(self):
+        self._proxy._client.call('order_view.clear')
+
+
+class EngineProxy:
+    """Sustituto de GridBot para los workers web en modo `--mode web`."""
+
+    def __init__(self, reader, client, stale_after=15):
+        object.__setattr__(self, '_reader', reader)
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, '_stale_after', stale_after)
+        object.__setattr__(self, 'connector', _RemoteConnector(self))
+        object.__setattr__(self, 'order_view', _SnapshotOrderView(self))
+        object.__setattr__(self, 'accounts', _RemoteAccounts(client))
+
+    @classmethod
+    def from_env(cls):
+        state_file, address = ipc_settings()
+        return cls(SnapshotReader(state_file), CommandClient(address))
+
+    def _snapshot(self):
+        snapshot = self._reader.read()
+        # Si el motor ha dejado de publicar, la web lo ve como parado/desconectado
+        if not snapshot or self._reader.age() > self._stale_after:
+            return {}
+        return snapshot
+
+    def _wait_for_publish(self, since, timeout=2.0):
+        """Espera a que el motor publique un snapshot posterior a `since` (envío de la orden)."""
+        while time.time() - since < timeout:
+            self._reader.read()
+            if self._reader.published_at >= since:
+                return
+            time.sleep(0.02)
+
+    def engine_debug(self, view, **kwargs):
+        """Vista de diagnóstico (DEBUG_VIEWS) del proceso del motor."""
+        return self._client.request('debug', view, **kwargs)
+
+    @property
+    def engine_online(self):
+        return bool(self._snapshot())
+
+    def __getattr__(self, name):
+        if name in SNAPSHOT_DEFAULTS:
+            return self._snapshot().get(name, SNAPSHOT_DEFAULTS[name])
+        if name.startswith('_'):
+            raise AttributeError(name)
+        method = _RemoteMethod(self._client, name)
+
+        def call(*args, **kwargs):
+            sent_at = time.time()
+            result = method(*args, **kwargs)
+            self._wait_for_publish(sent_at)
+            return result
+        return call
+
+    def __setattr__(self, name, value):
+        if name not in SETTABLE:
+            raise AttributeError(f"No se puede asignar '{name}' en remoto")
+        sent_at = time.time()
+        self._client.set(name, value)
+        self._wait_for_publish(sent_at)
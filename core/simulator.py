@@ -0,0 +1,653 @@
+# Archivo: core/simulator.py
+"""Exchange spot simulado en proceso, con la misma interfaz ccxt que usa BinanceConnector.
+
+`SimulatedExchange` se enchufa como `connector.exchange` (BinanceConnector(exchange=sim)) y
+permite ejecutar el bot, el backtester o los benchmarks sin red. Implementa:
+
+- Libro de órdenes límite propio por símbolo con prioridad precio-tiempo. El precio de mercado
+  es externo: se mueve con `set_price()` o `feed_candle()` y al cruzar un nivel ejecuta las
+  órdenes en reposo (como maker, a su precio límite). Una orden límite que ya cruza el mercado
+  al crearse se ejecuta al momento como taker al precio actual; las de mercado, con deslizamiento.
+- Comisiones maker/taker cobradas en el activo recibido (como Binance sin BNB).
+- Reglas de precisión y mínimos por mercado (`amount_to_precision`, `price_to_precision`,
+  `market(symbol)['limits']`).
+- Latencia y errores inyectables (`latency`, `error_rate` o `inject_error()` por método) con las
+  excepciones de ccxt, para probar los caminos de error del conector.
+
+`serve()` / `RemoteSimulatedExchange` lo exponen por el canal de órdenes de core.ipc para
+usarlo desde otro proceso.
+"""
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+import ccxt
+
+TIMEFRAME_SECONDS = {'1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600,
+                     '2h': 7200, '4h': 14400, '6h': 21600, '12h': 43200, '1d': 86400}
+
+DEFAULT_MARKET = {
+    'price_precision': 2,
+    'amount_precision': 5,
+    'min_amount': 0.00001,
+    'min_cost': 5.0,
+}
+
+# Métodos de la API ccxt que se exponen por IPC y en los que se inyectan latencia/errores
+API_METHODS = ('load_markets', 'fetch_time', 'fetch_balance', 'fetch_ticker', 'fetch_tickers',
+               'fetch_ohlcv', 'create_order', 'edit_order', 'cancel_order', 'cancel_all_orders', 'fetch_order',
+               'fetch_open_orders', 'fetch_my_trades', 'fetch_trading_fee',
+               'amount_to_precision', 'price_to_precision', 'market')
+
+
+def _iso(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f"{int(ms % 1000):03d}Z"
+
+
+def _truncate(value, decimals):
+    factor = 10 ** decimals
+    return math.floor(value * factor + 1e-9) / factor
+
+
+class SimulatedExchange:
+    id = 'simulated'
+    sandbox = False
+
+    def __init__(self, markets=None, balances=None, maker_fee=0.001, taker_fee=0.001,
+                 slippage_bps=0.0, latency=0.0, latency_jitter=0.0, error_rate=0.0,
+                 seed=None, candle_history=2000, clock=None, sleep=time.sleep):
+        """
+        markets: {símbolo: {'price_precision', 'amount_precision', 'min_amount', 'min_cost', 'price'}}
+        balances: {activo: cantidad libre inicial}
+        clock: función que devuelve ms (por defecto el reloj real; el tiempo simulado lo fijan
+               set_price/feed_candle cuando se les pasa timestamp)
+        """
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.slippage_bps = slippage_bps
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self._sleep = sleep
+        self._rng = random.Random(seed)
+        self._clock = clock
+        self._sim_time_ms = None
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._injected = {}
+        self.urls = {}
+        self.has = {'fetchTickers': True, 'fetchOHLCV': True, 'cancelAllOrders': True, 'fetchMyTrades': True,
+                    'editOrder': True}
+        self.markets = {}
+        self._last = {}
+        self._bids = {}    # símbolo -> heap (-precio, seq, id)
+        self._asks = {}    # símbolo -> heap (precio, seq, id)
+        self._orders = {}  # id -> orden (dict ccxt)
+        self._open = {}    # id -> orden abierta (en orden de creación)
+        self._reserved = {}  # id -> fondos reservados por una orden abierta
+        self._trades = {}  # símbolo -> lista de trades (dict ccxt)
+        self._candles = {}  # símbolo -> deque de velas de 1m [ts, o, h, l, c, v]
+        self._day = {}      # símbolo -> ventana móvil de 24h de velas cerradas (O(1) por vela)
+        self._candle_history = candle_history
+        self._free = {}
+        self._used = {}
+        self.api_calls = 0
+        self.state_version = 0  # cambia con cada orden creada, cancelada o ejecutada
+        for symbol, spec in (markets or {}).items():
+            self.add_market(symbol, **spec)
+        for asset, amount in (balances or {}).items():
+            self._free[asset] = float(amount)
+
+    # ------------------------------------------------------------------
+    # Configuración de la simulación
+    # ------------------------------------------------------------------
+    def add_market(self, symbol, price=None, price_precision=None, amount_precision=None,
+                   min_amount=None, min_cost=None):
+        base, quote = symbol.split('/')
+        spec = dict(DEFAULT_MARKET)
+        for key, value in (('price_precision', price_precision), ('amount_precision', amount_precision),
+                           ('min_amount', min_amount), ('min_cost', min_cost)):
+            if value is not None:
+                spec[key] = value
+        self.markets[symbol] = {
+            'id': symbol.replace('/', ''),
+            'symbol': symbol,
+            'base': base,
+            'quote': quote,
+            'active': True,
+            'spot': True,
+            'type': 'spot',
+            'maker': self.maker_fee,
+            'taker': self.taker_fee,
+            'precision': {'price': spec['price_precision'], 'amount': spec['amount_precision']},
+            'limits': {
+                'amount': {'min': spec['min_amount'], 'max': None},
+                'price': {'min': 10 ** -spec['price_precision'], 'max': None},
+                'cost': {'min': spec['min_cost'], 'max': None},
+            },
+        }
+        self._bids.setdefault(symbol, [])
+        self._asks.setdefault(symbol, [])
+        self._trades.setdefault(symbol, [])
+        self._candles.setdefault(symbol, deque(maxlen=self._candle_history))
+        self._day.setdefault(symbol, {'window': deque(), 'max': deque(), 'min': deque(), 'volume': 0.0})
+        if price is not None:
+            self.set_price(symbol, price)
+
+    def set_balance(self, asset, amount):
+        with self._lock:
+            self._free[asset] = float(amount)
+
+    def inject_error(self, method, error=None, times=1):
+        """La próxima(s) `times` llamada(s) a `method` lanzan `error` (por defecto NetworkError)."""
+        with self._lock:
+            self._injected[method] = [error or ccxt.NetworkError(f"{method}: error simulado"), times]
+
+    def milliseconds(self):
+        if self._sim_time_ms is not None:
+            return self._sim_time_ms
+        if self._clock is not None:
+            return int(self._clock())
+        return int(time.time() * 1000)
+
+    def _api(self, method):
+        """Punto común de las llamadas a la API: cuenta, simula latencia y errores."""
+        self.api_calls += 1
+        if self.latency or self.latency_jitter:
+            self._sleep(self.latency + (self._rng.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0))
+        injected = self._injected.get(method)
+        if injected:
+            with self._lock:
+                error, times = injected
+                if times <= 1:
+                    self._injected.pop(method, None)
+                else:
+                    injected[1] = times - 1
+            raise error
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise ccxt.NetworkError(f"{method}: error de red simulado")
+
+    # ------------------------------------------------------------------
+    # Mercado: movimiento de precio y casamiento
+    # ------------------------------------------------------------------
+    def set_price(self, symbol, price, timestamp=None, volume=0.0):
+        """Nuevo precio de mercado: actualiza la vela de 1m y ejecuta las órdenes que cruza."""
+        price = float(price)
+        with self._lock:
+            if timestamp is not None:
+                self._sim_time_ms = int(timestamp)
+            now = self.milliseconds()
+            self._last[symbol] = price
+            self._update_candle(symbol, now, price, volume)
+            self._match(symbol, price, now)
+
+    def feed_candle(self, symbol, candle):
+        """Reproduce una vela [ts, o, h, l, c, v] recorriendo o -> l -> h -> c (vela alcista) u
+        o -> h -> l -> c (bajista), que es el camino que menos favorece a la rejilla."""
+        ts, o, h, l, c = candle[:5]
+        volume = candle[5] if len(candle) > 5 else 0.0
+        path = (o, l, h, c) if c >= o else (o, h, l, c)
+        with self._lock:
+            self._sim_time_ms = int(ts)
+            for i, price in enumerate(path):
+                self.set_price(symbol, price, volume=volume if i == 0 else 0.0)
+            self._sim_time_ms = int(ts) + 59999
+
+    def _update_candle(self, symbol, now_ms, price, volume):
+        candles = self._candles[symbol]
+        bucket = now_ms - now_ms % 60000
+        if candles and candles[-1][0] == bucket:
+            candle = candles[-1]
+            candle[2] = max(candle[2], price)
+            candle[3] = min(candle[3], price)
+            candle[4] = price
+            candle[5] += volume
+        else:
+            if candles:
+                self._roll_day(symbol, candles[-1], bucket)
+            candles.append([bucket, price, price, price, price, volume])
+
+    def _roll_day(self, symbol, closed, bucket):
+        """Añade una vela cerrada a la ventana de 24h (máximo/mínimo con colas monótonas)."""
+        day = self._day[symbol]
+        window, maxq, minq = day['window'], day['max'], day['min']
+        window.append(closed)
+        day['volume'] += closed[5]
+        while maxq and maxq[-1][2] <= closed[2]:
+            maxq.pop()
+        maxq.append(closed)
+        while minq and minq[-1][3] >= closed[3]:
+            minq.pop()
+        minq.append(closed)
+        start = bucket - 86400000 + 60000
+        while window and window[0][0] < start:
+            old = window.popleft()
+            day['volume'] -= old[5]
+            if maxq and maxq[0] is old:
+                maxq.popleft()
+            if minq and minq[0] is old:
+                minq.popleft()
+
+    def _match(self, symbol, price, now):
+        bids = self._bids[symbol]
+        while bids:
+            neg_price, _, order_id = bids[0]
+            order = self._orders.get(order_id)
+            if order is None or order['status'] != 'open':
+                heapq.heappop(bids)
+                continue
+            if -neg_price < price:
+                break
+            heapq.heappop(bids)
+            self._fill(order, order['price'], 'maker', now)
+        asks = self._asks[symbol]
+        while asks:
+            ask_price, _, order_id = asks[0]
+            order = self._orders.get(order_id)
+            if order is None or order['status'] != 'open':
+                heapq.heappop(asks)
+                continue
+            if ask_price > price:
+                break
+            heapq.heappop(asks)
+            self._fill(order, order['price'], 'maker', now)
+
+    def _fill(self, order, price, liquidity, now):
+        self.state_version += 1
+        symbol = order['symbol']
+        market = self.markets[symbol]
+        base, quote = market['base'], market['quote']
+        amount = order['remaining']
+        cost = amount * price
+        fee_rate = self.maker_fee if liquidity == 'maker' else self.taker_fee
+        if order['side'] == 'buy':
+            reserved = self._reserved.pop(order['id'], 0.0)
+            self._used[quote] = self._used.get(quote, 0.0) - reserved
+            self._free[quote] = self._free.get(quote, 0.0) + reserved - cost
+            fee = {'cost': amount * fee_rate, 'currency': base, 'rate': fee_rate}
+            self._free[base] = self._free.get(base, 0.0) + amount - fee['cost']
+        else:
+            reserved = self._reserved.pop(order['id'], 0.0)
+            self._used[base] = self._used.get(base, 0.0) - reserved
+            self._free[base] = self._free.get(base, 0.0) + reserved - amount
+            fee = {'cost': cost * fee_rate, 'currency': quote, 'rate': fee_rate}
+            self._free[quote] = self._free.get(quote, 0.0) + cost - fee['cost']
+        self._open.pop(order['id'], None)
+        order.update({
+            'filled': order['amount'], 'remaining': 0.0, 'cost': cost, 'average': price,
+            'status': 'closed', 'fee': fee, 'lastTradeTimestamp': now
+        })
+        trade = {
+            'id': str(next(self._ids)),
+            'order': order['id'],
+            'timestamp': now,
+            'datetime': _iso(now),
+            'symbol': symbol,
+            'type': order['type'],
+            'side': order['side'],
+            'takerOrMaker': liquidity,
+            'price': price,
+            'amount': amount,
+            'cost': cost,
+            'fee': dict(fee),
+            'info': {},
+        }
+        self._trades[symbol].append(trade)
+        order['trades'].append(trade['id'])
+
+    # ------------------------------------------------------------------
+    # API ccxt: mercados y precisión
+    # ------------------------------------------------------------------
+    def load_markets(self, reload=False):
+        self._api('load_markets')
+        return self.markets
+
+    @property
+    def symbols(self):
+        return list(self.markets)
+
+    def market(self, symbol):
+        if symbol not in self.markets:
+            raise ccxt.BadSymbol(f"simulated no tiene el mercado {symbol}")
+        return self.markets[symbol]
+
+    def amount_to_precision(self, symbol, amount):
+        decimals = self.market(symbol)['precision']['amount']
+        return f"{_truncate(float(amount), decimals):.{decimals}f}"
+
+    def price_to_precision(self, symbol, price):
+        decimals = self.market(symbol)['precision']['price']
+        return f"{round(float(price), decimals):.{decimals}f}"
+
+    def fetch_time(self):
+        self._api('fetch_time')
+        return self.milliseconds()
+
+    def fetch_trading_fee(self, symbol, params=None):
+        self._api('fetch_trading_fee')
+        self.market(symbol)
+        return {'symbol': symbol, 'maker': self.maker_fee, 'taker': self.taker_fee}
+
+    # ------------------------------------------------------------------
+    # API ccxt: datos de mercado
+    # ------------------------------------------------------------------
+    def _ticker(self, symbol):
+        last = self._last.get(symbol)
+        if last is None:
+            raise ccxt.BadSymbol(f"Sin precio para {symbol}")
+        now = self.milliseconds()
+        candles = self._candles[symbol]
+        current = candles[-1] if candles else [now, last, last, last, last, 0.0]
+        day = self._day[symbol]
+        window = day['window']
+        open_ = window[0][1] if window else current[1]
+        high = max(day['max'][0][2], current[2]) if day['max'] else current[2]
+        low = min(day['min'][0][3], current[3]) if day['min'] else current[3]
+        return {
+            'symbol': symbol,
+            'timestamp': now,
+            'datetime': _iso(now),
+            'last': last,
+            'close': last,
+            'bid': last,
+            'ask': last,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'baseVolume': day['volume'] + current[5],
+            'percentage': ((last / open_) - 1) * 100 if open_ else 0.0,
+            'info': {},
+        }
+
+    def fetch_ticker(self, symbol, params=None):
+        self._api('fetch_ticker')
+        with self._lock:
+            self.market(symbol)
+            return self._ticker(symbol)
+
+    def fetch_tickers(self, symbols=None, params=None):
+        self._api('fetch_tickers')
+        with self._lock:
+            wanted = symbols or list(self.markets)
+            return {s: self._ticker(s) for s in wanted if s in self._last}
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self._api('fetch_ohlcv')
+        if timeframe not in TIMEFRAME_SECONDS:
+            raise ccxt.BadRequest(f"Timeframe no soportado: {timeframe}")
+        step = TIMEFRAME_SECONDS[timeframe] * 1000
+        with self._lock:
+            self.market(symbol)
+            source = list(self._candles[symbol])
+        result = []
+        for ts, o, h, l, c, v in source:
+            bucket = ts - ts % step
+            if result and result[-1][0] == bucket:
+                candle = result[-1]
+                candle[2] = max(candle[2], h)
+                candle[3] = min(candle[3], l)
+                candle[4] = c
+                candle[5] += v
+            else:
+                result.append([bucket, o, h, l, c, v])
+        if since is not None:
+            # Como Binance: con `since` se devuelven las primeras `limit` velas desde ese instante
+            result = [c for c in result if c[0] >= since]
+            return result[:limit] if limit else result
+        return result[-limit:] if limit else result
+
+    # ------------------------------------------------------------------
+    # API ccxt: cuenta y órdenes
+    # ------------------------------------------------------------------
+    def fetch_balance(self, params=None):
+        self._api('fetch_balance')
+        with self._lock:
+            assets = set(self._free) | set(self._used)
+            balance = {'free': {}, 'used': {}, 'total': {}, 'info': {}}
+            for asset in assets:
+                free = max(self._free.get(asset, 0.0), 0.0)
+                used = max(self._used.get(asset, 0.0), 0.0)
+                balance[asset] = {'free': free, 'used': used, 'total': free + used}
+                balance['free'][asset] = free
+                balance['used'][asset] = used
+                balance['total'][asset] = free + used
+            return balance
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self._api('create_order')
+        return self._create_order(symbol, type, side, amount, price, params)
+
+    def edit_order(self, id, symbol, type, side, amount=None, price=None, params=None):
+        """Cancel-replace en una sola llamada (como /api/v3/order/cancelReplace de Binance con
+        STOP_ON_FAILURE): si la orden ya no está abierta no se crea la nueva."""
+        self._api('edit_order')
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None or order['symbol'] != symbol or order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"Orden {id} no encontrada o ya cerrada")
+            self._release(order)
+            if amount is None:
+                amount = order['remaining']
+            return self._create_order(symbol, type, side, amount, price, params)
+
+    def _create_order(self, symbol, type, side, amount, price=None, params=None):
+        with self._lock:
+            market = self.market(symbol)
+            base, quote = market['base'], market['quote']
+            amount = _truncate(float(amount), market['precision']['amount'])
+            if side not in ('buy', 'sell'):
+                raise ccxt.InvalidOrder(f"Lado inválido: {side}")
+            if amount < market['limits']['amount']['min']:
+                raise ccxt.InvalidOrder(f"Cantidad {amount} por debajo del mínimo de {symbol}")
+            last = self._last.get(symbol)
+            if last is None:
+                raise ccxt.ExchangeNotAvailable(f"Sin precio de mercado para {symbol}")
+            if type == 'limit':
+                if price is None:
+                    raise ccxt.InvalidOrder("Orden límite sin precio")
+                price = round(float(price), market['precision']['price'])
+                crosses = (side == 'buy' and price >= last) or (side == 'sell' and price <= last)
+                exec_price = last if crosses else price
+            elif type == 'market':
+                slip = self.slippage_bps / 10000.0
+                exec_price = last * (1 + slip) if side == 'buy' else last * (1 - slip)
+                price = None
+                crosses = True
+            else:
+                raise ccxt.InvalidOrder(f"Tipo de orden no soportado: {type}")
+            notional = amount * (price if price is not None else exec_price)
+            if notional < market['limits']['cost']['min']:
+                raise ccxt.InvalidOrder(f"Importe {notional:.4f} por debajo del mínimo ({market['limits']['cost']['min']})")
+
+            # Reserva de fondos
+            if side == 'buy':
+                reserve_asset, reserve = quote, amount * (price if price is not None and not crosses else exec_price)
+            else:
+                reserve_asset, reserve = base, amount
+            if self._free.get(reserve_asset, 0.0) + 1e-12 < reserve:
+                raise ccxt.InsufficientFunds(
+                    f"Saldo insuficiente de {reserve_asset}: {self._free.get(reserve_asset, 0.0):.8f} < {reserve:.8f}")
+            self._free[reserve_asset] = self._free.get(reserve_asset, 0.0) - reserve
+            self._used[reserve_asset] = self._used.get(reserve_asset, 0.0) + reserve
+
+            now = self.milliseconds()
+            order_id = str(next(self._ids))
+            order = {
+                'id': order_id,
+                'clientOrderId': (params or {}).get('clientOrderId'),
+                'timestamp': now,
+                'datetime': _iso(now),
+                'lastTradeTimestamp': None,
+                'symbol': symbol,
+                'type': type,
+                'timeInForce': 'GTC',
+                'side': side,
+                'price': price if price is not None else exec_price,
+                'amount': amount,
+                'filled': 0.0,
+                'remaining': amount,
+                'cost': 0.0,
+                'average': None,
+                'status': 'open',
+                'fee': None,
+                'trades': [],
+                'info': {},
+            }
+            self._orders[order_id] = order
+            self._open[order_id] = order
+            self._reserved[order_id] = reserve
+            self.state_version += 1
+            if crosses:
+                self._fill(order, exec_price, 'taker', now)
+            elif side == 'buy':
+                heapq.heappush(self._bids[symbol], (-price, next(self._seq), order_id))
+            else:
+                heapq.heappush(self._asks[symbol], (price, next(self._seq), order_id))
+            return self._public(order)
+
+    def _release(self, order):
+        market = self.markets[order['symbol']]
+        asset = market['quote'] if order['side'] == 'buy' else market['base']
+        reserved = self._reserved.pop(order['id'], 0.0)
+        self._used[asset] = self._used.get(asset, 0.0) - reserved
+        self._free[asset] = self._free.get(asset, 0.0) + reserved
+        self._open.pop(order['id'], None)
+        order['status'] = 'canceled'
+        self.state_version += 1
+
+    def cancel_order(self, id, symbol=None, params=None):
+        self._api('cancel_order')
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None or (symbol and order['symbol'] != symbol) or order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"Orden {id} no encontrada o ya cerrada")
+            self._release(order)
+            return self._public(order)
+
+    def cancel_all_orders(self, symbol=None, params=None):
+        self._api('cancel_all_orders')
+        with self._lock:
+            canceled = []
+            for order in list(self._open.values()):
+                if symbol is None or order['symbol'] == symbol:
+                    self._release(order)
+                    canceled.append(self._public(order))
+            return canceled
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self._api('fetch_order')
+        with self._lock:
+            order = self._orders.get(str(id))
+            if order is None:
+                raise ccxt.OrderNotFound(f"Orden {id} no encontrada")
+            return self._public(order)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        self._api('fetch_open_orders')
+        with self._lock:
+            orders = [self._public(o) for o in self._open.values()
+                      if symbol is None or o['symbol'] == symbol]
+        return orders[-limit:] if limit else orders
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        self._api('fetch_my_trades')
+        with self._lock:
+            if symbol is not None:
+                trades = list(self._trades.get(symbol, []))
+            else:
+                trades = sorted((t for ts in self._trades.values() for t in ts), key=lambda t: t['timestamp'])
+        if since is not None:
+            trades = [t for t in trades if t['timestamp'] >= since]
+        if limit:
+            trades = trades[-limit:]
+        return [dict(t) for t in trades]
+
+    @staticmethod
+    def _public(order):
+        return dict(order)
+
+    # ------------------------------------------------------------------
+    # Utilidades para tests / backtests
+    # ------------------------------------------------------------------
+    def equity(self, quote='USDC'):
+        """Valor total de la cuenta en `quote` a los últimos precios."""
+        with self._lock:
+            total = 0.0
+            for asset in set(self._free) | set(self._used):
+                qty = self._free.get(asset, 0.0) + self._used.get(asset, 0.0)
+                if asset == quote:
+                    total += qty
+                else:
+                    price = self._last.get(f"{asset}/{quote}")
+                    if price:
+                        total += qty * price
+            return total
+
+    def trades_since(self, symbol, start=0):
+        """Trades de `symbol` desde la posición `start` (sin pasar por la API ni copiar el resto)."""
+        with self._lock:
+            return self._trades[symbol][start:]
+
+    def all_trades(self):
+        with self._lock:
+            return sorted((t for ts in self._trades.values() for t in ts), key=lambda t: t['timestamp'])
+
+
+# ----------------------------------------------------------------------
+# Acceso desde otro proceso (canal de órdenes de core.ipc)
+# ----------------------------------------------------------------------
+def serve(exchange, address):
+    """Expone `exchange` en `address` (socket Unix o tcp://host:puerto). Devuelve el CommandServer."""
+    from core.ipc import CommandServer
+
+    def dispatch(request):
+        if request.get('op') != 'call' or request.get('path') not in API_METHODS + ('set_price', 'feed_candle', 'equity'):
+            raise PermissionError(f"Operación no permitida: {request.get('path')}")
+        return getattr(exchange, request['path'])(*(request.get('args') or []), **(request.get('kwargs') or {}))
+
+    server = CommandServer(address, dispatch)
+    server.start()
+    return server
+
+
+class RemoteSimulatedExchange:
+    """Cliente con la interfaz ccxt de un SimulatedExchange servido con `serve()`.
+    Los errores del simulador se relanzan con su clase de ccxt."""
+    id = 'simulated'
+    sandbox = False
+
+    def __init__(self, address, timeout=30):
+        from core.ipc import CommandClient
+        self._client = CommandClient(address, timeout=timeout)
+        self.urls = {}
+        self.markets = {}
+
+    def _call(self, method, *args, **kwargs):
+        from core.ipc import EngineError
+        try:
+            return self._client.call(method, *args, **kwargs)
+        except EngineError as e:
+            name, _, message = str(e).partition(': ')
+            error_cls = getattr(ccxt, name, None)
+            if isinstance(error_cls, type) and issubclass(error_cls, Exception):
+                raise error_cls(message)
+            raise
+
+    def load_markets(self, reload=False):
+        self.markets = self._call('load_markets')
+        return self.markets
+
+    def market(self, symbol):
+        if symbol not in self.markets:
+            self.load_markets()
+        return self.markets[symbol]
+
+    def __getattr__(self, name):
+        if name not in API_METHODS + ('set_price', 'feed_candle', 'equity'):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
@@ -0,0 +1,134 @@
+# Archivo: core/snapshots.py
+"""Snapshots de balance de todas las cuentas configuradas, en paralelo.
+
+Cada exchange se consulta en un worker de un pool acotado (descifrar credenciales, crear el
+cliente ccxt, balance y tickers) con un timeout por exchange; los que fallan o no responden a
+tiempo usan el último valor conocido (carry-forward). Todas las filas se escriben al final en
+una sola transacción. Un exchange cuya consulta anterior sigue en marcha (p.ej. tras un
+timeout) no se vuelve a lanzar hasta que termine.
+
+La deduplicación entre programadores no depende de intervalos mínimos: `balance_history` tiene
+una fila por exchange y ranura (ver BotDatabase.log_balance_snapshots).
+"""
+import threading
+import time
+from concurrent.futures import wait
+from core.exchange import BinanceConnector
+from utils.executor import BoundedExecutor, ExecutorBusy
+from utils.logger import log
+from utils.metrics import REGISTRY
+
+SNAPSHOT_WORKERS = 4
+SNAPSHOT_TIMEOUT = 20  # segundos por pasada (todas las cuentas en paralelo)
+
+SNAPSHOT_SECONDS = REGISTRY.histogram(
+    'gridbot_balance_snapshot_seconds', 'Duración de la consulta de balance por exchange', ('exchange',),
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60))
+SNAPSHOT_RESULTS = REGISTRY.counter(
+    'gridbot_balance_snapshots_total', 'Snapshots de balance por resultado', ('result',))
+
+
+def exchange_key(exchange):
+    name = exchange.get('name')
+    return f"{name}-testnet" if exchange.get('use_testnet', False) else name
+
+
+class BalanceSnapshotPool:
+    def __init__(self, db, workers=SNAPSHOT_WORKERS, timeout=SNAPSHOT_TIMEOUT, fetcher=None):
+        self.db = db
+        self.timeout = timeout
+        self.fetcher = fetcher or BinanceConnector.fetch_balance_snapshot_static
+        self._executor = BoundedExecutor('snapshots', max_workers=workers, max_queue=workers * 4)
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self.last_run = None
+
+    def _fetch(self, exchange):
+        ex_key = exchange_key(exchange)
+        start = time.perf_counter()
+        try:
+            creds = self.db.get_exchange_credentials(exchange.get('name'))
+            if not (creds.get('success') and creds.get('api_key') and creds.get('secret_key')):
+                return None
+            return self.fetcher(creds.get('api_key'), creds.get('secret_key'), creds.get('passphrase'),
+                                creds.get('use_testnet', False), exchange_type=exchange.get('type', 'binance'),
+                                timeout_ms=int(self.timeout * 1000 / 2))
+        except Exception as e:
+            log.debug("[snapshots] Error consultando %s: %s", ex_key, e)
+            return None
+        finally:
+            SNAPSHOT_SECONDS.labels(ex_key).observe(time.perf_counter() - start)
+            with self._lock:
+                self._in_flight.discard(ex_key)
+
+    def collect(self, exchanges):
+        """Consulta en paralelo. Devuelve {ex_key: equity o None} y la lista de claves sin respuesta."""
+        futures = {}
+        results = {}
+        for exchange in exchanges:
+            ex_key = exchange_key(exchange)
+            with self._lock:
+                if ex_key in self._in_flight:
+                    results[ex_key] = None
+                    SNAPSHOT_RESULTS.labels('still_running').inc()
+                    continue
+                self._in_flight.add(ex_key)
+            try:
+                futures[self._executor.submit(self._fetch, exchange)] = ex_key
+            except ExecutorBusy:
+                with self._lock:
+                    self._in_flight.discard(ex_key)
+                results[ex_key] = None
+                SNAPSHOT_RESULTS.labels('rejected').inc()
+        done, pending = wait(futures, timeout=self.timeout)
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception:
+                results[futures[future]] = None
+        timed_out = [futures[f] for f in pending]
+        for ex_key in timed_out:
+            results[ex_key] = None
+        return results, timed_out
+
+    def run(self, exchanges, carry_forward=True):
+        """Una pasada completa: consulta, carry-forward de los fallidos y escritura en bloque."""
+        if not exchanges:
+            return {"taken": 0, "carried": 0, "failed": 0, "timed_out": 0}
+        start = time.perf_counter()
+        results, timed_out = self.collect(exchanges)
+        now = time.time()
+        rows = []
+        taken = carried = failed = 0
+        for ex_key, equity in results.items():
+            if equity and equity > 0:
+                rows.append((ex_key, equity, now))
+                taken += 1
+                SNAPSHOT_RESULTS.labels('ok').inc()
+                continue
+            last = self.db.get_last_balance_snapshot(ex_key) if carry_forward else None
+            if last:
+                rows.append((ex_key, float(last[1]), now))
+                carried += 1
+                SNAPSHOT_RESULTS.labels('carry_forward').inc()
+            else:
+                failed += 1
+                SNAPSHOT_RESULTS.labels('failed').inc()
+        SNAPSHOT_RESULTS.labels('timeout').inc(len(timed_out))
+        self.db.log_balance_snapshots(rows)
+        summary = {
+            "taken": taken,
+            "carried": carried,
+            "failed": failed,
+            "timed_out": len(timed_out),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+        self.last_run = dict(summary, at=now)
+        if timed_out:
+            log.debug("[snapshots] Sin respuesta a tiempo: %s", ', '.join(timed_out))
+        return summary
+
+    def stats(self):
+        with self._lock:
+            in_flight = sorted(self._in_flight)
+        return {"pool": self._executor.stats(), "in_flight": in_flight, "last_run": self.last_run}
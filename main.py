@@ -1,14 +1,81 @@
 # Archivo: gridbot_binance/main.py
-from core.bot import GridBot
-from utils.logger import log
-from web.server import start_server
-from utils.telegram import send_msg 
+# Los procesos hijos con contexto 'spawn' (pool de KDF, optimizador) vuelven a importar este
+# fichero como __mp_main__: aquí arriba sólo imports ligeros. El bot, la web (BD, auth,
+# executors...) y Telegram se importan dentro de las funciones, sólo en el proceso principal.
 import sys
 import os
+import time
+import argparse
 from dotenv import load_dotenv
 from colorama import Fore, Style
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="GridBot Pro")
+    # single: motor + web en un proceso (por defecto)
+    # engine: sólo el motor; publica su estado por IPC (snapshot mmap + socket Unix)
+    # web:    sólo la web, con varios workers que leen el estado del motor por IPC
+    parser.add_argument('--mode', choices=['single', 'engine', 'web'],
+                        default=os.getenv('GRIDBOT_MODE', 'single'))
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Workers de uvicorn en modo web (por defecto WEB_WORKERS o 2)")
+    return parser.parse_args()
+
+def shutdown(bot):
+    from utils.logger import log
+    from utils.telegram import send_msg, flush as flush_telegram
+
+    # Bloque de limpieza final (se ejecuta SIEMPRE al cerrar)
+    log.blank()
+    log.warning("🛑 Deteniendo sistema...")
+    send_msg("🔌 <b>SISTEMA OFF</b>\nApagando servidor...")
+    
+    # Si el motor del bot estaba corriendo, lo paramos suavemente
+    if bot and bot.is_running:
+        bot.stop_logic()
+        
+    flush_telegram()
+    log.flush()
+    print(f"\n{Fore.GREEN}👋 ¡Sistema cerrado correctamente!{Style.RESET_ALL}\n")
+    sys.exit(0)
+
+def run_engine():
+    from core.bot import GridBot
+    from core.engine import AccountEngine
+    from core.remote import EngineHost
+    from utils.config_service import config_service
+    from utils.logger import log
+    from utils.telegram import send_msg
+    from web.server import attach_bot, start_snapshot_scheduler
+
+    log.info(f"{Fore.CYAN}Iniciando MOTOR (Modo Engine, sin web)...{Style.RESET_ALL}")
+    bot = GridBot()
+    # Runtimes de las demás cuentas (pares con "accounts"), arrancan con el principal
+    AccountEngine(bot)
+    host = EngineHost(bot)
+    try:
+        host.start()
+        config_service.start_watching()
+        # El scheduler de snapshots de balance vive en el motor para no duplicarlo por worker web
+        attach_bot(bot)
+        start_snapshot_scheduler()
+        send_msg("⚙️ <b>MOTOR ONLINE</b>\nEsperando órdenes desde la web.")
+        while True:
+            time.sleep(1)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        host.stop()
+        shutdown(bot)
+
 def main():
+    from core.bot import GridBot
+    from core.engine import AccountEngine
+    from utils.logger import log
+    from utils.telegram import send_msg
+    from web.server import start_server, start_web_workers
+
+    args = parse_args()
+
     # 1. Cargamos la configuración inicial para saber Puerto y Host
     load_dotenv('config/.env', override=True)
     
@@ -16,13 +83,25 @@ def main():
     HOST = os.getenv('WEB_HOST', '0.0.0.0')
     PORT = int(os.getenv('WEB_PORT', 8001)) # Puerto cambiado a 8001 para entorno de pruebas
 
+    if args.mode == 'engine':
+        run_engine()
+        return
+
+    if args.mode == 'web':
+        workers = args.workers or int(os.getenv('WEB_WORKERS', 2))
+        log.info(f"{Fore.CYAN}Iniciando WEB ({workers} workers) conectada al motor por IPC...{Style.RESET_ALL}")
+        log.info(f"Servidor web listo en http://{HOST}:{PORT}")
+        start_web_workers(HOST, PORT, workers=workers)
+        return
+
     log.info(f"{Fore.CYAN}Iniciando Sistema WEB (Modo Servidor)...{Style.RESET_ALL}")
     
     # Alerta inicial a Telegram
     send_msg(f"🖥️ <b>SISTEMA ONLINE (Puerto {PORT})</b>\nServidor web listo para recibir órdenes.")
     
-    # 2. Instanciamos el bot (se queda en standby)
+    # 2. Instanciamos el bot (se queda en standby) y el motor de las demás cuentas
     bot = GridBot()
+    AccountEngine(bot)
     
     log.info(f"Servidor web listo en http://{HOST}:{PORT}")
     log.info("Usa 'pkill -f main.py' o Ctrl+C para detener el sistema.")
@@ -35,16 +114,7 @@ def main():
         pass
     finally:
         # 4. Bloque de limpieza final (se ejecuta SIEMPRE al cerrar)
-        print()
-        log.warning("🛑 Deteniendo sistema...")
-        send_msg("🔌 <b>SISTEMA OFF</b>\nApagando servidor...")
-        
-        # Si el motor del bot estaba corriendo, lo paramos suavemente
-        if bot.is_running:
-            bot.stop_logic()
-            
-        print(f"\n{Fore.GREEN}👋 ¡Sistema cerrado correctamente!{Style.RESET_ALL}\n")
-        sys.exit(0)
+        shutdown(bot)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Backtest de la estrategia de grid sobre un CSV de velas (ts, open, high, low, close, volumen).
+
+Uso:
+  python scripts/backtest.py velas.csv --symbol BTC/USDC --spread 1 --grids 10 --amount 20
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.backtest import Backtester, load_candles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest del grid sobre velas OHLCV")
+    parser.add_argument('csv', help="CSV de velas: ts(ms), open, high, low, close, volumen")
+    parser.add_argument('--symbol', default='BTC/USDC')
+    parser.add_argument('--grids', type=int, default=10, help="grids_quantity")
+    parser.add_argument('--spread', type=float, default=1.0, help="grid_spread (%%)")
+    parser.add_argument('--amount', type=float, default=20, help="amount_per_grid (USDC)")
+    parser.add_argument('--start-mode', default='wait', choices=('wait', 'buy_1', 'buy_2'))
+    parser.add_argument('--trailing', action='store_true', help="trailing_enabled")
+    parser.add_argument('--capital', type=float, default=1000.0, help="USDC iniciales")
+    parser.add_argument('--fee', type=float, default=0.1, help="comisión maker/taker (%%)")
+    args = parser.parse_args()
+
+    strategy = {
+        'grids_quantity': args.grids,
+        'grid_spread': args.spread,
+        'amount_per_grid': args.amount,
+        'start_mode': args.start_mode,
+        'trailing_enabled': args.trailing,
+    }
+    fee = args.fee / 100
+    result = Backtester(args.symbol, strategy, initial_quote=args.capital,
+                        maker_fee=fee, taker_fee=fee).run(load_candles(args.csv))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de los caminos calientes del motor, la base de datos y la web, sin red: exchange
+simulado (core.simulator) y base de datos, auth y config en un directorio temporal.
+
+- grid:        ciclos/s de `_ensure_grid_consistency` con 10/100/1000 niveles (estado estable)
+- stats:       `BotDatabase.get_stats` con 10k y 1M trades
+- save_trades: inserciones/s en lotes de 10 (como el recolector) y de 1000
+- web:         peticiones/s y p50/p99 de /api/status y /api/details con clientes concurrentes
+- collector:   tiempo de una pasada del recolector (sin pausas) según el número de pares
+
+Los resultados se guardan en JSON (por defecto data/benchmarks/benchmark-<fecha>.json) y
+`--compare` muestra la variación frente a una ejecución anterior.
+
+Uso:
+  python scripts/benchmark.py
+  python scripts/benchmark.py --quick --only grid,stats
+  python scripts/benchmark.py --compare data/benchmarks/benchmark-20260101-120000.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SECTIONS = ('grid', 'stats', 'save_trades', 'web', 'collector')
+SYMBOL = 'BTC/USDC'
+
+
+def _sandbox():
+    """Directorio de trabajo temporal con una copia de la configuración: la BD, la clave de
+    cifrado y la BD de auth usan rutas relativas (data/...) y se crean ahí."""
+    workdir = tempfile.mkdtemp(prefix='gridbot-bench-')
+    os.makedirs(os.path.join(workdir, 'config'))
+    shutil.copy(ROOT / 'config' / 'config.json5', os.path.join(workdir, 'config', 'config.json5'))
+    os.chdir(workdir)
+    return workdir
+
+
+def _config(pairs, grids=10, spread=1.0):
+    strategy = {'grids_quantity': grids, 'grid_spread': spread, 'amount_per_grid': 20,
+                'start_mode': 'wait', 'trailing_enabled': False, 'strategy_profile': 'manual'}
+    return {'system': {'cycle_delay': 0}, 'default_strategy': strategy,
+            'pairs': [{'symbol': s, 'enabled': True, 'strategy': dict(strategy)} for s in pairs]}
+
+
+def _bot(pairs, grids=10, spread=1.0, latency=0.0, db=None):
+    from core.simulator import SimulatedExchange
+    from core.exchange import BinanceConnector
+    from core.bot import GridBot
+    from core.planner import PlanExecutor
+    config = _config(pairs, grids, spread)
+    exchange = SimulatedExchange(balances={'USDC': 1e9}, latency=latency, seed=1)
+    for symbol in pairs:
+        exchange.add_market(symbol, price=100.0, price_precision=4)
+        exchange.set_balance(symbol.split('/')[0], 1e6)
+    bot = GridBot(connector=BinanceConnector(exchange=exchange, config=config), db=db,
+                  config=config, notifier=lambda text: None)
+    bot.settle_delay = 0
+    # En el hilo que mide y sin presupuesto de órdenes: se mide el ciclo, no el rate limit
+    bot.executor = PlanExecutor(bot.connector, max_workers=1, rate=None)
+    return exchange, bot
+
+
+def _timeit(fn, min_time=1.0, min_runs=3):
+    """Ejecuta `fn` hasta `min_time` segundos (y al menos `min_runs` veces) -> duraciones en s."""
+    durations = []
+    deadline = time.perf_counter() + min_time
+    while len(durations) < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _summary(durations):
+    ordered = sorted(durations)
+    return {
+        "runs": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+    }
+
+
+# ----------------------------------------------------------------------
+# Secciones
+# ----------------------------------------------------------------------
+def bench_grid(args, db):
+    from utils.logger import log
+    results = {}
+    for levels in (10, 100, 1000):
+        # Spread tal que la rejilla cubra ±20% como mucho
+        spread = min(1.0, 40.0 / levels)
+        exchange, bot = _bot([SYMBOL], grids=levels, spread=spread, db=db)
+        db.set_symbol_setup_done(SYMBOL, True)
+        db.save_trades([{'id': f'grid-seed-{levels}', 'symbol': SYMBOL, 'side': 'buy', 'price': 1.0,
+                         'amount': 1.0, 'cost': 1.0, 'fee': None, 'timestamp': int(time.time() * 1000)}])
+        with log.muted():
+            start = time.perf_counter()
+            bot._ensure_grid_consistency(SYMBOL)
+            first = time.perf_counter() - start
+            # Estado estable: el precio oscila dentro de la banda neutra, no hay órdenes que tocar
+            ticks = iter(range(10 ** 9))
+
+            def cycle():
+                exchange.set_price(SYMBOL, 100.0 + (next(ticks) % 2) * spread * 0.01)
+                bot._ensure_grid_consistency(SYMBOL)
+            durations = _timeit(cycle, args.min_time)
+        summary = _summary(durations)
+        results[str(levels)] = dict(summary, cycles_per_s=round(len(durations) / sum(durations), 1),
+                                    first_cycle_ms=round(first * 1000, 2),
+                                    open_orders=len(exchange.fetch_open_orders(SYMBOL)))
+        db.set_symbol_setup_done(SYMBOL, False)
+        exchange.cancel_all_orders(SYMBOL)
+        print(f"  grid {levels:>5} niveles: {results[str(levels)]['cycles_per_s']} ciclos/s")
+    return results
+
+
+def _seed_trades(db, count, symbols=(SYMBOL, 'ETH/USDC', 'SOL/USDC')):
+    """Inserta `count` trades directamente (executemany) para preparar las consultas."""
+    now_ms = int(time.time() * 1000)
+    rows = ((f'seed-{i}', symbols[i % len(symbols)], 'buy' if i % 2 == 0 else 'sell', 100.0, 0.2, 20.0,
+             0.02, 'USDC_EQ', now_ms - (count - i) * 1000) for i in range(count))
+    with db._get_conn() as conn:
+        conn.execute("DELETE FROM trade_history")
+        conn.executemany('''INSERT INTO trade_history (id, symbol, side, price, amount, cost, fee_cost, fee_currency, timestamp)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+        conn.commit()
+
+
+def bench_stats(args, db):
+    results = {}
+    sizes = (10_000,) if args.quick else (10_000, 1_000_000)
+    for size in sizes:
+        _seed_trades(db, size)
+        session_start = time.time() - size / 2  # la mitad de los trades son de la sesión
+        results[str(size)] = {
+            "global": _summary(_timeit(lambda: db.get_stats(0), args.min_time)),
+            "session": _summary(_timeit(lambda: db.get_stats(session_start), args.min_time)),
+        }
+        print(f"  get_stats {size:>9} trades: {results[str(size)]['global']['p50_ms']} ms")
+    _seed_trades(db, 0)
+    return results
+
+
+def bench_save_trades(args, db):
+    results = {}
+    counter = iter(range(10 ** 9))
+
+    def batch(size):
+        now_ms = int(time.time() * 1000)
+        return [{'id': f'save-{next(counter)}', 'symbol': SYMBOL, 'side': 'buy', 'price': 100.0,
+                 'amount': 0.2, 'cost': 20.0, 'fee': {'cost': 0.02, 'currency': 'USDC'},
+                 'timestamp': now_ms} for _ in range(size)]
+
+    for size in (10, 1000):
+        batches = [batch(size) for _ in range(200 if size == 10 else 5)]
+        start = time.perf_counter()
+        for trades in batches:
+            db.save_trades(trades)
+        elapsed = time.perf_counter() - start
+        results[str(size)] = {
+            "batches": len(batches),
+            "inserts_per_s": round(len(batches) * size / elapsed, 1),
+            "ms_per_batch": round(elapsed / len(batches) * 1000, 3),
+        }
+        print(f"  save_trades lotes de {size:>4}: {results[str(size)]['inserts_per_s']} inserciones/s")
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _load(url, clients, duration):
+    import requests
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                latencies[index].append(time.perf_counter() - start)
+            else:
+                errors[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    merged = [x for per_client in latencies for x in per_client]
+    result = _summary(merged) if merged else {"runs": 0}
+    result.update(requests_per_s=round(len(merged) / elapsed, 1), errors=sum(errors))
+    return result
+
+
+def bench_web(args, db):
+    import uvicorn
+    from web import server
+    exchange, bot = _bot([SYMBOL, 'ETH/USDC'], db=db)
+    _seed_trades(db, 10_000)
+    for symbol in (SYMBOL, 'ETH/USDC'):
+        exchange.set_price(symbol, 100.0)
+        bot._collect_symbol(symbol)
+    server.attach_bot(bot)
+
+    port = _free_port()
+    uv = uvicorn.Server(uvicorn.Config(server.app, host='127.0.0.1', port=port, log_level='error'))
+    thread = threading.Thread(target=uv.run, daemon=True)
+    thread.start()
+    while not uv.started:
+        time.sleep(0.05)
+    results = {}
+    try:
+        for path in ('/api/status', f'/api/details/{SYMBOL}'):
+            results[path] = {}
+            for clients in ((1, 8) if args.quick else (1, 8, 32)):
+                results[path][str(clients)] = _load(f'http://127.0.0.1:{port}{path}', clients, args.min_time * 2)
+                print(f"  {path} con {clients:>2} clientes: {results[path][str(clients)]['requests_per_s']} req/s")
+    finally:
+        uv.should_exit = True
+        thread.join(timeout=10)
+        _seed_trades(db, 0)
+    return results
+
+
+def bench_collector(args, db):
+    from utils.logger import log
+    results = {}
+    for count in (1, 5, 20) if args.quick else (1, 5, 20, 50):
+        pairs = [SYMBOL] + [f'C{i}/USDC' for i in range(count - 1)]
+        exchange, bot = _bot(pairs, db=db, latency=args.latency / 1000)
+        for symbol in pairs:
+            exchange.set_price(symbol, 100.0)
+
+        def sweep():
+            for symbol in pairs:
+                bot._collect_symbol(symbol)
+        with log.muted():
+            durations = _timeit(sweep, args.min_time, min_runs=2)
+        results[str(count)] = dict(_summary(durations), ms_per_pair=round(statistics.fmean(durations) * 1000 / count, 3))
+        print(f"  recolector {count:>3} pares: {results[str(count)]['p50_ms']} ms por pasada")
+    return results
+
+
+BENCHMARKS = {
+    'grid': bench_grid,
+    'stats': bench_stats,
+    'save_trades': bench_save_trades,
+    'web': bench_web,
+    'collector': bench_collector,
+}
+
+
+# ----------------------------------------------------------------------
+# Informe
+# ----------------------------------------------------------------------
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _flatten(data, prefix=''):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current):
+    """Variación porcentual de cada métrica común entre dos informes."""
+    old, new = _flatten(previous.get('results', {})), _flatten(current.get('results', {}))
+    lines = []
+    for name in sorted(set(old) & set(new)):
+        if name.endswith('.runs') or not old[name]:
+            continue
+        change = (new[name] - old[name]) / abs(old[name]) * 100
+        lines.append(f"  {name:<60} {old[name]:>12} -> {new[name]:>12} ({change:+.1f}%)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline del motor, la BD y la web")
+    parser.add_argument('--only', help=f"secciones separadas por comas ({', '.join(SECTIONS)})")
+    parser.add_argument('--quick', action='store_true', help="tamaños reducidos (sin 1M trades ni 50 pares)")
+    parser.add_argument('--min-time', type=float, default=1.0, help="segundos mínimos por medida")
+    parser.add_argument('--latency', type=float, default=0.0, help="latencia simulada del exchange en ms (recolector)")
+    parser.add_argument('--output', help="fichero JSON de resultados")
+    parser.add_argument('--compare', help="informe JSON anterior con el que comparar")
+    args = parser.parse_args()
+
+    sections = [s.strip() for s in args.only.split(',')] if args.only else list(SECTIONS)
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"Secciones desconocidas: {', '.join(sorted(unknown))}")
+    output = Path(args.output).resolve() if args.output else \
+        ROOT / 'data' / 'benchmarks' / f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    previous = json.loads(Path(args.compare).read_text(encoding='utf-8')) if args.compare else None
+
+    workdir = _sandbox()
+    from core.database import BotDatabase
+    db = BotDatabase()
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick,
+            "min_time": args.min_time,
+            "latency_ms": args.latency,
+        },
+        "results": {},
+    }
+    try:
+        for section in sections:
+            print(f"▶ {section}")
+            started = time.perf_counter()
+            report["results"][section] = BENCHMARKS[section](args, db)
+            print(f"  ({time.perf_counter() - started:.1f}s)")
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"Resultados en {output}")
+    if previous:
+        print("Comparación con", args.compare)
+        print("\n".join(compare(previous, report)) or "  (sin métricas comunes)")
+
+
+if __name__ == '__main__':
+    main()
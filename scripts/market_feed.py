@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Registros de datos de mercado para pruebas de carga (ver core/market_feed.py).
+
+  generate: genera un registro sintético (GBM con saltos) para N pares
+  info:     resume un registro (eventos por tipo, símbolos, duración, tamaño)
+
+Para grabar, arrancar el bot con MARKET_RECORD_PATH=<registro>. Para reproducir un registro (o
+precios sintéticos) sobre el exchange simulado: SIM_MARKET_FEED=replay:<registro> o
+SIM_MARKET_FEED=synthetic[:semilla], con SIM_MARKET_SPEED=1|10|max.
+
+Uso:
+  python scripts/market_feed.py generate data/feeds/synthetic-50.bin --pairs 50 --hours 24 --step 1000
+  python scripts/market_feed.py info data/feeds/synthetic-50.bin
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.market_feed import SyntheticMarket, log_summary
+
+
+def _generate(args):
+    symbols = [f"SYN{i}/USDC" for i in range(args.pairs)] if not args.symbols else args.symbols.split(',')
+    market = SyntheticMarket(symbols, step_ms=args.step, seed=args.seed, price=args.price,
+                             volatility=args.volatility, jump_intensity=args.jumps, jump_std=args.jump_std)
+    start = time.perf_counter()
+    count = market.write(args.path, duration_ms=args.hours * 3600 * 1000)
+    print(f"{count} eventos de {len(symbols)} pares en {args.path} ({time.perf_counter() - start:.1f}s)")
+
+
+def _info(args):
+    print(json.dumps(log_summary(args.path), indent=2, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registros de datos de mercado para pruebas de carga")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help="genera un registro sintético")
+    generate.add_argument('path')
+    generate.add_argument('--pairs', type=int, default=50)
+    generate.add_argument('--symbols', help="símbolos separados por comas (en lugar de --pairs)")
+    generate.add_argument('--hours', type=float, default=24.0)
+    generate.add_argument('--step', type=int, default=1000, help="ms entre ticks")
+    generate.add_argument('--seed', type=int, default=None)
+    generate.add_argument('--price', type=float, default=100.0, help="precio inicial")
+    generate.add_argument('--volatility', type=float, default=0.8, help="volatilidad anual de la difusión")
+    generate.add_argument('--jumps', type=float, default=2.0, help="saltos por día")
+    generate.add_argument('--jump-std', type=float, default=0.02, help="desviación del log-salto")
+    generate.set_defaults(func=_generate)
+
+    info = commands.add_parser('info', help="resume un registro")
+    info.add_argument('path')
+    info.set_defaults(func=_info)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
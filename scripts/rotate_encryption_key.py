@@ -0,0 +1,22 @@
+"""Rota la clave Fernet de data/.encryption_key y re-encripta las credenciales de exchanges.
+
+Uso (con el bot parado): python scripts/rotate_encryption_key.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.chdir(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database import DB_PATH, KEY_PATH, rotate_encryption_key
+
+if not os.path.exists(DB_PATH):
+    print(f"BD no encontrada en: {DB_PATH}")
+    raise SystemExit(0)
+
+try:
+    count = rotate_encryption_key()
+except Exception as e:
+    print(f"Error rotando la clave: {e}")
+    raise SystemExit(1)
+print(f"Clave nueva guardada en {KEY_PATH}; {count} exchanges re-encriptados")
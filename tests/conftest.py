@@ -0,0 +1,5 @@
+"""Configuración común de los tests: el directorio del proyecto en sys.path (como scripts/)."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
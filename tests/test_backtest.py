@@ -0,0 +1,41 @@
+"""Tests de core.backtest: el recorrido por eventos da el mismo resultado que evaluar cada punto."""
+import numpy as np
+import pytest
+from core import backtest
+
+# Campos del informe que dependen sólo de la simulación (no del tiempo ni del nº de ciclos)
+COMPARED = ("final_equity", "pnl", "pnl_pct", "fees", "turnover", "buys", "sells", "sharpe",
+            "max_drawdown_pct", "max_drawdown_at", "exposure_avg_pct", "exposure_max_pct",
+            "final_inventory", "final_inventory_value", "open_orders")
+
+
+def _candles(n=600, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    wick = np.abs(rng.normal(0, 0.002, n)) * close
+    high = np.maximum(open_, close) + wick
+    low = np.minimum(open_, close) - wick
+    ts = 1_700_000_000_000 + np.arange(n) * 60_000
+    return np.column_stack((ts, open_, high, low, close, np.ones(n)))
+
+
+def _every_point(prices, start, low, high, block=256):
+    return start
+
+
+@pytest.mark.parametrize("strategy", [
+    {"start_mode": "wait"},
+    {"start_mode": "buy_1", "grid_spread": 0.5},
+    {"start_mode": "buy_2", "grid_spread": 0.3, "trailing_enabled": True},
+])
+def test_event_driven_matches_every_point(monkeypatch, strategy):
+    candles = _candles()
+    events = backtest.run_backtest("BTC/USDC", candles, strategy)
+    monkeypatch.setattr(backtest, "_next_event", _every_point)
+    every = backtest.run_backtest("BTC/USDC", candles, strategy)
+    assert every["cycles"] == len(candles) * 4
+    assert events["cycles"] < every["cycles"]
+    assert events["trades"] == every["trades"] > 0
+    for key in COMPARED:
+        assert events[key] == every[key], key
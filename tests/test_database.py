@@ -0,0 +1,33 @@
+"""Tests de core.database.BotDatabase sobre una BD temporal."""
+import sqlite3
+from core.database import BotDatabase
+
+
+def _trade(trade_id, ts=1_700_000_000_000):
+    return {'id': trade_id, 'symbol': 'BTC/USDC', 'side': 'buy', 'price': 100.0,
+            'amount': 1.0, 'cost': 100.0, 'timestamp': ts}
+
+
+def test_trades_version_changes_on_insert_and_delete(tmp_path):
+    db = BotDatabase(str(tmp_path / 'bot.db'))
+    v0 = db.get_trades_version()
+    db.save_trades([_trade('a'), _trade('b')])
+    v1 = db.get_trades_version()
+    assert v1 > v0
+    db.save_trades([_trade('a')])  # duplicado ignorado: no cambia nada
+    assert db.get_trades_version() == v1
+    # Otro proceso borra un trade por su cuenta: la versión también cambia
+    with sqlite3.connect(db.path) as conn:
+        conn.execute("DELETE FROM trade_history WHERE id='a'")
+    assert db.get_trades_version() > v1
+
+
+def test_balance_snapshot_with_existing_timestamp_is_not_lost(tmp_path):
+    db = BotDatabase(str(tmp_path / 'bot.db'))
+    ts = 1_700_000_000.0
+    assert db.log_balance_snapshots([('binance', 100.0, ts)]) == 1
+    # Mismo instante, otro exchange, en otra escritura: choca con la clave primaria existente
+    assert db.log_balance_snapshots([('kraken', 50.0, ts), ('bybit', 25.0, ts + 1)]) == 2
+    assert db.get_last_balance_snapshot('binance')[1] == 100.0
+    assert db.get_last_balance_snapshot('kraken')[1] == 50.0
+    assert db.get_last_balance_snapshot('bybit')[1] == 25.0
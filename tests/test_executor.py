@@ -0,0 +1,29 @@
+"""Tests de utils.executor.BoundedExecutor: los timeouts no dejan huecos ocupados."""
+import asyncio
+import threading
+from utils.executor import BoundedExecutor
+
+
+def test_timeouts_of_queued_jobs_release_their_slots():
+    pool = BoundedExecutor("test", max_workers=1, max_queue=2)
+    gate = threading.Event()
+
+    async def scenario():
+        for _ in range(3):
+            # Uno ocupa el worker y dos esperan en cola: los tres vencen y los encolados se cancelan
+            results = await asyncio.gather(*(pool.run(gate.wait, timeout=0.05) for _ in range(3)),
+                                           return_exceptions=True)
+            assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+            gate.set()
+            await asyncio.sleep(0.05)
+            gate.clear()
+        return await pool.run(lambda: 42, timeout=1)
+
+    try:
+        assert asyncio.run(scenario()) == 42
+        stats = pool.stats()
+        assert stats["queued"] == 0 and stats["active"] == 0 and stats["rejected"] == 0
+        assert stats["timeouts"] == 9
+    finally:
+        gate.set()
+        pool.shutdown()
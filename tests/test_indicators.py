@@ -0,0 +1,91 @@
+"""Tests de core.indicators: las clases Streaming* dan los mismos valores que la versión por lotes."""
+import numpy as np
+import pytest
+from core import indicators
+
+
+def _series(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.005, n)) * close
+    high = close + spread
+    low = close - spread
+    # Tramo plano: fuerza pérdidas medias nulas (RSI 100) y rango verdadero 0 (ADX)
+    close[200:240] = close[199]
+    high[200:240] = close[199]
+    low[200:240] = close[199]
+    return high, low, close
+
+
+def _stream(indicator, *columns):
+    out = []
+    for values in zip(*columns):
+        value = indicator.update(*values)
+        out.append(np.nan if value is None else value)
+    return np.array(out, dtype=np.float64)
+
+
+def _assert_same(streamed, batch):
+    np.testing.assert_array_equal(np.isnan(streamed), np.isnan(batch))
+    np.testing.assert_allclose(streamed, batch, rtol=1e-12, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("period", [5, 20])
+def test_sma(period):
+    _, _, close = _series()
+    _assert_same(_stream(indicators.StreamingSMA(period), close), indicators.sma(close, period))
+
+
+@pytest.mark.parametrize("period", [5, 20])
+def test_ema(period):
+    _, _, close = _series()
+    _assert_same(_stream(indicators.StreamingEMA(period), close), indicators.ema(close, period))
+
+
+@pytest.mark.parametrize("period", [6, 14])
+def test_rsi(period):
+    _, _, close = _series()
+    _assert_same(_stream(indicators.StreamingRSI(period), close), indicators.rsi(close, period))
+
+
+def test_atr():
+    high, low, close = _series()
+    _assert_same(_stream(indicators.StreamingATR(14), high, low, close), indicators.atr(high, low, close, 14))
+
+
+def test_bollinger():
+    _, _, close = _series()
+    stream = indicators.StreamingBollinger(20, 2.0)
+    rows = [stream.update(c) for c in close]
+    for i, band in enumerate(indicators.bollinger(close, 20, 2.0)):
+        _assert_same(np.array([np.nan if r is None else r[i] for r in rows]), band)
+
+
+@pytest.mark.parametrize("periods_per_year", [None, indicators.PERIODS_PER_YEAR['1h']])
+def test_realized_volatility(periods_per_year):
+    _, _, close = _series()
+    _assert_same(_stream(indicators.StreamingRealizedVolatility(30, periods_per_year), close),
+                 indicators.realized_volatility(close, 30, periods_per_year))
+
+
+def test_adx():
+    high, low, close = _series()
+    stream = indicators.StreamingADX(14)
+    values, plus, minus = [], [], []
+    for h, l, c in zip(high, low, close):
+        value = stream.update(h, l, c)
+        values.append(np.nan if value is None else value)
+        plus.append(np.nan if stream.plus_di is None else stream.plus_di)
+        minus.append(np.nan if stream.minus_di is None else stream.minus_di)
+    batch_adx, batch_plus, batch_minus = indicators.adx(high, low, close, 14)
+    _assert_same(np.array(values), batch_adx)
+    _assert_same(np.array(plus), batch_plus)
+    _assert_same(np.array(minus), batch_minus)
+
+
+def test_batch_rows_match_single_series():
+    _, _, close = _series()
+    _, _, other = _series(seed=11)
+    batch = indicators.rsi(np.vstack((close, other)), 14)
+    _assert_same(batch[0], indicators.rsi(close, 14))
+    _assert_same(batch[1], indicators.rsi(other, 14))
@@ -0,0 +1,84 @@
+"""Tests de core.ipc: el canal de órdenes por TCP exige un secreto compartido."""
+import socket
+import threading
+import time
+import pytest
+from core.ipc import CommandServer, CommandClient, EngineUnavailable
+
+
+def _free_address():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return f"tcp://127.0.0.1:{s.getsockname()[1]}"
+
+
+def test_tcp_channel_requires_a_secret(monkeypatch):
+    monkeypatch.delenv('ENGINE_SECRET', raising=False)
+    with pytest.raises(ValueError):
+        CommandServer(_free_address(), lambda request: None)
+    with pytest.raises(ValueError):
+        CommandClient(_free_address())
+
+
+def test_tcp_channel_authenticates_clients():
+    address = _free_address()
+    server = CommandServer(address, lambda request: request['path'], secret='s3cr3t')
+    server.start()
+    try:
+        assert CommandClient(address, timeout=2, secret='s3cr3t').call('ping') == 'ping'
+        with pytest.raises(EngineUnavailable):
+            CommandClient(address, timeout=2, secret='otro').call('ping')
+    finally:
+        server.stop()
+
+
+def test_request_is_not_resent_after_it_was_written(tmp_path):
+    # Motor que recibe la orden y se cae antes de responder
+    received = []
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(tmp_path / 'engine.sock'))
+    listener.listen(2)
+    listener.settimeout(2)
+
+    def engine():
+        for _ in range(2):
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            with conn, conn.makefile('rb') as reader:
+                received.append(reader.readline())
+
+    thread = threading.Thread(target=engine, daemon=True)
+    thread.start()
+    client = CommandClient(str(tmp_path / 'engine.sock'), timeout=2)
+    with pytest.raises(EngineUnavailable):
+        client.call('connector.place_market_sell', 'BTC/USDC', 1)
+    listener.close()
+    thread.join(3)
+    assert len(received) == 1
+
+
+def test_client_reconnects_after_engine_restart(tmp_path):
+    # Motor que responde una orden por conexión y la cierra (como si se reiniciara)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(tmp_path / 'engine.sock'))
+    listener.listen(2)
+    listener.settimeout(2)
+
+    def engine():
+        for _ in range(2):
+            conn, _ = listener.accept()
+            with conn, conn.makefile('rb') as reader:
+                reader.readline()
+                conn.sendall(b'{"ok": true, "result": "hecho"}\n')
+
+    thread = threading.Thread(target=engine, daemon=True)
+    thread.start()
+    client = CommandClient(str(tmp_path / 'engine.sock'), timeout=2)
+    assert client.call('uno') == 'hecho'
+    time.sleep(0.1)
+    # La conexión persistente está cerrada: se detecta antes de enviar y se reconecta
+    assert client.call('dos') == 'hecho'
+    thread.join(3)
+    listener.close()
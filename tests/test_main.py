@@ -0,0 +1,13 @@
+"""main.py se reimporta como __mp_main__ en los hijos 'spawn' (KDF, optimizador): debe ser ligero."""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_main_does_not_load_web_or_engine():
+    heavy = ('web.server', 'core.bot', 'core.database', 'utils.telegram', 'utils.logger')
+    code = f"import sys, main; print([m for m in {heavy!r} if m in sys.modules])"
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
@@ -0,0 +1,67 @@
+"""Tests de core.planner.plan_orders: diff puro entre niveles deseados y órdenes abiertas."""
+from core.planner import plan_orders, plan_size
+
+
+def _order(order_id, side, price, amount=1.0, remaining=None):
+    return {"id": order_id, "side": side, "price": price, "amount": amount, "remaining": remaining}
+
+
+def test_keeps_orders_already_in_place():
+    targets = [{"price": 100.0, "side": "buy", "amount": 1.0},
+               {"price": 110.0, "side": None, "amount": 1.0}]
+    orders = [_order("a", "buy", 100.0), _order("b", "sell", 110.0)]
+    plan = plan_orders(targets, orders, quote_free=0.0, base_free=0.0)
+    assert [o["id"] for o in plan["keep"]] == ["a", "b"]
+    assert plan_size(plan) == 0
+
+
+def test_side_switch_becomes_amend():
+    # La compra de 100 se ha llenado a medias: el nivel pasa a venta con el saldo base disponible
+    targets = [{"price": 100.0, "side": "sell", "amount": 1.0}]
+    orders = [_order("a", "buy", 100.0)]
+    plan = plan_orders(targets, orders, quote_free=0.0, base_free=1.0)
+    assert plan["create"] == [] and plan["cancel"] == []
+    assert plan["amend"] == [{"side": "sell", "price": 100.0, "amount": 1.0,
+                              "order_id": "a", "old_side": "buy", "old_price": 100.0}]
+
+
+def test_insufficient_balance_on_side_switch_becomes_cancel():
+    targets = [{"price": 100.0, "side": "sell", "amount": 1.0}]
+    orders = [_order("a", "buy", 100.0)]
+    plan = plan_orders(targets, orders, quote_free=0.0, base_free=0.0)
+    assert plan["amend"] == [] and plan["create"] == []
+    assert plan["cancel"] == [{"order_id": "a", "side": "buy", "price": 100.0}]
+
+
+def test_create_only_when_balance_allows():
+    targets = [{"price": 100.0, "side": "buy", "amount": 1.0},
+               {"price": 90.0, "side": "buy", "amount": 1.0}]
+    plan = plan_orders(targets, [], quote_free=150.0, base_free=0.0)
+    assert plan["create"] == [{"side": "buy", "price": 100.0, "amount": 1.0}]
+
+
+def test_orphan_is_reused_for_new_level_of_same_side():
+    # La rejilla se ha movido: la compra de 90 ya no es un nivel y se reutiliza para el de 99
+    targets = [{"price": 99.0, "side": "buy", "amount": 1.0}]
+    orders = [_order("o", "buy", 90.0)]
+    plan = plan_orders(targets, orders, quote_free=10.0, base_free=0.0)
+    assert plan["create"] == [] and plan["cancel"] == []
+    assert plan["amend"] == [{"side": "buy", "price": 99.0, "amount": 1.0,
+                              "order_id": "o", "old_side": "buy", "old_price": 90.0}]
+
+
+def test_unused_orphans_are_cancelled():
+    targets = [{"price": 99.0, "side": "buy", "amount": 1.0}]
+    orders = [_order("o1", "buy", 90.0), _order("o2", "buy", 80.0), _order("s", "sell", 150.0)]
+    plan = plan_orders(targets, orders, quote_free=0.0, base_free=0.0)
+    # Se reutiliza la huérfana de menor precio; las demás se cancelan marcadas como huérfanas
+    assert [a["order_id"] for a in plan["amend"]] == ["o2"]
+    assert sorted(c["order_id"] for c in plan["cancel"]) == ["o1", "s"]
+    assert all(c["orphan"] for c in plan["cancel"])
+
+
+def test_sell_is_trimmed_to_remaining_base():
+    targets = [{"price": 110.0, "side": "sell", "amount": 1.0}]
+    plan = plan_orders(targets, [], quote_free=0.0, base_free=0.995,
+                       round_amount=lambda amount: round(amount, 2))
+    assert plan["create"] == [{"side": "sell", "price": 110.0, "amount": 0.99}]
@@ -0,0 +1,26 @@
+"""Tests de core.remote.EngineHost.dispatch: sólo se aceptan las órdenes de la lista permitida."""
+import pytest
+from types import SimpleNamespace
+from core.remote import EngineHost
+
+
+def _host():
+    exchange = SimpleNamespace(fetch_balance=lambda: {'USDT': 1}, withdraw=lambda *a, **k: 'enviado')
+    connector = SimpleNamespace(exchange=exchange, get_total_balance=lambda asset: 5.0)
+    bot = SimpleNamespace(connector=connector, panic_stop=lambda: 'parado',
+                          _refresh_pairs_map=lambda: None, reset_grid=lambda: 'borrado')
+    return EngineHost(bot)
+
+
+def test_allowed_calls_are_dispatched():
+    host = _host()
+    assert host.dispatch({'op': 'call', 'path': 'panic_stop'}) == 'parado'
+    assert host.dispatch({'op': 'call', 'path': 'connector.get_total_balance', 'args': ['BTC']}) == 5.0
+    assert host.dispatch({'op': 'call', 'path': 'connector.exchange.fetch_balance'}) == {'USDT': 1}
+
+
+@pytest.mark.parametrize('path', ['connector.exchange.withdraw', 'reset_grid', '_refresh_pairs_map',
+                                  'connector.exchange.privatePostSapiV1CapitalWithdrawApply'])
+def test_calls_outside_the_allowlist_are_rejected(path):
+    with pytest.raises(PermissionError):
+        _host().dispatch({'op': 'call', 'path': path})
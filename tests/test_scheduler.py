@@ -0,0 +1,23 @@
+"""Tests de utils.scheduler: una tarea lenta no bloquea a las demás."""
+import threading
+import time
+from utils.scheduler import Scheduler
+
+
+def test_pool_grows_with_registered_jobs():
+    sched = Scheduler('test-scheduler')
+    release = threading.Event()
+    started = []
+    try:
+        # Cuatro tareas que esperan (como un snapshot colgado de la red) y una rápida
+        for i in range(4):
+            sched.every(f'lenta-{i}', 60, lambda i=i: (started.append(i), release.wait(5)), initial_delay=0)
+        sched.every('rapida', 60, lambda: started.append('rapida'), initial_delay=0.1)
+        deadline = time.time() + 2
+        while len(started) < 5 and time.time() < deadline:
+            time.sleep(0.01)
+        assert sorted(map(str, started)) == ['0', '1', '2', '3', 'rapida']
+        assert sched.stats()['workers'] == 5
+    finally:
+        release.set()
+        sched.stop()
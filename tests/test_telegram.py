@@ -0,0 +1,23 @@
+"""Tests de utils.telegram.build_digest: los recortes no rompen el HTML de Telegram."""
+import re
+from utils.telegram import build_digest
+
+
+def _balanced(text):
+    return text.count('<b>') == text.count('</b>') and not re.search(r'&[a-z]*$|<[^>]*$', text)
+
+
+def test_long_message_is_cut_at_a_line_boundary():
+    lines = [f"<b>BTC/USDC</b> compra {i} &amp; venta" for i in range(20)]
+    [chunk] = build_digest(["\n".join(lines)], limit=200)
+    assert len(chunk) <= 200
+    assert _balanced(chunk)
+    assert chunk.startswith(lines[0])
+
+
+def test_single_long_line_drops_markup_before_cutting():
+    text = "<b>" + "A &amp; B " * 50 + "</b>"
+    [chunk] = build_digest([text], limit=101)
+    assert len(chunk) <= 101
+    assert '<b>' not in chunk
+    assert _balanced(chunk)
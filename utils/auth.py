@@ -1,14 +1,97 @@
 # Archivo: utils/auth.py
 import hashlib
+import hmac
 import secrets
 import sqlite3
 import os
+import threading
+import time
+from collections import OrderedDict
+from collections import deque
 from datetime import datetime, timedelta
+from utils.kdf import kdf_pool, KDFBusy
 from utils.logger import log
+from utils.metrics import REGISTRY
 
 # Archivo de base de datos para usuarios
 AUTH_DB = 'data/auth.db'
 
+# --- CACHÉ DE SESIONES ---
+# token -> (caduca_en (monotonic), resultado de verify_session). Las sesiones válidas se
+# cachean SESSION_CACHE_TTL segundos (nunca más allá de su expires_at) y los tokens inválidos
+# NEGATIVE_CACHE_TTL. Cada proceso tiene su propia caché: en despliegues con varios workers un
+# logout tarda como mucho SESSION_CACHE_TTL en verse en los demás.
+SESSION_CACHE_TTL = 60
+NEGATIVE_CACHE_TTL = 5
+SESSION_CACHE_MAX = 1024
+SESSION_SWEEP_INTERVAL = 3600
+_session_cache = OrderedDict()
+_session_cache_lock = threading.Lock()
+_sweeper_started = False
+_cache_requests = REGISTRY.counter(
+    'gridbot_cache_requests_total', 'Consultas a cachés internas por resultado (hit/miss)', ('cache', 'result'))
+_session_hit = _cache_requests.labels('sessions', 'hit')
+_session_miss = _cache_requests.labels('sessions', 'miss')
+
+def _cache_session(token, result, ttl):
+    with _session_cache_lock:
+        _session_cache[token] = (time.monotonic() + ttl, result)
+        _session_cache.move_to_end(token)
+        while len(_session_cache) > SESSION_CACHE_MAX:
+            _session_cache.popitem(last=False)
+
+def _cached_session(token):
+    with _session_cache_lock:
+        entry = _session_cache.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _session_cache[token]
+            return None
+        return entry[1]
+
+def invalidate_cached_sessions(token: str = None, user_id: int = None):
+    """Elimina de la caché un token, todas las sesiones de un usuario o (sin argumentos) todo."""
+    with _session_cache_lock:
+        if token is None and user_id is None:
+            _session_cache.clear()
+            return
+        for key in list(_session_cache.keys()):
+            result = _session_cache[key][1]
+            if key == token or (user_id is not None and result.get("user_id") == user_id):
+                del _session_cache[key]
+
+def purge_expired_sessions() -> int:
+    """Borra de la BD las sesiones caducadas. Devuelve cuántas se han eliminado."""
+    try:
+        conn = sqlite3.connect(AUTH_DB)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM sessions WHERE expires_at < ?', (datetime.now().isoformat(),))
+        deleted = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return deleted
+    except Exception as e:
+        log.error(f"Error purgando sesiones caducadas: {e}")
+        return 0
+
+def _session_sweeper_loop(interval):
+    while True:
+        time.sleep(interval)
+        deleted = purge_expired_sessions()
+        if deleted:
+            log.debug(f"🧹 {deleted} sesiones caducadas eliminadas")
+
+def start_session_sweeper(interval: int = SESSION_SWEEP_INTERVAL):
+    """Arranca (una sola vez por proceso) el hilo que purga periódicamente las sesiones caducadas."""
+    global _sweeper_started
+    with _session_cache_lock:
+        if _sweeper_started:
+            return
+        _sweeper_started = True
+    purge_expired_sessions()
+    threading.Thread(target=_session_sweeper_loop, args=(interval,), daemon=True, name="session-sweeper").start()
+
 def init_auth_db():
     """Inicializa la base de datos de autenticación"""
     os.makedirs('data', exist_ok=True)
@@ -41,24 +124,95 @@ def init_auth_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+    # token ya tiene índice por UNIQUE; estos aceleran la purga y la invalidación por usuario
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)')
     
     conn.commit()
     conn.close()
 
 def hash_password(password: str) -> str:
-    """Hashea una contraseña"""
+    """Hashea una contraseña (PBKDF2 en el pool de procesos; puede lanzar KDFBusy)"""
     salt = secrets.token_hex(16)
-    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-    return f"{salt}${password_hash.hex()}"
+    return f"{salt}${kdf_pool.derive(password, salt)}"
 
 def verify_password(password: str, password_hash: str) -> bool:
-    """Verifica una contraseña contra su hash"""
+    """Verifica una contraseña contra su hash (puede lanzar KDFBusy)"""
     try:
         salt, hash_part = password_hash.split('$')
-        password_check = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return password_check.hex() == hash_part
-    except Exception:
+    except ValueError:
         return False
+    return hmac.compare_digest(kdf_pool.derive(password, salt), hash_part)
+
+# --- LIMITACIÓN DE INTENTOS ---
+BUSY_MESSAGE = "Servidor ocupado, reintenta en unos segundos"
+
+class AuthThrottle:
+    """Limita los intentos de autenticación por IP y por usuario con ventanas deslizantes.
+
+    - Intentos totales por IP (acota el trabajo de KDF que puede generar un cliente).
+    - Fallos por IP y por usuario: al superar el límite se bloquea hasta que salgan de la ventana.
+    Un login correcto limpia los fallos de esa IP y ese usuario.
+    """
+
+    def __init__(self, attempts_per_ip=30, attempts_window=60,
+                 failures_per_ip=20, failures_per_user=5, failures_window=900):
+        self.limits = {
+            'ip_attempts': (attempts_per_ip, attempts_window),
+            'ip_failures': (failures_per_ip, failures_window),
+            'user_failures': (failures_per_user, failures_window),
+        }
+        self._events = {name: {} for name in self.limits}
+        self._lock = threading.Lock()
+
+    def _retry_after(self, name, key, now):
+        limit, window = self.limits[name]
+        events = self._events[name].get(key)
+        if not events:
+            return 0
+        while events and events[0] <= now - window:
+            events.popleft()
+        if not events:
+            del self._events[name][key]
+            return 0
+        if len(events) >= limit:
+            return int(events[0] + window - now) + 1
+        return 0
+
+    def _add(self, name, key, now):
+        self._events[name].setdefault(key, deque()).append(now)
+
+    def check(self, ip: str, username: str = None) -> int:
+        """Registra un intento. Devuelve 0 si se permite o los segundos a esperar si no."""
+        username = (username or '').lower()
+        now = time.monotonic()
+        with self._lock:
+            retry = max(
+                self._retry_after('ip_attempts', ip, now),
+                self._retry_after('ip_failures', ip, now),
+                self._retry_after('user_failures', username, now) if username else 0
+            )
+            if retry:
+                return retry
+            self._add('ip_attempts', ip, now)
+            return 0
+
+    def register_failure(self, ip: str, username: str = None):
+        username = (username or '').lower()
+        now = time.monotonic()
+        with self._lock:
+            self._add('ip_failures', ip, now)
+            if username:
+                self._add('user_failures', username, now)
+
+    def register_success(self, ip: str, username: str = None):
+        username = (username or '').lower()
+        with self._lock:
+            self._events['ip_failures'].pop(ip, None)
+            if username:
+                self._events['user_failures'].pop(username, None)
+
+auth_throttle = AuthThrottle()
 
 def hash_answer(answer: str) -> str:
     """Encripta la respuesta de seguridad"""
@@ -122,6 +276,8 @@ def create_user(username: str, email: str, security_question: int, security_answ
             "username": username
         }
     except Exception as e:
+        if isinstance(e, KDFBusy):
+            return {"success": False, "busy": True, "message": BUSY_MESSAGE}
         log.error(f"Error creando usuario: {e}")
         return {"success": False, "message": "Error al crear el usuario"}
 
@@ -163,6 +319,8 @@ def authenticate_user(username: str, password: str) -> dict:
             "username": username
         }
     except Exception as e:
+        if isinstance(e, KDFBusy):
+            return {"success": False, "busy": True, "message": BUSY_MESSAGE}
         log.error(f"Error autenticando usuario: {e}")
         return {"success": False, "message": "Error al autenticar"}
 
@@ -194,23 +352,34 @@ def create_session(user_id: int) -> str:
         return None
 
 def verify_session(token: str) -> dict:
-    """Verifica una sesión"""
+    """Verifica una sesión (primero en la caché en memoria, después en la BD)"""
+    if not token:
+        return {"success": False}
+    cached = _cached_session(token)
+    if cached is not None:
+        _session_hit.inc()
+        return dict(cached)
+    _session_miss.inc()
     try:
         conn = sqlite3.connect(AUTH_DB)
         cursor = conn.cursor()
         
-        now = datetime.now().isoformat()
+        now = datetime.now()
         cursor.execute('''
-            SELECT u.id, u.username FROM sessions s
+            SELECT u.id, u.username, s.expires_at FROM sessions s
             JOIN users u ON s.user_id = u.id
             WHERE s.token = ? AND s.expires_at > ?
-        ''', (token, now))
+        ''', (token, now.isoformat()))
         
         result = cursor.fetchone()
         conn.close()
         
         if result:
-            return {"success": True, "user_id": result[0], "username": result[1]}
+            session = {"success": True, "user_id": result[0], "username": result[1]}
+            remaining = (datetime.fromisoformat(result[2]) - now).total_seconds()
+            _cache_session(token, session, min(SESSION_CACHE_TTL, remaining))
+            return session
+        _cache_session(token, {"success": False}, NEGATIVE_CACHE_TTL)
         return {"success": False}
     except Exception:
         return {"success": False}
@@ -266,7 +435,7 @@ def reset_password(username: str, security_answer: str) -> dict:
         conn = sqlite3.connect(AUTH_DB)
         cursor = conn.cursor()
         
-        cursor.execute('SELECT security_answer FROM users WHERE username = ?', (username,))
+        cursor.execute('SELECT security_answer, id FROM users WHERE username = ?', (username,))
         result = cursor.fetchone()
         
         if not result:
@@ -282,6 +451,7 @@ def reset_password(username: str, security_answer: str) -> dict:
         cursor.execute('UPDATE users SET password_hash = ? WHERE username = ?', (password_hash, username))
         conn.commit()
         conn.close()
+        invalidate_cached_sessions(user_id=result[1])
         
         log.info(f"✓ Contraseña de '{username}' reseteada")
         
@@ -290,6 +460,8 @@ def reset_password(username: str, security_answer: str) -> dict:
             "message": f"Tu nueva contraseña temporal es: {temp_password}\nCámbiala cuando inicies sesión."
         }
     except Exception as e:
+        if isinstance(e, KDFBusy):
+            return {"success": False, "busy": True, "message": BUSY_MESSAGE}
         log.error(f"Error reseteando password: {e}")
         return {"success": False, "message": "Error al resetear la contraseña"}
 
@@ -303,6 +475,8 @@ def invalidate_session(token: str):
         conn.close()
     except Exception as e:
         log.error(f"Error invalidando sesión: {e}")
+    finally:
+        invalidate_cached_sessions(token=token)
 
 def update_password(username: str, new_password: str) -> dict:
     """Actualiza la contraseña de un usuario"""
@@ -323,9 +497,12 @@ def update_password(username: str, new_password: str) -> dict:
         cursor.execute('UPDATE users SET password_hash = ? WHERE username = ?', (password_hash, username))
         conn.commit()
         conn.close()
+        invalidate_cached_sessions(user_id=user[0])
         
         return {"success": True, "message": "Contraseña actualizada correctamente"}
     except Exception as e:
+        if isinstance(e, KDFBusy):
+            return {"success": False, "busy": True, "message": BUSY_MESSAGE}
         log.error(f"Error actualizando contraseña: {e}")
         return {"success": False, "message": f"Error: {str(e)}"}
 
@@ -0,0 +1,247 @@
+# Archivo: utils/config_service.py
+"""Servicio central de configuración (config/config.json5).
+
+El fichero se parsea UNA vez y se publica como `ConfigSnapshot`: un dict inmutable (las listas
+pasan a tuplas) con accesos tipados a los campos de `system`. Un observador de watchdog (inotify
+en Linux) vigila el fichero y, al cambiar, vuelve a parsearlo y avisa a los suscriptores con
+`callback(nuevo, anterior)`. Nadie necesita hacer stat ni parsear JSON5 en el camino caliente:
+basta con `config_service.get()` o guardar el snapshot recibido.
+
+Este módulo no importa el logger al cargarse (el logger lo usa para leer su nivel).
+"""
+import hashlib
+import os
+import threading
+import time
+import json5
+from utils.metrics import REGISTRY
+
+CONFIG_PATH = 'config/config.json5'
+DEBOUNCE_SECONDS = 0.3
+
+CONFIG_RELOADS = REGISTRY.counter(
+    'gridbot_config_reloads_total', 'Recargas de configuración por resultado', ('result',))
+
+
+def _log():
+    from utils.logger import log
+    return log
+
+
+class FrozenDict(dict):
+    """dict de sólo lectura (sigue siendo serializable con json)."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("La configuración es inmutable: usa config_service.save()")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class ConfigSnapshot(FrozenDict):
+    """Configuración publicada. Se usa como un dict (`cfg['pairs']`, `cfg.get('system', {})`)."""
+
+    def __init__(self, data=None, version=0, source='', loaded_at=None):
+        super().__init__((k, freeze(v)) for k, v in (data or {}).items())
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'source', source)
+        object.__setattr__(self, 'loaded_at', loaded_at or time.time())
+
+    def __setattr__(self, name, value):
+        raise TypeError("ConfigSnapshot es inmutable")
+
+    @property
+    def system(self):
+        return self.get('system', {})
+
+    @property
+    def use_testnet(self) -> bool:
+        return bool(self.system.get('use_testnet', True))
+
+    @property
+    def telegram_enabled(self) -> bool:
+        return bool(self.system.get('telegram_enabled', True))
+
+    @property
+    def log_level(self) -> str:
+        return str(self.system.get('log_level', 'INFO'))
+
+    @property
+    def log_file(self):
+        return self.system.get('log_file')
+
+    @property
+    def cycle_delay(self) -> float:
+        return float(self.system.get('cycle_delay', 5))
+
+    @property
+    def pairs(self):
+        return self.get('pairs', ())
+
+    @property
+    def enabled_pairs(self):
+        return {p['symbol']: p for p in self.pairs if p.get('enabled')}
+
+    def pair(self, symbol):
+        return next((p for p in self.pairs if p.get('symbol') == symbol), None)
+
+
+class ConfigService:
+    def __init__(self, path=CONFIG_PATH, debounce=DEBOUNCE_SECONDS):
+        self.path = path
+        self.debounce = debounce
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._digest = None
+        self._subscribers = []
+        self._observer = None
+        self._timer = None
+
+    # --- Lectura ---
+    def get(self) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._load(initial=True)
+                snapshot = self._snapshot
+        return snapshot
+
+    def _read(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        return source, json5.loads(source)
+
+    def _load(self, initial=False):
+        """Parsea el fichero y publica un snapshot nuevo. Devuelve (nuevo, anterior) o None."""
+        try:
+            source, data = self._read()
+        except Exception as e:
+            CONFIG_RELOADS.labels('error').inc()
+            if initial:
+                print(f"Warning loading configuration: {e}")
+                self._snapshot = ConfigSnapshot({})
+            else:
+                _log().error(f"Error leyendo config.json5: {e}")
+            return None
+        return self._publish(source, data)
+
+    def _publish(self, source, data):
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        if digest == self._digest:
+            CONFIG_RELOADS.labels('unchanged').inc()
+            return None
+        previous = self._snapshot
+        version = previous.version + 1 if previous is not None else 1
+        self._snapshot = ConfigSnapshot(data, version=version, source=source)
+        self._digest = digest
+        CONFIG_RELOADS.labels('ok').inc()
+        return self._snapshot, previous
+
+    # --- Suscripciones ---
+    def subscribe(self, callback):
+        """Registra `callback(nuevo, anterior)`; se llama en el hilo que detecta el cambio."""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, snapshot, previous):
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot, previous)
+            except Exception as e:
+                _log().error(f"Error aplicando configuración en {getattr(callback, '__qualname__', callback)}: {e}")
+
+    def reload(self):
+        """Relee el fichero y avisa si cambió. Devuelve True si se publicó un snapshot nuevo."""
+        with self._lock:
+            if self._snapshot is None:
+                self._load(initial=True)
+                return True
+            result = self._load()
+            if result is None:
+                return False
+            _log().warning(f"🔄 Configuración recargada (v{result[0].version})")
+            self._notify(*result)
+            return True
+
+    def save(self, content: str) -> ConfigSnapshot:
+        """Valida, escribe (atómico) y publica. Lanza ValueError si el JSON5 no es válido."""
+        try:
+            data = json5.loads(content)
+        except Exception as e:
+            raise ValueError(str(e))
+        with self._lock:
+            self.get()
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp, self.path)
+            result = self._publish(content, data)
+            if result is not None:
+                self._notify(*result)
+            return self._snapshot
+
+    # --- Vigilancia del fichero ---
+    def _schedule_reload(self):
+        # Los editores generan varios eventos por guardado: se agrupan
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.reload)
+            self._timer.daemon = True
+            self._timer.name = "config-reload"
+            self._timer.start()
+
+    def start_watching(self):
+        if self._observer is not None:
+            return True
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            _log().warning("watchdog no está instalado: la configuración sólo se recarga al guardarla desde la web.")
+            return False
+
+        target = os.path.abspath(self.path)
+        service = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = (getattr(event, 'src_path', None), getattr(event, 'dest_path', None))
+                if any(p and os.path.abspath(p) == target for p in paths):
+                    service._schedule_reload()
+
+        self.get()
+        observer = Observer()
+        observer.schedule(_Handler(), os.path.dirname(target) or '.', recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._observer = observer
+        return True
+
+    def stop_watching(self):
+        observer, self._observer = self._observer, None
+        if observer is not None:
+            observer.stop()
+            observer.join(timeout=2)
+
+
+config_service = ConfigService()
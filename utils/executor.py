@@ -0,0 +1,116 @@
+# Archivo: gridbot_binance/utils/executor.py
+"""Pool de hilos acotado para descargar trabajo bloqueante desde rutas async.
+
+A diferencia del pool por defecto de Starlette, cada `BoundedExecutor` tiene un número fijo de
+workers y una cola limitada: cuando está lleno rechaza la petición (ExecutorBusy) en lugar de
+acumular trabajo, y `run()` aplica un timeout al lado async. Lleva contadores para exponer la
+profundidad de cola y los rechazos/timeouts.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ExecutorBusy(Exception):
+    """El pool y su cola están llenos."""
+
+
+class BoundedExecutor:
+    def __init__(self, name, max_workers=4, max_queue=16):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_queued = 0
+        self.total_run_time = 0.0
+
+    def _wrap(self, fn, args, kwargs):
+        with self._lock:
+            self._active += 1
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            with self._lock:
+                self.completed += 1
+            return result
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._active -= 1
+                self.total_run_time += elapsed
+
+    def _release(self, future):
+        # Callback del future: se ejecuta al terminar y también si se cancela antes de empezar
+        # (timeout de run() con el trabajo aún en cola), así el hueco nunca se queda ocupado
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """Encola `fn` o lanza ExecutorBusy si no quedan huecos (workers + cola)."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorBusy(f"{self.name}: pool saturado ({self.max_workers} workers, cola {self.max_queue})")
+        with self._lock:
+            self._in_flight += 1
+            self.submitted += 1
+            queued = self._in_flight - self._active
+            if queued > self.max_queued:
+                self.max_queued = queued
+        try:
+            future = self._pool.submit(self._wrap, fn, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """Ejecuta `fn` en el pool y espera el resultado sin bloquear el event loop.
+        Si vence `timeout` se lanza asyncio.TimeoutError: un trabajo aún en cola se cancela y libera su
+        hueco; uno ya en marcha sigue en su worker hasta terminar (los hilos no se pueden interrumpir)
+        y su hueco cuenta contra el límite hasta entonces."""
+        future = self.submit(fn, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": max(self._in_flight - self._active, 0),
+                "max_queued": self.max_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "avg_run_ms": round((self.total_run_time / max(self.completed + self.failed, 1)) * 1000, 2)
+            }
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,77 @@
+# Archivo: utils/kdf.py
+"""Derivación de claves (PBKDF2) fuera del proceso principal.
+
+Las 100.000 iteraciones de PBKDF2 se ejecutan en un pool de procesos pequeño y de baja
+prioridad, con un límite de trabajos simultáneos: una ráfaga de logins no puede robar CPU
+(ni GIL) al motor de trading. Los procesos hijos (contexto 'spawn') importan al arrancar este
+módulo y el script principal (main.py como __mp_main__): este módulo sólo usa la librería
+estándar y main.py deja sus imports pesados (web, BD, bot) dentro de las funciones, así que
+un worker no abre la BD ni arranca executors.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+ITERATIONS = 100000
+KDF_WORKERS = 2
+KDF_MAX_PENDING = 4      # trabajos en vuelo (en ejecución + en cola) antes de rechazar
+KDF_WAIT_TIMEOUT = 5     # segundos esperando hueco antes de rechazar
+KDF_RESULT_TIMEOUT = 30
+
+
+class KDFBusy(Exception):
+    """Demasiadas derivaciones de clave en curso."""
+
+
+def pbkdf2_hex(password: str, salt: str, iterations: int = ITERATIONS) -> str:
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations).hex()
+
+
+def _lower_priority():
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+class KDFPool:
+    def __init__(self, workers=KDF_WORKERS, max_pending=KDF_MAX_PENDING):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._broken = False
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None and not self._broken:
+                try:
+                    ctx = multiprocessing.get_context('spawn')
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                                     initializer=_lower_priority)
+                except (OSError, NotImplementedError, ValueError):
+                    # Entornos sin multiprocessing: se calcula en el propio hilo (limitado igualmente)
+                    self._broken = True
+            return self._pool
+
+    def derive(self, password: str, salt: str, iterations: int = ITERATIONS) -> str:
+        if not self._slots.acquire(timeout=KDF_WAIT_TIMEOUT):
+            raise KDFBusy("Demasiadas operaciones de autenticación en curso")
+        try:
+            pool = self._get_pool()
+            if pool is None:
+                return pbkdf2_hex(password, salt, iterations)
+            return pool.submit(pbkdf2_hex, password, salt, iterations).result(timeout=KDF_RESULT_TIMEOUT)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+kdf_pool = KDFPool()
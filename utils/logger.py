@@ -1,70 +1,274 @@
 # Archivo: gridbot_binance/utils/logger.py
+"""Logger del bot: los hilos sólo encolan, un hilo de fondo formatea y escribe.
+
+- El nivel se comprueba ANTES de formatear: `log.debug("x=%s", valor)` no construye el texto
+  si DEBUG está desactivado (los argumentos se formatean en el hilo escritor).
+- La cola es acotada: si la consola o el disco van lentos se descartan registros (se cuentan)
+  en lugar de bloquear el bucle del grid. Las líneas de estado (`log.status`) se fusionan: sólo
+  se pinta la última pendiente.
+- El nivel se toma del servicio de configuración y se actualiza al recargarla.
+- Además de la consola con colores, cada registro se guarda como una línea JSON en un fichero
+  con rotación por tamaño (data/logs/gridbot.jsonl por defecto).
+"""
+import atexit
+import contextlib
+import json
 import logging
-import json5
 import os
+import queue
+import re
 import sys
+import threading
+import time
+import traceback
 from datetime import datetime
 from colorama import init, Fore, Back, Style
+from utils.metrics import REGISTRY
+from utils.config_service import config_service
 
 # Inicializar colores (autoreset limpia el color tras cada print)
 init(autoreset=True)
 
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'SUCCESS': 25, 'TRADE': 25, 'WARNING': 30, 'ERROR': 40}
+QUEUE_SIZE = 10000
+LOG_FILE = 'data/logs/gridbot.jsonl'
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+
+class RotatingJsonlWriter:
+    """Fichero JSON-lines con rotación por tamaño (gridbot.jsonl -> gridbot.jsonl.1 ...)."""
+
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._fh = None
+        self._size = 0
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._fh = open(self.path, 'a', encoding='utf-8')
+        self._size = self._fh.tell()
+
+    def _rotate(self):
+        self._fh.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def write(self, line):
+        if self._fh is None:
+            self._open()
+        if self._size + len(line) > self.max_bytes and self._size > 0:
+            self._rotate()
+        self._fh.write(line)
+        self._size += len(line)
+
+    def flush(self):
+        if self._fh is not None:
+            self._fh.flush()
+
+
 class BotLogger:
-    def __init__(self, level='INFO'):
-        self.level = level.upper()
+    def __init__(self, level='INFO', log_file=LOG_FILE, queue_size=QUEUE_SIZE):
+        self.set_level(level)
         # Desactivamos logs de librerías ruidosas
         logging.getLogger("urllib3").setLevel(logging.WARNING)
         logging.getLogger("ccxt").setLevel(logging.WARNING)
 
-    def _timestamp(self):
-        return datetime.now().strftime('%H:%M:%S')
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = RotatingJsonlWriter(log_file) if log_file else None
+        self.dropped = 0
+        self.written = 0
+        self.max_depth = 0
+        self._file_errors = 0
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True, name="log-writer")
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def set_level(self, level):
+        self.level = str(level).upper()
+        self._threshold = LEVELS.get(self.level, LEVELS['INFO'])
+
+    def is_enabled(self, level):
+        return LEVELS[level] >= self._threshold
+
+    @contextlib.contextmanager
+    def muted(self):
+        """Descarta los mensajes del hilo actual dentro del bloque (p.ej. un backtest que ejecuta
+        el código del motor no debe llenar la consola ni el fichero del bot en vivo)."""
+        previous = getattr(self._local, 'muted', False)
+        self._local.muted = True
+        try:
+            yield
+        finally:
+            self._local.muted = previous
 
-    def info(self, message):
-        # Mensaje general (Blanco/Gris)
-        print(f"{Fore.LIGHTBLACK_EX}[{self._timestamp()}] {Fore.WHITE}ℹ️  {message}")
+    # --- Lado productor (cualquier hilo): sólo encolar ---
+    def _enqueue(self, level, kind, message, args, extra=None):
+        if getattr(self._local, 'muted', False):
+            return
+        record = (time.time(), level, kind, message, args, threading.current_thread().name, extra)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
 
-    def warning(self, message):
-        # Alerta (Amarillo)
-        print(f"{Fore.LIGHTBLACK_EX}[{self._timestamp()}] {Fore.YELLOW}⚠️  {message}")
+    def info(self, message, *args):
+        if self._threshold <= 20:
+            self._enqueue('INFO', 'info', message, args)
 
-    def error(self, message):
-        # Error (Rojo brillante)
-        print(f"{Fore.LIGHTBLACK_EX}[{self._timestamp()}] {Fore.RED}{Style.BRIGHT}❌ ERROR: {message}")
+    def warning(self, message, *args):
+        if self._threshold <= 30:
+            self._enqueue('WARNING', 'warning', message, args)
 
-    def success(self, message):
-        # Éxito (Verde)
-        print(f"{Fore.LIGHTBLACK_EX}[{self._timestamp()}] {Fore.GREEN}✅ {message}")
+    # Alias usado en algunos puntos de la web
+    warn = warning
 
-    def debug(self, message):
+    def error(self, message, *args):
+        self._enqueue('ERROR', 'error', message, args)
+
+    def exception(self, message, *args):
+        """Como error() pero añade la traza de la excepción en curso (capturada aquí, en el hilo que falla)."""
+        self._enqueue('ERROR', 'error', message, args, {'exc': traceback.format_exc()})
+
+    def success(self, message, *args):
+        if self._threshold <= 25:
+            self._enqueue('SUCCESS', 'success', message, args)
+
+    def debug(self, message, *args):
         """Logs de depuración: se muestran sólo si el nivel es DEBUG"""
-        if self.level == 'DEBUG':
-            print(f"{Fore.LIGHTBLACK_EX}[{self._timestamp()}] {Fore.CYAN}🐞 DEBUG: {message}")
+        if self._threshold <= 10:
+            self._enqueue('DEBUG', 'debug', message, args)
 
     def trade(self, symbol, side, price, amount):
         # Operación (Formato especial muy visible)
-        ts = self._timestamp()
-        if side.lower() == 'buy':
-            # Fondo Verde letra Blanca
-            print(f"\n{Back.GREEN}{Fore.WHITE} ⚡ COMPRA {symbol} {Style.RESET_ALL} {Fore.GREEN}@{price} | Cant: {amount} | Hora: {ts}")
-        else:
-            # Fondo Rojo letra Blanca
-            print(f"\n{Back.RED}{Fore.WHITE} 💰 VENTA  {symbol} {Style.RESET_ALL} {Fore.RED}@{price} | Cant: {amount} | Hora: {ts}")
-        print() # Espacio extra
+        self._enqueue('TRADE', 'trade', '', (), {'symbol': symbol, 'side': side, 'price': price, 'amount': amount})
 
     def status(self, message):
-        # BARRA DE ESTADO (Sobreescribe la línea actual)
-        # \r vuelve al principio de la línea, end='' evita el salto de línea
-        sys.stdout.write(f"\r{Fore.CYAN}{Style.BRIGHT}🤖 ESTADO: {Fore.RESET}{message} " + " " * 10)
-        sys.stdout.flush()
-
-config_path = 'config/config.json5'
-level = 'INFO'
-try:
-    if os.path.exists(config_path):
-        with open(config_path, 'r') as f:
-            config = json5.load(f)
-            level = config['system'].get('log_level', 'INFO')
-except Exception as e:
-    print(f"Warning loading logger configuration: {e}")
-
-log = BotLogger(level=level)
\ No newline at end of file
+        # BARRA DE ESTADO (Sobreescribe la línea actual). No va al fichero.
+        self._enqueue('INFO', 'status', message, ())
+
+    def blank(self):
+        """Línea en blanco en consola (p.ej. para cortar la barra de estado)."""
+        self._enqueue('INFO', 'blank', '', ())
+
+    def flush(self, timeout=2.0):
+        """Espera a que el hilo escritor vacíe la cola (cierre ordenado)."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+        if self._file is not None:
+            try:
+                self._file.flush()
+            except Exception:
+                pass
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "max_depth": self.max_depth,
+                "written": self.written, "dropped": self.dropped, "file_errors": self._file_errors}
+
+    # --- Lado consumidor (hilo log-writer) ---
+    @staticmethod
+    def _render(message, args):
+        if not args:
+            return str(message)
+        try:
+            return str(message) % args
+        except (TypeError, ValueError):
+            return ' '.join([str(message)] + [str(a) for a in args])
+
+    def _console(self, ts, kind, text, extra):
+        stamp = datetime.fromtimestamp(ts).strftime('%H:%M:%S')
+        prefix = f"{Fore.LIGHTBLACK_EX}[{stamp}] "
+        if kind == 'status':
+            sys.stdout.write(f"\r{Fore.CYAN}{Style.BRIGHT}🤖 ESTADO: {Fore.RESET}{text} " + " " * 10)
+            sys.stdout.flush()
+        elif kind == 'blank':
+            print()
+        elif kind == 'info':
+            # Mensaje general (Blanco/Gris)
+            print(f"{prefix}{Fore.WHITE}ℹ️  {text}")
+        elif kind == 'warning':
+            # Alerta (Amarillo)
+            print(f"{prefix}{Fore.YELLOW}⚠️  {text}")
+        elif kind == 'error':
+            # Error (Rojo brillante)
+            print(f"{prefix}{Fore.RED}{Style.BRIGHT}❌ ERROR: {text}")
+            if extra and extra.get('exc'):
+                print(f"{Fore.RED}{extra['exc'].rstrip()}")
+        elif kind == 'success':
+            # Éxito (Verde)
+            print(f"{prefix}{Fore.GREEN}✅ {text}")
+        elif kind == 'debug':
+            print(f"{prefix}{Fore.CYAN}🐞 DEBUG: {text}")
+        elif kind == 'trade':
+            symbol, side, price, amount = extra['symbol'], extra['side'], extra['price'], extra['amount']
+            if str(side).lower() == 'buy':
+                # Fondo Verde letra Blanca
+                print(f"\n{Back.GREEN}{Fore.WHITE} ⚡ COMPRA {symbol} {Style.RESET_ALL} {Fore.GREEN}@{price} | Cant: {amount} | Hora: {stamp}")
+            else:
+                # Fondo Rojo letra Blanca
+                print(f"\n{Back.RED}{Fore.WHITE} 💰 VENTA  {symbol} {Style.RESET_ALL} {Fore.RED}@{price} | Cant: {amount} | Hora: {stamp}")
+            print() # Espacio extra
+
+    def _to_file(self, ts, level, kind, text, thread, extra):
+        if self._file is None or kind in ('status', 'blank'):
+            return
+        entry = {"ts": datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'),
+                 "level": level, "thread": thread, "msg": _ANSI_RE.sub('', text)}
+        if extra:
+            entry.update(extra)
+        try:
+            self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        except Exception:
+            self._file_errors += 1
+
+    def _writer_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Drenar lo que haya pendiente de una vez (menos llamadas a flush)
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            last_status = max((i for i, r in enumerate(batch) if r[2] == 'status'), default=-1)
+            for i, (ts, level, kind, message, args, thread, extra) in enumerate(batch):
+                try:
+                    if kind == 'status' and i != last_status:
+                        continue  # estados intermedios obsoletos
+                    text = self._render(message, args)
+                    self._console(ts, kind, text, extra)
+                    self._to_file(ts, level, kind, text, thread, extra)
+                    self.written += 1
+                except Exception:
+                    pass
+            try:
+                sys.stdout.flush()
+                if self._file is not None:
+                    self._file.flush()
+            except Exception:
+                pass
+            for _ in batch:
+                self._queue.task_done()
+
+
+_config = config_service.get()
+log = BotLogger(level=_config.log_level, log_file=_config.log_file or LOG_FILE)
+config_service.subscribe(lambda new, old: log.set_level(new.log_level))
+
+REGISTRY.gauge_fn('gridbot_log_queue_depth', 'Registros de log pendientes de escribir', lambda: log._queue.qsize())
+REGISTRY.gauge_fn('gridbot_log_dropped', 'Registros de log descartados por cola llena', lambda: log.dropped)
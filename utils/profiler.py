@@ -0,0 +1,137 @@
+# Archivo: utils/profiler.py
+"""Profiler por muestreo activable en caliente.
+
+Un hilo toma cada `interval` segundos las pilas de los hilos vivos (`sys._current_frames()`)
+durante `duration` segundos y acumula cuántas veces aparece cada pila. Cuando está apagado no
+hay hilo ni hooks: coste cero. El resultado se exporta como:
+  - pilas colapsadas ("hilo;func1;func2 N"), compatibles con flamegraph.pl / speedscope
+  - tabla de funciones con muestras propias (hoja) y totales (inclusivas)
+
+Los hilos del sistema tienen nombre (engine-monitor, engine-collector, scheduler-job_N,
+web-read_N, AnyIO worker thread, MainThread...) para poder filtrarlos por prefijo.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 300
+MAX_DEPTH = 128
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stacks = Counter()
+        self._samples = 0
+        self._started_at = None
+        self._finished_at = None
+        self._duration = 0
+        self._interval = DEFAULT_INTERVAL
+        self._thread_prefixes = None
+        self._sample_cost = 0.0
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=30, interval=DEFAULT_INTERVAL, threads=None):
+        """Arranca una sesión de muestreo. `threads`: prefijos de nombre de hilo a muestrear
+        (None = todos). Devuelve False si ya hay una sesión en curso."""
+        with self._lock:
+            if self.is_running():
+                return False
+            self._stacks = Counter()
+            self._samples = 0
+            self._sample_cost = 0.0
+            self._duration = max(1, min(float(duration), MAX_DURATION))
+            self._interval = max(0.001, float(interval))
+            self._thread_prefixes = tuple(threads) if threads else None
+            self._started_at = time.time()
+            self._finished_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="profiler-sampler")
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=2)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + self._duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            t0 = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = names.get(thread_id, f"thread-{thread_id}")
+                if self._thread_prefixes and not name.startswith(self._thread_prefixes):
+                    continue
+                stack = []
+                depth = 0
+                while frame is not None and depth < MAX_DEPTH:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                    depth += 1
+                stack.append(name)
+                stack.reverse()
+                self._stacks[tuple(stack)] += 1
+            self._samples += 1
+            self._sample_cost += time.perf_counter() - t0
+            self._stop.wait(self._interval)
+        self._finished_at = time.time()
+
+    def status(self):
+        return {
+            "running": self.is_running(),
+            "started_at": self._started_at,
+            "finished_at": self._finished_at,
+            "duration": self._duration,
+            "interval_ms": round(self._interval * 1000, 2),
+            "threads": list(self._thread_prefixes) if self._thread_prefixes else None,
+            "samples": self._samples,
+            "avg_sample_ms": round(self._sample_cost / self._samples * 1000, 3) if self._samples else 0.0
+        }
+
+    def collapsed(self):
+        """Pilas colapsadas (una línea por pila: 'hilo;raíz;...;hoja N')."""
+        lines = [f"{';'.join(stack)} {count}" for stack, count in self._stacks.most_common()]
+        return '\n'.join(lines) + ('\n' if lines else '')
+
+    def top(self, limit=30):
+        """Funciones ordenadas por muestras propias (la función estaba en la cima de la pila)."""
+        own = Counter()
+        total = Counter()
+        for stack, count in list(self._stacks.items()):
+            frames = stack[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = sum(self._stacks.values()) or 1
+        rows = []
+        for func, count in own.most_common(limit):
+            rows.append({
+                "function": func,
+                "self_samples": count,
+                "self_pct": round(count / samples * 100, 2),
+                "total_samples": total[func],
+                "total_pct": round(total[func] / samples * 100, 2)
+            })
+        return {"samples": samples, "functions": rows}
+
+
+profiler = SamplingProfiler()
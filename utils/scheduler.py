@@ -0,0 +1,301 @@
+# Archivo: utils/scheduler.py
+"""Planificador de tareas periódicas (motor y web).
+
+Un único hilo mantiene un heap ordenado por próxima ejecución y despierta sólo cuando toca la
+siguiente tarea; las tareas se ejecutan en un pool con un hilo por tarea registrada (como una
+tarea nunca se solapa consigo misma no hacen falta más), así una lenta (p.ej. un snapshot de
+balance esperando a la red) no retrasa a las demás. Cada tarea define:
+
+- modo `rate` (ritmo fijo: cada `interval` desde la ejecución *programada*) o `delay`
+  (pausa fija: `interval` desde que *terminó* la anterior), o `daily` a una hora local.
+- `jitter`: retraso aleatorio añadido a cada ejecución (reparte llamadas a APIs).
+- `align`: en modo `rate`, la primera ejecución cae en un múltiplo exacto del intervalo
+  (p.ej. snapshots de balance en el segundo 0 de cada minuto).
+- `misfire`: qué hacer si se pasó la hora (p.ej. el proceso estuvo bloqueado): `skip` salta a la
+  siguiente ranura, `coalesce` ejecuta una vez ya y sigue desde ahí. Nunca se ejecuta N veces.
+- Sin solapes: si la ejecución anterior sigue en marcha, la ranura se cuenta como saltada.
+
+Métricas por tarea: duración (`gridbot_job_seconds`) y ejecuciones por resultado.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from utils.metrics import REGISTRY
+
+JOB_SECONDS = REGISTRY.histogram(
+    'gridbot_job_seconds', 'Duración de las tareas programadas', ('job',),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+JOB_RUNS = REGISTRY.counter(
+    'gridbot_job_runs_total', 'Ejecuciones de tareas programadas por resultado', ('job', 'result'))
+
+MODES = ('rate', 'delay', 'daily')
+MAX_WORKERS = 32  # tope de hilos del pool aunque haya más tareas registradas
+MISFIRE_POLICIES = ('skip', 'coalesce')
+
+
+def _log():
+    from utils.logger import log
+    return log
+
+
+def _seconds_until(hour, minute):
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class Job:
+    def __init__(self, name, fn, interval, mode='rate', jitter=0.0, misfire='skip',
+                 misfire_grace=None, at=None, args=(), kwargs=None):
+        if mode not in MODES:
+            raise ValueError(f"Modo desconocido: {mode}")
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Política de misfire desconocida: {misfire}")
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.interval = float(interval)
+        self.mode = mode
+        self.jitter = float(jitter)
+        self.misfire = misfire
+        # Margen tras la hora programada en el que todavía se considera "a tiempo"
+        self.misfire_grace = misfire_grace if misfire_grace is not None else min(max(self.interval * 0.5, 1.0), 60.0)
+        self.at = at
+        self.next_run = None      # monotonic de la próxima ranura (sin jitter)
+        self.running = False
+        self.cancelled = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.missed = 0
+        self.last_run = None      # time.time() del último inicio
+        self.last_duration = None
+        self.last_error = None
+        self._duration = JOB_SECONDS.labels(name)
+
+    def _after_run(self, scheduled, finished):
+        """Próxima ranura tras una ejecución (o tras saltarla)."""
+        if self.mode == 'daily':
+            return finished + _seconds_until(*self.at)
+        if self.mode == 'delay':
+            return finished + self.interval
+        return scheduled + self.interval
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "interval": self.interval if self.mode != 'daily' else None,
+            "at": f"{self.at[0]:02d}:{self.at[1]:02d}" if self.at else None,
+            "running": self.running,
+            "next_run_in": round(self.next_run - time.monotonic(), 2) if self.next_run is not None else None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_overlap": self.skipped,
+            "missed": self.missed,
+            "last_run": self.last_run,
+            "last_duration_ms": round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            "last_error": self.last_error
+        }
+
+
+class Scheduler:
+    def __init__(self, name='scheduler', workers=None):
+        """`workers`: hilos del pool; None = uno por tarea registrada (crece al dar de alta tareas)."""
+        self.name = name
+        self.fixed_workers = workers
+        self.workers = workers or 1
+        self._heap = []
+        self._seq = itertools.count()
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._pool = None
+        self._thread = None
+        self._running = False
+
+    # --- Alta / baja de tareas ---
+    def every(self, name, interval, fn, *args, mode='rate', jitter=0.0, misfire='skip',
+              misfire_grace=None, align=False, initial_delay=None, **kwargs):
+        """Programa `fn(*args, **kwargs)` cada `interval` segundos (sustituye otra con el mismo nombre)."""
+        job = Job(name, fn, interval, mode=mode, jitter=jitter, misfire=misfire,
+                  misfire_grace=misfire_grace, args=args, kwargs=kwargs)
+        if initial_delay is not None:
+            first = initial_delay
+        elif align and mode == 'rate':
+            first = job.interval - (time.time() % job.interval)
+        else:
+            first = job.interval
+        return self._add(job, time.monotonic() + first)
+
+    def daily(self, name, hour, minute, fn, *args, jitter=0.0, **kwargs):
+        """Programa `fn` una vez al día a la hora local indicada."""
+        job = Job(name, fn, 86400, mode='daily', jitter=jitter, at=(hour, minute),
+                  misfire_grace=3600, args=args, kwargs=kwargs)
+        return self._add(job, time.monotonic() + _seconds_until(hour, minute))
+
+    def _add(self, job, first_run):
+        with self._cond:
+            previous = self._jobs.get(job.name)
+            if previous is not None:
+                previous.cancelled = True
+            job.next_run = first_run
+            self._jobs[job.name] = job
+            heapq.heappush(self._heap, (first_run, next(self._seq), job))
+            self._fit_pool()
+            self._cond.notify()
+        self.start()
+        return job
+
+    def _fit_pool(self):
+        """Amplía el pool hasta un hilo por tarea (con `_cond` tomado). El pool anterior termina lo
+        que tenga en marcha y se cierra solo; nunca se reduce al cancelar tareas."""
+        if self.fixed_workers:
+            return
+        needed = min(max(len(self._jobs), 1), MAX_WORKERS)
+        if needed <= self.workers:
+            return
+        self.workers = needed
+        if self._pool is not None:
+            previous = self._pool
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.name}-job")
+            previous.shutdown(wait=False)
+
+    def cancel(self, name):
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.cancelled = True
+                self._cond.notify()
+        return job is not None
+
+    def run_now(self, name):
+        """Adelanta la próxima ejecución de una tarea a este momento."""
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None:
+                return False
+            job.next_run = time.monotonic()
+            heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+            self._cond.notify()
+        return True
+
+    # --- Bucle ---
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.name}-job")
+            self._thread = threading.Thread(target=self._loop, daemon=True, name=self.name)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due, _, job = self._heap[0]
+                    # Entradas obsoletas: tarea cancelada o reprogramada
+                    if job.cancelled or due != job.next_run:
+                        heapq.heappop(self._heap)
+                        continue
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(wait)
+                else:
+                    return
+            self._dispatch(job, due)
+
+    def _reschedule(self, job, next_run):
+        with self._cond:
+            if job.cancelled:
+                return
+            job.next_run = next_run
+            heapq.heappush(self._heap, (next_run, next(self._seq), job))
+            self._cond.notify()
+
+    def _dispatch(self, job, scheduled):
+        now = time.monotonic()
+        if job.running:
+            # Sin solapes: la ranura se pierde y se programa la siguiente (en 'delay' lo hará el fin)
+            job.skipped += 1
+            JOB_RUNS.labels(job.name, 'skipped_overlap').inc()
+            if job.mode == 'rate':
+                self._reschedule(job, self._next_slot(job, scheduled, now))
+            return
+        late = now - scheduled
+        if late > job.misfire_grace and job.misfire == 'skip' and job.mode != 'daily':
+            job.missed += 1
+            JOB_RUNS.labels(job.name, 'missed').inc()
+            self._reschedule(job, self._next_slot(job, scheduled, now))
+            return
+        job.running = True
+        if job.mode == 'rate':
+            # Ritmo fijo: la siguiente ranura no depende de lo que tarde esta ejecución
+            self._reschedule(job, self._next_slot(job, scheduled, now))
+        delay = random.uniform(0, job.jitter) if job.jitter > 0 else 0.0
+        try:
+            # Con `_cond` tomado: `_fit_pool` puede estar sustituyendo el pool en otro hilo
+            with self._cond:
+                self._pool.submit(self._execute, job, scheduled, delay)
+        except RuntimeError:
+            job.running = False
+
+    @staticmethod
+    def _next_slot(job, scheduled, now):
+        next_run = job._after_run(scheduled, now)
+        if job.mode == 'rate' and next_run <= now:
+            # Varias ranuras perdidas: se salta a la siguiente futura (nunca se ejecutan en ráfaga)
+            missed = int((now - next_run) // job.interval) + 1
+            next_run += missed * job.interval
+        return next_run
+
+    def _execute(self, job, scheduled, delay):
+        if delay:
+            time.sleep(delay)
+        job.last_run = time.time()
+        start = time.perf_counter()
+        try:
+            job.fn(*job.args, **job.kwargs)
+            job.runs += 1
+            job.last_error = None
+            JOB_RUNS.labels(job.name, 'ok').inc()
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            JOB_RUNS.labels(job.name, 'error').inc()
+            _log().error(f"Error en tarea programada '{job.name}': {e}")
+        finally:
+            job.last_duration = time.perf_counter() - start
+            job._duration.observe(job.last_duration)
+            job.running = False
+            if job.mode != 'rate':
+                self._reschedule(job, job._after_run(scheduled, time.monotonic()))
+
+    def jobs(self):
+        with self._cond:
+            return list(self._jobs.values())
+
+    def stats(self):
+        return {"running": self._running, "workers": self.workers, "jobs": [job.stats() for job in self.jobs()]}
+
+
+scheduler = Scheduler()
@@ -1,58 +1,214 @@
 # Archivo: gridbot_binance/utils/telegram.py
+"""Envío de mensajes a Telegram desde un único hilo despachador.
+
+`send_msg` sólo encola (cola acotada, nunca bloquea al bot). El hilo `telegram-dispatcher`
+envía con una `requests.Session` persistente respetando el límite por chat: los mensajes que
+llegan mientras espera turno (p.ej. una ráfaga de fills) se agrupan en un único resumen.
+Si Telegram responde 429 se espera el `retry_after` indicado y se reintenta.
+
+El flag `telegram_enabled` se toma del servicio de configuración y se actualiza al recargarla,
+en lugar de volver a parsear el JSON5 en cada mensaje.
+"""
+import html
+import re
 import requests
 import os
+import queue
 import threading
-import json5
+import time
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from utils.logger import log
+from utils.metrics import REGISTRY
+from utils.config_service import config_service
 
 # Cargamos variables de entorno
 load_dotenv(dotenv_path='config/.env')
 
 TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
-CONFIG_PATH = 'config/config.json5'
-
-def _check_enabled():
-    """Lee la configuración para ver si Telegram está activado"""
-    try:
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, 'r') as f:
-                conf = json5.load(f)
-                return conf.get('system', {}).get('telegram_enabled', True)
-    except Exception as e:
-        log.debug(f"Error reading telegram config: {e}")
-        return True  # En caso de duda, activado
-    return True
-
-def _send_request(message):
-    """Función interna que hace la petición HTTP"""
-    if not TOKEN or not CHAT_ID:
-        return
-    
-    # Comprobación de configuración
-    if not _check_enabled():
-        return
-    
-    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
-    payload = {
-        "chat_id": CHAT_ID,
-        "text": message,
-        "parse_mode": "HTML"
-    }
-    
-    try:
-        requests.post(url, data=payload, timeout=5)
-    except Exception as e:
-        log.error(f"Error enviando Telegram: {e}")
+
+QUEUE_SIZE = 200
+MIN_INTERVAL = 1.0        # segundos entre mensajes al mismo chat (límite de Telegram ~1 msg/s)
+MAX_MESSAGE_LEN = 4096    # límite de Telegram por mensaje
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = 5
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+TRUNCATED_MARK = "\n…"
+_TAG_RE = re.compile(r'<[^>]*>')
+
+# Mensajes pendientes de envío y resultado de los envíos
+_pending = REGISTRY.gauge('gridbot_telegram_queue_depth', 'Mensajes de Telegram pendientes de enviar')
+_sent = REGISTRY.counter('gridbot_telegram_messages_total', 'Mensajes de Telegram procesados por resultado', ('result',))
+
+
+def truncate_html(text, limit=MAX_MESSAGE_LEN):
+    """Recorta un mensaje HTML a `limit` caracteres sin partir etiquetas ni entidades (&amp;...):
+    se corta en el último salto de línea que quepa. Si no hay ninguno, se quita el marcado y se
+    recorta el texto plano, escapándolo de nuevo."""
+    if len(text) <= limit:
+        return text
+    budget = limit - len(TRUNCATED_MARK)
+    cut = text.rfind('\n', 0, budget + 1)
+    if cut > 0:
+        return text[:cut] + TRUNCATED_MARK
+    plain = html.unescape(_TAG_RE.sub('', text))
+    size = budget
+    while True:
+        escaped = html.escape(plain[:size], quote=False)
+        if len(escaped) <= budget:
+            return escaped + TRUNCATED_MARK
+        size -= len(escaped) - budget
+
+
+def build_digest(messages, limit=MAX_MESSAGE_LEN):
+    """Agrupa mensajes en el menor número de textos que quepan en el límite de Telegram."""
+    chunks = []
+    current = ''
+    for text in messages:
+        text = truncate_html(text, limit)
+        if current and len(current) + len(DIGEST_SEPARATOR) + len(text) > limit:
+            chunks.append(current)
+            current = ''
+        current = f"{current}{DIGEST_SEPARATOR}{text}" if current else text
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class TelegramDispatcher:
+    def __init__(self, token, chat_id, queue_size=QUEUE_SIZE, min_interval=MIN_INTERVAL):
+        self.token = token
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self.enabled = config_service.get().telegram_enabled
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._session = None
+        self._last_sent = 0.0
+        self.dropped = 0
+
+    @property
+    def configured(self):
+        return bool(self.token and self.chat_id)
+
+    def apply_config(self, snapshot, previous=None):
+        self.enabled = snapshot.telegram_enabled
+
+    # --- Lado productor ---
+    def send(self, text):
+        if not self.configured or not self.enabled:
+            return False
+        try:
+            self._queue.put_nowait(text)
+        except queue.Full:
+            self.dropped += 1
+            _sent.labels('dropped').inc()
+            return False
+        _pending.inc()
+        self._ensure_thread()
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="telegram-dispatcher")
+                self._thread.start()
+
+    def flush(self, timeout=5.0):
+        """Espera (como mucho `timeout`) a que se envíe lo pendiente. Útil al apagar."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+
+    # --- Hilo despachador ---
+    def _get_session(self):
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Esperar turno del límite por chat; lo que llegue mientras tanto va en el mismo resumen
+            wait = self._last_sent + self.min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if self.enabled:
+                    if len(batch) > 1:
+                        _sent.labels('coalesced').inc(len(batch) - 1)
+                    chunks = build_digest(batch)
+                    for i, text in enumerate(chunks):
+                        if i:
+                            time.sleep(self.min_interval)
+                        self._post(text)
+                else:
+                    _sent.labels('disabled').inc(len(batch))
+            except Exception as e:
+                log.error(f"Error en el despachador de Telegram: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+                _pending.dec(len(batch))
+
+    def _post(self, text):
+        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        payload = {
+            "chat_id": self.chat_id,
+            "text": text,
+            "parse_mode": "HTML"
+        }
+        for attempt in range(MAX_RETRIES):
+            try:
+                response = self._get_session().post(url, data=payload, timeout=REQUEST_TIMEOUT)
+            except Exception as e:
+                self._last_sent = time.time()
+                _sent.labels('error').inc()
+                log.error(f"Error enviando Telegram: {e}")
+                return False
+            self._last_sent = time.time()
+            if response.status_code == 429:
+                try:
+                    retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+                except Exception:
+                    retry_after = 1.0
+                _sent.labels('rate_limited').inc()
+                log.warning(f"Telegram limita el envío: reintento en {retry_after:.0f}s")
+                time.sleep(retry_after)
+                continue
+            if response.status_code >= 400:
+                _sent.labels('error').inc()
+                log.error(f"Error enviando Telegram: HTTP {response.status_code} {response.text[:200]}")
+                return False
+            _sent.labels('ok').inc()
+            return True
+        _sent.labels('error').inc()
+        return False
+
+
+_dispatcher = TelegramDispatcher(TOKEN, CHAT_ID)
+config_service.subscribe(_dispatcher.apply_config)
+
+
+def flush(timeout=5.0):
+    _dispatcher.flush(timeout)
+
 
 def send_msg(text):
     """
-    Envía un mensaje a Telegram en un hilo separado para no bloquear el Bot.
+    Encola un mensaje para Telegram sin bloquear el Bot.
     Acepta HTML (negritas <b>, cursivas <i>, etc).
     """
-    if not TOKEN or not CHAT_ID:
-        return
-
-    # Ejecutamos en un thread (Daemon) para que el bot no se pare esperando a Telegram
-    threading.Thread(target=_send_request, args=(text,), daemon=True).start()
\ No newline at end of file
+    _dispatcher.send(text)
@@ -0,0 +1,173 @@
+# Archivo: utils/tracing.py
+"""Trazas ligeras del pipeline tick -> orden.
+
+Cada span es una tupla (nombre, símbolo, inicio_ns, duración_ns, trace_id, hilo, args) que se
+guarda en un buffer circular en memoria (los más antiguos se descartan). Una traza agrupa los
+spans de un mismo tick: `begin_trace(symbol)` la abre en el hilo actual y los spans posteriores
+de ese hilo (p.ej. el envío de la orden dentro del conector) se asocian a ella.
+
+Etapas del grid:
+  price_fetch   -> obtención del precio (ticker)
+  decision      -> desde que se observa el precio hasta decidir crear la orden
+  order_send    -> create_order en ccxt hasta recibir la respuesta del exchange
+  tick_to_order -> total, desde el precio observado hasta la orden confirmada
+
+Se exporta en formato Chrome trace (chrome://tracing, Perfetto) y como percentiles por etapa.
+"""
+import contextlib
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_CAPACITY = 20000
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'symbol', 'trace_id', 'args', 'start')
+
+    def __init__(self, tracer, name, symbol, trace_id, args):
+        self.tracer = tracer
+        self.name = name
+        self.symbol = symbol
+        self.trace_id = trace_id
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        args = self.args
+        if exc_type is not None:
+            args = dict(args or {}, error=exc_type.__name__)
+        self.tracer.record(self.name, self.symbol, self.start, time.perf_counter_ns(), self.trace_id, args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=True):
+        self.enabled = enabled
+        self._spans = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    # --- Trazas ---
+    def begin_trace(self, symbol=None):
+        """Abre una traza nueva en el hilo actual y devuelve (trace_id, inicio_ns)."""
+        trace_id = next(self._ids)
+        self._local.trace_id = trace_id
+        self._local.symbol = symbol
+        return trace_id, time.perf_counter_ns()
+
+    def current_trace(self):
+        return getattr(self._local, 'trace_id', None)
+
+    def end_trace(self):
+        self._local.trace_id = None
+        self._local.symbol = None
+
+    @contextlib.contextmanager
+    def join_trace(self, trace_id, symbol=None):
+        """Asocia el hilo actual a una traza abierta en otro hilo (envíos de órdenes en paralelo)."""
+        previous = (getattr(self._local, 'trace_id', None), getattr(self._local, 'symbol', None))
+        self._local.trace_id, self._local.symbol = trace_id, symbol
+        try:
+            yield
+        finally:
+            self._local.trace_id, self._local.symbol = previous
+
+    @contextlib.contextmanager
+    def muted(self):
+        """No registra spans del hilo actual dentro del bloque (backtests)."""
+        previous = getattr(self._local, 'muted', False)
+        self._local.muted = True
+        try:
+            yield
+        finally:
+            self._local.muted = previous
+
+    # --- Spans ---
+    def record(self, name, symbol, start_ns, end_ns, trace_id=None, args=None):
+        if not self.enabled or getattr(self._local, 'muted', False):
+            return
+        if trace_id is None:
+            trace_id = getattr(self._local, 'trace_id', None)
+        if symbol is None:
+            symbol = getattr(self._local, 'symbol', None)
+        self._spans.append((name, symbol, start_ns, end_ns - start_ns, trace_id,
+                            threading.get_ident(), args))
+
+    def span(self, name, symbol=None, trace_id=None, **args):
+        if not self.enabled or getattr(self._local, 'muted', False):
+            return _NULL_SPAN
+        return _Span(self, name, symbol, trace_id, args or None)
+
+    def clear(self):
+        self._spans.clear()
+
+    def spans(self):
+        return list(self._spans)
+
+    # --- Exportación ---
+    def chrome_trace(self):
+        """Spans en formato Chrome trace event (JSON) con tiempos en microsegundos."""
+        pid = os.getpid()
+        events = []
+        for name, symbol, start_ns, dur_ns, trace_id, tid, args in self.spans():
+            event_args = {'symbol': symbol, 'trace_id': trace_id}
+            if args:
+                event_args.update(args)
+            events.append({
+                'name': name,
+                'cat': symbol or 'grid',
+                'ph': 'X',
+                'ts': start_ns / 1000.0,
+                'dur': dur_ns / 1000.0,
+                'pid': pid,
+                'tid': tid,
+                'args': event_args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def stats(self):
+        """p50/p99/max (ms) por etapa, global ('*') y por símbolo."""
+        groups = {}
+        for name, symbol, _, dur_ns, _, _, _ in self.spans():
+            groups.setdefault((name, '*'), []).append(dur_ns)
+            if symbol:
+                groups.setdefault((name, symbol), []).append(dur_ns)
+        result = {}
+        for (name, symbol), durations in groups.items():
+            durations.sort()
+            result.setdefault(name, {})[symbol] = {
+                'count': len(durations),
+                'p50_ms': round(_percentile(durations, 50) / 1e6, 3),
+                'p99_ms': round(_percentile(durations, 99) / 1e6, 3),
+                'max_ms': round(durations[-1] / 1e6, 3)
+            }
+        return {'capacity': self._spans.maxlen, 'spans': len(self._spans), 'stages': result}
+
+
+tracer = Tracer()
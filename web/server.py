@@ -2,22 +2,35 @@
 from fastapi import FastAPI, Request, HTTPException, Header, Form
 from fastapi.staticfiles import StaticFiles 
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
 from starlette.middleware.base import BaseHTTPMiddleware
 import uvicorn
+import asyncio
 import os
 import time
-import json5 
+import json
 from datetime import datetime
 from core.database import BotDatabase 
+from core.ranking import StrategyRanker, RANKERS
+from core.snapshots import BalanceSnapshotPool
+from core.indicators import last_rsi
+from core.paper import PAPER_DB_PATH, is_paper_pair
 from utils.telegram import send_msg
+from utils.config_service import config_service
 from utils.logger import log
+from utils.executor import BoundedExecutor, ExecutorBusy
+from utils.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.tracing import tracer
+from utils.profiler import profiler
+from utils.scheduler import scheduler
 import ccxt
 import threading
 from utils.auth import (
     user_exists, create_user, authenticate_user, verify_session,
-    get_security_question, reset_password, invalidate_session
+    get_security_question, reset_password, invalidate_session,
+    init_auth_db, start_session_sweeper, auth_throttle
 )
 from dotenv import load_dotenv 
 
@@ -45,6 +58,27 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 
 app.add_middleware(SecurityHeadersMiddleware)
 
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'gridbot_http_request_seconds', 'Latencia de los endpoints web', ('method', 'route', 'status'))
+CACHE_REQUESTS = REGISTRY.counter(
+    'gridbot_cache_requests_total', 'Consultas a cachés internas por resultado (hit/miss)', ('cache', 'result'))
+
+# Middleware de métricas: latencia por ruta (plantilla, no la URL concreta, para acotar las series)
+class MetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+
+app.add_middleware(MetricsMiddleware)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Timestamp de arranque del servidor web (fallback para uptime de sesión si no hay global_start_time)
 SERVER_START_TS = time.time()
@@ -58,85 +92,111 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
 
 db = BotDatabase()
+_paper_db = None
+init_auth_db()
 bot_instance = None 
+# Modo web separado (main.py --mode web): cada worker de uvicorn habla con el motor por IPC
+if os.getenv('GRIDBOT_ENGINE') == 'remote':
+    from core.remote import EngineProxy
+    bot_instance = EngineProxy.from_env()
+    start_session_sweeper()
+    config_service.start_watching()
+strategy_ranker = StrategyRanker(db)
+snapshot_pool = BalanceSnapshotPool(db)
 
 # Sistema de caché simple para evitar llamadas bloqueantes repetidas
 _tickers_cache = {"data": {}, "timestamp": 0}
 _balance_cache = {"data": {}, "timestamp": 0}
 _cache_ttl = 10  # Validez de caché: 10 segundos
+# Un único refresco en curso por caché (single-flight): las peticiones concurrentes no
+# lanzan más llamadas al exchange, devuelven el dato anterior mientras se actualiza.
+_cache_refreshing = {"tickers": None, "balance": None}
+_cache_refresh_lock = threading.Lock()
+
+def _refresh_cache(name, cache, fetch):
+    """Lanza (si no hay uno ya en curso) el refresco de `cache` en un hilo de fondo."""
+    with _cache_refresh_lock:
+        current = _cache_refreshing[name]
+        if current is not None and current.is_alive():
+            return current
+
+        def worker():
+            try:
+                data = fetch()
+                if data:
+                    cache["data"] = data
+                    cache["timestamp"] = time.time()
+            except Exception as e:
+                log.warning(f"Error actualizando caché de {name}: {e}")
+
+        thread = threading.Thread(target=worker, daemon=True, name=f"cache-{name}")
+        _cache_refreshing[name] = thread
+        thread.start()
+        return thread
+
+def _get_cached(name, cache, fetch):
+    if time.time() - cache["timestamp"] < _cache_ttl and cache["data"]:
+        CACHE_REQUESTS.labels(name, 'hit').inc()
+        return cache["data"]
+    CACHE_REQUESTS.labels(name, 'miss').inc()
+    if not (bot_instance and bot_instance.connector and bot_instance.connector.exchange):
+        return cache["data"]
+    thread = _refresh_cache(name, cache, fetch)
+    # Sólo se espera (máx. 3 segundos) si todavía no hay nada que devolver
+    if not cache["data"]:
+        thread.join(timeout=3)
+    return cache["data"]
 
 def _get_cached_tickers():
-    """Obtiene tickers con caché de 10 segundos"""
-    global _tickers_cache
-    current_time = time.time()
-    
-    # Si el caché es válido, devolverlo
-    if current_time - _tickers_cache["timestamp"] < _cache_ttl and _tickers_cache["data"]:
-        return _tickers_cache["data"]
-    
-    # Intentar actualizar caché
-    try:
-        if bot_instance and bot_instance.connector and bot_instance.connector.exchange:
-            # Timeout de 3 segundos para no bloquear
-            import threading
-            result = [None]
-            
-            def fetch_with_timeout():
-                try:
-                    result[0] = bot_instance.connector.exchange.fetch_tickers()
-                except Exception as e:
-                    log.warning(f"Error fetching tickers: {e}")
-                    result[0] = None
-            
-            thread = threading.Thread(target=fetch_with_timeout, daemon=True)
-            thread.start()
-            thread.join(timeout=3)  # Esperar máximo 3 segundos
-            
-            if result[0]:
-                _tickers_cache["data"] = result[0]
-                _tickers_cache["timestamp"] = current_time
-                return result[0]
-    except Exception as e:
-        log.warning(f"Exception in _get_cached_tickers: {e}")
-    
-    # Devolver caché antiguo o vacío
-    return _tickers_cache["data"]
+    """Obtiene tickers con caché de 10 segundos (refresco en segundo plano)"""
+    return _get_cached("tickers", _tickers_cache, lambda: bot_instance.connector.exchange.fetch_tickers())
 
 def _get_cached_balance():
-    """Obtiene balance con caché de 10 segundos"""
-    global _balance_cache
-    current_time = time.time()
-    
-    # Si el caché es válido, devolverlo
-    if current_time - _balance_cache["timestamp"] < _cache_ttl and _balance_cache["data"]:
-        return _balance_cache["data"]
-    
-    # Intentar actualizar caché
+    """Obtiene balance con caché de 10 segundos (refresco en segundo plano)"""
+    return _get_cached("balance", _balance_cache, lambda: bot_instance.connector.exchange.fetch_balance())
+
+# --- POOLS DE TRABAJO ---
+# Las rutas async nunca bloquean el event loop: las lecturas (BD, vistas en memoria) van a un pool
+# y las llamadas al exchange / acciones de trading a otro, para que un exchange lento no deje sin
+# hilos al dashboard. Si un pool está saturado se responde 503 en lugar de encolar sin límite.
+_read_executor = BoundedExecutor("web-read", max_workers=8, max_queue=64)
+_trade_executor = BoundedExecutor("web-trade", max_workers=4, max_queue=8)
+# Pánico / parada del motor: pool propio y cola amplia, nunca compiten con el resto de llamadas
+# al exchange (un exchange colgado o el conector en pausa por ban no deben dejarlos en 503/504)
+_control_executor = BoundedExecutor("web-control", max_workers=2, max_queue=256)
+# El ping lo sondea cada pestaña abierta: pool mínimo y timeout corto (si no responde, no hay ping)
+_ping_executor = BoundedExecutor("web-ping", max_workers=1, max_queue=2)
+READ_TIMEOUT = 15
+TRADE_TIMEOUT = 30
+CONTROL_TIMEOUT = 300
+PING_TIMEOUT = 5
+
+def _executor_gauge(field):
+    return lambda: {(e.name,): e.stats()[field]
+                    for e in (_read_executor, _trade_executor, _control_executor, _ping_executor)}
+
+REGISTRY.gauge_fn('gridbot_executor_active', 'Trabajos en ejecución por pool web', _executor_gauge('active'), ('pool',))
+REGISTRY.gauge_fn('gridbot_executor_queued', 'Trabajos en cola por pool web', _executor_gauge('queued'), ('pool',))
+REGISTRY.gauge_fn('gridbot_executor_rejected', 'Trabajos rechazados (503) por pool web', _executor_gauge('rejected'), ('pool',))
+
+async def _run_in(executor, timeout, fn, **kwargs):
     try:
-        if bot_instance and bot_instance.connector and bot_instance.connector.exchange:
-            import threading
-            result = [None]
-            
-            def fetch_with_timeout():
-                try:
-                    result[0] = bot_instance.connector.exchange.fetch_balance()
-                except Exception as e:
-                    log.warning(f"Error fetching balance: {e}")
-                    result[0] = None
-            
-            thread = threading.Thread(target=fetch_with_timeout, daemon=True)
-            thread.start()
-            thread.join(timeout=3)  # Esperar máximo 3 segundos
-            
-            if result[0]:
-                _balance_cache["data"] = result[0]
-                _balance_cache["timestamp"] = current_time
-                return result[0]
-    except Exception as e:
-        log.warning(f"Exception in _get_cached_balance: {e}")
-    
-    # Devolver caché antiguo o vacío
-    return _balance_cache["data"]
+        return await executor.run(fn, timeout=timeout, **kwargs)
+    except ExecutorBusy as e:
+        log.warning(f"⏳ {e}")
+        raise HTTPException(status_code=503, detail="Servidor ocupado, reintenta en unos segundos")
+    except asyncio.TimeoutError:
+        log.warning(f"⏳ Timeout en {fn.__name__} ({executor.name}, {timeout}s)")
+        raise HTTPException(status_code=504, detail="La operación ha tardado demasiado")
+
+async def _run_read(fn, **kwargs):
+    return await _run_in(_read_executor, READ_TIMEOUT, fn, **kwargs)
+
+async def _run_trade(fn, **kwargs):
+    return await _run_in(_trade_executor, TRADE_TIMEOUT, fn, **kwargs)
+
+async def _run_control(fn, **kwargs):
+    return await _run_in(_control_executor, CONTROL_TIMEOUT, fn, **kwargs)
 
 class ConfigUpdate(BaseModel):
     content: str
@@ -154,6 +214,19 @@ class CoinResetRequest(BaseModel):
 class BalanceAdjustRequest(BaseModel):
     asset: str    
     amount: float 
+class OptimizeRequest(BaseModel):
+    symbol: str
+    timeframe: str = '5m'
+    days: int = 30
+    method: str = 'grid'
+    samples: int = 200
+    refine_rounds: int = 0
+    metric: str = 'sharpe'
+    capital: float = 1000.0
+    space: Optional[Dict[str, List[Any]]] = None
+class ApplyStrategyRequest(BaseModel):
+    symbol: str
+    params: Dict[str, Any]
 
 # Modelos de autenticación
 class LoginRequest(BaseModel):
@@ -175,112 +248,61 @@ class ChangePasswordRequest(BaseModel):
     current_password: str
     new_password: str
 
-def _calculate_rsi(candles, period=14):
-    try:
-        if not candles or len(candles) < period + 1:
-            return 50.0 
-        closes = [float(c[4]) for c in candles]
-        deltas = [closes[i] - closes[i-1] for i in range(1, len(closes))]
-        gains = [d if d > 0 else 0 for d in deltas]
-        losses = [-d if d < 0 else 0 for d in deltas]
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
-        for i in range(period, len(deltas)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        if avg_loss == 0:
-            return 100.0
-        if avg_gain == 0:
-            return 0.0
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return round(rsi, 2)
-    except Exception as e:
-        log.debug(f"Error calculating RSI: {e}")
-        return 50.0
-
-def _background_snapshot_scheduler():
-    """Hilo que ejecuta snapshots periódicos incluso si el motor no está arrancado.
-    - Exchanges activos: cada 60s (solo si el motor NO está arrancado para evitar duplicados)
-    - Exchanges inactivos: cada 180s
+def _snapshot_configured_exchanges(active):
+    """Una pasada de snapshots de balance de los exchanges configurados (incluso con el motor parado).
+    - active=True: sólo el exchange activo, y sólo si el motor NO está arrancado (si no, lo hace el motor)
+    - active=False: los exchanges inactivos
+    Las cuentas se consultan en paralelo (core.snapshots) y se guardan en una sola escritura.
     """
-    log.info("📸 Scheduler de snapshots en background iniciado.")
-    counter = 0
-    while True:
-        try:
-            counter = (counter + 1) % 3
-            exchanges = db.get_exchanges()
-            active_name = getattr(bot_instance, 'active_exchange_name', None) if bot_instance else None
-            active_test = getattr(bot_instance, 'active_exchange_use_testnet', False) if bot_instance else False
-
-            for e in exchanges:
-                name = e.get('name')
-                use_testnet = e.get('use_testnet', False)
-                ex_key = f"{name}-testnet" if use_testnet else name
-
-                is_active = False
-                if active_name and active_name.lower() == name.lower():
-                    is_active = True
-
-                # Active exchanges: intentar cada 60s, pero si el bot está corriendo dejamos que lo haga el motor
-                if is_active and bot_instance and getattr(bot_instance, 'is_running', False):
-                    continue
+    active_name = getattr(bot_instance, 'active_exchange_name', None) if bot_instance else None
+    engine_running = bool(bot_instance and getattr(bot_instance, 'is_running', False))
 
-                # For inactive exchanges, solo procesar cada 3 ciclos (180s)
-                if not is_active and counter != 0:
-                    continue
+    selected = []
+    for e in db.get_exchanges():
+        is_active = bool(active_name and active_name.lower() == e.get('name', '').lower())
+        if is_active != active or (is_active and engine_running):
+            continue
+        selected.append(e)
 
-                # Intentar snapshot real con credenciales
-                try:
-                    creds = db.get_exchange_credentials(name)
-                    if creds.get('success') and creds.get('api_key') and creds.get('secret_key'):
-                        fetched = None
-                        try:
-                            fetched = __import__('core.exchange', fromlist=['']).BinanceConnector.fetch_balance_snapshot_static(creds.get('api_key'), creds.get('secret_key'), creds.get('passphrase'), creds.get('use_testnet', False), exchange_type=e.get('type', 'binance'))
-                        except Exception as fe:
-                            log.debug(f"Error fetching snapshot static: {fe}")
-                        if fetched and fetched > 0:
-                            db.log_balance_snapshot(fetched, exchange=ex_key)
-                            log.debug(f"[scheduler] Snapshot real para {ex_key}: {fetched:.2f} USDC")
-                            # pequeña espera para no pisar rate limits
-                            time.sleep(0.5)
-                            continue
-                except Exception as inner:
-                    log.debug(f"Error scheduler credentials for {name}: {inner}")
-
-                # Fallback: carry-forward
-                try:
-                    last = db.get_last_balance_snapshot(ex_key)
-                    if last:
-                        last_equity = float(last[1])
-                        db.log_balance_snapshot(last_equity, exchange=ex_key)
-                        log.debug(f"[scheduler] Carry-forward snapshot para {ex_key}: {last_equity:.2f} USDC")
-                except Exception:
-                    pass
-        except Exception as e:
-            log.error(f"Error en snapshot scheduler: {e}")
+    summary = snapshot_pool.run(selected)
+    if selected:
+        log.debug(f"[scheduler] Snapshots {'activo' if active else 'inactivos'}: {summary}")
+    return summary
 
-        # Dormir 60s por ciclo (las inactivas se ejecutan cada 3 ciclos)
-        time.sleep(60)
 
-
-def start_server(bot, host=None, port=None):
+def attach_bot(bot):
+    """Registra la instancia del motor que usan los endpoints (GridBot o EngineProxy)."""
     global bot_instance
     bot_instance = bot
+
+def start_snapshot_scheduler():
+    """Programa los snapshots de balance de exchanges en el scheduler del proceso:
+    - Exchange activo: cada 60s mientras el motor está parado
+    - Exchanges inactivos: cada 180s (reduce uso de rate limits)"""
+    scheduler.every('web-active-exchange-snapshot', 60, _snapshot_configured_exchanges, True, align=True)
+    scheduler.every('offline-exchange-snapshots', 180, _snapshot_configured_exchanges, False, align=True, jitter=5)
+    log.info("📸 Scheduler de snapshots en background iniciado.")
+
+def start_server(bot, host=None, port=None):
+    attach_bot(bot)
     load_dotenv('config/.env', override=True)
     if host is None:
         host = os.getenv('WEB_HOST', '127.0.0.0')
     if port is None:
         port = int(os.getenv('WEB_PORT', 8001))
 
-    # Lanzar scheduler de snapshots en background (daemon)
-    try:
-        threading.Thread(target=_background_snapshot_scheduler, daemon=True).start()
-    except Exception as e:
-        log.error(f"No se pudo iniciar snapshot scheduler: {e}")
+    start_snapshot_scheduler()
+    start_session_sweeper()
+    config_service.start_watching()
 
     uvicorn.run(app, host=host, port=port, log_level="error")
 
+def start_web_workers(host, port, workers=2):
+    """Arranca sólo la web (sin motor) con varios workers; el estado llega por IPC desde
+    el proceso `--mode engine` y el scheduler de snapshots corre en ese proceso."""
+    os.environ['GRIDBOT_ENGINE'] = 'remote'
+    uvicorn.run("web.server:app", host=host, port=port, workers=workers, log_level="error")
+
 def format_uptime(seconds):
     if seconds < 0:
         return "0s"
@@ -297,17 +319,33 @@ def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 # --- NOU ENDPOINT: INFO COMPTE ---
-@app.get("/api/account/info")
-def get_account_info_api():
+def _get_account_info_sync():
     """Retorna informació del compte: VIP Tier i Comissions"""
     if not bot_instance or not bot_instance.connector:
         return {'tier': 'Offline', 'maker': 0, 'taker': 0}
     
     return bot_instance.connector.get_account_status()
+
+@app.get("/api/account/info")
+async def get_account_info_api():
+    return await _run_trade(_get_account_info_sync)
 # ---------------------------------
 
-@app.get("/api/status")
-def get_status():
+def _pair_config(symbol):
+    config = bot_instance.config if bot_instance else config_service.get()
+    return next((p for p in (config or {}).get('pairs', ()) if p.get('symbol') == symbol), None)
+
+def _get_paper_db():
+    global _paper_db
+    if _paper_db is None:
+        _paper_db = BotDatabase(PAPER_DB_PATH)
+    return _paper_db
+
+def _db_for(symbol):
+    """BD de un par: los pares en modo papel tienen la suya (core.paper)."""
+    return _get_paper_db() if is_paper_pair(_pair_config(symbol)) else db
+
+def _get_status_sync():
     if not bot_instance:
         return {
             "status": "Offline",
@@ -437,7 +475,6 @@ def get_status():
         now = datetime.now()
         monthly_start_ts = datetime(now.year, now.month, 1).timestamp()
         monthly_stats = db.get_stats(from_timestamp=monthly_start_ts)
-        monthly_cash_flow = monthly_stats['per_coin_stats']['cash_flow']
         
         # 2. Obtenim estadístiques GLOBALS
         global_trades_stats = db.get_stats(from_timestamp=0) 
@@ -459,6 +496,19 @@ def get_status():
         if bot_instance and bot_instance.config:
             pairs_to_check = [p['symbol'] for p in bot_instance.config.get('pairs', [])]
 
+        # Pares en papel: estadísticas de su BD, fuera de los totales de la cuenta real
+        paper_pairs = {p['symbol'] for p in bot_instance.config.get('pairs', []) if is_paper_pair(p)} \
+            if bot_instance and bot_instance.config else set()
+        paper_stats = None
+        if paper_pairs:
+            paper_db = _get_paper_db()
+            paper_stats = {
+                "monthly": paper_db.get_stats(from_timestamp=monthly_start_ts),
+                "global": paper_db.get_stats(from_timestamp=0),
+                "prices": paper_db.get_all_prices(),
+            }
+        paper_summary = {"pairs": len(paper_pairs), "trades": 0, "profit": 0.0, "session_profit": 0.0}
+
         strategies_data = []
         acc_global_pnl = 0.0
         acc_monthly_pnl = 0.0
@@ -471,28 +521,39 @@ def get_status():
 
                 strat_conf = pair_config.get('strategy', {})
                 is_enabled = pair_config.get('enabled', False)
+                is_paper = symbol in paper_pairs
+                pair_monthly = paper_stats['monthly'] if is_paper else monthly_stats
+                pair_global = paper_stats['global'] if is_paper else global_trades_stats
 
-                trades_count = global_trades_stats['per_coin_stats']['trades'].get(symbol, 0)
+                trades_count = pair_global['per_coin_stats']['trades'].get(symbol, 0)
                 curr_price = current_prices_map.get(symbol, 0.0)
-                curr_val = holding_values.get(symbol, 0.0)
+                if is_paper and not curr_price:
+                    curr_price = paper_stats['prices'].get(symbol, 0.0)
+                curr_val = 0.0 if is_paper else holding_values.get(symbol, 0.0)
                 
                 # --- CÀLCUL PNL MENSUAL ---
-                cf_monthly = monthly_cash_flow.get(symbol, 0.0)
-                qty_delta = monthly_stats['per_coin_stats']['qty_delta'].get(symbol, 0.0)
+                cf_monthly = pair_monthly['per_coin_stats']['cash_flow'].get(symbol, 0.0)
+                qty_delta = pair_monthly['per_coin_stats']['qty_delta'].get(symbol, 0.0)
                 strat_pnl_monthly = (qty_delta * curr_price) + cf_monthly
 
                 # --- CÀLCUL PNL GLOBAL (SISTEMA CAIXA REGISTRADORA) ---
-                accumulated_history = db.get_accumulated_pnl(symbol)
+                accumulated_history = _db_for(symbol).get_accumulated_pnl(symbol)
                 strat_pnl_global = accumulated_history + strat_pnl_monthly
                 # -------------------------
 
-                acc_global_pnl += strat_pnl_global
-                acc_monthly_pnl += strat_pnl_monthly
+                if is_paper:
+                    paper_summary["trades"] += trades_count
+                    paper_summary["profit"] += strat_pnl_global
+                    paper_summary["session_profit"] += strat_pnl_monthly
+                else:
+                    acc_global_pnl += strat_pnl_global
+                    acc_monthly_pnl += strat_pnl_monthly
 
                 if is_enabled or trades_count > 0 or curr_val > 1.0:
                     strategies_data.append({
                         "symbol": symbol,
                         "enabled": is_enabled,
+                        "paper": is_paper,
                         "grids": strat_conf.get('grids_quantity', '-'),
                         "amount": strat_conf.get('amount_per_grid', '-'),
                         "spread": strat_conf.get('grid_spread', '-'),
@@ -514,6 +575,8 @@ def get_status():
             "session_trades_distribution": monthly_stats['trades_distribution'],
             "global_trades_distribution": global_trades_stats['trades_distribution'],
             "strategies": strategies_data,
+            "paper": dict(paper_summary, profit=round(paper_summary["profit"], 2),
+                          session_profit=round(paper_summary["session_profit"], 2)),
             "stats": {
                 "session": {
                     "trades": monthly_stats['trades'],
@@ -541,8 +604,92 @@ def get_status():
             "stats": { "session": {"trades":0,"profit":0,"best_coin":"-","uptime":"-","uptime_seconds":0}, "global": {"trades":0,"profit":0,"best_coin":"-","uptime":"-","uptime_seconds":0} }
         }
 
-@app.get("/api/history/balance")
-def get_balance_history_api(exchange: str = None):
+@app.get("/api/status")
+async def get_status():
+    return await _run_read(_get_status_sync)
+
+@app.get("/metrics")
+def metrics():
+    """Métricas en formato Prometheus de este proceso."""
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+def _engine_debug(view, local_fn, target='engine', **kwargs):
+    """Vista de diagnóstico del motor: local en modo single, por IPC si el motor corre aparte.
+    Con target='web' se usa siempre la de este proceso (worker web)."""
+    if target != 'web' and bot_instance is not None and hasattr(bot_instance, 'engine_debug'):
+        return bot_instance.engine_debug(view, **kwargs)
+    return local_fn(**kwargs)
+
+@app.get("/metrics/engine")
+def engine_metrics():
+    """Métricas del proceso del motor cuando corre separado (`--mode engine`)."""
+    if bot_instance is None or not hasattr(bot_instance, 'engine_debug'):
+        raise HTTPException(status_code=404, detail="El motor corre en este mismo proceso: usa /metrics")
+    return Response(bot_instance.engine_debug('metrics'), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/api/debug/scheduler")
+def scheduler_stats():
+    """Tareas programadas del motor: próxima ejecución, duración, fallos y ranuras saltadas."""
+    return _engine_debug('scheduler_stats', scheduler.stats)
+
+@app.get("/api/debug/trace/stats")
+def trace_stats():
+    """p50/p99 por etapa del pipeline tick -> orden, global y por símbolo."""
+    return _engine_debug('trace_stats', tracer.stats)
+
+@app.get("/api/debug/trace/chrome")
+def trace_chrome():
+    """Spans en formato Chrome trace (abrir en chrome://tracing o ui.perfetto.dev)."""
+    data = _engine_debug('trace_chrome', tracer.chrome_trace)
+    return Response(json.dumps(data), media_type="application/json",
+                    headers={"Content-Disposition": "attachment; filename=gridbot_trace.json"})
+
+@app.post("/api/debug/trace/clear")
+def trace_clear():
+    _engine_debug('trace_clear', tracer.clear)
+    return {"status": "success", "message": "Buffer de trazas vaciado"}
+
+class ProfileRequest(BaseModel):
+    seconds: float = 30
+    interval_ms: float = 5
+    threads: list = None      # prefijos de nombre de hilo (None = todos)
+    target: str = 'engine'    # 'engine' o 'web' (este worker)
+
+@app.post("/api/debug/profile/start")
+def profile_start(req: ProfileRequest):
+    """Arranca el profiler por muestreo durante `seconds` segundos."""
+    started = _engine_debug('profile_start', profiler.start, target=req.target,
+                            duration=req.seconds, interval=req.interval_ms / 1000.0, threads=req.threads)
+    if not started:
+        raise HTTPException(status_code=409, detail="Ya hay una sesión de profiling en curso")
+    log.info(f"🔬 Profiling ({req.target}) iniciado durante {req.seconds:.0f}s")
+    return {"status": "success", "message": f"Profiling iniciado ({req.seconds:.0f}s)"}
+
+@app.get("/api/debug/profile/status")
+def profile_status(target: str = 'engine'):
+    return _engine_debug('profile_status', profiler.status, target=target)
+
+@app.get("/api/debug/profile/collapsed")
+def profile_collapsed(target: str = 'engine'):
+    """Pilas colapsadas del último muestreo (flamegraph.pl, speedscope, inferno)."""
+    data = _engine_debug('profile_collapsed', profiler.collapsed, target=target)
+    return Response(data, media_type="text/plain",
+                    headers={"Content-Disposition": f"attachment; filename=gridbot_{target}.collapsed"})
+
+@app.get("/api/debug/profile/top")
+def profile_top(target: str = 'engine', limit: int = 30):
+    """Funciones con más muestras propias del último muestreo."""
+    return _engine_debug('profile_top', profiler.top, target=target, limit=limit)
+
+@app.get("/api/executor/stats")
+async def get_executor_stats():
+    """Estado de los pools de trabajo de la web (activos, cola, rechazos, timeouts)."""
+    return {"read": _read_executor.stats(), "trade": _trade_executor.stats(),
+            "control": _control_executor.stats(), "ping": _ping_executor.stats()}
+
+def _get_balance_history_sync(exchange: str = None, since: float = None):
+    """Serie de balance. Con `since` (epoch ms, cursor devuelto por la llamada anterior) devuelve sólo
+    las snapshots nuevas y el cliente separa la sesión usando `session_start`."""
     try:
         # Si no se pasa `exchange` usamos el actual del bot (si existe)
         if not exchange and bot_instance and bot_instance.connector and bot_instance.connector.exchange and hasattr(bot_instance.connector.exchange, 'id'):
@@ -573,18 +720,37 @@ def get_balance_history_api(exchange: str = None):
             # Aplicar sufijo -testnet si el bot está conectado a testnet (por defecto)
             if getattr(bot_instance, 'active_exchange_use_testnet', False) and exchange:
                 exchange = f"{exchange}-testnet"
-        full_hist = db.get_balance_history(from_timestamp=0, exchange=exchange)
         session_start = bot_instance.global_start_time if bot_instance else 0
+        if since is not None:
+            # Variante delta: sólo filas posteriores al cursor, timestamps en epoch ms sin formatear
+            rows = db.get_balance_history(from_timestamp=since / 1000.0, exchange=exchange)
+            delta = [[r[0] * 1000, round(r[1], 2)] for r in rows if r[0] * 1000 > since]
+            return {
+                "delta": True,
+                "global": delta,
+                "session_start": int(session_start * 1000) if session_start else 0,
+                "cursor": delta[-1][0] if delta else since
+            }
+        full_hist = db.get_balance_history(from_timestamp=0, exchange=exchange)
         session_hist = [x for x in full_hist if x[0] >= session_start]
         def fmt(rows):
             return [[r[0]*1000, round(r[1], 2)] for r in rows]
-        return { "global": fmt(full_hist), "session": fmt(session_hist) }
+        global_hist = fmt(full_hist)
+        return {
+            "global": global_hist,
+            "session": fmt(session_hist),
+            "session_start": int(session_start * 1000) if session_start else 0,
+            "cursor": global_hist[-1][0] if global_hist else 0
+        }
     except Exception as e:
         log.exception(f"Error getting balance history: {e}")
         return {"global": [], "session": []}
 
-@app.post("/api/record_balance")
-def record_balance_snapshot():
+@app.get("/api/history/balance")
+async def get_balance_history_api(exchange: str = None, since: float = None):
+    return await _run_read(_get_balance_history_sync, exchange=exchange, since=since)
+
+def _record_balance_snapshot_sync():
     """Registra un snapshot del balance actual (puede llamarse desde frontend)"""
     try:
         if not bot_instance or not bot_instance.connector:
@@ -634,110 +800,61 @@ def record_balance_snapshot():
         log.exception(f"Error registrando snapshot: {e}")
         return {"success": False, "message": "Error interno"}
 
-@app.get("/api/top_strategies")
-def get_top_strategies():
-    """Retorna las estrategias/pares ordenadas por ROI anualizado"""
+@app.post("/api/record_balance")
+async def record_balance_snapshot():
+    return await _run_trade(_record_balance_snapshot_sync)
+
+def _get_top_strategies_sync(metric: str = 'roi', limit: int = 5):
+    """Retorna las estrategias/pares ordenadas por `metric` (roi anualizado, pnl, sharpe o drawdown)"""
     try:
-        # Obtener todos los trades agrupados por símbolo
-        with db._get_conn() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT symbol, side, cost, fee_cost, amount, timestamp 
-                FROM trade_history 
-                ORDER BY timestamp ASC
-            """)
-            trades = cursor.fetchall()
-        
-        # Agrupar por símbolo
-        symbol_stats = {}
-        for symbol, side, cost, fee_cost, amount, timestamp in trades:
-            if symbol not in symbol_stats:
-                symbol_stats[symbol] = {
-                    'symbol': symbol,
-                    'pnl': 0.0,
-                    'trades': 0,
-                    'first_trade_time': timestamp,
-                    'capital_invested': 0.0,
-                    'sell_proceeds': 0.0,
-                }
-            
-            stats = symbol_stats[symbol]
-            stats['trades'] += 1
-            
-            if side == 'buy':
-                stats['capital_invested'] += cost
-            else:
-                stats['sell_proceeds'] += (cost - fee_cost) if fee_cost else cost
-            
-            # PnL es lo que ganamos/perdemos
-            if side == 'sell':
-                stats['pnl'] += (cost - fee_cost) if fee_cost else cost
-            else:
-                stats['pnl'] -= cost
-        
-        # Calcular ROI anualizado para cada símbolo
-        current_time = time.time()
-        strategies_ranked = []
-        
-        for symbol, stats in symbol_stats.items():
-            capital = stats['capital_invested']
-            pnl = stats['pnl']
-            days_active = max((current_time - stats['first_trade_time']) / 86400, 1)  # Al menos 1 día
-            
-            if capital > 0:
-                roi_percent = (pnl / capital) * 100
-                roi_annualized = roi_percent * (365 / days_active) if days_active > 0 else 0
-            else:
-                roi_percent = 0
-                roi_annualized = 0
-            
-            strategies_ranked.append({
-                'symbol': symbol,
-                'pnl': round(pnl, 2),
-                'roi_percent': round(roi_percent, 2),
-                'roi_annualized': round(roi_annualized, 2),
-                'capital_invested': round(capital, 2),
-                'trades': stats['trades'],
-                'days_active': round(days_active, 1)
-            })
-        
-        # Ordenar por ROI anualizado descendente
-        strategies_ranked.sort(key=lambda x: x['roi_annualized'], reverse=True)
-        
-        # Retornar top 5
-        return {'strategies': strategies_ranked[:5]}
+        return {'strategies': strategy_ranker.top(metric, limit), 'metric': metric if metric in RANKERS else 'roi'}
     except Exception as e:
         log.error(f"Error en /api/top_strategies: {e}")
         return {'strategies': []}
 
-@app.get("/api/orders")
-def get_all_orders():
+@app.get("/api/top_strategies")
+async def get_top_strategies(metric: str = 'roi', limit: int = 5):
+    return await _run_read(_get_top_strategies_sync, metric=metric, limit=limit)
+
+def _get_all_orders_sync(grouped: bool = False):
+    """Órdenes abiertas enriquecidas. Se sirven desde la vista en memoria del motor (órdenes + precios en vivo);
+    nunca se hace una llamada síncrona al exchange desde aquí."""
     try:
+        active_symbols = None
+        if bot_instance and bot_instance.is_running:
+            active_symbols = list(bot_instance.active_pairs)
+
+        view = getattr(bot_instance, 'order_view', None) if bot_instance else None
+        if view is not None and view.has_data():
+            if grouped:
+                return view.get_grouped(active_symbols)
+            return view.get_orders(active_symbols)
+
+        # Fallback (motor sin datos todavía): caché de la BD, sin pedir precios al exchange
         raw_orders = db.get_all_active_orders()
         prices = db.get_all_prices()
         enhanced_orders = []
-        active_symbols = set()
-        if bot_instance:
-            active_symbols = set(bot_instance.active_pairs)
+        spreads = {}
         for o in raw_orders:
             symbol = o['symbol']
-            if bot_instance and bot_instance.is_running:
-                if symbol not in active_symbols:
-                    continue
-            current_price = prices.get(symbol, 0.0)
-            if current_price == 0 and bot_instance and bot_instance.is_running:
-                 current_price = bot_instance.connector.fetch_current_price(symbol)
-            o['current_price'] = current_price
+            if active_symbols is not None and symbol not in active_symbols:
+                continue
+            o['current_price'] = prices.get(symbol, 0.0)
             o['total_value'] = o['amount'] * o['price']
             o['entry_price'] = 0.0
             if o['side'] == 'sell' and bot_instance:
                 try:
-                    strat = bot_instance.pairs_map.get(symbol, {}).get('strategy', bot_instance.config['default_strategy'])
-                    spread = strat['grid_spread']
-                    o['entry_price'] = o['price'] / (1 + (spread / 100.0))
+                    if symbol not in spreads:
+                        spreads[symbol] = bot_instance.effective_spread(symbol)
+                    o['entry_price'] = o['price'] / (1 + (spreads[symbol] / 100.0))
                 except Exception as e:
-                    log.debug(f"Error computing entry_price for {symbol}: {e}")
+                    log.debug("Error computing entry_price for %s: %s", symbol, e)
             enhanced_orders.append(o)
+        if grouped:
+            result = {}
+            for o in enhanced_orders:
+                result.setdefault(o['symbol'], []).append(o)
+            return result
         return enhanced_orders
     except Exception as e:
         log.exception(f"Error building enhanced orders: {e}")
@@ -775,8 +892,11 @@ def get_all_orders():
         log.error(f"Error fetching wallet: {e}")
         return []
 
-@app.post("/api/liquidate_asset")
-def liquidate_asset_api(req: LiquidateRequest):
+@app.get("/api/orders")
+async def get_all_orders(grouped: bool = False):
+    return await _run_read(_get_all_orders_sync, grouped=grouped)
+
+def _liquidate_asset_sync(req: LiquidateRequest):
     if not bot_instance or not bot_instance.connector.exchange:
         raise HTTPException(status_code=503, detail="Bot no conectado")    
     asset = req.asset.upper()
@@ -804,40 +924,46 @@ def liquidate_asset_api(req: LiquidateRequest):
         log.error(f"Error liquidando {asset}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/history/clear")
-def clear_history_api(req: ClearHistoryRequest):
+@app.post("/api/liquidate_asset")
+async def liquidate_asset_api(req: LiquidateRequest):
+    return await _run_trade(_liquidate_asset_sync, req=req)
+
+def _clear_history_sync(req: ClearHistoryRequest):
     symbol = req.symbol
     keep_ids = []
+    pair_db = _db_for(symbol)
     try:
-        with open('config/config.json5', 'r') as f:
-            config = json5.load(f)
-        pair_conf = next((p for p in config['pairs'] if p['symbol'] == symbol), None)
+        pair_conf = config_service.get().pair(symbol)
         spread = pair_conf['strategy']['grid_spread'] if pair_conf else 1.0
         open_orders = []
-        if bot_instance and bot_instance.connector.exchange:
+        # Las órdenes de un par en papel no están en el exchange: se toman de su BD
+        if bot_instance and bot_instance.connector.exchange and pair_db is db:
             try:
                 open_orders = bot_instance.connector.fetch_open_orders(symbol)
             except Exception:
                 pass
         if not open_orders:
-            data = db.get_pair_data(symbol)
+            data = pair_db.get_pair_data(symbol)
             open_orders = data.get('open_orders', [])
         active_sells = [o for o in open_orders if o['side'] == 'sell']
         for o in active_sells:
             sell_price = float(o['price'])
-            uuid = db.get_buy_trade_uuid_for_sell_order(symbol, sell_price, spread)
+            uuid = pair_db.get_buy_trade_uuid_for_sell_order(symbol, sell_price, spread)
             if uuid:
                 keep_ids.append(uuid)
     except Exception:
         pass
     try:
-        count = db.delete_history_smart(symbol, keep_ids)
+        count = pair_db.delete_history_smart(symbol, keep_ids)
         return {"status": "success", "message": f"Historial limpiado. Borrados: {count}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/balance/adjust")
-def adjust_balance_api(req: BalanceAdjustRequest):
+@app.post("/api/history/clear")
+async def clear_history_api(req: ClearHistoryRequest):
+    return await _run_trade(_clear_history_sync, req=req)
+
+def _adjust_balance_sync(req: BalanceAdjustRequest):
     try:
         asset = req.asset.upper()
         amount = req.amount
@@ -858,8 +984,11 @@ def adjust_balance_api(req: BalanceAdjustRequest):
         log.error(f"Error ajustant capital: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/reset_stats")
-def reset_stats_api():
+@app.post("/api/balance/adjust")
+async def adjust_balance_api(req: BalanceAdjustRequest):
+    return await _run_trade(_adjust_balance_sync, req=req)
+
+def _reset_stats_sync():
     try:
         db.reset_all_statistics()
         if bot_instance:
@@ -876,8 +1005,11 @@ def reset_stats_api():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/reset/chart/global")
-def reset_global_chart_api(exchange: str = None):
+@app.post("/api/reset_stats")
+async def reset_stats_api():
+    return await _run_trade(_reset_stats_sync)
+
+def _reset_global_chart_sync(exchange: str = None):
     try:
         # Si no se pasa exchange usamos el actual del bot (si existe)
         if not exchange and bot_instance and bot_instance.connector and bot_instance.connector.exchange and hasattr(bot_instance.connector.exchange, 'id'):
@@ -900,8 +1032,11 @@ def reset_global_chart_api(exchange: str = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/reset/chart/session")
-def reset_session_chart_api():
+@app.post("/api/reset/chart/global")
+async def reset_global_chart_api(exchange: str = None):
+    return await _run_trade(_reset_global_chart_sync, exchange=exchange)
+
+def _reset_session_chart_sync():
     try:
         new_time = time.time()
         db.set_session_start_time(new_time)
@@ -913,9 +1048,12 @@ def reset_session_chart_api():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/reset/chart/session")
+async def reset_session_chart_api():
+    return await _run_trade(_reset_session_chart_sync)
 
-@app.post("/api/balance/snapshot")
-def snapshot_balance_api(exchange: str = None):
+
+def _snapshot_balance_sync(exchange: str = None):
     """Forza una instantánea del balance actual y la guarda en `balance_history`.
     Útil para re-inicializar la gráfica después de borrar datos antiguos.
     """
@@ -940,8 +1078,11 @@ def snapshot_balance_api(exchange: str = None):
         log.error(f"Error guardando snapshot: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/reset/pnl/global")
-def reset_global_pnl_api():
+@app.post("/api/balance/snapshot")
+async def snapshot_balance_api(exchange: str = None):
+    return await _run_trade(_snapshot_balance_sync, exchange=exchange)
+
+def _reset_global_pnl_sync():
     try:
         db.clear_all_trades_history()
         db.reset_global_pnl_history()
@@ -949,19 +1090,28 @@ def reset_global_pnl_api():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/refresh_orders")
-def refresh_orders_api():
+@app.post("/api/reset/pnl/global")
+async def reset_global_pnl_api():
+    return await _run_trade(_reset_global_pnl_sync)
+
+def _refresh_orders_sync():
     try:
         db.clear_orders_cache()
+        if bot_instance and getattr(bot_instance, 'order_view', None) is not None:
+            bot_instance.order_view.clear()
         return {"status": "success", "message": "Caché de órdenes limpiada."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/reset/coin/session")
-def reset_coin_session_api(req: CoinResetRequest):
+@app.post("/api/refresh_orders")
+async def refresh_orders_api():
+    return await _run_trade(_refresh_orders_sync)
+
+def _reset_coin_session_sync(req: CoinResetRequest):
     try:
-        db.set_coin_session_start(req.symbol, time.time())
-        if bot_instance:
+        pair_db = _db_for(req.symbol)
+        pair_db.set_coin_session_start(req.symbol, time.time())
+        if bot_instance and pair_db is db:
              try:
                 base = req.symbol.split('/')[0]
                 qty = bot_instance.connector.get_total_balance(base)
@@ -973,11 +1123,15 @@ def reset_coin_session_api(req: CoinResetRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/reset/coin/global")
-def reset_coin_global_api(req: CoinResetRequest):
+@app.post("/api/reset/coin/session")
+async def reset_coin_session_api(req: CoinResetRequest):
+    return await _run_trade(_reset_coin_session_sync, req=req)
+
+def _reset_coin_global_sync(req: CoinResetRequest):
     try:
-        db.delete_trades_for_symbol(req.symbol)
-        if bot_instance:
+        pair_db = _db_for(req.symbol)
+        pair_db.delete_trades_for_symbol(req.symbol)
+        if bot_instance and pair_db is db:
              try:
                 base = req.symbol.split('/')[0]
                 qty = bot_instance.connector.get_total_balance(base)
@@ -989,17 +1143,20 @@ def reset_coin_global_api(req: CoinResetRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/strategy/analyze/")
-def analyze_strategy(symbol: str, timeframe: str = '4h'):
+@app.post("/api/reset/coin/global")
+async def reset_coin_global_api(req: CoinResetRequest):
+    return await _run_trade(_reset_coin_global_sync, req=req)
+
+def _analyze_strategy_sync(symbol: str, timeframe: str = '4h'):
     try:
         rsi = 50.0
         if bot_instance and bot_instance.connector.exchange:
             try:
                 raw_candles = bot_instance.connector.fetch_candles(symbol, timeframe=timeframe, limit=500)
                 if raw_candles:
-                    rsi = _calculate_rsi(raw_candles)
+                    rsi = last_rsi(raw_candles)
             except Exception as e:
-                log.debug(f"Error fetching candles for RSI calculation: {e}")
+                log.debug("Error fetching candles for RSI calculation: %s", e)
         base_s = {"conservative": 1.0, "moderate": 0.8, "aggressive": 0.5}
         if timeframe == '15m':
             base_s = {"conservative": 0.6, "moderate": 0.4, "aggressive": 0.25}
@@ -1029,8 +1186,62 @@ def analyze_strategy(symbol: str, timeframe: str = '4h'):
     except Exception:
         return {"rsi": 50, "conservative": {"grids": 8, "spread": 1.0}, "moderate": {"grids": 10, "spread": 0.8}, "aggressive": {"grids": 12, "spread": 0.5}}
 
-@app.post("/api/close_order")
-def close_order_api(req: CloseOrderRequest):
+@app.get("/api/strategy/analyze/")
+async def analyze_strategy(symbol: str, timeframe: str = '4h'):
+    return await _run_trade(_analyze_strategy_sync, symbol=symbol, timeframe=timeframe)
+
+# --- OPTIMIZADOR (backtests en paralelo en el proceso del motor; la web sólo lanza y consulta) ---
+_OPTIMIZE_ERRORS = {"offline": 503, "invalid": 400, "busy": 409}
+
+def _start_optimization_sync(req: OptimizeRequest):
+    if not bot_instance:
+        raise HTTPException(status_code=503, detail="Bot no inicializado")
+    result = bot_instance.start_optimization(req.symbol, timeframe=req.timeframe, days=req.days,
+                                             metric=req.metric, capital=req.capital, space=req.space,
+                                             method=req.method, samples=req.samples,
+                                             refine_rounds=req.refine_rounds)
+    if result.get("status") == "error":
+        raise HTTPException(status_code=_OPTIMIZE_ERRORS.get(result.get("reason"), 400), detail=result["message"])
+    return result
+
+@app.post("/api/strategy/optimize")
+async def start_optimization(req: OptimizeRequest):
+    return await _run_trade(_start_optimization_sync, req=req)
+
+def _optimization_status_sync():
+    if not bot_instance:
+        return {"status": "idle"}
+    return bot_instance.optimization_status()
+
+@app.get("/api/strategy/optimize")
+async def optimization_status():
+    return await _run_read(_optimization_status_sync)
+
+def _cancel_optimization_sync():
+    if not bot_instance:
+        return {"status": "idle"}
+    return {"status": "success" if bot_instance.cancel_optimization() else "idle"}
+
+@app.post("/api/strategy/optimize/cancel")
+async def cancel_optimization():
+    return await _run_trade(_cancel_optimization_sync)
+
+def _apply_optimization_sync(req: ApplyStrategyRequest):
+    from core.optimizer import apply_strategy
+    try:
+        apply_strategy(req.symbol, req.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if bot_instance and getattr(bot_instance, 'engine_online', False):
+        bot_instance.reload_config()
+    send_msg(f"🧪 <b>ESTRATEGIA OPTIMIZADA</b>\n{req.symbol}: parámetros aplicados desde el optimizador.")
+    return {"status": "success", "message": f"Estrategia de {req.symbol} guardada y aplicada."}
+
+@app.post("/api/strategy/optimize/apply")
+async def apply_optimization(req: ApplyStrategyRequest):
+    return await _run_trade(_apply_optimization_sync, req=req)
+
+def _close_order_sync(req: CloseOrderRequest):
     if not bot_instance:
         raise HTTPException(status_code=503, detail="Bot no inicializado")
     success = bot_instance.manual_close_order(req.symbol, req.order_id, req.side, req.amount)
@@ -1039,16 +1250,73 @@ def close_order_api(req: CloseOrderRequest):
     else:
         raise HTTPException(status_code=400, detail="Error cerrando orden.")
 
-@app.get("/api/details/{symbol:path}")
-def get_pair_details(symbol: str, timeframe: str = '15m'):
+@app.post("/api/close_order")
+async def close_order_api(req: CloseOrderRequest):
+    return await _run_trade(_close_order_sync, req=req)
+
+def _pair_pnl(symbol, current_price):
+    """Devuelve (pnl_sesión, pnl_global) de un par a partir del precio actual."""
+    if current_price <= 0:
+        return 0.0, 0.0
+    pair_db = _db_for(symbol)
+    # --- PnL SESSIÓ ---
+    coin_session_ts = pair_db.get_coin_session_start(symbol)
+    if coin_session_ts == 0:
+        coin_session_ts = bot_instance.global_start_time
+    cf_session, qty_delta = pair_db.get_session_flows(symbol, coin_session_ts)
+    pnl_value_session = (qty_delta * current_price) + cf_session
+
+    # --- PnL GLOBAL ---
+    accumulated_history = pair_db.get_accumulated_pnl(symbol)
+    return pnl_value_session, accumulated_history + pnl_value_session
+
+def _pair_details_delta(symbol, since, trades_cursor, timeframe):
+    """Variante incremental de /api/details: velas con timestamp >= `since` (la última puede seguir abierta),
+    la página de trades posterior a `trades_cursor` (sin cursor, los últimos) y timestamps crudos en epoch ms.
+    `more` indica que quedan trades tras esta página: el cliente vuelve a pedir con el nuevo cursor."""
+    pair_db = _db_for(symbol)
+    candles, updated_at = pair_db.get_candles_since(symbol, since)
+    if not since and not candles and bot_instance and bot_instance.is_running:
+        try:
+            candles = bot_instance.connector.fetch_candles(symbol, timeframe=timeframe, limit=500) or []
+        except Exception as e:
+            log.debug("Error fetching candles for %s: %s", symbol, e)
+    trades, more = pair_db.get_trades_since(symbol, after_rowid=trades_cursor)
+    pair = pair_db.get_pair_state(symbol)
+    price = pair['price']
+    session_pnl, global_pnl = (0.0, 0.0)
+    if bot_instance:
+        session_pnl, global_pnl = _pair_pnl(symbol, price)
+    next_trades_cursor = max((t['rowid'] for t in trades), default=trades_cursor or 0)
+    return {
+        "symbol": symbol,
+        "delta": True,
+        "price": price,
+        "open_orders": pair['open_orders'],
+        "grid_lines": pair['grid_levels'],
+        "candles": [[c[0], c[1], c[4], c[3], c[2]] for c in candles],
+        "trades": trades,
+        "more": more,
+        "updated_at": updated_at,
+        "session_pnl": round(session_pnl, 2),
+        "global_pnl": round(global_pnl, 2),
+        "cursor": {
+            "since": candles[-1][0] if candles else (since or 0),
+            "trades_cursor": next_trades_cursor
+        }
+    }
+
+def _get_pair_details_sync(symbol: str, timeframe: str = '15m', since: int = None, trades_cursor: int = None):
     try:
-        data = db.get_pair_data(symbol)
+        if since is not None or trades_cursor is not None:
+            return _pair_details_delta(symbol, since or 0, trades_cursor, timeframe)
+        data = _db_for(symbol).get_pair_data(symbol)
         raw_candles = data.get('candles', [])
         if not raw_candles and bot_instance and bot_instance.is_running:
             try:
                 raw_candles = bot_instance.connector.fetch_candles(symbol, timeframe=timeframe, limit=500)
             except Exception as e:
-                log.debug(f"Error fetching candles for {symbol}: {e}")
+                log.debug("Error fetching candles for %s: %s", symbol, e)
         chart_data = []
         for candle in raw_candles:
             dt = datetime.fromtimestamp(candle[0]/1000).strftime('%Y-%m-%d %H:%M')
@@ -1059,22 +1327,11 @@ def get_pair_details(symbol: str, timeframe: str = '15m'):
         
         if bot_instance:
             current_price = data.get('price', 0.0)
-            if current_price == 0 and bot_instance.is_running: 
-                current_price = bot_instance.connector.fetch_current_price(symbol)
-
-            if current_price > 0:
-                # --- PnL SESSIÓ ---
-                coin_session_ts = db.get_coin_session_start(symbol)
-                if coin_session_ts == 0:
-                    coin_session_ts = bot_instance.global_start_time
-                session_stats = db.get_stats(from_timestamp=coin_session_ts)
-                cf_session = session_stats['per_coin_stats']['cash_flow'].get(symbol, 0.0)
-                qty_delta = session_stats['per_coin_stats']['qty_delta'].get(symbol, 0.0)
-                pnl_value_session = (qty_delta * current_price) + cf_session
-
-                # --- PnL GLOBAL ---
-                accumulated_history = db.get_accumulated_pnl(symbol)
-                global_pnl = accumulated_history + pnl_value_session
+            if current_price == 0:
+                # Precio de la vista en memoria del motor: nunca se llama al exchange desde una lectura
+                current_price = bot_instance.order_view.get_price(symbol)
+
+            pnl_value_session, global_pnl = _pair_pnl(symbol, current_price)
 
         return {
             "symbol": symbol,
@@ -1090,60 +1347,74 @@ def get_pair_details(symbol: str, timeframe: str = '15m'):
         log.error(f"Error details {symbol}: {e}")
         return {"symbol": symbol, "price": 0, "open_orders": [], "trades": [], "chart_data": [], "grid_lines": [], "session_pnl": 0, "global_pnl": 0}
 
+@app.get("/api/details/{symbol:path}")
+async def get_pair_details(symbol: str, timeframe: str = '15m', since: int = None, trades_cursor: int = None):
+    return await _run_read(_get_pair_details_sync, symbol=symbol, timeframe=timeframe, since=since, trades_cursor=trades_cursor)
+
+def _get_config_sync():
+    snapshot = config_service.get()
+    if not snapshot.source:
+        raise HTTPException(status_code=500, detail="No se pudo leer config/config.json5")
+    return {"content": snapshot.source}
+
 @app.get("/api/config")
-def get_config():
-    try:
-        with open('config/config.json5', 'r') as f:
-            content = f.read()
-        return {"content": content}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_config():
+    return await _run_read(_get_config_sync)
 
 @app.post("/api/config")
 def save_config(config: ConfigUpdate):
     try:
-        json5.loads(config.content)
-        with open('config/config.json5', 'w') as f:
-            f.write(config.content)
-        if bot_instance:
-            bot_instance.connector.check_and_reload_config()
-            bot_instance.config = bot_instance.connector.config
-            bot_instance._refresh_pairs_map()
+        # Valida, escribe y avisa a los suscriptores (conector, bot, telegram, logger)
+        config_service.save(config.content)
+        if bot_instance and getattr(bot_instance, 'engine_online', False):
+            # Motor en otro proceso: que relea ya sin esperar a su watcher
+            bot_instance.reload_config()
         send_msg("💾 <b>CONFIGURACIÓN GUARDADA</b>\nSe han aplicado cambios desde la web.")
         return {"status": "success", "message": "Configuración guardada y aplicada."}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error JSON5: {e}")
 
-@app.post("/api/panic/stop")
-def panic_stop_api():
+def _panic_stop_sync():
     if bot_instance:
         bot_instance.panic_stop() 
         return {"status": "success", "message": "Bot PAUSADO."}
     return {"status": "error", "detail": "Bot no iniciado"}
 
-@app.post("/api/panic/start")
-def panic_start_api():
+@app.post("/api/panic/stop")
+async def panic_stop_api():
+    return await _run_control(_panic_stop_sync)
+
+def _panic_start_sync():
     if bot_instance:
         bot_instance.resume_bot()
         return {"status": "success", "message": "Bot REANUDADO."}
     return {"status": "error", "detail": "Bot no iniciado"}
 
-@app.post("/api/panic/cancel_all")
-def panic_cancel_all_api():
+@app.post("/api/panic/start")
+async def panic_start_api():
+    return await _run_control(_panic_start_sync)
+
+def _panic_cancel_all_sync():
     if bot_instance:
         bot_instance.panic_cancel_all()
         return {"status": "success", "message": "Órdenes canceladas."}
     return {"status": "error", "detail": "Bot no iniciado"}
 
-@app.post("/api/panic/sell_all")
-def panic_sell_all_api():
+@app.post("/api/panic/cancel_all")
+async def panic_cancel_all_api():
+    return await _run_control(_panic_cancel_all_sync)
+
+def _panic_sell_all_sync():
     if bot_instance:
         bot_instance.panic_sell_all()
         return {"status": "success", "message": "Venta pánico ejecutada."}
     return {"status": "error", "detail": "Bot no iniciado"}
 
-@app.post("/api/engine/on")
-def engine_on_api():
+@app.post("/api/panic/sell_all")
+async def panic_sell_all_api():
+    return await _run_control(_panic_sell_all_sync)
+
+def _engine_on_sync():
     if bot_instance:
         if bot_instance.launch():
             return {"status": "success", "message": "Motor de trading ARRANCADO."}
@@ -1151,13 +1422,20 @@ def engine_on_api():
             return {"status": "warning", "message": "El motor ya está corriendo."}
     return {"status": "error", "detail": "Error interno"}
 
-@app.post("/api/engine/off")
-def engine_off_api():
+@app.post("/api/engine/on")
+async def engine_on_api():
+    return await _run_control(_engine_on_sync)
+
+def _engine_off_sync():
     if bot_instance:
         bot_instance.stop_logic()
         return {"status": "success", "message": "Motor de trading APAGADO."}
     return {"status": "error", "detail": "Error interno"}
 
+@app.post("/api/engine/off")
+async def engine_off_api():
+    return await _run_control(_engine_off_sync)
+
 # ==================== ENDPOINTS DE AUTENTICACIÓN ====================
 
 @app.get("/api/auth/check-user")
@@ -1193,12 +1471,32 @@ def auth_status(authorization: str = Header(None)):
     
     return {"logged": False}
 
+def _client_ip(http_request: Request) -> str:
+    return http_request.client.host if http_request.client else "unknown"
+
+def _throttle_auth(http_request: Request, username: str = None) -> str:
+    """Aplica el límite de intentos de autenticación (429) y devuelve la IP del cliente."""
+    ip = _client_ip(http_request)
+    retry_after = auth_throttle.check(ip, username)
+    if retry_after:
+        log.warning(f"🚫 Demasiados intentos de autenticación (ip={ip}, usuario={username})")
+        raise HTTPException(status_code=429, detail=f"Demasiados intentos. Reintenta en {retry_after}s",
+                            headers={"Retry-After": str(retry_after)})
+    return ip
+
+def _raise_if_busy(result: dict):
+    if result.get("busy"):
+        raise HTTPException(status_code=503, detail=result["message"], headers={"Retry-After": "5"})
+
 @app.post("/api/auth/login")
-def login(request: LoginRequest):
+def login(request: LoginRequest, http_request: Request):
     """Login del usuario"""
+    ip = _throttle_auth(http_request, request.username)
     result = authenticate_user(request.username, request.password)
+    _raise_if_busy(result)
     
     if result["success"]:
+        auth_throttle.register_success(ip, request.username)
         return {
             "logged": True,
             "username": result["username"],
@@ -1206,11 +1504,13 @@ def login(request: LoginRequest):
             "message": result["message"]
         }
     else:
+        auth_throttle.register_failure(ip, request.username)
         raise HTTPException(status_code=401, detail=result["message"])
 
 @app.post("/api/auth/create-user")
-def create_user_api(request: CreateUserRequest):
+def create_user_api(request: CreateUserRequest, http_request: Request):
     """Crea un nuevo usuario"""
+    _throttle_auth(http_request)
     # Validaciones básicas
     if len(request.username) < 4:
         raise HTTPException(status_code=400, detail="Username debe tener al menos 4 caracteres")
@@ -1231,6 +1531,7 @@ def create_user_api(request: CreateUserRequest):
         request.security_answer,
         request.password
     )
+    _raise_if_busy(result)
     
     if result["success"]:
         return {
@@ -1253,17 +1554,21 @@ def get_security_q(username: str):
         raise HTTPException(status_code=404, detail=result.get("message", "Usuario no encontrado"))
 
 @app.post("/api/auth/reset-password")
-def reset_pwd(request: RecoveryRequest):
+def reset_pwd(request: RecoveryRequest, http_request: Request):
     """Resetea la contraseña"""
+    ip = _throttle_auth(http_request, request.username)
     result = reset_password(request.username, request.answer)
+    _raise_if_busy(result)
     
     if result["success"]:
+        auth_throttle.register_success(ip, request.username)
         return {"message": result["message"]}
     else:
+        auth_throttle.register_failure(ip, request.username)
         raise HTTPException(status_code=400, detail=result["message"])
 
 @app.post("/api/auth/change-password")
-def change_password(request: ChangePasswordRequest, authorization: str = Header(None)):
+def change_password(request: ChangePasswordRequest, http_request: Request, authorization: str = Header(None)):
     """Cambia la contraseña del usuario logueado"""
     from utils.auth import verify_session, update_password
     
@@ -1278,14 +1583,19 @@ def change_password(request: ChangePasswordRequest, authorization: str = Header(
         raise HTTPException(status_code=401, detail="Sesión inválida")
     
     username = session_data.get("username")
+    ip = _throttle_auth(http_request, username)
     
     # Verificar contraseña actual
     auth_result = authenticate_user(username, request.current_password)
+    _raise_if_busy(auth_result)
     if not auth_result.get("success"):
+        auth_throttle.register_failure(ip, username)
         raise HTTPException(status_code=401, detail="Contraseña actual incorrecta")
+    auth_throttle.register_success(ip, username)
     
     # Cambiar contraseña
     result = update_password(username, request.new_password)
+    _raise_if_busy(result)
     if result.get("success"):
         return {"message": "Contraseña cambida correctamente"}
     else:
@@ -1302,8 +1612,7 @@ def logout(authorization: str = Header(None)):
 
 # ==================== ENDPOINTS DE EXCHANGES MANAGEMENT ====================
 
-@app.get("/api/exchanges/list")
-def get_exchanges_list():
+def _get_exchanges_list_sync():
     """Obtiene lista de exchanges configurados"""
     try:
         exchanges = db.get_exchanges()
@@ -1312,8 +1621,11 @@ def get_exchanges_list():
         log.error(f"Error obteniendo exchanges: {e}")
         return {"success": False, "exchanges": []}
 
-@app.post("/api/exchanges/save")
-def save_exchange_config(
+@app.get("/api/exchanges/list")
+async def get_exchanges_list():
+    return await _run_read(_get_exchanges_list_sync)
+
+def _save_exchange_config_sync(
     exchange_name: str = Form(...),
     api_key: str = Form(...),
     secret_key: str = Form(...),
@@ -1435,6 +1747,16 @@ def save_exchange_config(
         log.error(f"Error guardando exchange: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/exchanges/save")
+async def save_exchange_config(
+    exchange_name: str = Form(...),
+    api_key: str = Form(...),
+    secret_key: str = Form(...),
+    passphrase: str = Form(default=None),
+    use_testnet: int = Form(default=0)
+):
+    return await _run_trade(_save_exchange_config_sync, exchange_name=exchange_name, api_key=api_key, secret_key=secret_key, passphrase=passphrase, use_testnet=use_testnet)
+
 @app.get("/api/exchanges/get/{exchange_name}")
 def get_exchange_config(exchange_name: str):
     """Obtiene credenciales de un exchange"""
@@ -1462,8 +1784,7 @@ def delete_exchange_config(exchange_name: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/exchanges/connect/{exchange_name}")
-def connect_exchange(exchange_name: str):
+def _connect_exchange_sync(exchange_name: str):
     """Conecta el servicio al exchange con las credenciales guardadas"""
     try:
         creds = db.get_exchange_credentials(exchange_name)
@@ -1501,6 +1822,14 @@ def connect_exchange(exchange_name: str):
         except Exception:
             pass
 
+        # Los pares con "accounts" dependen de la cuenta conectada: se reparten de nuevo (core.engine)
+        accounts = getattr(bot_instance, 'accounts', None)
+        if accounts is not None:
+            try:
+                accounts.sync()
+            except Exception as e:
+                log.warning(f"No se pudieron reasignar las cuentas: {e}")
+
         # Invalidar cachés para forzar actualización inmediata
         global _balance_cache, _tickers_cache
         _balance_cache = {"data": {}, "timestamp": 0}
@@ -1513,12 +1842,20 @@ def connect_exchange(exchange_name: str):
         log.error(f"Error conectando exchange: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/exchanges/connect/{exchange_name}")
+async def connect_exchange(exchange_name: str):
+    return await _run_trade(_connect_exchange_sync, exchange_name=exchange_name)
+
 
 @app.post("/api/exchanges/disconnect")
 def disconnect_exchange():
     """Desconecta el exchange actual"""
     try:
         if bot_instance and bot_instance.connector:
+            try:
+                bot_instance.connector.release_recording()
+            except Exception as e:
+                log.debug(f"release_recording: {e}")
             bot_instance.connector.exchange = None
             try:
                 bot_instance.active_exchange_name = None
@@ -1560,8 +1897,7 @@ def get_exchange_keys_hash(exchange_name: str):
 
 # ==================== ENDPOINTS DE EXCHANGE ====================
 
-@app.get("/api/exchange/ping")
-def exchange_ping():
+def _exchange_ping_sync():
     """Obtiene el ping del exchange (Binance)"""
     try:
         import time
@@ -1591,8 +1927,44 @@ def exchange_ping():
         log.error(f"Error en ping: {e}")
         return {"ping": None, "error": str(e)}
 
+@app.get("/api/exchange/ping")
+async def exchange_ping():
+    return await _run_in(_ping_executor, PING_TIMEOUT, _exchange_ping_sync)
+
+# ==================== MOTOR MULTICUENTA (core.engine) ====================
+
+def _engine_accounts():
+    accounts = getattr(bot_instance, 'accounts', None) if bot_instance else None
+    if accounts is None:
+        raise HTTPException(status_code=503, detail="Motor multicuenta no disponible")
+    return accounts
+
+def _accounts_status_sync():
+    """Vista agregada de las cuentas: patrimonio, trades y PnL por cuenta y totales."""
+    return _engine_accounts().status()
+
+@app.get("/api/accounts")
+async def accounts_status():
+    return await _run_read(_accounts_status_sync)
+
+def _account_action_sync(account: str, action: str):
+    accounts = _engine_accounts()
+    done = accounts.launch_account(account) if action == 'start' else accounts.stop_account(account)
+    if not done:
+        return {"status": "warning", "message": f"Sin cambios en la cuenta {account}."}
+    log.info(f"🏦 Cuenta {account}: {'arrancada' if action == 'start' else 'detenida'} desde la web.")
+    return {"status": "success", "message": f"Cuenta {account}: {'arrancada' if action == 'start' else 'detenida'}."}
+
+@app.post("/api/accounts/{account}/start")
+async def account_start(account: str):
+    return await _run_control(_account_action_sync, account=account, action='start')
+
+@app.post("/api/accounts/{account}/stop")
+async def account_stop(account: str):
+    return await _run_control(_account_action_sync, account=account, action='stop')
+
 @app.get("/api/exchange/info")
-def exchange_info():
+async def exchange_info():
     """Obtiene información del exchange conectado"""
     try:
         if bot_instance and bot_instance.connector and bot_instance.connector.exchange:
@@ -38,6 +38,8 @@ export async function loadConfigForm() {
             const startMode = strategy.start_mode || 'wait';
             const profile = strategy.strategy_profile || 'manual';
             const trailing = strategy.trailing_enabled === true; 
+            const adaptive = strategy.grid_mode === 'adaptive';
+            const paper = pair.mode === 'paper';
             
             // ESTRUCTURA HTML ORIGINAL RESTAURADA
             const html = `
@@ -71,6 +73,14 @@ export async function loadConfigForm() {
                                 <input class="form-check-input ms-0 me-2" type="checkbox" role="switch" id="trailing-${index}" ${trailing ? 'checked' : ''} style="float:none;">
                                 <label class="form-check-label fw-bold small text-primary" for="trailing-${index}"><i class="fa-solid fa-arrow-trend-up me-1"></i> Trailing Up</label>
                             </div>
+                            <div class="form-check form-switch mb-3 p-2 border rounded bg-white" title="Spread y líneas según ATR y volatilidad (Nº Líneas y Spread quedan como valores iniciales)">
+                                <input class="form-check-input ms-0 me-2" type="checkbox" role="switch" id="adaptive-${index}" ${adaptive ? 'checked' : ''} style="float:none;">
+                                <label class="form-check-label fw-bold small text-primary" for="adaptive-${index}"><i class="fa-solid fa-wave-square me-1"></i> Rejilla adaptativa (ATR)</label>
+                            </div>
+                            <div class="form-check form-switch mb-3 p-2 border rounded bg-white" title="Órdenes virtuales contra los precios reales, con cartera y estadísticas aparte">
+                                <input class="form-check-input ms-0 me-2" type="checkbox" role="switch" id="paper-${index}" ${paper ? 'checked' : ''} style="float:none;">
+                                <label class="form-check-label fw-bold small text-warning" for="paper-${index}"><i class="fa-solid fa-flask me-1"></i> Paper trading (virtual)</label>
+                            </div>
                             
                             <hr class="text-muted">
                             
@@ -137,10 +147,12 @@ export async function analyzeSymbol(symbol, index, currentProfile) {
                 <button id="btn-mod-${index}" class="btn btn-sm ${btnMod} flex-fill" title="Moderada" onclick="applyStrategy(${index}, 'moderate')">⚖️</button>
                 <button id="btn-agg-${index}" class="btn btn-sm ${btnAgg} flex-fill" title="Agresiva" onclick="applyStrategy(${index}, 'aggressive')">🚀</button>
                 <button id="btn-man-${index}" class="btn btn-sm ${btnMan} flex-fill" disabled style="opacity:1" title="Manual">🛠️</button>
+                <button class="btn btn-sm btn-outline-dark flex-fill" title="Optimizar con backtests" onclick="optimizeSymbol('${symbol}', ${index})">🧪</button>
             </div>
             <div class="mt-1 small text-muted text-start fst-italic" style="font-size:0.7rem">
                Estrategia: <strong>${currentProfile ? currentProfile.toUpperCase() : 'MANUAL'}</strong>
             </div>
+            <div id="opt-box-${index}" class="mt-1 small text-start" style="font-size:0.7rem"></div>
         `;
     } catch (e) { const box = document.getElementById(`rsi-box-${index}`); if(box) box.innerHTML = '<small class="text-danger">Error RSI</small>'; }
 }
@@ -181,6 +193,45 @@ export function applyStrategy(index, type) {
 
 export function setManual(index) { updateButtons(index, 'manual'); }
 
+export async function optimizeSymbol(symbol, index) {
+    if (!confirm(`¿Buscar la mejor configuración para ${symbol}?\n\nSe ejecutarán backtests de los últimos 30 días (velas de 5m) en todos los núcleos del servidor.`)) return;
+    const box = document.getElementById(`opt-box-${index}`);
+    try {
+        const res = await fetch('/api/strategy/optimize', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ symbol: symbol }) });
+        const data = await res.json();
+        if (!res.ok) { alert('Error: ' + data.detail); return; }
+    } catch (e) { alert("Error iniciando la optimización."); return; }
+
+    let status = null;
+    while (true) {
+        await new Promise(r => setTimeout(r, 2000));
+        try { status = await (await fetch(`/api/strategy/optimize?_=${Date.now()}`)).json(); } catch (e) { continue; }
+        if (status.status !== 'running') break;
+        const progress = status.phase === 'download' ? 'Descargando velas...' : `Backtests: ${status.progress.evaluated}/${status.progress.total}`;
+        if (box) box.innerHTML = `<div class="spinner-border spinner-border-sm text-secondary"></div> ${progress}`;
+    }
+    if (status.status !== 'done' || !status.result || !status.result.best) {
+        if (box) box.innerHTML = `<span class="text-danger">Optimización ${status.status}${status.error ? ': ' + status.error : ''}</span>`;
+        return;
+    }
+    const best = status.result.best;
+    const p = best.params;
+    if (box) box.innerHTML = `🧪 ${p.grids_quantity} líneas · ${p.grid_spread}% · ${p.amount_per_grid}$ · ${p.start_mode}${p.trailing_enabled ? ' · trailing' : ''}<br>PnL ${best.pnl_pct}% · DD ${best.max_drawdown_pct}% · Sharpe ${best.sharpe}`;
+    if (!confirm(`Mejor resultado (${status.result.evaluated} backtests):\n\nLíneas: ${p.grids_quantity}\nSpread: ${p.grid_spread}%\nInversión por línea: ${p.amount_per_grid} USDC\nArranque: ${p.start_mode}\nTrailing: ${p.trailing_enabled ? 'Sí' : 'No'}\n\nPnL: ${best.pnl_pct}% · Drawdown máx: ${best.max_drawdown_pct}%\n\n¿Guardar en config.json5?`)) return;
+
+    const res = await fetch('/api/strategy/optimize/apply', { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ symbol: symbol, params: p }) });
+    const data = await res.json();
+    if (!res.ok) { alert('Error: ' + data.detail); return; }
+    document.getElementById(`qty-${index}`).value = p.grids_quantity;
+    document.getElementById(`spread-${index}`).value = p.grid_spread;
+    document.getElementById(`amount-${index}`).value = p.amount_per_grid;
+    document.getElementById(`trailing-${index}`).checked = p.trailing_enabled;
+    const mode = { wait: 'wait', buy_1: 'buy1', buy_2: 'buy2' }[p.start_mode];
+    if (mode) document.getElementById(`sm-${mode}-${index}`).checked = true;
+    updateButtons(index, 'manual');
+    alert(data.message);
+}
+
 export function toggleCard(index) {
     const checkbox = document.getElementById(`enable-${index}`);
     const card = document.getElementById(`card-pair-${index}`);
@@ -214,12 +265,19 @@ export async function saveConfigForm() {
         
         const trailingCheck = document.getElementById(`trailing-${index}`);
         const trailing = trailingCheck ? trailingCheck.checked : false;
+
+        const adaptiveCheck = document.getElementById(`adaptive-${index}`);
+        const adaptive = adaptiveCheck ? adaptiveCheck.checked : false;
+
+        const paperCheck = document.getElementById(`paper-${index}`);
+        const paper = paperCheck ? paperCheck.checked : false;
         
         let startMode = 'wait';
         if (document.getElementById(`sm-buy1-${index}`).checked) startMode = 'buy_1';
         if (document.getElementById(`sm-buy2-${index}`).checked) startMode = 'buy_2';
 
         pair.enabled = isEnabled;
+        pair.mode = paper ? 'paper' : 'live';
         if (!pair.strategy) pair.strategy = {};
         pair.strategy.amount_per_grid = amount;
         pair.strategy.grids_quantity = qty;
@@ -227,6 +285,7 @@ export async function saveConfigForm() {
         pair.strategy.start_mode = startMode;
         pair.strategy.strategy_profile = profile; 
         pair.strategy.trailing_enabled = trailing;
+        pair.strategy.grid_mode = adaptive ? 'adaptive' : 'fixed';
     });
 
     const jsonString = JSON.stringify(currentConfigObj, null, 2);
@@ -257,3 +316,4 @@ window.toggleCard = toggleCard;
 window.applyStrategy = applyStrategy;
 window.setManual = setManual;
 window.changeRsiTf = changeRsiTf;
+window.optimizeSymbol = optimizeSymbol;
@@ -14,6 +14,8 @@ let currentTimeframe = '15m';
 let currentChartType = 'candles'; 
 let dataCache = {}; 
 let fullGlobalHistory = []; 
+let detailsState = null; // /api/details incremental del par abierto
+let balanceState = null; // /api/history/balance incremental (serie cruda + cursor)
 let sessionUptimeInterval = null; 
 let sessionUptimeBase = null; // segundos (del servidor)
 let sessionOnlineState = null; // booleano
@@ -37,6 +39,7 @@ window.panicStop = panicStop;
 window.panicStart = panicStart;
 window.panicCancel = panicCancel;
 window.panicSell = panicSell;
+window.runProfiler = runProfiler;
 window.startEngine = startEngine;
 window.stopEngine = stopEngine;
 window.clearHistory = clearHistory;
@@ -322,7 +325,7 @@ function ensureTabExists(symbol) {
 }
 
 function setMode(m) {
-    currentMode = m; dataCache = {};
+    currentMode = m; dataCache = {}; detailsState = null;
     if(m==='home') loadHome();
     else if(m==='wallet') loadWallet();
     else if(m!=='config') loadSymbol(m);
@@ -762,7 +765,7 @@ async function loadHome() {
         }
 
         // Operaciones totales (suma de trades de todas las estrategias)
-        const totalOperations = (data.strategies || []).reduce((acc, s) => acc + (s.total_trades || 0), 0);
+        const totalOperations = (data.strategies || []).filter(s => !s.paper).reduce((acc, s) => acc + (s.total_trades || 0), 0);
         const elTotalOps = document.getElementById('summary-total-operations');
         if (elTotalOps) elTotalOps.innerText = totalOperations.toString();
         
@@ -780,13 +783,40 @@ async function loadHome() {
         if(stTable) {
             stTable.innerHTML = data.strategies.map(s => {
                 const safe = s.symbol.replace('/', '_');
-                return `<tr><td class="fw-bold">${s.symbol}</td><td><span class="badge bg-success bg-opacity-25 text-success">Activo</span></td><td><small>${s.grids} Líneas @ ${s.amount}$ (${s.spread}%)</small></td><td class="fw-bold">${s.total_trades}</td><td class="${s.total_pnl>=0?'text-success':'text-danger'} fw-bold">${fmtUSDC(s.total_pnl)} $</td><td class="${s.session_pnl>=0?'text-success':'text-danger'} fw-bold">${fmtUSDC(s.session_pnl)} $</td><td class="text-end"><button class="btn btn-sm btn-outline-primary" onclick="document.querySelector('[data-bs-target=\\'#content-${safe}\\']').click()"><i class="fa-solid fa-chart-line"></i></button></td></tr>`;
+                return `<tr><td class="fw-bold">${s.symbol}</td><td>${s.paper ? '<span class="badge bg-warning bg-opacity-25 text-warning">Paper</span>' : '<span class="badge bg-success bg-opacity-25 text-success">Activo</span>'}</td><td><small>${s.grids} Líneas @ ${s.amount}$ (${s.spread}%)</small></td><td class="fw-bold">${s.total_trades}</td><td class="${s.total_pnl>=0?'text-success':'text-danger'} fw-bold">${fmtUSDC(s.total_pnl)} $</td><td class="${s.session_pnl>=0?'text-success':'text-danger'} fw-bold">${fmtUSDC(s.session_pnl)} $</td><td class="text-end"><button class="btn btn-sm btn-outline-primary" onclick="document.querySelector('[data-bs-target=\\'#content-${safe}\\']').click()"><i class="fa-solid fa-chart-line"></i></button></td></tr>`;
             }).join('');
         }
     } catch(e) { console.error(e); }
     
     // Cargar ranking de operaciones
     loadTopStrategies();
+    loadAccounts();
+}
+
+// Vista agregada del motor multicuenta (sólo se muestra con más de una cuenta)
+async function loadAccounts() {
+    const row = document.getElementById('accounts-row');
+    const tbody = document.getElementById('accounts-table-body');
+    if (!row || !tbody) return;
+    try {
+        const res = await fetch('/api/accounts');
+        if (!res.ok) { row.classList.add('d-none'); return; }
+        const data = await res.json();
+        if (!data.accounts || data.accounts.length < 2) { row.classList.add('d-none'); return; }
+        row.classList.remove('d-none');
+        const pnlCell = v => `<td class="${v>=0?'text-success':'text-danger'} fw-bold">${fmtUSDC(v)} $</td>`;
+        tbody.innerHTML = data.accounts.map(a => {
+            const state = !a.connected ? '<span class="badge bg-secondary">Desconectada</span>'
+                : a.paused ? '<span class="badge bg-warning text-dark">Pausada</span>'
+                : a.running ? '<span class="badge bg-success bg-opacity-25 text-success">En marcha</span>'
+                : '<span class="badge bg-secondary bg-opacity-25 text-secondary">Parada</span>';
+            const equity = a.equity === null ? '-' : `${fmtUSDC(a.equity)} $`;
+            return `<tr><td class="fw-bold">${a.account || '-'}${a.primary ? ' <small class="text-muted">(principal)</small>' : ''}</td><td>${state}</td><td><small>${a.pairs.join(', ') || '-'}</small></td><td>${equity}</td><td class="fw-bold">${a.trades}</td>${pnlCell(a.total_pnl)}${pnlCell(a.session_pnl)}</tr>`;
+        }).join('');
+        const t = data.totals;
+        document.getElementById('accounts-totals').innerText =
+            `${t.accounts} cuentas · ${t.pairs} pares · ${fmtUSDC(t.equity)} $ · PnL sesión ${fmtUSDC(t.session_pnl)} $`;
+    } catch (e) { row.classList.add('d-none'); }
 }
 
 // --- FUNCIONES CONTROL SISTEMA ---
@@ -814,29 +844,64 @@ function formatServiceUptime(seconds){
     }
 }
 
+// Estado incremental de /api/details: velas y trades ya recibidos + cursores de la siguiente petición
+const MAX_DETAIL_CANDLES = 1000;
+const MAX_DETAIL_TRADES = 50;
+
+function fmtCandleTime(ts) {
+    const d = new Date(ts);
+    return `${d.getFullYear()}-${pad2(d.getMonth() + 1)}-${pad2(d.getDate())} ${pad2(d.getHours())}:${pad2(d.getMinutes())}`;
+}
+
+function mergeDetailsDelta(state, data) {
+    // La primera vela del delta puede ser la última que ya teníamos (seguía abierta): se reemplaza
+    if (data.candles.length) {
+        const first = data.candles[0][0];
+        state.candles = state.candles.filter(c => c[0] < first).concat(data.candles).slice(-MAX_DETAIL_CANDLES);
+    }
+    if (data.trades.length) {
+        state.trades = state.trades.concat(data.trades)
+            .sort((a, b) => b.timestamp - a.timestamp)
+            .slice(0, MAX_DETAIL_TRADES);
+    }
+    state.since = data.cursor.since;
+    state.tradesCursor = data.cursor.trades_cursor;
+}
+
 async function loadSymbol(symbol) {
     const safe = symbol.replace('/', '_');
     try {
-        const res = await fetch(`/api/details/${symbol}?timeframe=${currentTimeframe}&_=${Date.now()}`);
+        if (!detailsState || detailsState.symbol !== symbol || detailsState.timeframe !== currentTimeframe) {
+            detailsState = { symbol: symbol, timeframe: currentTimeframe, candles: [], trades: [], since: 0, tradesCursor: null };
+        }
+        const state = detailsState;
+        let url = `/api/details/${symbol}?timeframe=${currentTimeframe}&since=${state.since}`;
+        if (state.tradesCursor !== null) url += `&trades_cursor=${state.tradesCursor}`;
+        const res = await fetch(`${url}&_=${Date.now()}`);
         if (!res.ok) {
             console.error(`Error fetchin /api/details/${symbol}:`, res.status);
             return;
         }
         const data = await res.json();
-        
+        if (detailsState !== state) return; // cambio de par/timeframe mientras llegaba la respuesta
+        if (!data || !data.delta) {
+            console.warn(`Respuesta inválida de /api/details/${symbol}`);
+            return;
+        }
+        mergeDetailsDelta(state, data);
+
         // Validar que los datos existan y sean válidos
-        if (!data || !data.chart_data) {
-            console.warn(`No hay chart_data para ${symbol}`);
+        if (!state.candles.length) {
+            console.warn(`No hay velas para ${symbol}`);
             const chartDom = document.getElementById(`chart-${safe}`);
             if (chartDom) chartDom.innerHTML = '<div class="empty-chart text-center text-muted" style="padding:40px 10px">Sin datos disponibles</div>';
             return;
         }
-        
-        
-        
+
         document.getElementById(`price-${safe}`).innerText = `${fmtPrice(data.price)} USDC`;
-        
-        renderCandleChart(safe, data.chart_data, data.grid_lines || [], data.open_orders || [], currentChartType);
+
+        const chartData = state.candles.map(c => [fmtCandleTime(c[0]), c[1], c[2], c[3], c[4]]);
+        renderCandleChart(safe, chartData, data.grid_lines || [], data.open_orders || [], currentChartType);
         
         document.getElementById(`count-buy-${safe}`).innerText = data.open_orders.filter(o => o.side === 'buy').length;
         document.getElementById(`count-sell-${safe}`).innerText = data.open_orders.filter(o => o.side === 'sell').length;
@@ -846,12 +911,15 @@ async function loadSymbol(symbol) {
         const allOrders = [...data.open_orders].sort((a,b) => b.price - a.price);
         document.getElementById(`orders-${safe}`).innerHTML = allOrders.map(o => `<tr><td><b class="${o.side=='buy'?'text-buy':'text-sell'}">${o.side.toUpperCase()}</b></td><td>${fmtPrice(o.price)}</td><td>${fmtCrypto(o.amount)}</td></tr>`).join('');
         
-        document.getElementById(`trades-${safe}`).innerHTML = data.trades.map(t => {
+        document.getElementById(`trades-${safe}`).innerHTML = state.trades.map(t => {
             let idBadge = t.buy_id || '-';
             if(t.side === 'sell' && t.buy_id) idBadge = '⮑ ' + t.buy_id; 
             return `<tr><td><span class="badge bg-secondary">${idBadge}</span></td><td>${new Date(t.timestamp).toLocaleTimeString()}</td><td><span class="badge ${t.side=='buy'?'bg-buy':'bg-sell'}">${t.side.toUpperCase()}</span></td><td>${fmtPrice(t.price)}</td><td>${fmtUSDC(t.cost)}</td></tr>`;
         }).join('');
 
+        // Quedan trades tras esta página: seguir avanzando el cursor sin esperar al siguiente ciclo
+        if (data.more && currentMode === symbol) loadSymbol(symbol);
+
 // --- MANTENIMIENTO ---
     } catch(e) { console.error(`Error en loadSymbol(${symbol}):`, e); }
 }
@@ -946,6 +1014,7 @@ async function loadBalanceCharts(exchange=null, force=false) {
 
         // Si se fuerza la recarga, destruimos los charts existentes para forzar render limpio
         if (force) {
+            balanceState = null;
             try {
                 destroyChartById('balanceChartSession');
                 destroyChartById('balanceChartHistory');
@@ -953,35 +1022,49 @@ async function loadBalanceCharts(exchange=null, force=false) {
             } catch(e) { /* silent */ }
         }
 
-        // Determinar label legible (añadir indicador Testnet si aplica)
-        let displayName = exchange || '';
-        if (exchange) {
-            try {
-                const cfgRes = await fetch(`/api/exchanges/get/${encodeURIComponent(exchange)}`);
-                if (cfgRes.ok) {
-                    const cfg = await cfgRes.json();
-                    if (cfg.use_testnet) displayName = `${displayName} (testnet)`;
+        // Con serie ya cargada del mismo exchange sólo se piden las snapshots nuevas (?since=cursor)
+        const incremental = balanceState && balanceState.exchange === exchange;
+        if (!incremental) {
+            // Determinar label legible (añadir indicador Testnet si aplica)
+            let displayName = exchange || '';
+            if (exchange) {
+                try {
+                    const cfgRes = await fetch(`/api/exchanges/get/${encodeURIComponent(exchange)}`);
+                    if (cfgRes.ok) {
+                        const cfg = await cfgRes.json();
+                        if (cfg.use_testnet) displayName = `${displayName} (testnet)`;
+                    }
+                } catch(e) {
+                    // ignore
                 }
-            } catch(e) {
-                // ignore
             }
+            balanceState = { exchange: exchange, label: displayName, global: [], sessionStart: 0, cursor: null };
         }
+        const state = balanceState;
 
-        const url = exchange ? `/api/history/balance?exchange=${encodeURIComponent(exchange)}` : '/api/history/balance';
-        const res = await fetch(url);
+        const params = new URLSearchParams();
+        if (exchange) params.set('exchange', exchange);
+        if (state.cursor !== null) params.set('since', state.cursor);
+        const query = params.toString();
+        const res = await fetch(query ? `/api/history/balance?${query}` : '/api/history/balance');
         
         if (!res.ok) {
             console.error("❌ Error fetching balance history:", res.status);
             return;
         }
         const data = await res.json(); 
+        if (balanceState !== state) return;
+        state.global = data.delta ? state.global.concat(data.global) : data.global;
+        state.sessionStart = data.session_start || 0;
+        state.cursor = data.cursor !== undefined ? data.cursor : state.cursor;
+        const session = state.global.filter(x => x[0] >= state.sessionStart);
         
         // Aplicar filtro de pikes: ignorar variaciones >30% en <1 minuto
-        fullGlobalHistory = filterBalancePikes(data.global); 
+        fullGlobalHistory = filterBalancePikes(state.global); 
         
         // Solo renderizar con ECharts (mucho mejor control de escala)
-        const exLabel = displayName ? ` (${displayName.toUpperCase()})` : '';
-        renderEChart('balanceChartSession', data.session, '#0ecb81', `Balance Sesión${exLabel}`);
+        const exLabel = state.label ? ` (${state.label.toUpperCase()})` : '';
+        renderEChart('balanceChartSession', session, '#0ecb81', `Balance Sesión${exLabel}`);
         renderEChart('balanceChartHistory', fullGlobalHistory, '#3b82f6', `Balance Total${exLabel}`);
         renderEChart('balanceChartGlobal', fullGlobalHistory, '#3b82f6', `Balance Global${exLabel}`);
         
@@ -1021,10 +1104,43 @@ async function resetGlobalChart() { const result = await Swal.fire({ title: '¿B
 async function resetSessionChart() { const result = await Swal.fire({ title: '¿Reiniciar Sesión?', text: "Se reiniciará la gráfica de sesión y el contador de PnL de sesión.", icon: 'question', showCancelButton: true, confirmButtonText: 'Reiniciar' }); if (result.isConfirmed) postAction('/api/reset/chart/session'); }
 async function resetGlobalPnL() { const result = await Swal.fire({ title: '¿Borrar Historial PnL?', text: "Se eliminarán todos los registros de trades pasados.", icon: 'warning', showCancelButton: true, confirmButtonColor: '#d33', confirmButtonText: 'Borrar' }); if (result.isConfirmed) postAction('/api/reset/pnl/global'); }
 async function refreshOrders() { postAction('/api/refresh_orders'); }
+
+// --- PROFILER POR MUESTREO (diagnóstico en caliente) ---
+async function runProfiler() {
+    const result = await Swal.fire({
+        title: 'Perfilar motor',
+        text: 'Segundos de muestreo (los hilos del motor y la web siguen funcionando):',
+        input: 'number', inputValue: 30, inputAttributes: { min: 5, max: 300, step: 5 },
+        showCancelButton: true, confirmButtonText: 'Empezar'
+    });
+    if (!result.isConfirmed) return;
+    const seconds = Math.max(5, Math.min(300, parseInt(result.value) || 30));
+    try {
+        const res = await fetch('/api/debug/profile/start', { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({ seconds: seconds }) });
+        const d = await res.json();
+        if (!res.ok) { Swal.fire('Error', d.detail, 'error'); return; }
+    } catch(e) { Swal.fire('Error', 'Conexión', 'error'); return; }
+
+    Swal.fire({ title: 'Perfilando...', html: `Muestreando durante ${seconds}s<br><i class="fa-solid fa-spinner fa-spin fa-2x mt-3"></i>`, allowOutsideClick: false, showConfirmButton: false });
+    const poll = setInterval(async () => {
+        try {
+            const st = await (await fetch('/api/debug/profile/status')).json();
+            if (st.running) return;
+            clearInterval(poll);
+            const top = await (await fetch('/api/debug/profile/top?limit=15')).json();
+            const rows = top.functions.map(f => `<tr><td class="text-start small">${f.function}</td><td>${f.self_pct}%</td><td>${f.total_pct}%</td></tr>`).join('');
+            Swal.fire({
+                title: `Top funciones (${top.samples} muestras)`, width: 900,
+                html: `<table class="table table-sm"><thead><tr><th class="text-start">Función</th><th>Propio</th><th>Total</th></tr></thead><tbody>${rows}</tbody></table>` +
+                      `<a class="btn btn-sm btn-outline-primary" href="/api/debug/profile/collapsed" download>Descargar pilas (flamegraph)</a>`
+            });
+        } catch(e) { clearInterval(poll); Swal.fire('Error', 'Conexión', 'error'); }
+    }, 2000);
+}
 async function resetCoinSession(symbol) { const result = await Swal.fire({ title: `¿Reiniciar Sesión ${symbol}?`, text: "Solo afectará al contador de esta moneda.", icon: 'question', showCancelButton: true, confirmButtonText: 'Reiniciar' }); if (result.isConfirmed) postAction('/api/reset/coin/session', { symbol: symbol }); }
 async function resetCoinGlobal(symbol) { const result = await Swal.fire({ title: `¿Borrar Historial ${symbol}?`, text: "Se eliminarán los trades antiguos de esta moneda.", icon: 'warning', showCancelButton: true, confirmButtonColor: '#d33', confirmButtonText: 'Borrar' }); if (result.isConfirmed) postAction('/api/reset/coin/global', { symbol: symbol }); }
 
-async function postAction(url, body={}, cb=null) { try { const res = await fetch(url, { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(body) }); const d = await res.json(); if(res.ok) { if(cb) await cb(); else { dataCache={}; await loadHome(); } Swal.fire({title:'Éxito', text:d.message, icon:'success', timer:1500, showConfirmButton:false}); } else Swal.fire('Error', d.detail, 'error'); } catch(e) { Swal.fire('Error', 'Conexión', 'error'); } }
+async function postAction(url, body={}, cb=null) { try { const res = await fetch(url, { method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(body) }); const d = await res.json(); if(res.ok) { if(cb) await cb(); else { dataCache={}; detailsState=null; balanceState=null; await loadHome(); } Swal.fire({title:'Éxito', text:d.message, icon:'success', timer:1500, showConfirmButton:false}); } else Swal.fire('Error', d.detail, 'error'); } catch(e) { Swal.fire('Error', 'Conexión', 'error'); } }
 
 // --- NUEVA LÓGICA DE ESPERA ACTIVA (POLLING DE ESTADO) ---
 async function executeEngineAction(url, actionTitle, targetStatus) {